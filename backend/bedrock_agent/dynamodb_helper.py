@@ -8,8 +8,17 @@ from botocore.exceptions import ClientError
 # (Add logger, add error handling, add optimizations, etc...)
 
 TABLE_NAME = os.environ.get("TABLE_NAME")
-dynamodb_resource = boto3.resource("dynamodb")
-table = dynamodb_resource.Table(TABLE_NAME)
+
+# Created on first use, as the state machine also imports the action groups
+# (local intents) and the agents data table is not its main table
+table = None
+
+
+def get_table():
+    global table
+    if table is None:
+        table = boto3.resource("dynamodb").Table(TABLE_NAME)
+    return table
 
 
 def query_dynamodb_pk_sk(partition_key: str, sort_key_portion: str) -> list[dict]:
@@ -33,7 +42,7 @@ def query_dynamodb_pk_sk(partition_key: str, sort_key_portion: str) -> list[dict
         limit = 50
 
         # Initial query before pagination
-        response = table.query(
+        response = get_table().query(
             KeyConditionExpression=key_condition,
             Limit=limit,
         )
@@ -42,7 +51,7 @@ def query_dynamodb_pk_sk(partition_key: str, sort_key_portion: str) -> list[dict
 
         # Pagination loop for possible following queries
         while "LastEvaluatedKey" in response:
-            response = table.query(
+            response = get_table().query(
                 KeyConditionExpression=key_condition,
                 Limit=limit,
                 ExclusiveStartKey=response["LastEvaluatedKey"],
@@ -10,6 +10,38 @@ class WhatsAppMessageTypes(Enum):
     VOICE: str = "voice"
 
 
+class WhatsAppStatusTypes(Enum):
+    """Class that represents the different statuses of outbound WhatsApp messages."""
+
+    SENT: str = "sent"
+    DELIVERED: str = "delivered"
+    READ: str = "read"
+    FAILED: str = "failed"
+
+
+class ExecutionModes(Enum):
+    """Class that represents how the messages are processed after the trigger."""
+
+    STATE_MACHINE: str = "state_machine"
+    DIRECT: str = "direct"
+
+
+class StaleMessagePolicies(Enum):
+    """Class that represents what the trigger does with stale (old) messages."""
+
+    OFF: str = "off"
+    SKIP: str = "skip"
+    FOLD: str = "fold"
+
+
+class CircuitStates(Enum):
+    """Class that represents the states of the circuit breaker of a dependency."""
+
+    CLOSED: str = "closed"
+    OPEN: str = "open"
+    HALF_OPEN: str = "half_open"
+
+
 # TODO: Actually use these prefixes for my DynamoDB Table Single Table Design
 class DDBPrefixes(Enum):
     """
@@ -21,6 +53,14 @@ class DDBPrefixes(Enum):
     SK_NUMBER_DATA = "NUMBER#"
     SK_CHAT_INPUT = "CHAT#INPUT#"
     SK_CHAT_OUTPUT = "CHAT#OUTPUT#"
+    PK_DEDUPE = "DEDUPE#"
+    SK_DEDUPE = "DEDUPE"
+    SK_STATUS = "STATUS#"
+    SK_CATCHING_UP = "CATCHING_UP"
+    SK_SESSION = "SESSION"
+    PK_FAILURE = "FAILURE#"
+    PK_ANSWER = "ANSWER#"
+    SK_ANSWER = "ANSWER"
 
 
 if __name__ == "__main__":
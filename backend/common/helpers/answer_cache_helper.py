@@ -0,0 +1,338 @@
+# Built-in imports
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+# External imports
+from aws_lambda_powertools.metrics import MetricUnit
+
+try:
+    import numpy as np
+except ImportError:  # Optional, only needed for the semantic lookups
+    np = None
+
+# Own imports
+from common.enums import DDBPrefixes
+from common.helpers.aws_clients import get_client
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.text_helper import normalize_text
+from common.logger import custom_logger
+from common.metrics import custom_metrics
+from common.models.answer_cache_model import AnswerCacheModel
+
+logger = custom_logger()
+metrics = custom_metrics()
+
+# Answers can change when the knowledge base is updated, so they expire
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "500"))
+
+# Minimum cosine similarity to reuse the answer of a different question
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(
+    os.environ.get("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.92")
+)
+ANSWER_CACHE_EMBEDDING_MODEL = os.environ.get(
+    "ANSWER_CACHE_EMBEDDING_MODEL", "amazon.titan-embed-text-v2:0"
+)
+
+# The answers about the calendar, TODOs and contacts (agent action groups) are
+# personal and change over time, as the questions with dates (e.g. "today")
+UNCACHEABLE_PATTERN = re.compile(
+    r"\b("
+    r"calendars?|events?|meetings?|agenda|schedules?|todos?|to do|tasks?|"
+    r"pending|reminders?|contacts?|phones?|emails?|"
+    r"calendarios?|eventos?|reunion(es)?|citas?|tareas?|pendientes?|"
+    r"recordatorios?|contactos?|telefonos?|correos?|"
+    r"today|tomorrow|yesterday|tonight|hoy|manana|ayer|"
+    r"\d{4} \d{2} \d{2}|\d{1,2} \d{1,2}( \d{2,4})?"
+    r")\b"
+)
+
+# Smoothing of the average agent latency (to estimate the latency saved)
+LATENCY_SMOOTHING = 0.2
+
+
+def is_cacheable(question: str) -> bool:
+    """
+    Function to check if the answer of a (normalized) question can be shared.
+    :param question (str): Normalized question (see "normalize_text").
+    """
+    return bool(question) and not UNCACHEABLE_PATTERN.search(question)
+
+
+class BedrockEmbedder:
+    """Embeddings of the questions with a Bedrock model (normalized vectors)."""
+
+    def __init__(self, model_id: str = ANSWER_CACHE_EMBEDDING_MODEL) -> None:
+        self.model_id = model_id
+        self._bedrock_runtime_client = None
+
+    @property
+    def bedrock_runtime_client(self):
+        if self._bedrock_runtime_client is None:
+            self._bedrock_runtime_client = get_client("bedrock-runtime")
+        return self._bedrock_runtime_client
+
+    @bedrock_runtime_client.setter
+    def bedrock_runtime_client(self, client) -> None:
+        self._bedrock_runtime_client = client
+
+    def __call__(self, text: str) -> list[float]:
+        response = self.bedrock_runtime_client.invoke_model(
+            modelId=self.model_id,
+            body=json.dumps({"inputText": text, "dimensions": 256, "normalize": True}),
+        )
+        return json.loads(response["body"].read())["embedding"]
+
+
+class VectorIndex:
+    """
+    In-memory index of normalized vectors (one row per key of a NumPy matrix),
+    for the nearest neighbor by cosine similarity (dot product).
+    """
+
+    def __init__(self) -> None:
+        self._vectors = {}
+        self._keys = []
+        self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def add(self, key: str, vector: list[float]) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        self._vectors[key] = vector / (np.linalg.norm(vector) or 1.0)
+        self._matrix = None
+
+    def remove(self, key: str) -> None:
+        if self._vectors.pop(key, None) is not None:
+            self._matrix = None
+
+    def search(self, vector: list[float]) -> tuple[Optional[str], float]:
+        """
+        Method to get the key of the most similar vector, and its similarity.
+        :param vector (list(float)): Vector to search.
+        """
+        if not self._vectors:
+            return None, 0.0
+        if self._matrix is None:
+            self._keys = list(self._vectors)
+            self._matrix = np.stack([self._vectors[key] for key in self._keys])
+        vector = np.asarray(vector, dtype=np.float32)
+        similarities = self._matrix @ (vector / (np.linalg.norm(vector) or 1.0))
+        best = int(np.argmax(similarities))
+        return self._keys[best], float(similarities[best])
+
+
+class AnswerCache:
+    """
+    Cache of the answers of the Bedrock agent, keyed by the normalized question:
+        - memory: per container, with a TTL and LRU eviction (max entries).
+        - warm tier: DynamoDB items shared by all the containers (with a TTL).
+        - semantic (optional, with NumPy and an embedder): the answer of the most
+          similar cached question, above a similarity threshold.
+    The questions about personal data (calendar, TODOs, contacts or dates) are
+    never cached.
+    """
+
+    def __init__(
+        self,
+        dynamodb_helper: Optional[DynamoDBHelper] = None,
+        embedder: Optional[Callable[[str], list[float]]] = None,
+        ttl_seconds: int = ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        similarity_threshold: float = ANSWER_CACHE_SIMILARITY_THRESHOLD,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        :param dynamodb_helper (DynamoDBHelper): Helper for the chatbot table
+            (warm tier), or None to only cache in memory.
+        :param embedder (callable): Function to get the vector of a question, or
+            None to disable the semantic lookups.
+        :param ttl_seconds (int): Seconds to keep an answer.
+        :param max_entries (int): Maximum answers in memory.
+        :param similarity_threshold (float): Minimum similarity for a semantic hit.
+        :param clock (callable): Clock in epoch seconds.
+        """
+        if embedder and np is None:
+            logger.warning("NumPy is not installed, semantic lookups are disabled")
+            embedder = None
+        self.dynamodb_helper = dynamodb_helper
+        self.embedder = embedder
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        self.agent_latency_ms = None
+
+        # Cache key -> (question, answer, expires_at), in LRU order
+        self._entries = OrderedDict()
+        self._index = VectorIndex() if embedder else None
+        self._last_embedding = (None, None)
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Optional[str]:
+        """
+        Method to get the cached answer of a question (None if not cached).
+        :param text (str): Input text of the user.
+        """
+        start = time.perf_counter()
+        question = normalize_text(text)
+        if not is_cacheable(question):
+            metrics.add_metric(
+                name="AnswerCacheUncacheable", unit=MetricUnit.Count, value=1
+            )
+            return None
+
+        key = self._key(question)
+        answer = self._get_from_memory(key)
+        tier = "Memory"
+        if answer is None and self.dynamodb_helper:
+            answer = self._get_from_warm_tier(key, question)
+            tier = "Warm"
+        if answer is None and self.embedder:
+            answer = self._get_similar(question)
+            tier = "Semantic"
+
+        if answer is None:
+            metrics.add_metric(name="AnswerCacheMisses", unit=MetricUnit.Count, value=1)
+            return None
+
+        lookup_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Answer cache hit ({tier}) in {lookup_ms:.1f} ms")
+        metrics.add_metric(name="AnswerCacheHits", unit=MetricUnit.Count, value=1)
+        metrics.add_metric(
+            name=f"AnswerCache{tier}Hits", unit=MetricUnit.Count, value=1
+        )
+        if self.agent_latency_ms is not None:
+            metrics.add_metric(
+                name="AnswerCacheLatencySaved",
+                unit=MetricUnit.Milliseconds,
+                value=max(self.agent_latency_ms - lookup_ms, 0.0),
+            )
+        return answer
+
+    def put(
+        self,
+        text: str,
+        answer: str,
+        agent_latency_ms: Optional[float] = None,
+    ) -> None:
+        """
+        Method to cache the answer of a question (if cacheable).
+        :param text (str): Input text of the user.
+        :param answer (str): Answer of the agent.
+        :param agent_latency_ms (float): Duration of the agent call, to estimate
+            the latency saved by the hits.
+        """
+        if agent_latency_ms is not None:
+            self.agent_latency_ms = (
+                agent_latency_ms
+                if self.agent_latency_ms is None
+                else self.agent_latency_ms
+                + LATENCY_SMOOTHING * (agent_latency_ms - self.agent_latency_ms)
+            )
+
+        question = normalize_text(text)
+        if not answer or not is_cacheable(question):
+            return
+
+        key = self._key(question)
+        now = int(self.clock())
+        vector = self._embed(question) if self.embedder else None
+        self._put_in_memory(key, question, answer, now + self.ttl_seconds, vector)
+        if self.dynamodb_helper:
+            try:
+                self.dynamodb_helper.put_item(
+                    AnswerCacheModel(
+                        PK=f"{DDBPrefixes.PK_ANSWER.value}{key}",
+                        SK=DDBPrefixes.SK_ANSWER.value,
+                        question=question,
+                        answer=answer,
+                        created_at=now,
+                        ttl=now + self.ttl_seconds,
+                    )
+                )
+            except Exception as error:
+                logger.warning(f"Could not save the answer in the warm tier: {error}")
+
+    def _key(self, question: str) -> str:
+        return hashlib.sha256(question.encode()).hexdigest()[:32]
+
+    def _get_from_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= self.clock():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _get_from_warm_tier(self, key: str, question: str) -> Optional[str]:
+        try:
+            item = self.dynamodb_helper.get_item_by_pk_and_sk(
+                f"{DDBPrefixes.PK_ANSWER.value}{key}", DDBPrefixes.SK_ANSWER.value
+            )
+        except Exception as error:
+            logger.warning(f"Could not read the answer cache warm tier: {error}")
+            return None
+        if not item:
+            return None
+
+        cached_answer = AnswerCacheModel.from_dynamodb_item(item)
+        # The expired items are deleted by DynamoDB with a delay
+        if cached_answer.ttl and cached_answer.ttl <= self.clock():
+            return None
+        self._put_in_memory(key, question, cached_answer.answer, cached_answer.ttl)
+        return cached_answer.answer
+
+    def _get_similar(self, question: str) -> Optional[str]:
+        vector = self._embed(question)
+        if vector is None:
+            return None
+        with self._lock:
+            key, similarity = self._index.search(vector)
+        if key is None or similarity < self.similarity_threshold:
+            return None
+        logger.info(f"Similar question found (similarity: {similarity:.3f})")
+        return self._get_from_memory(key)
+
+    def _embed(self, question: str) -> Optional[list[float]]:
+        # The vector of a missed question is reused to index its answer
+        if self._last_embedding[0] == question:
+            return self._last_embedding[1]
+        try:
+            vector = self.embedder(question)
+        except Exception as error:
+            logger.warning(f"Could not get the embedding of the question: {error}")
+            return None
+        self._last_embedding = (question, vector)
+        return vector
+
+    def _put_in_memory(
+        self,
+        key: str,
+        question: str,
+        answer: str,
+        expires_at: int,
+        vector: Optional[list[float]] = None,
+    ) -> None:
+        with self._lock:
+            self._entries[key] = (question, answer, expires_at)
+            self._entries.move_to_end(key)
+            if vector is not None:
+                self._index.add(key, vector)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self._index is not None:
+            self._index.remove(key)
@@ -0,0 +1,72 @@
+# Built-in imports
+import threading
+from typing import Optional
+
+# External imports
+import boto3
+from botocore.config import Config
+
+
+# Clients are created on first use (not at import time, to keep cold starts
+# short) and shared by all the helpers of the execution environment
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(
+    service_name: str,
+    endpoint_url: Optional[str] = None,
+    max_pool_connections: Optional[int] = None,
+    connect_timeout: Optional[int] = None,
+    read_timeout: Optional[int] = None,
+    max_attempts: Optional[int] = None,
+):
+    """
+    Function to get a shared boto3 client, created lazily on the first call.
+    Note: clients are thread-safe (unlike resources), but creating them is not,
+    so the creation is serialized.
+    :param service_name (str): Name of the AWS service (e.g. "dynamodb").
+    :param endpoint_url (Optional(str)): Custom endpoint (only for local tests).
+    :param max_pool_connections (Optional(int)): Size of the HTTP connection pool.
+    :param connect_timeout (Optional(int)): Connection timeout in seconds.
+    :param read_timeout (Optional(int)): Read timeout in seconds.
+    :param max_attempts (Optional(int)): "max_attempts" of the "standard" retry
+        mode of botocore.
+    """
+    key = (
+        service_name,
+        endpoint_url,
+        max_pool_connections,
+        connect_timeout,
+        read_timeout,
+        max_attempts,
+    )
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                options = {}
+                if max_pool_connections:
+                    options["max_pool_connections"] = max_pool_connections
+                if connect_timeout:
+                    options["connect_timeout"] = connect_timeout
+                if read_timeout:
+                    options["read_timeout"] = read_timeout
+                if max_attempts:
+                    options["retries"] = {
+                        "mode": "standard",
+                        "max_attempts": max_attempts,
+                    }
+                config = Config(**options) if options else None
+                client = boto3.client(
+                    service_name, endpoint_url=endpoint_url, config=config
+                )
+                _clients[key] = client
+    return client
+
+
+def clear_clients() -> None:
+    """Function to drop the shared clients (e.g. after changing credentials)."""
+    with _lock:
+        _clients.clear()
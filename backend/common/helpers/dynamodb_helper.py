@@ -1,26 +1,63 @@
 # Built-in imports
-import boto3
-from boto3.dynamodb.conditions import Key
+import os
+import time
+from typing import Optional, Union
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 from botocore.exceptions import ClientError
 
 # Own imports
+from common.helpers.aws_clients import get_client
 from common.logger import custom_logger
+from common.models.dynamodb_model import DynamoDBModel
 
 logger = custom_logger()
 
+# The client is shared by concurrent requests (e.g. webhook executor threads)
+DEFAULT_MAX_POOL_CONNECTIONS = int(
+    os.environ.get("DYNAMODB_MAX_POOL_CONNECTIONS", "10")
+)
+BATCH_WRITE_MAX_ITEMS = 25
+BATCH_WRITE_MAX_ATTEMPTS = 5
+BATCH_GET_MAX_KEYS = 100
+TRANSACT_WRITE_MAX_ITEMS = 100
+
 
 class DynamoDBHelper:
     """Custom DynamoDB Helper for simplifying CRUD operations."""
 
-    def __init__(self, table_name: str, endpoint_url: str = None) -> None:
+    def __init__(
+        self,
+        table_name: str,
+        endpoint_url: str = None,
+        max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+    ) -> None:
         """
         :param table_name (str): Name of the DynamoDB table to connect with.
         :param endpoint_url (Optional(str)): Endpoint for DynamoDB (only for local tests).
+        :param max_pool_connections (int): Size of the HTTP connection pool of the client.
         """
         self.table_name = table_name
-        self.dynamodb_client = boto3.client("dynamodb", endpoint_url=endpoint_url)
-        self.dynamodb_resource = boto3.resource("dynamodb", endpoint_url=endpoint_url)
-        self.table = self.dynamodb_resource.Table(self.table_name)
+        self.endpoint_url = endpoint_url
+        self.max_pool_connections = max_pool_connections
+        self._dynamodb_client = None
+        self.serializer = TypeSerializer()
+        self.deserializer = TypeDeserializer()
+
+    @property
+    def dynamodb_client(self):
+        # Only the low-level client is used, as it is thread-safe (unlike
+        # resources), and it is created on first use to keep cold starts short
+        if self._dynamodb_client is None:
+            self._dynamodb_client = get_client(
+                "dynamodb",
+                endpoint_url=self.endpoint_url,
+                max_pool_connections=self.max_pool_connections,
+            )
+        return self._dynamodb_client
+
+    @dynamodb_client.setter
+    def dynamodb_client(self, client) -> None:
+        self._dynamodb_client = client
 
     def get_item_by_pk_and_sk(self, partition_key: str, sort_key: str) -> dict:
         """
@@ -76,30 +113,31 @@ class DynamoDBHelper:
         all_items = []
         try:
             # The structure key for a single-table-design "PK" and "SK" naming
-            key_condition = Key("PK").eq(partition_key) & Key("SK").begins_with(
-                sort_key_portion
-            )
-            limit = 50
+            query_kwargs = {
+                "TableName": self.table_name,
+                "KeyConditionExpression": "PK = :pk AND begins_with(SK, :sk)",
+                "ExpressionAttributeValues": {
+                    ":pk": {"S": partition_key},
+                    ":sk": {"S": sort_key_portion},
+                },
+                "Limit": 50,
+            }
 
             # Initial query before pagination
-            response = self.table.query(
-                KeyConditionExpression=key_condition,
-                Limit=limit,
-            )
+            response = self.dynamodb_client.query(**query_kwargs)
             if "Items" in response:
                 all_items.extend(response["Items"])
 
             # Pagination loop for possible following queries
             while "LastEvaluatedKey" in response:
-                response = self.table.query(
-                    KeyConditionExpression=key_condition,
-                    Limit=limit,
+                response = self.dynamodb_client.query(
+                    **query_kwargs,
                     ExclusiveStartKey=response["LastEvaluatedKey"],
                 )
                 if "Items" in response:
                     all_items.extend(response["Items"])
 
-            return all_items
+            return [self.deserialize_item(item) for item in all_items]
         except ClientError as error:
             logger.error(
                 f"query operation failed for: "
@@ -110,18 +148,104 @@ class DynamoDBHelper:
             )
             raise error
 
-    def put_item(self, data: dict) -> dict:
+    def query_index(
+        self,
+        index_name: str,
+        key_condition_expression: str,
+        attribute_values: dict,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        """
+        Method to run a query against a global secondary index of the table.
+        :param index_name (str): Name of the index.
+        :param key_condition_expression (str): Key condition on the index keys.
+        :param attribute_values (dict): Expression attribute values in a JSON
+            format (without the "S", "N", "B" approach).
+        :param limit (Optional(int)): Maximum number of items to return.
+        """
+        logger.info(f"Starting query_index with index: ({index_name})")
+
+        all_items = []
+        try:
+            query_kwargs = {
+                "TableName": self.table_name,
+                "IndexName": index_name,
+                "KeyConditionExpression": key_condition_expression,
+                "ExpressionAttributeValues": self.serialize_item(attribute_values),
+            }
+            if limit:
+                query_kwargs["Limit"] = limit
+
+            # Pagination loop until the limit (if any) is reached
+            response = self.dynamodb_client.query(**query_kwargs)
+            all_items.extend(response.get("Items", []))
+            while "LastEvaluatedKey" in response and (
+                not limit or len(all_items) < limit
+            ):
+                response = self.dynamodb_client.query(
+                    **query_kwargs,
+                    ExclusiveStartKey=response["LastEvaluatedKey"],
+                )
+                all_items.extend(response.get("Items", []))
+
+            return [self.deserialize_item(item) for item in all_items[:limit]]
+        except ClientError as error:
+            logger.error(
+                f"query_index operation failed for: "
+                f"table_name: {self.table_name}."
+                f"index_name: {index_name}."
+                f"error: {error}."
+            )
+            raise error
+
+    def get_items(
+        self,
+        keys: list[tuple[str, str]],
+        projection_expression: Optional[str] = None,
+    ) -> list[dict]:
+        """
+        Method to get multiple DynamoDB items from their primary keys (pk+sk) in
+        BatchGetItem requests (up to 100 keys each), retrying the unprocessed
+        keys with exponential backoff. The missing items are not returned.
+        :param keys (list[tuple[str, str]]): Partition and sort key values.
+        :param projection_expression (Optional(str)): Attributes to get.
+        """
+        logger.info(f"Starting get_items operation for {len(keys)} keys.")
+
+        # BatchGetItem rejects repeated keys
+        keys = list(dict.fromkeys(keys))
+
+        items = []
+        try:
+            for i in range(0, len(keys), BATCH_GET_MAX_KEYS):
+                items.extend(
+                    self._batch_get(
+                        keys[i : i + BATCH_GET_MAX_KEYS], projection_expression
+                    )
+                )
+            return [self.deserialize_item(item) for item in items]
+        except ClientError as error:
+            logger.error(
+                f"get_items operation failed for: "
+                f"table_name: {self.table_name}."
+                f"keys: {keys}."
+                f"error: {error}."
+            )
+            raise error
+
+    def put_item(self, data: Union[dict, DynamoDBModel]) -> dict:
         """
         Method to add a single DynamoDB item.
-        :param data (dict): Item to be added in a JSON format (without the "S", "N", "B" approach).
+        :param data (dict | DynamoDBModel): Item to be added as a model or in a
+            JSON format (without the "S", "N", "B" approach).
         """
         logger.info("Starting put_item operation.")
         logger.debug(data, message_details=f"Data to be added to {self.table_name}")
 
         try:
-            response = self.table.put_item(
+            response = self.dynamodb_client.put_item(
                 TableName=self.table_name,
-                Item=data,
+                Item=self.serialize_item(data),
             )
             logger.info(response)
             return response
@@ -133,3 +257,352 @@ class DynamoDBHelper:
                 f"error: {error}."
             )
             raise error
+
+    def put_item_if_not_exists(
+        self, data: dict, ttl_attribute: Optional[str] = None
+    ) -> bool:
+        """
+        Method to add a single DynamoDB item only if its primary key does not
+        exist yet (conditional write). Returns False if the item already exists.
+        :param data (dict): Item to be added in a JSON format (without the "S", "N", "B" approach).
+        :param ttl_attribute (Optional(str)): TTL attribute name, so that expired
+            items that were not deleted by DynamoDB yet are considered as missing.
+        """
+        logger.info("Starting put_item_if_not_exists operation.")
+
+        try:
+            self.dynamodb_client.put_item(
+                TableName=self.table_name,
+                Item=self.serialize_item(data),
+                **self._not_exists_condition(ttl_attribute),
+            )
+            return True
+        except ClientError as error:
+            if error.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                logger.info("Item already exists, conditional put_item skipped.")
+                return False
+            logger.error(
+                f"put_item_if_not_exists operation failed for: "
+                f"table_name: {self.table_name}."
+                f"data: {data}."
+                f"error: {error}."
+            )
+            raise error
+
+    def delete_item(self, partition_key: str, sort_key: str) -> dict:
+        """
+        Method to delete a single DynamoDB item from the primary key (pk+sk).
+        :param partition_key (str): partition key value.
+        :param sort_key (str): sort key value.
+        """
+        logger.info(
+            f"Starting delete_item with" f"pk: ({partition_key}) and sk: ({sort_key})"
+        )
+
+        try:
+            return self.dynamodb_client.delete_item(
+                TableName=self.table_name,
+                Key={"PK": {"S": partition_key}, "SK": {"S": sort_key}},
+            )
+        except ClientError as error:
+            logger.error(
+                f"delete_item operation failed for: "
+                f"table_name: {self.table_name}."
+                f"pk: {partition_key}."
+                f"sk: {sort_key}."
+                f"error: {error}."
+            )
+            raise error
+
+    def update_item_attributes(
+        self, partition_key: str, sort_key: str, attributes: dict
+    ) -> dict:
+        """
+        Method to set some attributes of an existing DynamoDB item (pk+sk).
+        :param partition_key (str): partition key value.
+        :param sort_key (str): sort key value.
+        :param attributes (dict): Attributes to set in a JSON format (without the "S", "N", "B" approach).
+        """
+        logger.info(
+            f"Starting update_item_attributes with "
+            f"pk: ({partition_key}) and sk: ({sort_key})"
+        )
+
+        names = {f"#a{i}": name for i, name in enumerate(attributes)}
+        values = {
+            f":v{i}": self.serializer.serialize(value)
+            for i, value in enumerate(attributes.values())
+        }
+        update_expression = "SET " + ", ".join(
+            f"#a{i} = :v{i}" for i in range(len(attributes))
+        )
+
+        try:
+            return self.dynamodb_client.update_item(
+                TableName=self.table_name,
+                Key={"PK": {"S": partition_key}, "SK": {"S": sort_key}},
+                UpdateExpression=update_expression,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+        except ClientError as error:
+            logger.error(
+                f"update_item_attributes operation failed for: "
+                f"table_name: {self.table_name}."
+                f"pk: {partition_key}."
+                f"sk: {sort_key}."
+                f"error: {error}."
+            )
+            raise error
+
+    def update_item(
+        self,
+        partition_key: str,
+        sort_key: str,
+        update_expression: str,
+        attribute_names: Optional[dict] = None,
+        attribute_values: Optional[dict] = None,
+        condition_expression: Optional[str] = None,
+    ) -> Optional[dict]:
+        """
+        Method to update a single DynamoDB item (pk+sk) with an update expression.
+        Returns the updated item in a JSON format, or None if the condition failed.
+        :param partition_key (str): partition key value.
+        :param sort_key (str): sort key value.
+        :param update_expression (str): DynamoDB update expression.
+        :param attribute_names (Optional(dict)): Expression attribute names.
+        :param attribute_values (Optional(dict)): Expression attribute values in
+            a JSON format (without the "S", "N", "B" approach).
+        :param condition_expression (Optional(str)): Condition for the update.
+        """
+        logger.info(
+            f"Starting update_item with pk: ({partition_key}) and sk: ({sort_key})"
+        )
+
+        update_kwargs = {"UpdateExpression": update_expression}
+        if attribute_names:
+            update_kwargs["ExpressionAttributeNames"] = attribute_names
+        if attribute_values:
+            update_kwargs["ExpressionAttributeValues"] = self.serialize_item(
+                attribute_values
+            )
+        if condition_expression:
+            update_kwargs["ConditionExpression"] = condition_expression
+
+        try:
+            response = self.dynamodb_client.update_item(
+                TableName=self.table_name,
+                Key={"PK": {"S": partition_key}, "SK": {"S": sort_key}},
+                ReturnValues="ALL_NEW",
+                **update_kwargs,
+            )
+            return self.deserialize_item(response.get("Attributes", {}))
+        except ClientError as error:
+            if error.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                logger.info("Condition not met, update_item skipped.")
+                return None
+            logger.error(
+                f"update_item operation failed for: "
+                f"table_name: {self.table_name}."
+                f"pk: {partition_key}."
+                f"sk: {sort_key}."
+                f"error: {error}."
+            )
+            raise error
+
+    def put_items(self, items: list[Union[dict, DynamoDBModel]]) -> None:
+        """
+        Method to add multiple DynamoDB items in BatchWriteItem requests (up to 25
+        items each), retrying the unprocessed items with exponential backoff.
+        :param items (list[dict | DynamoDBModel]): Items to be added as models or
+            in a JSON format (without the "S", "N", "B" approach).
+        """
+        logger.info(f"Starting put_items operation for {len(items)} items.")
+        logger.debug(items, message_details=f"Data to be added to {self.table_name}")
+
+        write_requests = [
+            {"PutRequest": {"Item": self.serialize_item(item)}} for item in items
+        ]
+        try:
+            for i in range(0, len(write_requests), BATCH_WRITE_MAX_ITEMS):
+                self._batch_write(write_requests[i : i + BATCH_WRITE_MAX_ITEMS])
+        except ClientError as error:
+            logger.error(
+                f"put_items operation failed for: "
+                f"table_name: {self.table_name}."
+                f"items: {items}."
+                f"error: {error}."
+            )
+            raise error
+
+    def put_items_with_claims(
+        self,
+        items: list[Union[dict, DynamoDBModel]],
+        claims: list[dict],
+        ttl_attribute: Optional[str] = None,
+    ) -> list[bool]:
+        """
+        Method to add multiple DynamoDB items, each one together with a claim item
+        that is only added if its primary key does not exist yet (as in
+        "put_item_if_not_exists"), in TransactWriteItems requests (up to 50 pairs
+        each). An item and its claim are always added together, so a failure
+        never leaves a claim without its item. Returns if each item was added
+        (False if its claim already existed).
+        :param items (list[dict | DynamoDBModel]): Items to be added as models or
+            in a JSON format (without the "S", "N", "B" approach).
+        :param claims (list[dict]): Claim item of each item, in a JSON format.
+        :param ttl_attribute (Optional(str)): TTL attribute name of the claims, so
+            that expired claims that were not deleted by DynamoDB yet are
+            considered as missing.
+        """
+        logger.info(f"Starting put_items_with_claims operation for {len(items)} items.")
+
+        condition_kwargs = self._not_exists_condition(ttl_attribute)
+        pairs_per_request = TRANSACT_WRITE_MAX_ITEMS // 2
+        added = []
+        try:
+            for i in range(0, len(items), pairs_per_request):
+                added += self._transact_write_with_claims(
+                    items[i : i + pairs_per_request],
+                    claims[i : i + pairs_per_request],
+                    condition_kwargs,
+                )
+        except ClientError as error:
+            logger.error(
+                f"put_items_with_claims operation failed for: "
+                f"table_name: {self.table_name}."
+                f"items: {items}."
+                f"error: {error}."
+            )
+            raise error
+        return added
+
+    def serialize_item(self, data: Union[dict, DynamoDBModel]) -> dict:
+        """
+        Method to convert an item to the DynamoDB low-level format ("S", "N", ...).
+        :param data (dict | DynamoDBModel): Item as a model (serialized with the
+            conversion derived from its fields) or in a JSON format.
+        """
+        if isinstance(data, DynamoDBModel):
+            return data.to_dynamodb_item()
+        return {key: self.serializer.serialize(value) for key, value in data.items()}
+
+    def deserialize_item(self, dynamodb_item: dict) -> dict:
+        """
+        Method to convert a DynamoDB low-level item ("S", "N", ...) to a JSON item.
+        :param dynamodb_item (dict): Item in the DynamoDB low-level format.
+        """
+        return {
+            key: self.deserializer.deserialize(value)
+            for key, value in dynamodb_item.items()
+        }
+
+    def _batch_get(
+        self,
+        keys: list[tuple[str, str]],
+        projection_expression: Optional[str],
+    ) -> list[dict]:
+        request = {
+            "Keys": [
+                {"PK": {"S": partition_key}, "SK": {"S": sort_key}}
+                for partition_key, sort_key in keys
+            ]
+        }
+        if projection_expression:
+            request["ProjectionExpression"] = projection_expression
+
+        items = []
+        for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+            response = self.dynamodb_client.batch_get_item(
+                RequestItems={self.table_name: request}
+            )
+            items.extend(response.get("Responses", {}).get(self.table_name, []))
+            request = response.get("UnprocessedKeys", {}).get(self.table_name)
+            if not request:
+                return items
+            time.sleep(min(0.05 * 2**attempt, 1.0))
+
+        raise RuntimeError(
+            f"batch_get_item left {len(request['Keys'])} unprocessed keys "
+            f"after {BATCH_WRITE_MAX_ATTEMPTS} attempts in {self.table_name}"
+        )
+
+    def _not_exists_condition(self, ttl_attribute: Optional[str]) -> dict:
+        if not ttl_attribute:
+            return {"ConditionExpression": "attribute_not_exists(PK)"}
+        return {
+            "ConditionExpression": "attribute_not_exists(PK) OR #ttl < :now",
+            "ExpressionAttributeNames": {"#ttl": ttl_attribute},
+            "ExpressionAttributeValues": {":now": {"N": str(int(time.time()))}},
+        }
+
+    def _transact_write_with_claims(
+        self,
+        items: list[Union[dict, DynamoDBModel]],
+        claims: list[dict],
+        condition_kwargs: dict,
+    ) -> list[bool]:
+        added = [True] * len(items)
+        pending = list(range(len(items)))
+        attempt = 0
+        while pending:
+            transact_items = []
+            for index in pending:
+                transact_items.append(
+                    {
+                        "Put": {
+                            "TableName": self.table_name,
+                            "Item": self.serialize_item(claims[index]),
+                            **condition_kwargs,
+                        }
+                    }
+                )
+                transact_items.append(
+                    {
+                        "Put": {
+                            "TableName": self.table_name,
+                            "Item": self.serialize_item(items[index]),
+                        }
+                    }
+                )
+            try:
+                self.dynamodb_client.transact_write_items(TransactItems=transact_items)
+                return added
+            except ClientError as error:
+                if error.response["Error"]["Code"] != "TransactionCanceledException":
+                    raise
+                reasons = error.response.get("CancellationReasons", [])
+                existing = {
+                    pending[position // 2]
+                    for position, reason in enumerate(reasons)
+                    if reason.get("Code") == "ConditionalCheckFailed"
+                }
+                if existing:
+                    # The rest of the items are written again without them
+                    for index in existing:
+                        added[index] = False
+                    pending = [index for index in pending if index not in existing]
+                    continue
+                # Conflicts with other transactions (or throttling) are retried
+                attempt += 1
+                if attempt >= BATCH_WRITE_MAX_ATTEMPTS:
+                    raise
+                time.sleep(min(0.05 * 2**attempt, 1.0))
+        return added
+
+    def _batch_write(self, write_requests: list[dict]) -> None:
+        for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+            response = self.dynamodb_client.batch_write_item(
+                RequestItems={self.table_name: write_requests}
+            )
+            write_requests = response.get("UnprocessedItems", {}).get(
+                self.table_name, []
+            )
+            if not write_requests:
+                return
+            time.sleep(min(0.05 * 2**attempt, 1.0))
+
+        raise RuntimeError(
+            f"batch_write_item left {len(write_requests)} unprocessed items "
+            f"after {BATCH_WRITE_MAX_ATTEMPTS} attempts in {self.table_name}"
+        )
@@ -0,0 +1,63 @@
+# Built-in imports
+import json
+import os
+
+# Own imports
+from common.enums import ExecutionModes
+from common.helpers.aws_clients import get_client
+
+
+# Messages are processed by the Express State Machine ("state_machine"), or by
+# a single asynchronous invocation of its Lambda that runs all the steps
+# in-process ("direct"), to compare their end-to-end latency and cost
+EXECUTION_MODE = ExecutionModes(
+    os.environ.get("EXECUTION_MODE", ExecutionModes.STATE_MACHINE.value).lower()
+)
+PIPELINE_FUNCTION_NAME = os.environ.get("PIPELINE_FUNCTION_NAME")
+
+# Executions are started concurrently by the trigger (one connection per worker)
+START_EXECUTION_MAX_CONNECTIONS = int(os.environ.get("TRIGGER_MAX_WORKERS", "10"))
+
+
+def invoke_pipeline(lambda_client, execution_input: str) -> None:
+    """
+    Function to start the in-process pipeline ("direct" mode) for a message, with
+    the same input as the State Machine execution.
+    :param lambda_client: Lambda client (boto3).
+    :param execution_input (str): Input of the execution (JSON string).
+    """
+    lambda_client.invoke(
+        FunctionName=PIPELINE_FUNCTION_NAME,
+        InvocationType="Event",
+        Payload=json.dumps(
+            {
+                "event": json.loads(execution_input),
+                "params": {"class_name": "PipelineRunner", "method_name": "run"},
+            }
+        ),
+    )
+
+
+def start_execution(name: str, execution_input: str) -> str:
+    """
+    Function to start the processing of a message, with the State Machine or
+    the in-process pipeline (see "EXECUTION_MODE"). The clients are created on
+    the first call, as most State Machine steps never start executions.
+    Returns the execution ARN (or the name in "direct" mode).
+    :param name (str): Execution name (see "build_execution_name").
+    :param execution_input (str): Input of the execution (JSON string).
+    """
+    if EXECUTION_MODE == ExecutionModes.DIRECT:
+        invoke_pipeline(
+            get_client("lambda", max_pool_connections=START_EXECUTION_MAX_CONNECTIONS),
+            execution_input,
+        )
+        return name
+    response = get_client(
+        "stepfunctions", max_pool_connections=START_EXECUTION_MAX_CONNECTIONS
+    ).start_execution(
+        stateMachineArn=os.environ.get("STATE_MACHINE_ARN", ""),
+        input=execution_input,
+        name=name,
+    )
+    return response.get("executionArn")
@@ -0,0 +1,251 @@
+# Built-in imports
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+# Own imports
+from common.enums import DDBPrefixes
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.sequencer_helper import (
+    EXECUTION_NAME_MAX_LENGTH,
+    ConversationSequencer,
+)
+from common.logger import custom_logger
+from common.models.failure_model import FailureModel
+from common.models.message_envelope_model import MessageEnvelopeModel
+
+logger = custom_logger()
+
+# Failed messages are kept for a while, to replay them after an incident
+FAILURE_TTL_SECONDS = int(os.environ.get("FAILURE_TTL_SECONDS", str(14 * 86400)))
+
+# Long causes (e.g. with stack traces) are truncated
+MAX_CAUSE_LENGTH = 1000
+
+
+def failure_partition_key(day: date) -> str:
+    """
+    Function to build the partition key of the failures of a day (UTC).
+    :param day (date): Day of the failures.
+    """
+    return f"{DDBPrefixes.PK_FAILURE.value}{day.isoformat()}"
+
+
+def build_replay_execution_name(execution_name: str) -> str:
+    """
+    Function to build a new (unique) execution name for the replay of a failure.
+    :param execution_name (str): Name of the failed execution.
+    """
+    suffix = f"_r{int(time.time())}"
+    return execution_name[: EXECUTION_NAME_MAX_LENGTH - len(suffix)] + suffix
+
+
+class FailureStore:
+    """
+    Store of the messages that failed in the State Machine, with one item per
+    failed execution partitioned by day ("PK": "FAILURE#<date>"), and their
+    message envelope, failed step and error, so that they can be replayed.
+    """
+
+    def __init__(
+        self,
+        dynamodb_helper: DynamoDBHelper,
+        ttl_seconds: int = FAILURE_TTL_SECONDS,
+    ) -> None:
+        """
+        :param dynamodb_helper (DynamoDBHelper): Helper for the chatbot table.
+        :param ttl_seconds (int): Seconds to keep the failures.
+        """
+        self.dynamodb_helper = dynamodb_helper
+        self.ttl_seconds = ttl_seconds
+
+    def save(
+        self,
+        message: dict,
+        execution_name: str,
+        step: str,
+        error: str,
+        cause: str,
+    ) -> FailureModel:
+        """
+        Method to save a failed message.
+        :param message (dict): Message envelope of the execution (event "message").
+        :param execution_name (str): Name of the failed execution.
+        :param step (str): State of the State Machine that failed.
+        :param error (str): Error class.
+        :param cause (str): Error message.
+        """
+        failed_at = datetime.now(timezone.utc)
+        failure = FailureModel(
+            PK=failure_partition_key(failed_at.date()),
+            SK=f"{failed_at.isoformat()}#{execution_name}",
+            failed_at=failed_at.isoformat(),
+            execution_name=execution_name,
+            step=step,
+            error=error,
+            cause=cause[:MAX_CAUSE_LENGTH],
+            message=message,
+            from_number=message.get("from_number"),
+            whatsapp_id=message.get("whatsapp_id"),
+            ttl=int(time.time()) + self.ttl_seconds,
+        )
+        self.dynamodb_helper.put_item(failure)
+        return failure
+
+    def list_failures(self, since: date, until: date) -> list[FailureModel]:
+        """
+        Method to get the failed messages of a range of days (UTC), in order.
+        :param since (date): First day of the range.
+        :param until (date): Last day of the range (included).
+        """
+        failures = []
+        day = since
+        while day <= until:
+            items = self.dynamodb_helper.query_by_pk_and_sk_begins_with(
+                failure_partition_key(day), day.isoformat()
+            )
+            failures.extend(FailureModel.model_validate(item) for item in items)
+            day += timedelta(days=1)
+        return failures
+
+    def mark_replayed(self, failure: FailureModel, replay_execution_name: str) -> None:
+        """
+        Method to save that a failure was replayed, so that the next replays skip it.
+        :param failure (FailureModel): Replayed failure.
+        :param replay_execution_name (str): Name of the execution of the replay.
+        """
+        self.dynamodb_helper.update_item_attributes(
+            failure.PK,
+            failure.SK,
+            {
+                "replayed_at": datetime.now(timezone.utc).isoformat(),
+                "replay_execution_name": replay_execution_name,
+            },
+        )
+
+    def is_answered(self, message: MessageEnvelopeModel) -> bool:
+        """
+        Method to check if a message was answered already (see "SendMessage"),
+        also in part when the streaming of the response failed midway (see
+        "ProcessText"), as a replay would send the same chunks again.
+        :param message (MessageEnvelopeModel): Message envelope.
+        """
+        item = self.dynamodb_helper.get_item_by_pk_and_sk(message.PK, message.SK)
+        return "answered_at" in item or "partial_reply_at" in item
+
+
+class _RateLimiter:
+    """Spaces the calls of all the threads to a maximum rate per second."""
+
+    def __init__(self, rate_per_second: float) -> None:
+        self.interval = 1 / rate_per_second
+        self._next_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(self._next_at, now)
+            self._next_at = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+
+class FailureReplayer:
+    """
+    Replays failed messages through the pipeline, in parallel and at a maximum
+    rate. The messages already answered (e.g. the reply was sent, but a later
+    step failed) and the failures already replayed are skipped. The replays go
+    through the conversation sequencer, so the failures of a conversation are
+    replayed in order and never overlap with its new messages.
+    """
+
+    def __init__(
+        self,
+        failure_store: FailureStore,
+        sequencer: ConversationSequencer,
+        rate_per_second: float = 5.0,
+        max_workers: int = 8,
+        force: bool = False,
+    ) -> None:
+        """
+        :param failure_store (FailureStore): Store of the failed messages.
+        :param sequencer (ConversationSequencer): Sequencer to start the replays.
+        :param rate_per_second (float): Maximum replays started per second.
+        :param max_workers (int): Conversations replayed in parallel.
+        :param force (bool): Also replay the failures that were replayed already.
+        """
+        self.failure_store = failure_store
+        self.sequencer = sequencer
+        self.rate_per_second = rate_per_second
+        self.max_workers = max_workers
+        self.force = force
+
+    def replay(self, failures: list[FailureModel], dry_run: bool = False) -> Counter:
+        """
+        Method to replay the failed messages (in order per conversation).
+        Returns the number of failures per outcome ("replayed", "answered",
+        "already_replayed", "invalid", "error" or "would_replay" for dry runs).
+        :param failures (list(FailureModel)): Failures to replay.
+        :param dry_run (bool): Only report what would be replayed.
+        """
+        conversations = {}
+        for failure in failures:
+            conversations.setdefault(failure.from_number, []).append(failure)
+
+        rate_limiter = _RateLimiter(self.rate_per_second)
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def replay_conversation(conversation_failures: list[FailureModel]) -> None:
+            for failure in conversation_failures:
+                outcome = self._replay_failure(failure, rate_limiter, dry_run)
+                with lock:
+                    outcomes[outcome] += 1
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(replay_conversation, conversations.values()))
+        return outcomes
+
+    def _replay_failure(
+        self,
+        failure: FailureModel,
+        rate_limiter: _RateLimiter,
+        dry_run: bool,
+    ) -> str:
+        if failure.replayed_at and not self.force:
+            return "already_replayed"
+        try:
+            message = MessageEnvelopeModel.model_validate(failure.message)
+        except ValueError:
+            message = None
+        if not message or not message.from_number or not message.SK:
+            logger.warning(f"Failure {failure.SK} has no message to replay")
+            return "invalid"
+
+        try:
+            if self.failure_store.is_answered(message):
+                return "answered"
+            if dry_run:
+                return "would_replay"
+
+            rate_limiter.wait()
+            name = build_replay_execution_name(failure.execution_name)
+            self.sequencer.submit(
+                message.from_number,
+                name,
+                {
+                    "message": message.to_event(),
+                    "execution_name": name,
+                    "sequenced": True,
+                    "replay_of": failure.execution_name,
+                },
+            )
+            self.failure_store.mark_replayed(failure, name)
+            return "replayed"
+        except Exception as error:
+            logger.error(f"Error replaying the failure {failure.SK}: {error}")
+            return "error"
@@ -0,0 +1,110 @@
+# Built-in imports
+import os
+import time
+import threading
+
+# Own imports
+from common.helpers.aws_clients import get_client
+from common.logger import custom_logger
+
+logger = custom_logger()
+
+# Parameters are cached per container, so this value bounds how long an updated
+# parameter can take to be picked up (unless a forced refresh is requested)
+DEFAULT_TTL_SECONDS = int(os.environ.get("PARAMETERS_CACHE_TTL_SECONDS", "300"))
+
+# Maximum number of names of a "GetParameters" request
+MAX_NAMES_PER_REQUEST = 10
+
+
+class ParametersHelper:
+    """
+    Custom SSM Parameter Store Helper for the configuration of the Lambdas.
+    All the parameters are fetched together (one "GetParameters" request per
+    ten names) and cached with a TTL, and concurrent callers share a single
+    fetch (single-flight).
+    """
+
+    def __init__(
+        self,
+        parameter_names: list[str],
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        """
+        :param parameter_names (list(str)): Names of the parameters to fetch.
+        :param ttl_seconds (int): Seconds to keep the parameter values in cache.
+        """
+        self.parameter_names = list(parameter_names)
+        self.ttl_seconds = ttl_seconds
+        self._ssm_client = None
+        self.parameters = None
+        self._expires_at = 0.0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ssm_client(self):
+        # Created on first use, to keep the cold starts short
+        if self._ssm_client is None:
+            self._ssm_client = get_client("ssm")
+        return self._ssm_client
+
+    @ssm_client.setter
+    def ssm_client(self, client) -> None:
+        self._ssm_client = client
+
+    def get_parameters(self, force_refresh: bool = False) -> dict:
+        """
+        Obtain the values of all the parameters (by name).
+        :param force_refresh (bool): Skip the cache and fetch the parameters again
+            (e.g. after an error caused by an outdated value).
+        """
+        seen_version = self._version
+        expired = time.monotonic() >= self._expires_at
+        if force_refresh or self.parameters is None or expired:
+            return self._refresh_parameters(seen_version)
+        return self.parameters
+
+    def get_parameter(self, parameter_name: str, force_refresh: bool = False) -> str:
+        """
+        Obtain the value of a parameter (intentional KeyError if not configured).
+        :param parameter_name (str): Name of the parameter.
+        :param force_refresh (bool): Skip the cache and fetch the parameters again.
+        """
+        return self.get_parameters(force_refresh=force_refresh)[parameter_name]
+
+    def invalidate(self) -> None:
+        """
+        Drop the cached parameters, so that the next call fetches them again.
+        """
+        with self._lock:
+            self.parameters = None
+            self._expires_at = 0.0
+
+    def _refresh_parameters(self, seen_version: int) -> dict:
+        with self._lock:
+            # Single-flight: skip the fetch if another caller already refreshed
+            if self._version == seen_version or self.parameters is None:
+                self._fetch_parameters()
+            return self.parameters
+
+    def _fetch_parameters(self) -> None:
+        parameters = {}
+        invalid_parameters = []
+        for start in range(0, len(self.parameter_names), MAX_NAMES_PER_REQUEST):
+            response = self.ssm_client.get_parameters(
+                Names=self.parameter_names[start : start + MAX_NAMES_PER_REQUEST],
+                WithDecryption=True,
+            )
+            for parameter in response.get("Parameters", []):
+                parameters[parameter["Name"]] = parameter["Value"]
+            invalid_parameters.extend(response.get("InvalidParameters", []))
+
+        if invalid_parameters:
+            logger.error(f"Parameters not found in SSM: {invalid_parameters}")
+            raise ValueError(f"Parameters not found in SSM: {invalid_parameters}")
+
+        logger.info(f"Successfully retrieved {len(parameters)} SSM parameters")
+        self.parameters = parameters
+        self._expires_at = time.monotonic() + self.ttl_seconds
+        self._version += 1
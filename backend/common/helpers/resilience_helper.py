@@ -0,0 +1,258 @@
+# Built-in imports
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+# External imports
+from aws_lambda_powertools.metrics import MetricUnit
+
+# Own imports
+from common.enums import CircuitStates
+from common.logger import custom_logger
+from common.metrics import custom_metrics
+
+logger = custom_logger()
+metrics = custom_metrics()
+
+
+class RetryableError(Exception):
+    """
+    Exception for transient failures detected from a response (e.g. HTTP 429 or
+    5xx), optionally with the delay requested by the dependency (Retry-After).
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TransientDependencyError(Exception):
+    """
+    Exception raised when a dependency keeps failing with transient errors after
+    the retries (the State Machine tasks retry it once more, later).
+    """
+
+
+class CircuitOpenError(Exception):
+    """
+    Exception raised without calling a dependency while its circuit is open
+    (the dependency is down, so the execution fails fast).
+    """
+
+
+class RetryBudget:
+    """
+    Token bucket that limits the retries to a ratio of the calls, so that the
+    retries of every caller do not multiply the load of a degraded dependency.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0) -> None:
+        """
+        :param ratio (float): Retries allowed per call (0.2 -> 1 retry every 5 calls).
+        :param max_tokens (float): Maximum retries that can be accumulated.
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of a dependency: after "failure_threshold" consecutive
+    transient failures the circuit opens and the calls fail fast. Once
+    "reset_timeout_seconds" passed, a single trial call is allowed (half-open),
+    which closes the circuit again when it succeeds.
+    Note: the state is kept per execution environment (warm Lambda container).
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        :param failure_threshold (int): Consecutive failures that open the circuit.
+        :param reset_timeout_seconds (float): Seconds before the trial call.
+        :param clock (Callable): Monotonic clock (seconds).
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.clock = clock
+        self.state = CircuitStates.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == CircuitStates.CLOSED:
+                return True
+            if self.clock() - self._opened_at >= self.reset_timeout_seconds:
+                # Only one caller gets the trial (another one after the timeout,
+                # in case the trial never reported back)
+                self.state = CircuitStates.HALF_OPEN
+                self._opened_at = self.clock()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CircuitStates.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> bool:
+        """
+        Method to count a transient failure. Returns True if it opened the circuit.
+        """
+        with self._lock:
+            self._failures += 1
+            if self.state == CircuitStates.OPEN:
+                return False
+            if (
+                self.state == CircuitStates.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self.state = CircuitStates.OPEN
+                self._opened_at = self.clock()
+                return True
+            return False
+
+
+class ResilientDependency:
+    """
+    Calls to an external dependency (e.g. the Meta API or Bedrock) that retry the
+    transient errors with exponential backoff and full jitter, within a retry
+    budget and a deadline, behind a circuit breaker. Publishes the metrics
+    "<name>Retries", "<name>Failures" (retries exhausted) and "<name>CircuitOpen"
+    (calls rejected without reaching the dependency).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        is_transient: Callable[[Exception], bool],
+        max_attempts: int = 3,
+        base_delay_seconds: float = 0.2,
+        max_delay_seconds: float = 2.0,
+        deadline_seconds: Optional[float] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        :param name (str): Name of the dependency (prefix of the metrics).
+        :param is_transient (Callable): Whether an exception is worth a retry.
+        :param max_attempts (int): Maximum attempts per call (including the first).
+        :param base_delay_seconds (float): Backoff of the first retry (before jitter).
+        :param max_delay_seconds (float): Maximum backoff between attempts.
+        :param deadline_seconds (Optional(float)): No retry starts after this time.
+        :param circuit_breaker (Optional(CircuitBreaker)): Circuit of the dependency.
+        :param retry_budget (Optional(RetryBudget)): Retry budget of the dependency.
+        :param sleep (Callable): Function to wait between the attempts.
+        """
+        self.name = name
+        self.is_transient = is_transient
+        self.max_attempts = max_attempts
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.deadline_seconds = deadline_seconds
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.retry_budget = retry_budget or RetryBudget()
+        self.sleep = sleep
+
+    def backoff_seconds(self, retry_number: int, error: Exception) -> float:
+        """
+        Method to get the wait before a retry (the "Retry-After" of the dependency,
+        or a full jitter backoff), capped by "max_delay_seconds".
+        :param retry_number (int): Number of the retry (starting at 1).
+        :param error (Exception): Error of the previous attempt.
+        """
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is None:
+            retry_after = random.uniform(
+                0, self.base_delay_seconds * 2 ** (retry_number - 1)
+            )
+        return min(retry_after, self.max_delay_seconds)
+
+    def call(self, function: Callable, *args, **kwargs):
+        """
+        Method to call the dependency with the retries and the circuit breaker.
+        Transient errors raise TransientDependencyError once the retries are
+        exhausted, and the rest of the errors are raised right away.
+        :param function (Callable): Function that calls the dependency.
+        """
+        if not self.circuit_breaker.allow_request():
+            self._add_metric("CircuitOpen")
+            raise CircuitOpenError(f"The circuit of {self.name} is open")
+
+        self.retry_budget.deposit()
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = function(*args, **kwargs)
+            except Exception as error:
+                if not self.is_transient(error):
+                    # The dependency answered, so it is not counted as down
+                    self.circuit_breaker.record_success()
+                    raise
+                if self.circuit_breaker.record_failure():
+                    logger.warning(f"Opened the circuit of {self.name}: {error}")
+
+                delay = self.backoff_seconds(attempt, error)
+                exhausted_reason = self._exhausted_reason(attempt, start, delay)
+                if exhausted_reason:
+                    self._add_metric("Failures")
+                    raise TransientDependencyError(
+                        f"{self.name} failed after {attempt} attempts "
+                        f"({exhausted_reason}): {error}"
+                    ) from error
+
+                self._add_metric("Retries")
+                logger.warning(
+                    f"Transient error from {self.name} (attempt {attempt}), "
+                    f"retrying in {delay:.2f} seconds: {error}"
+                )
+                self.sleep(delay)
+                continue
+
+            self.circuit_breaker.record_success()
+            return result
+
+    def _exhausted_reason(
+        self, attempt: int, start: float, delay: float
+    ) -> Optional[str]:
+        if attempt >= self.max_attempts:
+            return "maximum attempts"
+        if self.circuit_breaker.state != CircuitStates.CLOSED:
+            return "circuit open"
+        if (
+            self.deadline_seconds is not None
+            and time.monotonic() - start + delay > self.deadline_seconds
+        ):
+            return "deadline"
+        if not self.retry_budget.withdraw():
+            return "retry budget"
+        return None
+
+    def _add_metric(self, suffix: str) -> None:
+        metrics.add_metric(
+            name=f"{self.name}{suffix}",
+            unit=MetricUnit.Count,
+            value=1,
+        )
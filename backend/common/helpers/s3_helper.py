@@ -0,0 +1,129 @@
+# Built-in imports
+import os
+from typing import Iterable, Optional
+
+# External imports
+from botocore.exceptions import ClientError
+
+# Own imports
+from common.helpers.aws_clients import get_client
+from common.logger import custom_logger
+
+logger = custom_logger()
+
+# S3 requires at least 5 MiB for every part of a multipart upload (but the last)
+MIN_PART_SIZE_BYTES = 5 * 1024 * 1024
+DEFAULT_PART_SIZE_BYTES = int(
+    os.environ.get("S3_PART_SIZE_BYTES", str(8 * 1024 * 1024))
+)
+
+
+class S3Helper:
+    """Custom S3 Helper for simplifying the uploads of streamed content."""
+
+    def __init__(self, bucket_name: str, endpoint_url: Optional[str] = None) -> None:
+        """
+        :param bucket_name (str): Name of the S3 bucket to connect with.
+        :param endpoint_url (Optional(str)): Endpoint for S3 (only for local tests).
+        """
+        self.bucket_name = bucket_name
+        self.endpoint_url = endpoint_url
+        self._s3_client = None
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            self._s3_client = get_client("s3", endpoint_url=self.endpoint_url)
+        return self._s3_client
+
+    @s3_client.setter
+    def s3_client(self, client) -> None:
+        self._s3_client = client
+
+    def upload_stream(
+        self,
+        chunks: Iterable[bytes],
+        key: str,
+        content_type: Optional[str] = None,
+        part_size: int = DEFAULT_PART_SIZE_BYTES,
+    ) -> int:
+        """
+        Method to upload streamed content to S3 in fixed-size parts (multipart
+        upload), so that at most one part is kept in memory. Content smaller than
+        one part is uploaded with a single PutObject. Returns the size in bytes.
+        :param chunks (Iterable[bytes]): Chunks of the content (any size).
+        :param key (str): S3 key of the object.
+        :param content_type (Optional(str)): Content type of the object.
+        :param part_size (int): Size of the parts in bytes (at least 5 MiB).
+        """
+        if part_size < MIN_PART_SIZE_BYTES:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE_BYTES} bytes")
+        logger.info(f"Starting upload_stream operation for key: {key}")
+
+        extra_args = {"ContentType": content_type} if content_type else {}
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+        size = 0
+        try:
+            for chunk in chunks:
+                buffer.extend(chunk)
+                size += len(chunk)
+                while len(buffer) >= part_size:
+                    if upload_id is None:
+                        upload_id = self.s3_client.create_multipart_upload(
+                            Bucket=self.bucket_name, Key=key, **extra_args
+                        )["UploadId"]
+                    parts.append(
+                        self._upload_part(
+                            key, upload_id, len(parts) + 1, buffer[:part_size]
+                        )
+                    )
+                    del buffer[:part_size]
+
+            if upload_id is None:
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name, Key=key, Body=bytes(buffer), **extra_args
+                )
+                return size
+
+            if buffer:
+                parts.append(self._upload_part(key, upload_id, len(parts) + 1, buffer))
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+            return size
+        except Exception as error:
+            logger.error(
+                f"upload_stream operation failed for: "
+                f"bucket_name: {self.bucket_name}."
+                f"key: {key}."
+                f"error: {error}."
+            )
+            if upload_id is not None:
+                self._abort_upload(key, upload_id)
+            raise error
+
+    def _upload_part(
+        self, key: str, upload_id: str, part_number: int, body: bytearray
+    ) -> dict:
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=bytes(body),
+        )
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    def _abort_upload(self, key: str, upload_id: str) -> None:
+        # The bucket lifecycle also cleans the incomplete uploads, in case this fails
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=upload_id
+            )
+        except ClientError as error:
+            logger.warning(f"abort_multipart_upload failed for key {key}: {error}")
@@ -1,39 +1,127 @@
 # Built-in imports
+import os
 import json
-import boto3
+import time
+import threading
 from typing import Union, Optional
 
 # External imports
 from botocore.exceptions import ClientError
 
 # Own imports
+from common.helpers.aws_clients import get_client
 from common.logger import custom_logger
 
 logger = custom_logger()
 
+# Secrets are cached per container, so these values bound how long a rotated
+# secret can take to be picked up (unless a forced refresh is requested)
+DEFAULT_TTL_SECONDS = int(os.environ.get("SECRETS_CACHE_TTL_SECONDS", "300"))
+DEFAULT_REFRESH_AHEAD_SECONDS = int(
+    os.environ.get("SECRETS_CACHE_REFRESH_AHEAD_SECONDS", "30")
+)
+
 
 class SecretsHelper:
-    """Custom Secrets Manager Helper for simplifying secret's retrieval."""
+    """
+    Custom Secrets Manager Helper for simplifying secret's retrieval.
+    The secret is cached with a TTL and refreshed ahead of its expiration, and
+    concurrent callers share a single fetch (single-flight).
+    """
 
-    def __init__(self, secret_name: str) -> None:
+    def __init__(
+        self,
+        secret_name: str,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        refresh_ahead_seconds: int = DEFAULT_REFRESH_AHEAD_SECONDS,
+    ) -> None:
         """
         :param secret_name (str): Name of the secret to fetch.
+        :param ttl_seconds (int): Seconds to keep the secret value in cache.
+        :param refresh_ahead_seconds (int): Seconds before the expiration in which
+            a single caller refreshes the secret while the rest use the cached one.
         """
         self.secret_name = secret_name
-        self.client_sm = boto3.client("secretsmanager")
+        self.ttl_seconds = ttl_seconds
+        self.refresh_ahead_seconds = min(refresh_ahead_seconds, ttl_seconds)
+        self._client_sm = None
+        self.json_secret = None
+        self._expires_at = 0.0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def client_sm(self):
+        # Created on first use, to keep the cold starts short
+        if self._client_sm is None:
+            self._client_sm = get_client("secretsmanager")
+        return self._client_sm
+
+    @client_sm.setter
+    def client_sm(self, client) -> None:
+        self._client_sm = client
 
-    def get_secret_value(self, key_name: Optional[str] = None) -> Union[str, None]:
+    def get_secret_value(
+        self,
+        key_name: Optional[str] = None,
+        force_refresh: bool = False,
+    ) -> Union[str, None]:
         """
         Obtain the AWS Secret value based on a given key.
         :param key_name Optional(str): Key name to fetch from the JSON secret.
+        :param force_refresh (bool): Skip the cache and fetch the secret again
+            (e.g. after an authentication failure with the secret's credentials).
+        """
+        if force_refresh:
+            json_secret = self._refresh_secret(self._version)
+        else:
+            json_secret = self._get_cached_secret()
+
+        # Return value or intentional KeyError if the key is not present
+        return json_secret[key_name] if key_name else json_secret
+
+    def invalidate(self) -> None:
         """
+        Drop the cached secret, so that the next call fetches it again.
+        """
+        with self._lock:
+            self.json_secret = None
+            self._expires_at = 0.0
+
+    def _get_cached_secret(self) -> dict:
+        now = time.monotonic()
+        if self.json_secret is None or now >= self._expires_at:
+            return self._refresh_secret(self._version)
+
+        # Refresh-ahead: only one caller refreshes, the rest keep the valid value
+        refresh_at = self._expires_at - self.refresh_ahead_seconds
+        if now >= refresh_at and self._lock.acquire(blocking=False):
+            try:
+                self._fetch_secret()
+            except ClientError:
+                logger.warning(
+                    f"Refresh-ahead failed for {self.secret_name}, "
+                    "using the cached value until it expires"
+                )
+            finally:
+                self._lock.release()
+        return self.json_secret
+
+    def _refresh_secret(self, seen_version: int) -> dict:
+        with self._lock:
+            # Single-flight: skip the fetch if another caller already refreshed
+            if self._version == seen_version or self.json_secret is None:
+                self._fetch_secret()
+            return self.json_secret
+
+    def _fetch_secret(self) -> None:
         try:
             secret_value = self.client_sm.get_secret_value(SecretId=self.secret_name)
             logger.info(f"Successfully retrieved the AWS Secret: {self.secret_name}")
             self.json_secret = json.loads(secret_value["SecretString"])
+            self._expires_at = time.monotonic() + self.ttl_seconds
+            self._version += 1
             logger.debug("Successfully obtained the SecretString value.")
-            # Return value or intentional KeyError if the key is not present
-            return self.json_secret[key_name] if key_name else self.json_secret
         except ClientError as e:
             logger.exception(f"Error in pulling the AWS Secret: {self.secret_name}")
             logger.exception(f"Error details: {str(e)}")
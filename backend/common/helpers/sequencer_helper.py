@@ -0,0 +1,400 @@
+# Built-in imports
+import json
+import os
+import time
+from typing import Callable, Optional
+
+# Own imports
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.logger import custom_logger
+
+logger = custom_logger()
+
+SEQUENCER_SORT_KEY = "SEQUENCER"
+
+# An execution that never releases its conversation (e.g. it timed out) holds
+# it for this long (Express executions run for up to 5 minutes). The expired
+# leases are then taken over by the next submit or release of the conversation,
+# or by the scheduled recovery ("recover_expired_leases")
+SEQUENCER_LEASE_SECONDS = int(os.environ.get("SEQUENCER_LEASE_SECONDS", "300"))
+
+# Sparse index of the sequencer items with a lease ("lease_index" is only set
+# next to "lease_expires_at"), to find the expired ones without a scan
+SEQUENCER_LEASE_INDEX = "sequencer-leases"
+SEQUENCER_LEASE_PARTITION = "LEASE"
+
+# Conversations recovered per run of the scheduled recovery
+SEQUENCER_RECOVERY_LIMIT = int(os.environ.get("SEQUENCER_RECOVERY_LIMIT", "100"))
+
+# The stream re-delivers the records after the checkpoint of a failed batch, so
+# the names of the last finished executions are kept to skip them (Express
+# executions are not deduplicated by name)
+SEQUENCER_COMPLETED_NAMES = int(os.environ.get("SEQUENCER_COMPLETED_NAMES", "100"))
+
+# Attempts to start the next execution of a conversation (with backoff), as no
+# stream retry starts it when it is dispatched by a release
+SEQUENCER_DISPATCH_ATTEMPTS = int(os.environ.get("SEQUENCER_DISPATCH_ATTEMPTS", "3"))
+
+# Step Functions only allows these characters (up to 80) in execution names
+EXECUTION_NAME_MAX_LENGTH = 80
+
+
+def build_execution_name(from_number: str, sort_key: str, correlation_id: str) -> str:
+    """
+    Function to build the execution name of a message. It is derived from the
+    primary key of the message item (unique by definition, with microseconds in
+    the "SK"), so that two messages never collide on the same name.
+    :param from_number (str): Phone number of the sender.
+    :param sort_key (str): Sort key of the message (e.g. "MESSAGE#<created_at>").
+    :param correlation_id (str): Correlation ID of the message (for traceability).
+    """
+    created_at_digits = "".join(char for char in sort_key if char.isdigit())
+    name = f"{from_number}_{created_at_digits}_{correlation_id}"
+    name = "".join(char if char.isalnum() or char in "-_" else "-" for char in name)
+    return name[:EXECUTION_NAME_MAX_LENGTH]
+
+
+class DispatchError(Exception):
+    """
+    The next execution of a conversation could not be started (it is back at
+    the front of the queue, so a retry of the release or the submit starts it).
+    """
+
+
+class ConversationSequencer:
+    """
+    Sequencer of the State Machine executions per conversation (phone number):
+    at most one execution is in flight per conversation, and the next messages
+    wait in a queue (in order) until it finishes, while different conversations
+    run in parallel. The queue and the lock are a single DynamoDB item per
+    number ("PK": "NUMBER#<from_number>", "SK": "SEQUENCER"), only updated with
+    conditional writes:
+        - pending: queued executions ({"name", "input"}) in order.
+        - queued_names: names of the pending and in-flight executions (dedupe).
+        - completed_names: names of the last finished executions, oldest first
+          (dedupe of the re-delivered records, trimmed in batches).
+        - in_flight / lease_expires_at: the execution that holds the conversation.
+        - lease_index: set with "lease_expires_at", for the "sequencer-leases"
+          index (also without "in_flight" when a start failed, so that the
+          recovery starts the queued execution).
+    """
+
+    def __init__(
+        self,
+        dynamodb_helper: DynamoDBHelper,
+        start_execution: Optional[Callable[[str, str], None]] = None,
+        lease_seconds: int = SEQUENCER_LEASE_SECONDS,
+        completed_names: int = SEQUENCER_COMPLETED_NAMES,
+        dispatch_attempts: int = SEQUENCER_DISPATCH_ATTEMPTS,
+    ) -> None:
+        """
+        :param dynamodb_helper (DynamoDBHelper): Helper for the chatbot table.
+        :param start_execution (Optional(Callable)): Function to start executions
+            (e.g. "start_execution" of the "execution_helper").
+        :param lease_seconds (int): Maximum time an execution holds a conversation.
+        :param completed_names (int): Minimum finished names kept per conversation.
+        :param dispatch_attempts (int): Attempts to start an execution.
+        """
+        self.dynamodb_helper = dynamodb_helper
+        self.start_execution = start_execution
+        self.lease_seconds = lease_seconds
+        self.completed_names = completed_names
+        self.dispatch_attempts = dispatch_attempts
+
+    def submit(
+        self,
+        from_number: str,
+        name: str,
+        execution_input: dict,
+        start_execution: Optional[Callable[[str, str], None]] = None,
+    ) -> int:
+        """
+        Method to queue an execution for a conversation, and start it right away
+        if the conversation is idle. Submitting the same name again is ignored
+        while it is queued, in flight or recently finished (e.g. stream records
+        re-delivered after a failure in their batch).
+        Returns the queue depth of the conversation (including the in-flight one).
+        :param from_number (str): Phone number of the conversation.
+        :param name (str): Execution name (see "build_execution_name").
+        :param execution_input (dict): Input of the execution.
+        :param start_execution (Optional(Callable)): Function to start executions.
+        """
+        item = self.dynamodb_helper.update_item(
+            f"NUMBER#{from_number}",
+            SEQUENCER_SORT_KEY,
+            "SET pending = list_append(if_not_exists(pending, :empty), :entry) "
+            "ADD queued_names :names",
+            attribute_values={
+                ":empty": [],
+                ":entry": [{"name": name, "input": json.dumps(execution_input)}],
+                ":names": {name},
+                ":name": name,
+            },
+            condition_expression=(
+                "NOT contains(queued_names, :name) "
+                "AND NOT contains(completed_names, :name)"
+            ),
+        )
+        if item is None:
+            logger.info(f"Execution {name} was already submitted, skipping it")
+            item = self.dynamodb_helper.deserialize_item(
+                self.dynamodb_helper.get_item_by_pk_and_sk(
+                    f"NUMBER#{from_number}", SEQUENCER_SORT_KEY
+                )
+            )
+
+        queue_depth = len(item.get("pending", [])) + int(self._holds_conversation(item))
+        self._dispatch(from_number, item, start_execution)
+        return queue_depth
+
+    def release(
+        self,
+        from_number: str,
+        name: str,
+        start_execution: Optional[Callable[[str, str], None]] = None,
+    ) -> Optional[str]:
+        """
+        Method to finish the in-flight execution of a conversation and start the
+        next queued one (if any). Returns the name of the started execution.
+        Releasing again (e.g. a retry after a "DispatchError") starts the next
+        queued execution if the conversation is still idle.
+        :param from_number (str): Phone number of the conversation.
+        :param name (str): Name of the finished execution.
+        :param start_execution (Optional(Callable)): Function to start executions.
+        """
+        item = self.dynamodb_helper.update_item(
+            f"NUMBER#{from_number}",
+            SEQUENCER_SORT_KEY,
+            "SET completed_names = list_append("
+            "if_not_exists(completed_names, :empty), :name_list) "
+            "REMOVE in_flight, lease_expires_at, lease_index "
+            "DELETE queued_names :names",
+            attribute_values={
+                ":empty": [],
+                ":name_list": [name],
+                ":names": {name},
+                ":name": name,
+            },
+            condition_expression="in_flight = :name",
+        )
+        if item is None:
+            # Released already, or the lease expired and the conversation was
+            # taken over (the dispatch is skipped if another execution holds it)
+            logger.warning(f"Execution {name} does not hold the conversation")
+            item = self.dynamodb_helper.deserialize_item(
+                self.dynamodb_helper.get_item_by_pk_and_sk(
+                    f"NUMBER#{from_number}", SEQUENCER_SORT_KEY
+                )
+            )
+        else:
+            self._trim_completed_names(from_number, item)
+        return self._dispatch(from_number, item, start_execution)
+
+    def recover_expired_leases(
+        self,
+        start_execution: Optional[Callable[[str, str], None]] = None,
+        limit: int = SEQUENCER_RECOVERY_LIMIT,
+    ) -> list[str]:
+        """
+        Method to recover the conversations whose lease expired (e.g. the
+        execution timed out or its Lambda crashed before the release), so that
+        their queued executions do not wait for another message of the same
+        number. It is meant to run on a schedule. Returns the names of the
+        started executions.
+        :param start_execution (Optional(Callable)): Function to start executions.
+        :param limit (int): Maximum number of conversations to recover.
+        """
+        now = int(time.time())
+        expired_items = self.dynamodb_helper.query_index(
+            SEQUENCER_LEASE_INDEX,
+            "lease_index = :lease_partition AND lease_expires_at <= :now",
+            {":lease_partition": SEQUENCER_LEASE_PARTITION, ":now": now},
+            limit=limit,
+        )
+
+        started_names = []
+        for expired_item in expired_items:
+            from_number = expired_item["PK"].removeprefix("NUMBER#")
+            item = self.dynamodb_helper.deserialize_item(
+                self.dynamodb_helper.get_item_by_pk_and_sk(
+                    expired_item["PK"], SEQUENCER_SORT_KEY
+                )
+            )
+            if self._holds_conversation(item):
+                continue
+            if not item.get("pending"):
+                self._clear_lease(from_number, item)
+                continue
+            try:
+                name = self._dispatch(from_number, item, start_execution)
+            except DispatchError as error:
+                # The lease is left expired, so the next run retries it
+                logger.error(f"Could not recover the conversation: {error}")
+                continue
+            if name:
+                logger.warning(
+                    f"Recovered the conversation of {from_number} from "
+                    f"{item.get('in_flight')}, started {name}"
+                )
+                started_names.append(name)
+        return started_names
+
+    def _clear_lease(self, from_number: str, item: dict) -> None:
+        """
+        Method to finish an expired execution with no queued ones after it (it
+        was started, so its name counts as finished), so that the conversation
+        is idle and it leaves the index.
+        """
+        attribute_values = {":lease": item.get("lease_expires_at")}
+        update_expression = "REMOVE in_flight, lease_expires_at, lease_index"
+        condition = "lease_expires_at = :lease"
+        if "in_flight" in item:
+            condition += " AND in_flight = :expired"
+            update_expression = (
+                "SET completed_names = list_append("
+                "if_not_exists(completed_names, :empty), :expired_list) "
+                f"{update_expression} DELETE queued_names :expired_set"
+            )
+            attribute_values.update(
+                {
+                    ":empty": [],
+                    ":expired": item["in_flight"],
+                    ":expired_list": [item["in_flight"]],
+                    ":expired_set": {item["in_flight"]},
+                }
+            )
+        else:
+            condition += " AND attribute_not_exists(in_flight)"
+        self.dynamodb_helper.update_item(
+            f"NUMBER#{from_number}",
+            SEQUENCER_SORT_KEY,
+            update_expression,
+            attribute_values=attribute_values,
+            condition_expression=condition,
+        )
+
+    def _trim_completed_names(self, from_number: str, item: dict) -> None:
+        """
+        Method to remove the oldest finished names once they double the limit
+        (so that most releases are a single write). New names are only appended,
+        so the first positions are still the oldest ones.
+        """
+        completed_names = item.get("completed_names") or []
+        if len(completed_names) < 2 * self.completed_names:
+            return
+        excess = len(completed_names) - self.completed_names
+        self.dynamodb_helper.update_item(
+            f"NUMBER#{from_number}",
+            SEQUENCER_SORT_KEY,
+            "REMOVE " + ", ".join(f"completed_names[{i}]" for i in range(excess)),
+        )
+
+    def _holds_conversation(self, item: dict) -> bool:
+        return "in_flight" in item and int(item.get("lease_expires_at", 0)) >= int(
+            time.time()
+        )
+
+    def _dispatch(
+        self,
+        from_number: str,
+        item: dict,
+        start_execution: Optional[Callable[[str, str], None]],
+    ) -> Optional[str]:
+        """
+        Method to start the first queued execution if the conversation is idle
+        (or its lease expired). Only one caller can win the conditional update,
+        so the same execution is never started twice.
+        """
+        pending = item.get("pending") or []
+        if not pending or self._holds_conversation(item):
+            return None
+
+        start_execution = start_execution or self.start_execution
+        if start_execution is None:
+            raise ValueError("The sequencer has no function to start executions")
+        head = pending[0]
+        condition = "pending[0].#name = :head"
+        attribute_values = {
+            ":head": head["name"],
+            ":lease": int(time.time()) + self.lease_seconds,
+            ":lease_partition": SEQUENCER_LEASE_PARTITION,
+        }
+        update_expression = (
+            "SET in_flight = :head, lease_expires_at = :lease, "
+            "lease_index = :lease_partition"
+        )
+        if "in_flight" in item:
+            # Take over the conversation from an execution whose lease expired
+            # (it was started, so its name counts as finished)
+            condition += " AND in_flight = :expired"
+            update_expression += (
+                ", completed_names = list_append("
+                "if_not_exists(completed_names, :empty), :expired_list) "
+                "REMOVE pending[0] DELETE queued_names :expired_set"
+            )
+            attribute_values.update(
+                {
+                    ":empty": [],
+                    ":expired": item["in_flight"],
+                    ":expired_list": [item["in_flight"]],
+                    ":expired_set": {item["in_flight"]},
+                }
+            )
+        else:
+            condition += " AND attribute_not_exists(in_flight)"
+            update_expression += " REMOVE pending[0]"
+
+        acquired = self.dynamodb_helper.update_item(
+            f"NUMBER#{from_number}",
+            SEQUENCER_SORT_KEY,
+            update_expression,
+            attribute_names={"#name": "name"},
+            attribute_values=attribute_values,
+            condition_expression=condition,
+        )
+        if acquired is None:
+            return None
+
+        try:
+            self._start_with_retries(start_execution, head)
+        except Exception as error:
+            # Give the execution back to the front of the queue, so that it is
+            # started by the retry of the stream record or of the release (or
+            # by the recovery, as the lease is left expired)
+            self.dynamodb_helper.update_item(
+                f"NUMBER#{from_number}",
+                SEQUENCER_SORT_KEY,
+                "SET pending = list_append(:head_entry, if_not_exists(pending, :empty)), "
+                "lease_expires_at = :now REMOVE in_flight",
+                attribute_values={
+                    ":head_entry": [head],
+                    ":empty": [],
+                    ":head": head["name"],
+                    ":now": int(time.time()),
+                },
+                condition_expression="in_flight = :head",
+            )
+            raise DispatchError(
+                f"Could not start execution {head['name']}: {error}"
+            ) from error
+
+        logger.info(f"Started execution {head['name']} for {from_number}")
+        return head["name"]
+
+    def _start_with_retries(
+        self,
+        start_execution: Callable[[str, str], None],
+        head: dict,
+    ) -> None:
+        for attempt in range(self.dispatch_attempts):
+            try:
+                start_execution(head["name"], head["input"])
+                return
+            except Exception as error:
+                if attempt + 1 >= self.dispatch_attempts:
+                    raise
+                logger.warning(
+                    f"Could not start execution {head['name']} "
+                    f"(attempt {attempt + 1}): {error}"
+                )
+                time.sleep(min(0.1 * 2**attempt, 1.0))
@@ -0,0 +1,175 @@
+# Built-in imports
+import hashlib
+import os
+import time
+from typing import Callable
+
+# External imports
+from aws_lambda_powertools.metrics import MetricUnit
+
+# Own imports
+from common.enums import DDBPrefixes
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.logger import custom_logger
+from common.metrics import custom_metrics
+from common.models.session_model import SessionModel
+
+logger = custom_logger()
+metrics = custom_metrics()
+
+# A conversation idle for longer starts from scratch (new agent session)
+SESSION_IDLE_SECONDS = int(os.environ.get("SESSION_IDLE_SECONDS", "1800"))
+
+# The agent session grows with every turn, so it is replaced after these turns
+# by a new one that only carries over the last turns (bounded prompt size)
+SESSION_MAX_TURNS = int(os.environ.get("SESSION_MAX_TURNS", "10"))
+SESSION_CARRY_OVER_TURNS = int(os.environ.get("SESSION_CARRY_OVER_TURNS", "3"))
+
+# Carried over texts are truncated (e.g. long answers with lists of events)
+MAX_TURN_CHARS = 500
+
+SESSION_TTL_SECONDS = 7 * 86400
+
+
+def build_session_id(from_number: str, started_at: int) -> str:
+    """
+    Function to build the Bedrock agent session ID of a conversation. The phone
+    number is hashed, so that it is not exposed in the agent sessions.
+    :param from_number (str): Phone number of the conversation.
+    :param started_at (int): Start of the session (epoch seconds).
+    """
+    number_hash = hashlib.sha256(from_number.encode()).hexdigest()[:16]
+    return f"{number_hash}-{started_at}"
+
+
+class SessionManager:
+    """
+    Manager of the Bedrock agent sessions, with one session per conversation
+    (phone number) saved in the chatbot table ("PK": "NUMBER#<from_number>",
+    "SK": "SESSION"). Idle sessions expire, and long sessions are replaced by a
+    new one that starts with the last turns of the previous one, so the prompt
+    of every turn stays bounded. The sequencer runs one execution at a time per
+    conversation, so the item has a single writer.
+    """
+
+    def __init__(
+        self,
+        dynamodb_helper: DynamoDBHelper,
+        idle_seconds: int = SESSION_IDLE_SECONDS,
+        max_turns: int = SESSION_MAX_TURNS,
+        carry_over_turns: int = SESSION_CARRY_OVER_TURNS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        :param dynamodb_helper (DynamoDBHelper): Helper for the chatbot table.
+        :param idle_seconds (int): Seconds without turns to expire a session.
+        :param max_turns (int): Turns of a session before it is replaced.
+        :param carry_over_turns (int): Turns carried over to the next session.
+        :param clock (callable): Clock in epoch seconds.
+        """
+        self.dynamodb_helper = dynamodb_helper
+        self.idle_seconds = idle_seconds
+        self.max_turns = max_turns
+        self.carry_over_turns = carry_over_turns
+        self.clock = clock
+
+    def get_session(self, from_number: str) -> SessionModel:
+        """
+        Method to get the agent session of a conversation, starting a new one if
+        there is none, it is idle or it reached the maximum turns.
+        :param from_number (str): Phone number of the conversation.
+        """
+        now = int(self.clock())
+        item = self.dynamodb_helper.get_item_by_pk_and_sk(
+            f"{DDBPrefixes.PK_NUMBER.value}{from_number}",
+            DDBPrefixes.SK_SESSION.value,
+        )
+        session = SessionModel.from_dynamodb_item(item) if item else None
+
+        if session and now - session.last_active_at < self.idle_seconds:
+            if session.turns < self.max_turns:
+                return session
+            # Only the last turns are carried over to the new session
+            return self._start_session(from_number, now, session.recent_turns)
+        return self._start_session(from_number, now, [])
+
+    def has_context(self, session: SessionModel) -> bool:
+        """
+        Method to check if the next turn of a session can depend on previous ones
+        (turns of the session or carried over), e.g. "and the second one?".
+        :param session (SessionModel): Agent session of the conversation.
+        """
+        return bool(session.turns or session.recent_turns)
+
+    def conversation_history(self, session: SessionModel) -> list[dict]:
+        """
+        Method to get the turns the agent session does not have yet, in the
+        format of the agent "conversationHistory": the carried over turns to start
+        a new session with, or the turns answered without the agent since its
+        last turn.
+        :param session (SessionModel): Agent session of the conversation.
+        """
+        turns = session.pending_turns if session.turns else session.recent_turns
+        messages = []
+        for turn in turns:
+            messages.append({"role": "user", "content": [{"text": turn["user"]}]})
+            messages.append(
+                {"role": "assistant", "content": [{"text": turn["assistant"]}]}
+            )
+        return messages
+
+    def record_turn(
+        self,
+        session: SessionModel,
+        user_text: str,
+        assistant_text: str,
+        agent_turn: bool = True,
+    ) -> None:
+        """
+        Method to save a completed turn of the session.
+        :param session (SessionModel): Agent session of the conversation.
+        :param user_text (str): Input text of the user.
+        :param assistant_text (str): Response of the agent.
+        :param agent_turn (bool): If the agent answered the turn. Otherwise (e.g.
+            cached answers) it is not in the agent session, so it is pending until
+            it is sent with the history of the next agent turn (which clears it).
+        """
+        now = int(self.clock())
+        turn = {
+            "user": user_text[:MAX_TURN_CHARS],
+            "assistant": assistant_text[:MAX_TURN_CHARS],
+        }
+        session = session.model_copy(
+            update={
+                "last_active_at": now,
+                "turns": session.turns + int(agent_turn),
+                "recent_turns": self._last_turns(session.recent_turns + [turn]),
+                "pending_turns": (
+                    []
+                    if agent_turn
+                    else self._last_turns(session.pending_turns + [turn])
+                ),
+                "ttl": now + SESSION_TTL_SECONDS,
+            }
+        )
+        self.dynamodb_helper.put_item(session)
+
+    def _start_session(
+        self,
+        from_number: str,
+        now: int,
+        recent_turns: list[dict],
+    ) -> SessionModel:
+        logger.info(f"Starting a new agent session ({len(recent_turns)} turns)")
+        metrics.add_metric(name="AgentSessionsStarted", unit=MetricUnit.Count, value=1)
+        return SessionModel(
+            PK=f"{DDBPrefixes.PK_NUMBER.value}{from_number}",
+            SK=DDBPrefixes.SK_SESSION.value,
+            session_id=build_session_id(from_number, now),
+            started_at=now,
+            last_active_at=now,
+            recent_turns=self._last_turns(recent_turns),
+        )
+
+    def _last_turns(self, turns: list[dict]) -> list[dict]:
+        return turns[max(len(turns) - self.carry_over_turns, 0) :]
@@ -0,0 +1,14 @@
+# Built-in imports
+import re
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    """
+    Function to normalize a text of the user for lookups (e.g. cache keys or
+    known phrases): lowercase, without accents, punctuation nor repeated spaces.
+    :param text (str): Input text of the user.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
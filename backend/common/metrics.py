@@ -0,0 +1,10 @@
+# External imports
+from aws_lambda_powertools import Metrics
+
+
+def custom_metrics() -> Metrics:
+    """Returns a custom <aws_lambda_powertools.Metrics> Object."""
+    return Metrics(
+        namespace="WppChatbot",
+        service="wpp-chatbot",
+    )
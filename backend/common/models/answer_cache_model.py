@@ -0,0 +1,26 @@
+from typing import Optional
+from pydantic import Field
+
+from common.models.dynamodb_model import DynamoDBModel
+
+
+class AnswerCacheModel(DynamoDBModel):
+    """
+    Class that represents a cached answer of the Bedrock agent (warm tier of
+    the answer cache, shared by all the containers).
+
+    Attributes:
+        PK: str: Primary Key for the DynamoDB item (ANSWER#<question_hash>)
+        SK: str: Sort Key for the DynamoDB item (ANSWER)
+        question: str: Normalized question.
+        answer: str: Answer of the agent.
+        created_at: int: Creation of the answer (epoch seconds).
+        ttl: Optional(int): Expiration of the item (epoch seconds).
+    """
+
+    PK: str = Field(pattern=r"^ANSWER#")
+    SK: str = Field(pattern=r"^ANSWER$")
+    question: str
+    answer: str
+    created_at: int
+    ttl: Optional[int] = None
@@ -0,0 +1,85 @@
+from decimal import Decimal
+from typing import Any, ClassVar, Union, get_args, get_origin
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from pydantic import BaseModel
+
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+# Scalar types with a direct DynamoDB low-level representation. The rest of the
+# types fall back to the generic boto3 (de)serializer
+_SCALAR_TYPES = {
+    str: ("S", str),
+    int: ("N", int),
+    float: ("N", float),
+    Decimal: ("N", Decimal),
+    bool: ("BOOL", bool),
+}
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) is Union:
+        arguments = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(arguments) == 1:
+            return arguments[0]
+    return annotation
+
+
+class DynamoDBModel(BaseModel):
+    """
+    Class that represents an item of the DynamoDB table (Base Model).
+    The conversion from/to the DynamoDB low-level format ({"S": ...}) is derived
+    once per class from its fields, so subclasses only declare the fields.
+    Note: None values are not stored (the attributes are omitted).
+    """
+
+    # Tuples of (field_name, attribute_type, python_type), by subclass
+    _dynamodb_fields: ClassVar[tuple] = ()
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        dynamodb_fields = []
+        for name, field in cls.model_fields.items():
+            scalar = _SCALAR_TYPES.get(_unwrap_optional(field.annotation))
+            attribute_type, python_type = scalar if scalar else (None, None)
+            dynamodb_fields.append((name, attribute_type, python_type))
+        cls._dynamodb_fields = tuple(dynamodb_fields)
+
+    def to_dynamodb_item(self) -> dict:
+        """
+        Method to convert the model to a DynamoDB low-level item ("S", "N", ...).
+        """
+        item = {}
+        for name, attribute_type, _ in self._dynamodb_fields:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if attribute_type == "S" or attribute_type == "BOOL":
+                item[name] = {attribute_type: value}
+            elif attribute_type == "N":
+                item[name] = {"N": str(value)}
+            else:
+                item[name] = _serializer.serialize(value)
+        return item
+
+    @classmethod
+    def from_dynamodb_item(cls, dynamodb_item: dict) -> "DynamoDBModel":
+        """
+        Method to create the model from a DynamoDB low-level item ("S", "N", ...).
+        :param dynamodb_item (dict): Item in the DynamoDB low-level format.
+        """
+        values = {}
+        for name, attribute_type, python_type in cls._dynamodb_fields:
+            attribute = dynamodb_item.get(name)
+            if attribute is None:
+                continue
+            if attribute_type == "S" and "S" in attribute:
+                values[name] = attribute["S"]
+            elif attribute_type == "N" and "N" in attribute:
+                values[name] = python_type(attribute["N"])
+            else:
+                values[name] = _deserializer.deserialize(attribute)
+
+        return cls.model_validate(values)
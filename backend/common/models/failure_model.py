@@ -0,0 +1,40 @@
+from typing import Optional
+from pydantic import Field
+
+from common.models.dynamodb_model import DynamoDBModel
+
+
+class FailureModel(DynamoDBModel):
+    """
+    Class that represents a message that failed in the State Machine, saved by
+    the "Process Failure" step so that it can be replayed later.
+
+    Attributes:
+        PK: str: Primary Key for the DynamoDB item (FAILURE#<date>)
+        SK: str: Sort Key for the DynamoDB item (<failed_at>#<execution_name>)
+        failed_at: str: Datetime of the failure.
+        execution_name: str: Name of the failed execution.
+        step: str: State of the State Machine that failed (e.g. "Send Message").
+        error: str: Error class (e.g. "TransientDependencyError").
+        cause: str: Error message (truncated).
+        message: dict: Message envelope of the execution (see MessageEnvelopeModel).
+        from_number: Optional(str): Phone number of the sender.
+        whatsapp_id: Optional(str): WhatsApp ID of the message.
+        replayed_at: Optional(str): Datetime of the last replay.
+        replay_execution_name: Optional(str): Name of the last replay execution.
+        ttl: Optional(int): Expiration of the item (epoch seconds).
+    """
+
+    PK: str = Field(pattern=r"^FAILURE#")
+    SK: str
+    failed_at: str
+    execution_name: str
+    step: str
+    error: str
+    cause: str
+    message: dict
+    from_number: Optional[str] = None
+    whatsapp_id: Optional[str] = None
+    replayed_at: Optional[str] = None
+    replay_execution_name: Optional[str] = None
+    ttl: Optional[int] = None
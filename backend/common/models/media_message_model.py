@@ -0,0 +1,37 @@
+from typing import Optional
+
+from common.models.message_base_model import MessageBaseModel
+
+
+class MediaMessageModel(MessageBaseModel):
+    """
+    Class that represents a Chat Message item with media (image, voice, video).
+    Only a reference to the media is stored (the content is fetched to S3 by the
+    State Machine), to keep the items far from the DynamoDB 400 KB limit.
+    All additional attributes are inherited from the MessageBaseModel.
+
+    Attributes:
+        PK: str: Primary Key for the DynamoDB item (NUMBER#<phone_number>)
+        SK: str: Sort Key for the DynamoDB item (MESSAGE#<datetime>)
+        from_number: str: Phone number of the sender.
+        created_at: str: Creation datetime of the message.
+        type: str: Type of message (image, voice or video).
+        whatsapp_id: str: WhatsApp ID of the message.
+        whatsapp_timestamp: str: WhatsApp timestamp of the message.
+        media_id: str: Meta ID of the media (used to download it).
+        mime_type: str: MIME type of the media.
+        sha256: Optional(str): SHA256 checksum of the media reported by Meta.
+        caption: Optional(str): Caption of the media.
+        media_bucket: Optional(str): S3 bucket of the media (once fetched).
+        media_key: Optional(str): S3 key of the media (once fetched).
+        media_size: Optional(int): Size of the media in bytes (once fetched).
+        correlation_id: Optional(str): Correlation ID for the message.
+    """
+
+    media_id: str
+    mime_type: str
+    sha256: Optional[str] = None
+    caption: Optional[str] = None
+    media_bucket: Optional[str] = None
+    media_key: Optional[str] = None
+    media_size: Optional[int] = None
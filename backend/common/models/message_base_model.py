@@ -1,8 +1,10 @@
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import Field
 
+from common.models.dynamodb_model import DynamoDBModel
 
-class MessageBaseModel(BaseModel):
+
+class MessageBaseModel(DynamoDBModel):
     """
     Class that represents a Chat Message item (Base Model).
 
@@ -25,16 +27,3 @@ class MessageBaseModel(BaseModel):
     whatsapp_id: str
     whatsapp_timestamp: str
     correlation_id: Optional[str] = None
-
-    @classmethod
-    def from_dynamodb_item(cls, dynamodb_item: dict) -> "MessageBaseModel":
-        return cls(
-            PK=dynamodb_item["PK"]["S"],
-            SK=dynamodb_item["SK"]["S"],
-            from_number=dynamodb_item["from_number"]["S"],
-            whatsapp_id=dynamodb_item["whatsapp_id"]["S"],
-            created_at=dynamodb_item["created_at"]["S"],
-            whatsapp_timestamp=dynamodb_item["whatsapp_timestamp"]["S"],
-            type=dynamodb_item["type"]["S"],
-            correlation_id=dynamodb_item.get("correlation_id", {}).get("S"),
-        )
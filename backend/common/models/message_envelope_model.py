@@ -0,0 +1,98 @@
+from typing import Optional
+
+from boto3.dynamodb.types import TypeDeserializer
+from pydantic import BaseModel
+
+
+_deserializer = TypeDeserializer()
+
+# Bump it on incompatible changes (executions queued by a previous trigger
+# version can still be in flight, or waiting in the sequencer queue)
+ENVELOPE_VERSION = 1
+
+
+class MessageEnvelopeModel(BaseModel):
+    """
+    Class that represents the message processed by the State Machine: a compact
+    and versioned envelope built once by the trigger from the DynamoDB Stream
+    record, with only the fields that the steps need (as "message" in the input).
+    Note: None values are omitted from the event.
+
+    Attributes:
+        version: int: Version of the envelope format.
+        PK: Optional(str): Primary Key of the message item (NUMBER#<phone_number>)
+        SK: Optional(str): Sort Key of the message item (MESSAGE#<datetime>)
+        from_number: Optional(str): Phone number of the sender.
+        type: Optional(str): Type of message (text, image, video, etc).
+        whatsapp_id: Optional(str): WhatsApp ID of the message (replied to).
+        correlation_id: Optional(str): Correlation ID for the message.
+        text: Optional(str): Text of the message (or its transcription).
+        media_id: Optional(str): Meta ID of the media (media messages).
+        mime_type: Optional(str): MIME type of the media (media messages).
+        caption: Optional(str): Caption of the media (media messages).
+        catching_up: Optional(bool): Folded stale messages (see "fold_records").
+        coalesced_count: Optional(int): Number of messages merged in this one.
+        coalesced_whatsapp_ids: Optional(list): WhatsApp IDs of those messages.
+        coalesced_sks: Optional(list): Sort Keys of the items of those messages.
+    """
+
+    version: int = ENVELOPE_VERSION
+    PK: Optional[str] = None
+    SK: Optional[str] = None
+    from_number: Optional[str] = None
+    type: Optional[str] = None
+    whatsapp_id: Optional[str] = None
+    correlation_id: Optional[str] = None
+    text: Optional[str] = None
+    media_id: Optional[str] = None
+    mime_type: Optional[str] = None
+    caption: Optional[str] = None
+    catching_up: Optional[bool] = None
+    coalesced_count: Optional[int] = None
+    coalesced_whatsapp_ids: Optional[list[str]] = None
+    coalesced_sks: Optional[list[str]] = None
+
+    def to_event(self) -> dict:
+        """
+        Method to convert the envelope to the "message" of the State Machine event.
+        """
+        return self.model_dump(exclude_none=True)
+
+    @classmethod
+    def from_new_image(cls, new_image: dict) -> "MessageEnvelopeModel":
+        """
+        Method to create the envelope from the message item (deserialized).
+        :param new_image (dict): Message item (e.g. NewImage of the Stream record).
+        """
+        return cls.model_validate(
+            {
+                name: new_image[name]
+                for name in cls.model_fields
+                if name != "version" and new_image.get(name) is not None
+            }
+        )
+
+    @classmethod
+    def from_event(cls, event: dict) -> "MessageEnvelopeModel":
+        """
+        Method to load the envelope from the event of a State Machine step.
+        :param event (dict): Event of the step ("message" or legacy "input").
+        """
+        message = event.get("message")
+        if message is None and "input" in event:
+            # Executions started before the envelope (whole DynamoDB record)
+            new_image = event["input"].get("dynamodb", {}).get("NewImage", {})
+            return cls.from_new_image(
+                {
+                    name: _deserializer.deserialize(value)
+                    for name, value in new_image.items()
+                }
+            )
+        if message is None:
+            raise ValueError("The event has no message envelope")
+        if message.get("version") != ENVELOPE_VERSION:
+            raise ValueError(
+                f"Message envelope version <{message.get('version')}> is not "
+                f"supported (expected <{ENVELOPE_VERSION}>)"
+            )
+        return cls.model_validate(message)
@@ -0,0 +1,35 @@
+from typing import Optional
+from pydantic import Field
+
+from common.models.dynamodb_model import DynamoDBModel
+
+
+class MessageStatusModel(DynamoDBModel):
+    """
+    Class that represents the aggregated delivery status of an outbound message.
+
+    Attributes:
+        PK: str: Primary Key for the DynamoDB item (NUMBER#<phone_number>)
+        SK: str: Sort Key for the DynamoDB item (STATUS#<whatsapp_id>)
+        whatsapp_id: str: WhatsApp ID of the outbound message.
+        recipient_id: str: Phone number of the recipient.
+        status: str: Latest known status (sent, delivered, read or failed).
+        status_timestamp: str: WhatsApp timestamp of the latest known status.
+        sent_at: Optional(str): WhatsApp timestamp of the "sent" status.
+        delivered_at: Optional(str): WhatsApp timestamp of the "delivered" status.
+        read_at: Optional(str): WhatsApp timestamp of the "read" status.
+        failed_at: Optional(str): WhatsApp timestamp of the "failed" status.
+        error_code: Optional(str): Error code reported by Meta for failures.
+    """
+
+    PK: str = Field(pattern=r"^NUMBER#\d{10,15}$")
+    SK: str = Field(pattern=r"^STATUS#")
+    whatsapp_id: str
+    recipient_id: str
+    status: str
+    status_timestamp: str
+    sent_at: Optional[str] = None
+    delivered_at: Optional[str] = None
+    read_at: Optional[str] = None
+    failed_at: Optional[str] = None
+    error_code: Optional[str] = None
@@ -0,0 +1,33 @@
+from typing import Optional
+from pydantic import Field
+
+from common.models.dynamodb_model import DynamoDBModel
+
+
+class SessionModel(DynamoDBModel):
+    """
+    Class that represents the Bedrock agent session of a conversation, with the
+    last turns to carry over to the next session (bounded history).
+
+    Attributes:
+        PK: str: Primary Key for the DynamoDB item (NUMBER#<from_number>)
+        SK: str: Sort Key for the DynamoDB item (SESSION)
+        session_id: str: Session ID of the Bedrock agent.
+        started_at: int: Start of the session (epoch seconds).
+        last_active_at: int: Last turn of the session (epoch seconds).
+        turns: int: Number of turns of the session.
+        recent_turns: list(dict): Last turns ({"user", "assistant"} texts).
+        pending_turns: list(dict): Turns answered without the agent (e.g. cached
+            or local answers) since its last turn, to send with the next one.
+        ttl: Optional(int): Expiration of the item (epoch seconds).
+    """
+
+    PK: str = Field(pattern=r"^NUMBER#")
+    SK: str = Field(pattern=r"^SESSION$")
+    session_id: str
+    started_at: int
+    last_active_at: int
+    turns: int = 0
+    recent_turns: list[dict] = []
+    pending_turns: list[dict] = []
+    ttl: Optional[int] = None
@@ -19,17 +19,3 @@ class TextMessageModel(MessageBaseModel):
     """
 
     text: str
-
-    @classmethod
-    def from_dynamodb_item(cls, dynamodb_item: dict) -> "TextMessageModel":
-        return cls(
-            PK=dynamodb_item["PK"]["S"],
-            SK=dynamodb_item["SK"]["S"],
-            from_number=dynamodb_item["from_number"]["S"],
-            whatsapp_id=dynamodb_item["whatsapp_id"]["S"],
-            created_at=dynamodb_item["created_at"]["S"],
-            whatsapp_timestamp=dynamodb_item["whatsapp_timestamp"]["S"],
-            type=dynamodb_item["type"]["S"],
-            text=dynamodb_item["text"]["S"],
-            correlation_id=dynamodb_item.get("correlation_id", {}).get("S"),
-        )
@@ -1,18 +1,7 @@
 ################################################################################
 # !!! IMPORTANT !!!
-#  This __init__.py allows to load the relevant classes from the State Machine.
-#  By importing this file, we leverage "globals" and "getattr" to dynamically
-#  execute the Step Function's inner Lambda Functions classes.
+#  The State Machine steps are NOT imported here on purpose. They are loaded on
+#  first use by "state_machine.step_registry" (from the "class_name" and the
+#  "method_name" of the event params), so that every step only pays for its own
+#  imports on cold starts. New steps must be added to "STEP_MODULES" there.
 ################################################################################
-
-# Validation
-from state_machine.utils.validate_message import ValidateMessage  # noqa
-
-# Processing
-from state_machine.processing.process_text import ProcessText  # noqa
-from state_machine.processing.process_voice import ProcessVoice  # noqa
-from state_machine.processing.send_message import SendMessage  # noqa
-
-# Utils
-from state_machine.utils.success import Success  # noqa
-from state_machine.utils.failure import Failure  # noqa
@@ -1,4 +1,5 @@
 # Built-in imports
+import os
 import uuid
 from typing import Optional
 
@@ -6,7 +7,28 @@ from typing import Optional
 from aws_lambda_powertools import Logger
 
 # Own imports
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.execution_helper import start_execution
+from common.helpers.sequencer_helper import ConversationSequencer
 from common.logger import custom_logger
+from common.models.message_envelope_model import MessageEnvelopeModel
+
+# Executions started by the trigger through the sequencer hold their
+# conversation until they release it at the end of the State Machine. It is
+# created on the first release, as the other steps never use it
+_sequencer: Optional[ConversationSequencer] = None
+
+
+def get_sequencer() -> ConversationSequencer:
+    """
+    Function to get the conversation sequencer of the State Machine steps.
+    """
+    global _sequencer
+    if _sequencer is None:
+        _sequencer = ConversationSequencer(
+            DynamoDBHelper(os.environ.get("DYNAMODB_TABLE")), start_execution
+        )
+    return _sequencer
 
 
 class BaseStepFunction:
@@ -28,22 +50,22 @@ class BaseStepFunction:
         self.logger = logger or custom_logger()
 
         self.logger.info(self.__class__.__name__ + "class event")
-        self.logger.info(event, message_details="Received Event")
+        self.logger.debug(event, message_details="Received Event")
 
         self.message_type: str = self.event.get("message_type")
 
-        # Load correlation ID from event, from DynamoDB Stream or generate a new one
-        correlation_id_from_event = self.event.get("correlation_id")
-        correlation_id_from_dynamo = (
-            self.event.get("input", {})
-            .get("dynamodb", {})
-            .get("NewImage", {})
-            .get("correlation_id", {})
-            .get("S")
-        )
+        # Message envelope built by the trigger (validated by "ValidateMessage",
+        # so that the failure handling still runs for invalid events)
+        self.message: Optional[MessageEnvelopeModel] = None
+        try:
+            self.message = MessageEnvelopeModel.from_event(self.event)
+        except ValueError as error:
+            self.logger.warning(f"Invalid message envelope in the event: {error}")
+
+        # Load correlation ID from the message envelope or generate a new one
         self.correlation_id: str = (
-            correlation_id_from_event or correlation_id_from_dynamo or str(uuid.uuid4())
-        )
+            self.message and self.message.correlation_id
+        ) or str(uuid.uuid4())
 
         # TODO: Also include the phone number in the appended keys
 
@@ -51,3 +73,28 @@ class BaseStepFunction:
             correlation_id=self.correlation_id,
             message_type=self.message_type,
         )
+
+    def release_conversation(self) -> None:
+        """
+        Method to release the conversation of a sequenced execution, so that
+        the next queued message of the same number starts processing.
+        """
+        if not self.event.get("sequenced"):
+            return
+
+        sequencer = get_sequencer()
+        execution_name = self.event.get("execution_name")
+        from_number = self.message.from_number if self.message else None
+        if not from_number or not execution_name:
+            # The next queued message only starts when the lease expires
+            self.logger.error(
+                f"Could not release the conversation of the sequenced execution "
+                f"{execution_name} (missing from_number or execution_name), the "
+                f"next queued message waits for the lease to expire "
+                f"({sequencer.lease_seconds} s)"
+            )
+            return
+
+        next_execution = sequencer.release(from_number, execution_name)
+        if next_execution:
+            self.logger.info(f"Started next queued execution {next_execution}")
@@ -6,9 +6,15 @@ from typing import Optional
 # External imports
 from aws_lambda_powertools import Logger
 import requests
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
 
 
 # Own imports
+from common.helpers.resilience_helper import (
+    CircuitBreaker,
+    ResilientDependency,
+    RetryableError,
+)
 from common.helpers.secrets_helper import SecretsHelper
 from common.logger import custom_logger
 from state_machine.integrations.meta.api_utils import (
@@ -20,7 +26,49 @@ from state_machine.integrations.meta.schemas import MetaPostMessageModel
 
 SECRET_NAME = os.environ["SECRET_NAME"]
 secrets_helper = SecretsHelper(SECRET_NAME)
-auth_token = secrets_helper.get_secret_value("META_TOKEN")
+
+# Meta answers with HTTP 401 when the access token is expired or was rotated
+AUTH_FAILURE_STATUS_CODES = (401,)
+
+# (connect, read) timeouts in seconds for the media downloads
+MEDIA_REQUEST_TIMEOUT = (5, 30)
+
+# (connect, read) timeouts in seconds for the messages, so that a degraded Meta
+# API fails the attempt fast instead of hanging until the Lambda timeout
+MESSAGE_REQUEST_TIMEOUT = (3.05, 10)
+
+# Meta answers with these when it is throttling or temporarily unavailable
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def _is_transient_error(error: Exception) -> bool:
+    # The read timeouts of a POST are not retried (the message may be sent)
+    return isinstance(error, (RetryableError, RequestsConnectionError))
+
+
+def _raise_for_retryable_status(response: requests.Response) -> None:
+    if response.status_code not in RETRYABLE_STATUS_CODES:
+        return
+    try:
+        retry_after = float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        retry_after = None
+    response.close()
+    raise RetryableError(
+        f"Meta API answered with status code {response.status_code}", retry_after
+    )
+
+
+# Shared by all the requests of the execution environment (one circuit)
+meta_dependency = ResilientDependency(
+    "MetaAPI",
+    is_transient=_is_transient_error,
+    max_attempts=3,
+    base_delay_seconds=0.25,
+    max_delay_seconds=2.0,
+    deadline_seconds=20.0,
+    circuit_breaker=CircuitBreaker(failure_threshold=5, reset_timeout_seconds=30),
+)
 
 
 class MetaAPI:
@@ -32,18 +80,22 @@ class MetaAPI:
         self.logger = logger or custom_logger()
         self.load_meta_configurations()
 
-    def load_meta_configurations(self) -> None:
+    def load_meta_configurations(self, force_refresh: bool = False) -> None:
         """
         Method to load Meta configurations from Secrets Manager and initialize endpoint and headers.
+        :param force_refresh (bool): Skip the secrets cache (e.g. after an auth failure).
         """
         self.logger.debug("Loading Meta configurations from Secrets Manager...")
-        self.meta_secret_json = secrets_helper.get_secret_value()
+        self.meta_secret_json = secrets_helper.get_secret_value(
+            force_refresh=force_refresh
+        )
         _meta_token = self.meta_secret_json.get("META_TOKEN")
         _meta_from_phone_number_id = self.meta_secret_json.get(
             "META_FROM_PHONE_NUMBER_ID"
         )
-        self.api_headers = get_api_headers(bearer_token=auth_token)
+        self.api_headers = get_api_headers(bearer_token=_meta_token)
         self.api_endpoint = get_api_endpoint(f"{_meta_from_phone_number_id}/messages")
+        self.auth_headers = {"Authorization": f"Bearer {_meta_token}"}
 
     def post_message(
         self,
@@ -72,18 +124,94 @@ class MetaAPI:
             ),
         )
 
-        try:
-            response = requests.post(
-                self.api_endpoint,
-                headers=self.api_headers,
-                json=message_data_model.model_dump(),
+        response = self._post_request(message_data_model.model_dump())
+
+        # The cached token may be outdated, so refresh the secret only once
+        if response.status_code in AUTH_FAILURE_STATUS_CODES:
+            self.logger.warning(
+                "Authentication failure with Meta API, refreshing the secret..."
             )
+            self.load_meta_configurations(force_refresh=True)
+            response = self._post_request(message_data_model.model_dump())
+
+        self.logger.info(f"Response has status_code: {response.status_code}")
+        self.logger.info(f"Response data: {response.text}")
+        return response.json()
+
+    def get_media(self, media_id: str) -> dict:
+        """
+        Method to get the metadata of a media from the Meta API, which includes
+        its temporary download URL ("url"), "mime_type", "sha256" and "file_size".
+        :param media_id (str): Meta ID of the media.
+        """
+        self.logger.info(f"Starting GET media request to Meta API: {media_id}")
+        response = self._get_request(get_api_endpoint(media_id))
+        response.raise_for_status()
+        return response.json()
+
+    def stream_media(self, media_url: str) -> requests.Response:
+        """
+        Method to start the download of a media from its temporary URL, without
+        loading it in memory (use "iter_content" and close the response).
+        :param media_url (str): Download URL returned by "get_media".
+        """
+        self.logger.info("Starting media download from Meta API")
+        response = self._get_request(media_url, stream=True)
+        response.raise_for_status()
+        return response
+
+    def _get_request(self, url: str, stream: bool = False) -> requests.Response:
+        """
+        Method to execute an authenticated GET request against the Meta API,
+        refreshing the cached token once in case of an authentication failure.
+        The transient errors are retried (see "meta_dependency").
+        :param url (str): URL for the GET request.
+        :param stream (bool): Do not download the body of the response right away.
+        """
+        for attempt in range(2):
+            response = meta_dependency.call(self._send_get_request, url, stream)
+            if response.status_code not in AUTH_FAILURE_STATUS_CODES or attempt:
+                return response
+            self.logger.warning(
+                "Authentication failure with Meta API, refreshing the secret..."
+            )
+            response.close()
+            self.load_meta_configurations(force_refresh=True)
+
+    def _post_request(self, json_data: dict) -> requests.Response:
+        """
+        Method to execute the POST request against the Meta API endpoint.
+        The transient errors are retried (see "meta_dependency").
+        :param json_data (dict): JSON data to send in the POST request.
+        """
+        try:
+            return meta_dependency.call(self._send_post_request, json_data)
         except Exception as e:
             self.logger.exception(
                 "Unexpected error occurred while executing Meta API request."
             )
             raise e
 
-        self.logger.info(f"Response has status_code: {response.status_code}")
-        self.logger.info(f"Response data: {response.text}")
-        return response.json()
+    def _send_post_request(self, json_data: dict) -> requests.Response:
+        response = requests.post(
+            self.api_endpoint,
+            headers=self.api_headers,
+            json=json_data,
+            timeout=MESSAGE_REQUEST_TIMEOUT,
+        )
+        _raise_for_retryable_status(response)
+        return response
+
+    def _send_get_request(self, url: str, stream: bool) -> requests.Response:
+        try:
+            response = requests.get(
+                url,
+                headers=self.auth_headers,
+                stream=stream,
+                timeout=MEDIA_REQUEST_TIMEOUT,
+            )
+        except Timeout as error:
+            # The GET requests are idempotent, so their read timeouts are retried
+            raise RetryableError(str(error)) from error
+        _raise_for_retryable_status(response)
+        return response
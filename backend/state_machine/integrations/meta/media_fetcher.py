@@ -0,0 +1,109 @@
+# Built-in imports
+import os
+import hashlib
+import mimetypes
+from typing import Iterator, Optional
+
+# External imports
+from aws_lambda_powertools import Logger
+import requests
+
+# Own imports
+from common.helpers.s3_helper import DEFAULT_PART_SIZE_BYTES, S3Helper
+from common.logger import custom_logger
+from state_machine.integrations.meta.api_requests import MetaAPI
+
+
+# Chunks read from the Meta download (the S3 parts are bigger and fixed-size)
+MEDIA_READ_SIZE_BYTES = 64 * 1024
+
+# WhatsApp media is at most 16 MB (100 MB for documents), so bigger downloads
+# are aborted instead of being copied to S3
+MEDIA_MAX_SIZE_BYTES = int(
+    os.environ.get("MEDIA_MAX_SIZE_BYTES", str(100 * 1024 * 1024))
+)
+
+
+def build_media_key(from_number: str, whatsapp_id: str, mime_type: str) -> str:
+    """
+    Function to build the S3 key of the media of a message.
+    :param from_number (str): Phone number of the sender.
+    :param whatsapp_id (str): WhatsApp ID of the message.
+    :param mime_type (str): MIME type of the media (e.g. "audio/ogg; codecs=opus").
+    """
+    extension = mimetypes.guess_extension(mime_type.split(";")[0].strip()) or ""
+    return f"media/{from_number}/{whatsapp_id}{extension}"
+
+
+class MediaFetcher:
+    """
+    Class that streams the media of WhatsApp messages from the Meta API to S3,
+    without buffering the whole files in the Lambda memory.
+    """
+
+    def __init__(
+        self,
+        s3_helper: S3Helper,
+        meta_api: Optional[MetaAPI] = None,
+        logger: Optional[Logger] = None,
+        part_size: int = DEFAULT_PART_SIZE_BYTES,
+        max_size: int = MEDIA_MAX_SIZE_BYTES,
+    ) -> None:
+        """
+        :param s3_helper (S3Helper): Helper for the S3 bucket of the media.
+        :param meta_api (Optional(MetaAPI)): Client for the Meta API.
+        :param logger (Optional(Logger)): Logger to use.
+        :param part_size (int): Size of the S3 multipart upload parts in bytes.
+        :param max_size (int): Maximum size of the media in bytes.
+        """
+        self.logger = logger or custom_logger()
+        self.s3_helper = s3_helper
+        self.meta_api = meta_api or MetaAPI(logger=self.logger)
+        self.part_size = part_size
+        self.max_size = max_size
+
+    def fetch(self, media_id: str, key: str) -> dict:
+        """
+        Method to copy a media from the Meta API to S3. Returns the reference to
+        the S3 object ("bucket", "key", "size", "mime_type" and "sha256").
+        :param media_id (str): Meta ID of the media.
+        :param key (str): S3 key for the media.
+        """
+        media = self.meta_api.get_media(media_id)
+        mime_type = media.get("mime_type")
+        if int(media.get("file_size") or 0) > self.max_size:
+            raise ValueError(f"Media {media_id} exceeds {self.max_size} bytes")
+
+        checksum = hashlib.sha256()
+        response = self.meta_api.stream_media(media["url"])
+        try:
+            size = self.s3_helper.upload_stream(
+                self._read_chunks(response, checksum),
+                key=key,
+                content_type=mime_type,
+                part_size=self.part_size,
+            )
+        finally:
+            response.close()
+
+        sha256 = checksum.hexdigest()
+        if media.get("sha256") and media["sha256"] != sha256:
+            self.logger.warning(f"SHA256 of media {media_id} does not match Meta's")
+
+        self.logger.info(f"Media {media_id} fetched to S3 ({size} bytes): {key}")
+        return {
+            "bucket": self.s3_helper.bucket_name,
+            "key": key,
+            "size": size,
+            "mime_type": mime_type,
+            "sha256": sha256,
+        }
+
+    def _read_chunks(self, response: requests.Response, checksum) -> Iterator[bytes]:
+        size = 0
+        for chunk in response.iter_content(chunk_size=MEDIA_READ_SIZE_BYTES):
+            size += len(chunk)
+            if size > self.max_size:
+                raise ValueError(f"Media download exceeds {self.max_size} bytes")
+            checksum.update(chunk)
+            yield chunk
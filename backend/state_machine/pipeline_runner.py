@@ -0,0 +1,96 @@
+# Built-in imports
+import time
+
+# External imports
+from aws_lambda_powertools.metrics import MetricUnit
+
+# Own imports
+from state_machine import step_registry
+from state_machine.base_step_function import BaseStepFunction
+from common.enums import WhatsAppMessageTypes
+from common.logger import custom_logger
+from common.metrics import custom_metrics
+
+
+logger = custom_logger()
+metrics = custom_metrics()
+
+# Same state names, classes and methods as the LambdaInvoke tasks
+PIPELINE_STEPS = {
+    "Validate Message": ("ValidateMessage", "validate_input"),
+    "Process Media": ("ProcessMedia", "process_media"),
+    "Process Voice": ("ProcessVoice", "process_voice"),
+    "Process Text": ("ProcessText", "process_text"),
+    "Send Message": ("SendMessage", "send_message"),
+    "Process Success": ("Success", "process_success"),
+    "Process Failure": ("Failure", "process_failure"),
+}
+
+
+class PipelineRunner(BaseStepFunction):
+    """
+    This class runs all the steps of the State Machine in-process (the "direct"
+    execution mode), with the same routing as the "Message Type?" and "Media
+    Type?" choices of the CDK definition, and the duration of every step.
+    """
+
+    def __init__(self, event):
+        super().__init__(event, logger=logger)
+        self.step_durations_ms = {}
+        self.current_step = None
+
+    def run(self):
+        """
+        Method to process the message end to end. On errors, the "Process
+        Failure" step runs before raising the exception.
+        """
+        start = time.perf_counter()
+        state = self.event
+        try:
+            state = self._run_step("Validate Message", state)
+            message_type = state.get("message_type")
+
+            if message_type != WhatsAppMessageTypes.TEXT.value:
+                state = self._run_step("Process Media", state)
+            if message_type == WhatsAppMessageTypes.VOICE.value:
+                state = self._run_step("Process Voice", state)
+            if message_type in (
+                WhatsAppMessageTypes.TEXT.value,
+                WhatsAppMessageTypes.VOICE.value,
+            ):
+                state = self._run_step("Process Text", state)
+
+            state = self._run_step("Send Message", state)
+            state = self._run_step("Process Success", state)
+        except Exception as error:
+            self.logger.exception(f"Error while running the pipeline: {error}")
+            # Same fields as the "Catch" of the State Machine tasks
+            state["error"] = {"Error": type(error).__name__, "Cause": str(error)}
+            state["failed_step"] = self.current_step
+            self._run_step("Process Failure", state)
+            raise
+        finally:
+            self.step_durations_ms["Pipeline"] = (time.perf_counter() - start) * 1000
+            self._publish_durations()
+
+        state["step_durations_ms"] = self.step_durations_ms
+        return state
+
+    def _run_step(self, state_name: str, state: dict) -> dict:
+        self.current_step = state_name
+        start = time.perf_counter()
+        try:
+            return step_registry.get_handler(*PIPELINE_STEPS[state_name])(state)
+        finally:
+            self.step_durations_ms[state_name] = (time.perf_counter() - start) * 1000
+
+    def _publish_durations(self) -> None:
+        self.logger.info(
+            "Pipeline step durations", step_durations_ms=self.step_durations_ms
+        )
+        for state_name, duration_ms in self.step_durations_ms.items():
+            metrics.add_metric(
+                name=f"{state_name.replace(' ', '')}Duration",
+                unit=MetricUnit.Milliseconds,
+                value=duration_ms,
+            )
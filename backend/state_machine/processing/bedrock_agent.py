@@ -1,8 +1,18 @@
 # Built-in imports
 import os
-import boto3
+from typing import Callable, Optional
+
+# External imports
+from botocore.exceptions import (
+    ClientError,
+    ConnectionError as BotocoreConnectionError,
+    HTTPClientError,
+)
 
 # Own imports
+from common.helpers.aws_clients import get_client
+from common.helpers.parameters_helper import ParametersHelper
+from common.helpers.resilience_helper import CircuitBreaker, ResilientDependency
 from common.logger import custom_logger
 
 
@@ -10,43 +20,163 @@ ENVIRONMENT = os.environ.get("ENVIRONMENT")
 
 logger = custom_logger()
 
-# Create a bedrock runtime client
-bedrock_agent_runtime_client = boto3.client("bedrock-agent-runtime")
-ssm_client = boto3.client("ssm")
+# The agent answers in one go after its reasoning, so the read timeout is long,
+# but a degraded endpoint still fails the attempt before the Lambda timeout
+BEDROCK_CONNECT_TIMEOUT_SECONDS = int(
+    os.environ.get("BEDROCK_CONNECT_TIMEOUT_SECONDS", "3")
+)
+BEDROCK_READ_TIMEOUT_SECONDS = int(os.environ.get("BEDROCK_READ_TIMEOUT_SECONDS", "40"))
+
+# Error codes of Bedrock worth a retry (the stream errors start in lowercase)
+TRANSIENT_ERROR_CODES = {
+    "ThrottlingException",
+    "ServiceQuotaExceededException",
+    "InternalServerException",
+    "DependencyFailedException",
+    "BadGatewayException",
+    "ModelNotReadyException",
+}
+
+# Bedrock runtime client, created on first use (see "get_runtime_client")
+bedrock_agent_runtime_client = None
+
+# The agent configuration is loaded once per container (a single SSM request)
+AGENT_ALIAS_PARAMETER = f"/{ENVIRONMENT}/aws-wpp/bedrock-agent-alias-id-full-string"
+AGENT_ID_PARAMETER = f"/{ENVIRONMENT}/aws-wpp/bedrock-agent-id"
+agent_parameters = ParametersHelper([AGENT_ALIAS_PARAMETER, AGENT_ID_PARAMETER])
+
+# Session for the calls without a conversation (e.g. not a user message)
+DEFAULT_SESSION_ID = "TempSessionBedrock"
+
+# Error codes of an agent or alias that does not exist (e.g. replaced by a deploy)
+INVALID_AGENT_ERROR_CODES = {"ResourceNotFoundException"}
+
+
+class PartialResponseError(Exception):
+    """The response stream failed after a part of it was already delivered."""
+
+
+def _is_transient_error(error: Exception) -> bool:
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        return code[:1].upper() + code[1:] in TRANSIENT_ERROR_CODES
+    return isinstance(error, (BotocoreConnectionError, HTTPClientError))
+
 
+# Only the fast failures (e.g. throttling) are retried within the deadline, as
+# a slow attempt already took most of the Lambda timeout
+bedrock_dependency = ResilientDependency(
+    "BedrockAgent",
+    is_transient=_is_transient_error,
+    max_attempts=3,
+    base_delay_seconds=0.5,
+    max_delay_seconds=4.0,
+    deadline_seconds=15.0,
+    circuit_breaker=CircuitBreaker(failure_threshold=5, reset_timeout_seconds=30),
+)
 
-def get_ssm_parameter(parameter_name):
+
+def get_agent_configuration(force_refresh: bool = False) -> tuple[str, str]:
     """
-    Fetches the parameter value from SSM Parameter Store.
+    Function to get the IDs of the Bedrock agent and its alias (cached).
+    :param force_refresh (bool): Fetch the configuration again from SSM.
     """
-    response = ssm_client.get_parameter(Name=parameter_name, WithDecryption=True)
-    return response["Parameter"]["Value"]
+    parameters = agent_parameters.get_parameters(force_refresh=force_refresh)
+    agent_alias_id = parameters[AGENT_ALIAS_PARAMETER].split("|")[-1]
+    return parameters[AGENT_ID_PARAMETER], agent_alias_id
 
 
-def call_bedrock_agent(input_text: str) -> str:
-    # TODO: Update to use PowerTools SSM Params for optimization
-    AGENT_ALIAS_ID = get_ssm_parameter(
-        f"/{ENVIRONMENT}/aws-wpp/bedrock-agent-alias-id-full-string"
-    )
-    AGENT_ALIAS_ID = AGENT_ALIAS_ID.split("|")[-1]
-    AGENT_ID = get_ssm_parameter(f"/{ENVIRONMENT}/aws-wpp/bedrock-agent-id")
-
-    response = bedrock_agent_runtime_client.invoke_agent(
-        agentAliasId=AGENT_ALIAS_ID,
-        agentId=AGENT_ID,
-        enableTrace=False,
-        inputText=input_text,
-        sessionId="TempSessionBedrock",
+def get_runtime_client():
+    """
+    Function to get the Bedrock agent runtime client, created on the first call
+    (the retries are done by "bedrock_dependency", not by boto3).
+    """
+    global bedrock_agent_runtime_client
+    if bedrock_agent_runtime_client is None:
+        bedrock_agent_runtime_client = get_client(
+            "bedrock-agent-runtime",
+            connect_timeout=BEDROCK_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=BEDROCK_READ_TIMEOUT_SECONDS,
+            max_attempts=1,
+        )
+    return bedrock_agent_runtime_client
+
+
+def call_bedrock_agent(
+    input_text: str,
+    on_chunk: Optional[Callable[[str], None]] = None,
+    session_id: str = DEFAULT_SESSION_ID,
+    conversation_history: Optional[list[dict]] = None,
+) -> str:
+    """
+    Function to get the response of the Bedrock agent for an input text.
+    :param input_text (str): Input text of the user.
+    :param on_chunk (callable): Called with every chunk of the response as soon
+        as it is generated (the response is streamed by the agent).
+    :param session_id (str): Agent session of the conversation (see "SessionManager").
+    :param conversation_history (list(dict)): Previous messages to start a new
+        session with (only used by the first turn of the session).
+    """
+    request = {
+        "enableTrace": False,
+        "inputText": input_text,
+        "sessionId": session_id,
+    }
+    if conversation_history:
+        request["sessionState"] = {
+            "conversationHistory": {"messages": conversation_history}
+        }
+    if on_chunk:
+        request["streamingConfigurations"] = {"streamFinalResponse": True}
+
+    agent_id, agent_alias_id = get_agent_configuration()
+    try:
+        return bedrock_dependency.call(
+            _invoke_agent, agent_id, agent_alias_id, request, on_chunk
+        )
+    except ClientError as error:
+        code = error.response.get("Error", {}).get("Code")
+        if code not in INVALID_AGENT_ERROR_CODES:
+            raise
+        # The cached alias may be outdated, so reload the configuration once
+        logger.warning(f"Invalid Bedrock agent configuration: {error}")
+        configuration = get_agent_configuration(force_refresh=True)
+        if configuration == (agent_id, agent_alias_id):
+            raise
+        return bedrock_dependency.call(_invoke_agent, *configuration, request, on_chunk)
+
+
+def _invoke_agent(
+    agent_id: str,
+    agent_alias_id: str,
+    request: dict,
+    on_chunk: Optional[Callable[[str], None]] = None,
+) -> str:
+    # The stream errors are raised while reading it, so it is read in the retry
+    response = get_runtime_client().invoke_agent(
+        agentAliasId=agent_alias_id,
+        agentId=agent_id,
+        **request,
     )
     logger.info(response)
 
     stream = response.get("completion")
     text_response = ""
-    if stream:
-        for event in stream:
+    try:
+        for event in stream or []:
             chunk = event.get("chunk")
             logger.info("-----")
-            text_response += chunk.get("bytes").decode()
+            text = chunk.get("bytes").decode()
+            text_response += text
+            if on_chunk:
+                on_chunk(text)
+    except Exception as error:
+        # A retry would deliver the chunks again, so it is not transient anymore
+        if on_chunk and text_response:
+            raise PartialResponseError(
+                f"Response stream failed after {len(text_response)} chars: {error}"
+            ) from error
+        raise
     logger.info(text_response)
 
     # TODO: Add better error handling and validations/checks
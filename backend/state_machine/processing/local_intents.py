@@ -0,0 +1,285 @@
+# Built-in imports
+import os
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# External imports
+from aws_lambda_powertools.metrics import MetricUnit
+
+# Own imports
+from bedrock_agent.lambda_function import (
+    action_group_fetch_calendar_events,
+    action_group_fetch_contacts,
+    action_group_fetch_todos,
+)
+from common.helpers.text_helper import normalize_text
+from common.logger import custom_logger
+from common.metrics import custom_metrics
+
+logger = custom_logger()
+metrics = custom_metrics()
+
+# Relative dates ("today", "mañana") are resolved in the timezone of the user
+LOCAL_TIMEZONE = os.environ.get("LOCAL_TIMEZONE", "America/Bogota")
+
+# Longer messages are rarely a simple request, so they go to the agent
+MAX_TOKENS = 12
+
+CALENDAR_EVENTS = "FetchCalendarEvents"
+TODOS = "FetchTODOs"
+CONTACTS = "FetchContacts"
+
+# Phrases of each language, by intent (same action groups as the agent)
+INTENT_PHRASES = {
+    CALENDAR_EVENTS: {
+        "en": "event,events,calendar,agenda,meeting,meetings,schedule",
+        "es": "evento,eventos,calendario,reunion,reuniones,cita,citas",
+    },
+    TODOS: {
+        "en": "todo,todos,to do,to dos,task,tasks",
+        "es": "tarea,tareas,pendiente,pendientes,por hacer",
+    },
+    CONTACTS: {
+        "en": "contact,contacts",
+        "es": "contacto,contactos",
+    },
+}
+RELATIVE_DAYS = {
+    "en": {"today": 0, "tomorrow": 1, "yesterday": -1, "day after tomorrow": 2},
+    "es": {"hoy": 0, "manana": 1, "ayer": -1, "pasado manana": 2},
+}
+MONTHS = {
+    "en": "january,february,march,april,may,june,july,august,september,"
+    "october,november,december",
+    "es": "enero,febrero,marzo,abril,mayo,junio,julio,agosto,septiembre,"
+    "octubre,noviembre,diciembre",
+}
+# Words that do not change the meaning of a simple request
+FILLER_WORDS = {
+    "en": "what,whats,s,are,is,my,me,show,list,give,get,tell,the,for,on,of,in,"
+    "all,please,pls,do,i,have,any,hi,hello,hey,can,could,you,santi",
+    "es": "que,cuales,cual,son,es,mis,mi,muestrame,muestra,dame,dime,los,las,"
+    "el,la,de,del,para,en,tengo,hay,por favor,hola,todas,puedes,santi",
+}
+
+ISO_DATE_PATTERN = re.compile(r"\b(\d{4})[-/](\d{1,2})[-/](\d{1,2})\b")
+
+REPLIES = {
+    CALENDAR_EVENTS: {
+        "en": (
+            "Santi, these are your events for {date}:",
+            "Santi, you have no events for {date}.",
+        ),
+        "es": (
+            "Santi, estos son tus eventos del {date}:",
+            "Santi, no tienes eventos el {date}.",
+        ),
+    },
+    TODOS: {
+        "en": ("Santi, these are your TODOs:", "Santi, you have no pending TODOs."),
+        "es": (
+            "Santi, estas son tus tareas pendientes:",
+            "Santi, no tienes tareas pendientes.",
+        ),
+    },
+    CONTACTS: {
+        "en": ("Santi, these are your contacts:", "Santi, you have no saved contacts."),
+        "es": (
+            "Santi, estos son tus contactos:",
+            "Santi, no tienes contactos guardados.",
+        ),
+    },
+}
+
+
+class LocalIntent(NamedTuple):
+    """Simple request recognized with high confidence."""
+
+    name: str
+    language: str
+    date: Optional[str] = None
+
+
+def build_trie() -> dict:
+    """
+    Function to build the trie of the known phrases, by words. The end of a
+    phrase is a "$" node with its (kind, value, language).
+    """
+    entries = []
+    for intent, phrases_by_language in INTENT_PHRASES.items():
+        for language, phrases in phrases_by_language.items():
+            entries += [
+                (phrase, "intent", intent, language) for phrase in phrases.split(",")
+            ]
+    for language, offsets in RELATIVE_DAYS.items():
+        entries += [
+            (phrase, "days", offset, language) for phrase, offset in offsets.items()
+        ]
+    for language, months in MONTHS.items():
+        entries += [
+            (month, "month", number, language)
+            for number, month in enumerate(months.split(","), start=1)
+        ]
+    for language, words in FILLER_WORDS.items():
+        entries += [(word, "filler", None, language) for word in words.split(",")]
+
+    trie = {}
+    for phrase, kind, value, language in entries:
+        node = trie
+        for word in phrase.split():
+            node = node.setdefault(word, {})
+        # The first language of a phrase wins (e.g. "agenda" or "santi")
+        node.setdefault("$", (kind, value, language))
+    return trie
+
+
+TRIE = build_trie()
+
+
+def today_in_local_timezone() -> date:
+    try:
+        return datetime.now(ZoneInfo(LOCAL_TIMEZONE)).date()
+    except ZoneInfoNotFoundError:
+        return datetime.now(timezone.utc).date()
+
+
+def classify(text: str, today: Optional[date] = None) -> Optional[LocalIntent]:
+    """
+    Function to recognize a simple request (a single intent, with the date for
+    the calendar events). Every word of the text must be known, so anything
+    else (None) is left to the agent.
+    :param text (str): Input text of the user.
+    :param today (date): Reference for the relative dates.
+    """
+    today = today or today_in_local_timezone()
+    dates = []
+    for year, month, day in ISO_DATE_PATTERN.findall(text):
+        dates.append((int(year), int(month), int(day)))
+    words = normalize_text(ISO_DATE_PATTERN.sub(" ", text)).split()
+    if not words or len(words) > MAX_TOKENS:
+        return None
+
+    intents, languages, months, numbers = [], [], [], []
+    position = 0
+    while position < len(words):
+        # Longest known phrase starting at this word
+        node, match, end = TRIE, None, position
+        for index in range(position, len(words)):
+            node = node.get(words[index])
+            if node is None:
+                break
+            if "$" in node:
+                match, end = node["$"], index + 1
+
+        if match is None:
+            if not words[position].isdigit():
+                return None
+            numbers.append(int(words[position]))
+            position += 1
+            continue
+
+        kind, value, language = match
+        if kind == "intent":
+            intents.append((value, " ".join(words[position:end])))
+        elif kind == "days":
+            day = today + timedelta(days=value)
+            dates.append((day.year, day.month, day.day))
+        elif kind == "month":
+            months.append(value)
+        if kind != "filler":
+            languages.append(language)
+        position = end
+
+    # "todos" is also "all" in Spanish (e.g. "todos mis contactos")
+    if len(intents) > 1:
+        intents = [intent for intent in intents if intent[1] != "todos"]
+    if len({intent for intent, _ in intents}) != 1:
+        return None
+    intent = intents[0][0]
+
+    # Month names with the day and optional year (e.g. "2 de diciembre")
+    if months:
+        days = [number for number in numbers if 1 <= number <= 31]
+        years = [number for number in numbers if number >= 1000]
+        if len(months) > 1 or len(days) != 1 or len(days) + len(years) != len(numbers):
+            return None
+        dates.append((years[0] if years else today.year, months[0], days[0]))
+    elif numbers:
+        return None
+
+    language = "es" if "es" in languages else "en"
+    if intent != CALENDAR_EVENTS:
+        return LocalIntent(intent, language) if not dates else None
+    if len(dates) != 1:
+        return None
+    try:
+        return LocalIntent(intent, language, date(*dates[0]).isoformat())
+    except ValueError:
+        return None
+
+
+def fetch(intent: LocalIntent) -> list:
+    """
+    Function to get the data of an intent, with the action group functions of
+    the agent.
+    :param intent (LocalIntent): Recognized intent.
+    """
+    if intent.name == CALENDAR_EVENTS:
+        return action_group_fetch_calendar_events(
+            [{"name": "date", "value": intent.date}]
+        )
+    if intent.name == TODOS:
+        return action_group_fetch_todos()
+    return action_group_fetch_contacts()
+
+
+def format_reply(intent: LocalIntent, items: list) -> str:
+    """
+    Function to build the reply of an intent, in the language of the request.
+    :param intent (LocalIntent): Recognized intent.
+    :param items (list): Data of the intent.
+    """
+    header, empty = REPLIES[intent.name][intent.language]
+    if not items:
+        return empty.format(date=intent.date)
+    lines = [header.format(date=intent.date)]
+    lines += [f"- {item}" for item in items]
+    return "\n".join(lines)
+
+
+def answer_locally(
+    text: str,
+    fetch_function: Callable[[LocalIntent], list] = fetch,
+) -> Optional[str]:
+    """
+    Function to answer a simple request without the agent (None otherwise).
+    :param text (str): Input text of the user.
+    :param fetch_function (callable): Function to get the data of an intent.
+    """
+    start = time.perf_counter()
+    intent = classify(text)
+    if intent is None:
+        metrics.add_metric(name="LocalIntentMisses", unit=MetricUnit.Count, value=1)
+        return None
+
+    try:
+        reply = format_reply(intent, fetch_function(intent))
+    except Exception as error:
+        # The agent can still answer (with its own retries)
+        logger.warning(f"Could not answer the {intent.name} intent locally: {error}")
+        metrics.add_metric(name="LocalIntentErrors", unit=MetricUnit.Count, value=1)
+        return None
+
+    duration_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"Answered the {intent.name} intent locally in {duration_ms:.1f} ms")
+    metrics.add_metric(name="LocalIntentHits", unit=MetricUnit.Count, value=1)
+    metrics.add_metric(
+        name=f"LocalIntent{intent.name}Hits", unit=MetricUnit.Count, value=1
+    )
+    metrics.add_metric(
+        name="LocalIntentLatency", unit=MetricUnit.Milliseconds, value=duration_ms
+    )
+    return reply
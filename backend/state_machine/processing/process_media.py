@@ -0,0 +1,79 @@
+# Built-in imports
+import os
+
+# Own imports
+from state_machine.base_step_function import BaseStepFunction
+from state_machine.integrations.meta.media_fetcher import MediaFetcher, build_media_key
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.s3_helper import S3Helper
+from common.logger import custom_logger
+from common.models.message_envelope_model import MessageEnvelopeModel
+
+
+logger = custom_logger()
+
+MEDIA_BUCKET = os.environ.get("MEDIA_BUCKET")
+DYNAMODB_TABLE = os.environ.get("DYNAMODB_TABLE")
+
+# Fields of the message envelope needed to fetch and reference the media
+REQUIRED_MEDIA_FIELDS = (
+    "PK",
+    "SK",
+    "from_number",
+    "whatsapp_id",
+    "media_id",
+    "mime_type",
+)
+
+
+class ProcessMedia(BaseStepFunction):
+    """
+    This class contains methods that serve as the "media processing" for the State Machine.
+    """
+
+    def __init__(self, event):
+        super().__init__(event, logger=logger)
+
+    def process_media(self):
+        """
+        Method to fetch the media of the input message (image, voice or video) to
+        S3 and save the reference to it in the message item.
+        """
+
+        self.logger.info("Starting process_media for the chatbot")
+
+        # Raise the reason why the message envelope could not be loaded
+        self.message = self.message or MessageEnvelopeModel.from_event(self.event)
+        missing_fields = [
+            name for name in REQUIRED_MEDIA_FIELDS if not getattr(self.message, name)
+        ]
+        if missing_fields:
+            raise ValueError(
+                f"The message envelope has no media to process (missing: {missing_fields})"
+            )
+
+        media_fetcher = MediaFetcher(S3Helper(MEDIA_BUCKET), logger=self.logger)
+        media_reference = media_fetcher.fetch(
+            media_id=self.message.media_id,
+            key=build_media_key(
+                self.message.from_number,
+                self.message.whatsapp_id,
+                self.message.mime_type,
+            ),
+        )
+
+        DynamoDBHelper(DYNAMODB_TABLE).update_item_attributes(
+            self.message.PK,
+            self.message.SK,
+            {
+                "media_bucket": media_reference["bucket"],
+                "media_key": media_reference["key"],
+                "media_size": media_reference["size"],
+            },
+        )
+
+        self.logger.info("Media processing finished successfully")
+
+        self.event["media"] = media_reference
+
+        return self.event
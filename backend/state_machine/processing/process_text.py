@@ -1,17 +1,58 @@
 # Built-in imports
-from datetime import datetime
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
 
 # Own imports
 from state_machine.base_step_function import BaseStepFunction
 from common.enums import WhatsAppMessageTypes
+from common.helpers.answer_cache_helper import AnswerCache, BedrockEmbedder
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.session_helper import SessionManager
 from common.logger import custom_logger
 
-from state_machine.processing.bedrock_agent import call_bedrock_agent
+from state_machine.integrations.meta.api_requests import MetaAPI
+from state_machine.processing.bedrock_agent import (
+    PartialResponseError,
+    call_bedrock_agent,
+)
+from state_machine.processing.local_intents import answer_locally
+from state_machine.processing.response_streamer import ResponseStreamer
 
 
 logger = custom_logger()
 ALLOWED_MESSAGE_TYPES = WhatsAppMessageTypes.__members__
 
+dynamodb_helper = DynamoDBHelper(os.environ.get("DYNAMODB_TABLE"))
+
+# One agent session per conversation, with a bounded history
+session_manager = SessionManager(dynamodb_helper)
+
+# Answers of the repeated questions (the semantic lookups need NumPy)
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_SEMANTIC = (
+    os.environ.get("ANSWER_CACHE_SEMANTIC", "false").lower() == "true"
+)
+answer_cache = AnswerCache(
+    dynamodb_helper,
+    embedder=BedrockEmbedder() if ANSWER_CACHE_SEMANTIC else None,
+)
+
+# Simple requests (TODOs, contacts, events of a date) answered without the agent
+LOCAL_INTENTS_ENABLED = (
+    os.environ.get("LOCAL_INTENTS_ENABLED", "false").lower() == "true"
+)
+
+# Send the response of the agent to WhatsApp while it is generated
+STREAM_RESPONSES = os.environ.get("STREAM_RESPONSES", "false").lower() == "true"
+
+# Single reply for the stale messages folded by the trigger (see "fold_records")
+CATCHING_UP_MESSAGE = (
+    "Sorry for the late reply, I was catching up on {count} pending messages. "
+    "Could you send me your last question again, please?"
+)
+
 
 class ProcessText(BaseStepFunction):
     """
@@ -20,6 +61,7 @@ class ProcessText(BaseStepFunction):
 
     def __init__(self, event):
         super().__init__(event, logger=logger)
+        self.session = None
 
     def process_text(self):
         """
@@ -29,17 +71,16 @@ class ProcessText(BaseStepFunction):
         self.logger.info("Starting process_text for the chatbot")
 
         # TODO: Add more robust "text processing" logic here (actual response)
-        self.text = (
-            self.event.get("input", {})
-            .get("dynamodb", {})
-            .get("NewImage", {})
-            .get("text", {})
-            .get("S", "DEFAULT_RESPONSE")
-        )
+        self.text = self.message.text or "DEFAULT_RESPONSE"
 
-        # TODO: Update "acnowledged" message to a more complex response
-        # TODO: Add more complex "text processing" logic here with memory and sessions...
-        self.response_message = call_bedrock_agent(self.text)
+        if self.message.catching_up:
+            # Stale messages get a single reply, without the (late) agent answer
+            self.response_message = CATCHING_UP_MESSAGE.format(
+                count=self.message.coalesced_count or 1,
+            )
+        else:
+            # TODO: Update "acnowledged" message to a more complex response
+            self.response_message = self.get_response()
 
         self.logger.info(f"Generated response message: {self.response_message}")
         self.logger.info("Validation finished successfully")
@@ -47,3 +88,139 @@ class ProcessText(BaseStepFunction):
         self.event["response_message"] = self.response_message
 
         return self.event
+
+    def get_response(self) -> str:
+        """
+        Method to get the response of the agent (or the local answer of a simple
+        request, or the cached answer of the same question), streamed to the user
+        if enabled.
+        """
+        if LOCAL_INTENTS_ENABLED:
+            local_answer = answer_locally(self.text)
+            if local_answer is not None:
+                self.record_turn(local_answer, agent_turn=False)
+                return local_answer
+
+        # The cache is shared by all the users, so the follow-ups (that depend on
+        # the previous turns of the conversation) always go to the agent
+        session = self.get_session()
+        use_cache = ANSWER_CACHE_ENABLED and not (
+            session and session_manager.has_context(session)
+        )
+        if use_cache:
+            cached_answer = answer_cache.get(self.text)
+            if cached_answer is not None:
+                self.record_turn(cached_answer, agent_turn=False)
+                return cached_answer
+
+        start = time.perf_counter()
+        if STREAM_RESPONSES:
+            response_message = self.stream_response()
+        else:
+            response_message = self.ask_agent()
+
+        if use_cache:
+            agent_latency_ms = (time.perf_counter() - start) * 1000
+            answer_cache.put(self.text, response_message, agent_latency_ms)
+        return response_message
+
+    def stream_response(self) -> str:
+        """
+        Method to send the response of the agent to the user while it is generated
+        (in chunks), so "Send Message" only marks the message as answered.
+        """
+        streamer = ResponseStreamer(
+            MetaAPI(logger=self.logger),
+            to_phone_number=self.message.from_number,
+            original_message_id=self.message.whatsapp_id,
+            on_first_chunk=self.mark_partial_reply,
+        )
+        try:
+            with streamer:
+                response_message = self.ask_agent(on_chunk=streamer.add_text)
+        except PartialResponseError:
+            raise
+        except Exception as error:
+            # A retry of the step would send the same chunks again
+            if streamer.sent_whatsapp_ids:
+                raise PartialResponseError(
+                    f"Streaming failed after {len(streamer.sent_whatsapp_ids)} "
+                    f"chunks: {error}"
+                ) from error
+            raise
+
+        if streamer.sent_whatsapp_ids:
+            self.event["response_sent"] = True
+            self.event["answer_whatsapp_id"] = streamer.sent_whatsapp_ids[-1]
+        return response_message
+
+    def mark_partial_reply(self, answer_whatsapp_id: str) -> None:
+        """
+        Method to mark the message item (with all the messages merged in it) as
+        partially answered once the first chunk is sent, so that a replay of a
+        failure in the middle of the stream does not send the chunks again.
+        :param answer_whatsapp_id (str): WhatsApp ID of the first chunk.
+        """
+        if not self.message.PK or not self.message.SK:
+            return
+        partial_reply_at = datetime.now(timezone.utc).isoformat()
+        for sort_key in self.message.coalesced_sks or [self.message.SK]:
+            try:
+                dynamodb_helper.update_item_attributes(
+                    self.message.PK,
+                    sort_key,
+                    {
+                        "partial_reply_at": partial_reply_at,
+                        "answer_whatsapp_id": answer_whatsapp_id,
+                    },
+                )
+            except Exception as error:
+                # The chunk was sent already, so the streaming goes on
+                self.logger.warning(
+                    f"Could not mark the message {sort_key} as partially answered: "
+                    f"{error}"
+                )
+
+    def ask_agent(self, on_chunk: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Method to get the response of the agent, in the session of the conversation.
+        :param on_chunk (callable): Called with every chunk of the response.
+        """
+        session = self.get_session()
+        if session is None:
+            return call_bedrock_agent(self.text, on_chunk=on_chunk)
+
+        response_message = call_bedrock_agent(
+            self.text,
+            on_chunk=on_chunk,
+            session_id=session.session_id,
+            conversation_history=session_manager.conversation_history(session),
+        )
+        self.record_turn(response_message)
+        return response_message
+
+    def get_session(self):
+        """
+        Method to get the agent session of the conversation (loaded once per step),
+        or None for the messages without a sender.
+        """
+        if self.session is None and self.message.from_number:
+            self.session = session_manager.get_session(self.message.from_number)
+        return self.session
+
+    def record_turn(self, response_message: str, agent_turn: bool = True) -> None:
+        """
+        Method to save the turn in the session of the conversation (if any).
+        :param response_message (str): Response sent to the user.
+        :param agent_turn (bool): If the agent answered the turn.
+        """
+        session = self.get_session()
+        if session is None:
+            return
+        try:
+            session_manager.record_turn(
+                session, self.text, response_message, agent_turn=agent_turn
+            )
+        except Exception as error:
+            # The response is ready, the next turn only loses this one
+            self.logger.warning(f"Could not save the turn of the session: {error}")
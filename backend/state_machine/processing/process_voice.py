@@ -34,6 +34,7 @@ class ProcessVoice(BaseStepFunction):
 
         self.logger.info(f"Generated response message: {self.text}")
 
-        self.event["input"]["dynamodb"]["NewImage"]["S"] = self.text
+        # Continue the processing as a text message (Process Text reads "text")
+        self.event["message"]["text"] = self.text
 
         return self.event
@@ -0,0 +1,193 @@
+# Built-in imports
+import os
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+# External imports
+from aws_lambda_powertools.metrics import MetricUnit
+
+# Own imports
+from common.logger import custom_logger
+from common.metrics import custom_metrics
+from state_machine.integrations.meta.api_requests import MetaAPI
+
+
+logger = custom_logger()
+metrics = custom_metrics()
+
+# Smaller chunks reach the user sooner, but too many messages are annoying
+STREAM_MIN_CHUNK_CHARS = int(os.environ.get("STREAM_MIN_CHUNK_CHARS", "120"))
+
+# Maximum length of the body of a WhatsApp text message
+MAX_CHUNK_CHARS = 4096
+
+# End of a sentence, once the next word started (e.g. not the "." of "3.5")
+SENTENCE_END = re.compile(r"[.!?:;](?=\s)")
+
+
+class ResponseStreamer:
+    """
+    Sends a response to WhatsApp while it is generated, in chunks of complete
+    paragraphs or sentences of a minimum size. The chunks are sent by a single
+    worker in order (a chunk is sent once the previous one was accepted), so the
+    generation is not blocked by the Meta API and the user gets them in order.
+    Use it as a context manager: the remaining text is sent at the exit.
+    """
+
+    def __init__(
+        self,
+        meta_api: MetaAPI,
+        to_phone_number: str,
+        original_message_id: Optional[str] = None,
+        min_chunk_chars: Optional[int] = None,
+        max_chunk_chars: int = MAX_CHUNK_CHARS,
+        clock: Callable[[], float] = time.monotonic,
+        on_first_chunk: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        """
+        :param meta_api (MetaAPI): Meta API to send the chunks.
+        :param to_phone_number (str): Phone number to send the chunks to.
+        :param original_message_id (str): Message ID the first chunk replies to.
+        :param min_chunk_chars (int): Minimum length of a chunk (except the last),
+            by default "STREAM_MIN_CHUNK_CHARS".
+        :param max_chunk_chars (int): Maximum length of a chunk.
+        :param clock (callable): Monotonic clock in seconds.
+        :param on_first_chunk (callable): Called with the WhatsApp ID of the first
+            chunk, once it was sent (the user got a part of the response).
+        """
+        self.meta_api = meta_api
+        self.to_phone_number = to_phone_number
+        self.original_message_id = original_message_id
+        self.min_chunk_chars = min_chunk_chars or STREAM_MIN_CHUNK_CHARS
+        self.max_chunk_chars = max_chunk_chars
+        self.clock = clock
+        self.on_first_chunk = on_first_chunk
+
+        self.sent_whatsapp_ids = []
+        self.started_at = clock()
+        self.first_chunk_ms = None
+        self.last_chunk_ms = None
+        self._buffer = ""
+        self._chunks = 0
+        self._futures: list[Future] = []
+        self._error: Optional[Exception] = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def __enter__(self) -> "ResponseStreamer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        if exc_type is None:
+            self._publish_metrics()
+
+    def add_text(self, text: str) -> None:
+        """
+        Method to add generated text, sending the chunks that are complete.
+        :param text (str): Text generated since the previous call.
+        """
+        self._raise_if_failed()
+        self._buffer += text
+        while split_at := self._split_point():
+            self._send(self._buffer[:split_at])
+            self._buffer = self._buffer[split_at:]
+
+    def flush(self) -> list[str]:
+        """
+        Method to send the remaining text and wait for all the chunks to be sent.
+        Returns the WhatsApp IDs of the sent chunks (in order).
+        """
+        while self._buffer:
+            split_at = self._split_point() or min(
+                len(self._buffer), self.max_chunk_chars
+            )
+            self._send(self._buffer[:split_at])
+            self._buffer = self._buffer[split_at:]
+        for future in self._futures:
+            future.result()
+        self._raise_if_failed()
+        return self.sent_whatsapp_ids
+
+    def _split_point(self) -> int:
+        """Length of the next complete chunk of the buffer (0 if not complete)."""
+        if len(self._buffer) < self.min_chunk_chars:
+            return 0
+        window = self._buffer[: self.max_chunk_chars]
+        paragraph_end = window.rfind("\n\n")
+        if paragraph_end >= self.min_chunk_chars:
+            return paragraph_end + 2
+        sentence_ends = [match.end() for match in SENTENCE_END.finditer(window)]
+        if sentence_ends and sentence_ends[-1] >= self.min_chunk_chars:
+            return sentence_ends[-1]
+        if len(self._buffer) > self.max_chunk_chars:
+            # No sentence fits in a message, so cut it at the last word
+            return window.rfind(" ") + 1 or self.max_chunk_chars
+        return 0
+
+    def _send(self, chunk: str) -> None:
+        chunk = chunk.strip()
+        if chunk:
+            self._futures.append(self._executor.submit(self._post_chunk, chunk))
+
+    def _post_chunk(self, chunk: str) -> None:
+        # The chunks after a failed one are not sent, to not leave a gap
+        if self._error:
+            return
+        try:
+            response = self.meta_api.post_message(
+                text_message=chunk,
+                to_phone_number=self.to_phone_number,
+                original_message_id=(
+                    self.original_message_id if not self._chunks else None
+                ),
+            )
+            if "error" in response:
+                raise Exception("Error in POST WhatsApp Message Meta API Response")
+        except Exception as error:
+            logger.error(f"Error sending the chunk {self._chunks + 1}: {error}")
+            self._error = error
+            raise
+
+        self._chunks += 1
+        self.sent_whatsapp_ids.append(
+            response.get("messages", [{}])[0].get("id", "UNKNOWN")
+        )
+        elapsed_ms = (self.clock() - self.started_at) * 1000
+        if self.first_chunk_ms is None:
+            self.first_chunk_ms = elapsed_ms
+            if self.on_first_chunk:
+                self.on_first_chunk(self.sent_whatsapp_ids[0])
+        self.last_chunk_ms = elapsed_ms
+
+    def _raise_if_failed(self) -> None:
+        if self._error:
+            raise self._error
+
+    def _publish_metrics(self) -> None:
+        logger.info(
+            "Streamed response",
+            chunks=self._chunks,
+            first_chunk_ms=self.first_chunk_ms,
+            last_chunk_ms=self.last_chunk_ms,
+        )
+        if not self._chunks:
+            return
+        metrics.add_metric(
+            name="StreamedChunks", unit=MetricUnit.Count, value=self._chunks
+        )
+        metrics.add_metric(
+            name="TimeToFirstChunk",
+            unit=MetricUnit.Milliseconds,
+            value=self.first_chunk_ms,
+        )
+        metrics.add_metric(
+            name="TimeToLastChunk",
+            unit=MetricUnit.Milliseconds,
+            value=self.last_chunk_ms,
+        )
@@ -1,14 +1,19 @@
 # Built-in imports
-from datetime import datetime
+import os
+from datetime import datetime, timezone
 
 # Own imports
 from state_machine.base_step_function import BaseStepFunction
 from state_machine.integrations.meta.api_requests import MetaAPI
+from common.helpers.dynamodb_helper import DynamoDBHelper
 from common.logger import custom_logger
 
 
 logger = custom_logger()
 
+# Messages are marked as answered in their item (see "mark_answered")
+dynamodb_helper = DynamoDBHelper(os.environ.get("DYNAMODB_TABLE"))
+
 
 class SendMessage(BaseStepFunction):
     """
@@ -25,22 +30,17 @@ class SendMessage(BaseStepFunction):
 
         self.logger.info("Starting send_message for the chatbot")
 
+        # The response was streamed to the user already (see "ProcessText")
+        if self.event.get("response_sent"):
+            self.logger.info("Response already sent, skipping the POST request")
+            self.mark_answered(self.event.get("answer_whatsapp_id", "UNKNOWN"))
+            self.event["send_message_response_status_code"] = 200
+            return self.event
+
         # Load response details from the event
         text_message = self.event.get("response_message", "DEFAULT_RESPONSE_MESSAGE")
-        phone_number = (
-            self.event.get("input", {})
-            .get("dynamodb", {})
-            .get("NewImage", {})
-            .get("from_number", {})
-            .get("S")
-        )
-        original_message_id = (
-            self.event.get("input", {})
-            .get("dynamodb", {})
-            .get("NewImage", {})
-            .get("whatsapp_id", {})
-            .get("S")
-        )
+        phone_number = self.message.from_number
+        original_message_id = self.message.whatsapp_id
 
         # Initialize the Meta API
         meta_api = MetaAPI(logger=self.logger)
@@ -62,5 +62,33 @@ class SendMessage(BaseStepFunction):
             )
             raise Exception("Error in POST WhatsApp Message Meta API Response")
 
+        self.mark_answered(response.get("messages", [{}])[0].get("id", "UNKNOWN"))
+
         self.event["send_message_response_status_code"] = 200
         return self.event
+
+    def mark_answered(self, answer_whatsapp_id: str) -> None:
+        """
+        Method to mark the message item as answered (with all the messages merged
+        in it), so that it is not answered twice when a later step fails and the
+        failure is replayed, or when the stream re-delivers the records.
+        :param answer_whatsapp_id (str): WhatsApp ID of the (last) reply.
+        """
+        if not self.message.PK or not self.message.SK:
+            return
+        answered_at = datetime.now(timezone.utc).isoformat()
+        for sort_key in self.message.coalesced_sks or [self.message.SK]:
+            try:
+                dynamodb_helper.update_item_attributes(
+                    self.message.PK,
+                    sort_key,
+                    {
+                        "answered_at": answered_at,
+                        "answer_whatsapp_id": answer_whatsapp_id,
+                    },
+                )
+            except Exception as error:
+                # The reply was sent already, so the step does not fail
+                self.logger.warning(
+                    f"Could not mark the message {sort_key} as answered: {error}"
+                )
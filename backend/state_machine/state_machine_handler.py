@@ -3,7 +3,8 @@ from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
 # Own imports
-from state_machine.__init__ import *  # noqa NOSONAR
+from state_machine import step_registry
+from common.metrics import custom_metrics
 
 
 logger = Logger(
@@ -11,8 +12,10 @@ logger = Logger(
     log_uncaught_exceptions=True,
     owner="Santiago Garcia Arango",
 )
+metrics = custom_metrics()
 
 
+@metrics.log_metrics
 @logger.inject_lambda_context(log_event=True)
 def lambda_handler(event: dict, context: LambdaContext):
     main_event = {}
@@ -26,15 +29,9 @@ def lambda_handler(event: dict, context: LambdaContext):
         logger.info(main_event)
 
         if class_name is not None and method_name is not None:
-            # Dynamically load and initialize the target class at runtime
-            target_class = globals()[class_name]
-            target_instance = target_class(main_event)
-            logger.debug(f"dynamically loaded target_instance: {target_instance}")
-
-            # Dynamically load and execute the method at runtime
-            target_method = getattr(target_instance, method_name)
-            logger.debug(f"dynamically loaded target_method: {target_method}")
-            return target_method()
+            # Load the step on first use (cached for the warm invocations)
+            step_handler = step_registry.get_handler(class_name, method_name)
+            return step_handler(main_event)
         else:
             message = "class_name and method_name are not provided in event params"
             logger.info(message)
@@ -0,0 +1,59 @@
+# Built-in imports
+import importlib
+from typing import Callable
+
+# Own imports
+from common.logger import custom_logger
+
+
+logger = custom_logger()
+
+# Steps that can be dispatched by the State Machine ("params" of the LambdaInvoke
+# tasks), with the module of their class. The modules are only imported when a
+# step is first dispatched, so a cold start only pays for the imports (and
+# clients) of the step that is running
+STEP_MODULES = {
+    ("ValidateMessage", "validate_input"): "state_machine.utils.validate_message",
+    ("ProcessText", "process_text"): "state_machine.processing.process_text",
+    ("ProcessMedia", "process_media"): "state_machine.processing.process_media",
+    ("ProcessVoice", "process_voice"): "state_machine.processing.process_voice",
+    ("SendMessage", "send_message"): "state_machine.processing.send_message",
+    ("Success", "process_success"): "state_machine.utils.success",
+    ("Failure", "process_failure"): "state_machine.utils.failure",
+    ("PipelineRunner", "run"): "state_machine.pipeline_runner",
+}
+
+# Handlers already resolved in this execution environment (warm invocations)
+_handlers: dict[tuple[str, str], Callable[[dict], dict]] = {}
+
+
+def get_step_class(class_name: str, method_name: str) -> type:
+    """
+    Function to import (on first use) and return the class of a step.
+    :param class_name (str): Name of the step class (e.g. "ProcessText").
+    :param method_name (str): Name of the step method (e.g. "process_text").
+    """
+    module_path = STEP_MODULES.get((class_name, method_name))
+    if module_path is None:
+        raise ValueError(f"Step <{class_name}.{method_name}> is not registered")
+    return getattr(importlib.import_module(module_path), class_name)
+
+
+def get_handler(class_name: str, method_name: str) -> Callable[[dict], dict]:
+    """
+    Function to get the handler of a step, which runs the step method for an
+    event. The step instances are bound to their event, so the handlers (with
+    the class already imported) are the ones cached across warm invocations.
+    :param class_name (str): Name of the step class (e.g. "ProcessText").
+    :param method_name (str): Name of the step method (e.g. "process_text").
+    """
+    handler = _handlers.get((class_name, method_name))
+    if handler is None:
+        step_class = get_step_class(class_name, method_name)
+
+        def handler(event: dict) -> dict:
+            return getattr(step_class(event), method_name)()
+
+        _handlers[(class_name, method_name)] = handler
+        logger.debug(f"Loaded step handler {class_name}.{method_name}")
+    return handler
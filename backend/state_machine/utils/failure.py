@@ -1,9 +1,23 @@
+# Built-in imports
+import json
+import os
+
+# External imports
+from aws_lambda_powertools.metrics import MetricUnit
+
 # Own imports
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.failure_helper import FailureStore
 from common.logger import custom_logger
+from common.metrics import custom_metrics
 from state_machine.base_step_function import BaseStepFunction
 
 
 logger = custom_logger()
+metrics = custom_metrics()
+
+# Failed messages are saved for the replays (see "scripts/replay_failures.py")
+failure_store = FailureStore(DynamoDBHelper(os.environ.get("DYNAMODB_TABLE")))
 
 
 class Failure(BaseStepFunction):
@@ -21,11 +35,38 @@ class Failure(BaseStepFunction):
         """
         self.logger.info("Failure during execution of the event")
 
-        error_message = self.event.get("error_message", "No error message provided")
-        self.logger.info(f"Error message: {error_message}")
+        # Error caught by the State Machine ("Catch" with "ResultPath": "$.error")
+        error = self.event.get("error", {})
+        error_class = error.get("Error", "UnknownError")
+        error_message = _error_message(error)
+        step = self.event.get("failed_step", "Unknown")
+        self.logger.info(f"Error in step {step} ({error_class}): {error_message}")
 
-        # TODO: Add additional failure processing here
+        try:
+            message = self.message.to_event() if self.message else {}
+            failure_store.save(
+                message,
+                self.event.get("execution_name", "UNKNOWN"),
+                step,
+                error_class,
+                error_message,
+            )
+        except Exception:
+            # The conversation is released anyway, so it does not stay blocked
+            self.logger.exception("Could not save the failed message")
+
+        metrics.add_metric(name="FailedMessages", unit=MetricUnit.Count, value=1)
 
         self.event.update({"success": False})
+        self.release_conversation()
 
         return self.event
+
+
+def _error_message(error: dict) -> str:
+    # The "Cause" of the Lambda errors is a JSON with the "errorMessage"
+    cause = error.get("Cause", "No error message provided")
+    try:
+        return json.loads(cause).get("errorMessage", cause)
+    except (ValueError, AttributeError):
+        return cause
@@ -24,5 +24,6 @@ class Success(BaseStepFunction):
         # TODO: Add additional success processing here
 
         self.event.update({"success": True})
+        self.release_conversation()
 
         return self.event
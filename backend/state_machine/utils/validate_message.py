@@ -2,6 +2,7 @@
 from state_machine.base_step_function import BaseStepFunction
 from common.enums import WhatsAppMessageTypes
 from common.logger import custom_logger
+from common.models.message_envelope_model import MessageEnvelopeModel
 
 
 logger = custom_logger()
@@ -23,17 +24,9 @@ class ValidateMessage(BaseStepFunction):
 
         self.logger.info("Starting validate_input JSON body validation")
 
-        # TODO: Add a more complex validation here (Python schema, etc.)
-
-        # Obtain message_type from the DynamoDB Stream event
-        # TODO: add abstraction and validation
-        self.message_type = (
-            self.event.get("input", {})
-            .get("dynamodb", {})
-            .get("NewImage", {})
-            .get("type", {})
-            .get("S", "NOT_FOUND_MESSAGE_TYPE")
-        )
+        # Raise the reason why the message envelope could not be loaded
+        self.message = self.message or MessageEnvelopeModel.from_event(self.event)
+        self.message_type = self.message.type or "NOT_FOUND_MESSAGE_TYPE"
 
         if self.message_type not in ALLOWED_MESSAGE_TYPES:
             logger.error(f"Message type {self.message_type} not allowed")
@@ -44,7 +37,10 @@ class ValidateMessage(BaseStepFunction):
         self.logger.info("Validation finished successfully")
 
         # Add relevant data fields for traceability in the next State Machine steps
-        self.event["correlation_id"] = self.correlation_id
+        # (the legacy DynamoDB record is replaced by its message envelope)
+        self.message.correlation_id = self.correlation_id
+        self.event.pop("input", None)
+        self.event["message"] = self.message.to_event()
         self.event["message_type"] = self.message_type
 
         return self.event
@@ -0,0 +1,88 @@
+# Built-in imports
+import copy
+import os
+
+# External imports
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import (
+    DynamoDBRecord,
+)
+
+# Own imports
+from common.enums import WhatsAppMessageTypes
+
+
+# People type in bursts, so the text messages of the same number that arrive in
+# the same stream batch (see the batching window of the event source mapping)
+# are merged into a single agent turn
+COALESCE_MESSAGES = os.environ.get("COALESCE_MESSAGES", "true").lower() == "true"
+COALESCE_MAX_MESSAGES = int(os.environ.get("COALESCE_MAX_MESSAGES", "10"))
+COALESCE_SEPARATOR = "\n"
+
+
+def _new_image(record: DynamoDBRecord) -> dict:
+    return record.raw_event["dynamodb"]["NewImage"]
+
+
+def _is_text_message(record: DynamoDBRecord) -> bool:
+    return _new_image(record).get("type", {}).get("S") == (
+        WhatsAppMessageTypes.TEXT.value
+    )
+
+
+def group_records(
+    records: list[DynamoDBRecord],
+    max_messages: int = COALESCE_MAX_MESSAGES,
+) -> list[list[DynamoDBRecord]]:
+    """
+    Function to group the consecutive text messages of every number, keeping the
+    order of the stream. Other types of messages (media) are never merged.
+    :param records (list[DynamoDBRecord]): New message records of the batch.
+    :param max_messages (int): Maximum number of messages merged in one group.
+    """
+    groups = []
+    open_groups = {}  # Last group of text messages per number
+    for record in records:
+        from_number = _new_image(record).get("from_number", {}).get("S")
+        group = open_groups.get(from_number)
+        if not _is_text_message(record):
+            groups.append([record])
+            open_groups.pop(from_number, None)
+        elif group is not None and len(group) < max_messages:
+            group.append(record)
+        else:
+            group = [record]
+            groups.append(group)
+            open_groups[from_number] = group
+    return groups
+
+
+def merge_records(records: list[DynamoDBRecord]) -> DynamoDBRecord:
+    """
+    Function to merge a group of text message records into a single record. The
+    last message is kept (the reply goes to it), with the texts of all of them
+    and the references to the merged messages in "coalesced_*" attributes.
+    :param records (list[DynamoDBRecord]): Text message records of the same number.
+    """
+    if len(records) == 1:
+        return records[0]
+
+    raw_event = copy.deepcopy(records[-1].raw_event)
+    new_image = raw_event["dynamodb"]["NewImage"]
+    new_image["text"] = {
+        "S": COALESCE_SEPARATOR.join(
+            _new_image(record).get("text", {}).get("S", "") for record in records
+        )
+    }
+    new_image["coalesced_count"] = {"N": str(len(records))}
+    new_image["coalesced_whatsapp_ids"] = {
+        "L": [
+            {"S": _new_image(record).get("whatsapp_id", {}).get("S", "")}
+            for record in records
+        ]
+    }
+    new_image["coalesced_sks"] = {
+        "L": [
+            {"S": _new_image(record).get("SK", {}).get("S", "")} for record in records
+        ]
+    }
+    return DynamoDBRecord(raw_event)
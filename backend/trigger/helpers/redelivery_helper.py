@@ -0,0 +1,60 @@
+# Built-in imports
+import os
+
+# External imports
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import (
+    DynamoDBRecord,
+)
+
+# Own imports
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.logger import custom_logger
+
+logger = custom_logger()
+
+# With "batchItemFailures", the stream checkpoints at the lowest failed record
+# and re-delivers every record after it (also the ones that succeeded), so the
+# messages that were answered already are skipped
+SKIP_ANSWERED_MESSAGES = (
+    os.environ.get("SKIP_ANSWERED_MESSAGES", "true").lower() == "true"
+)
+
+dynamodb_helper = DynamoDBHelper(os.environ.get("DYNAMODB_TABLE"))
+
+
+def _message_key(record: DynamoDBRecord) -> tuple[str, str]:
+    new_image = record.dynamodb.new_image
+    return new_image.get("PK", ""), new_image.get("SK", "")
+
+
+def split_answered_records(
+    records: list[DynamoDBRecord],
+) -> tuple[list[DynamoDBRecord], list[DynamoDBRecord]]:
+    """
+    Function to split the new message records in the ones to process and the
+    ones whose message was answered already (re-delivered records), with a
+    single BatchGetItem per batch. If the items can not be read, all the
+    records are processed (the sequencer still skips the finished executions).
+    :param records (list(DynamoDBRecord)): New message records.
+    """
+    if not records:
+        return records, []
+
+    try:
+        items = dynamodb_helper.get_items(
+            [_message_key(record) for record in records], "PK, SK, answered_at"
+        )
+    except Exception as error:
+        logger.warning(f"Could not check the answered messages: {error}")
+        return records, []
+
+    answered_keys = {
+        (item["PK"], item["SK"]) for item in items if "answered_at" in item
+    }
+    pending, answered = [], []
+    for record in records:
+        if _message_key(record) in answered_keys:
+            answered.append(record)
+        else:
+            pending.append(record)
+    return pending, answered
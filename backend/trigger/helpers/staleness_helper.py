@@ -0,0 +1,142 @@
+# Built-in imports
+import copy
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+# External imports
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import (
+    DynamoDBRecord,
+)
+
+# Own imports
+from common.enums import DDBPrefixes, StaleMessagePolicies, WhatsAppMessageTypes
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.logger import custom_logger
+from trigger.helpers.coalescing_helper import COALESCE_SEPARATOR
+
+logger = custom_logger()
+
+
+# The stream starts at TRIM_HORIZON, so after an outage the whole backlog is
+# replayed: the messages older than the max age are skipped, or folded into a
+# single "catching up" reply per number (instead of one late answer each)
+STALE_MESSAGE_POLICY = StaleMessagePolicies(
+    os.environ.get("STALE_MESSAGE_POLICY", StaleMessagePolicies.FOLD.value).lower()
+)
+STALE_MESSAGE_MAX_AGE_SECONDS = int(
+    os.environ.get("STALE_MESSAGE_MAX_AGE_SECONDS", "900")
+)
+# A backlog spans many batches, so a number gets at most one "catching up"
+# reply per interval (the rest of its stale messages are skipped)
+CATCHING_UP_INTERVAL_SECONDS = int(
+    os.environ.get("CATCHING_UP_INTERVAL_SECONDS", "3600")
+)
+TTL_ATTRIBUTE = "ttl"
+
+dynamodb_helper = DynamoDBHelper(os.environ.get("DYNAMODB_TABLE"))
+
+
+def _new_image(record: DynamoDBRecord) -> dict:
+    return record.raw_event["dynamodb"]["NewImage"]
+
+
+def message_age_seconds(
+    record: DynamoDBRecord, now: Optional[float] = None
+) -> Optional[float]:
+    """
+    Function to get the age of a message, based on the time it was sent by the
+    user ("whatsapp_timestamp") or, if missing, when it was received ("created_at").
+    Returns None when the message has no valid timestamps.
+    :param record (DynamoDBRecord): New message record.
+    :param now (Optional(float)): Current epoch time. Defaults to "time.time()".
+    """
+    now = time.time() if now is None else now
+    new_image = _new_image(record)
+    whatsapp_timestamp = new_image.get("whatsapp_timestamp", {}).get("S")
+    created_at = new_image.get("created_at", {}).get("S")
+    try:
+        if whatsapp_timestamp:
+            return now - int(whatsapp_timestamp)
+        if created_at:
+            return now - datetime.fromisoformat(created_at).timestamp()
+    except ValueError:
+        pass
+    return None
+
+
+def split_stale_records(
+    records: list[DynamoDBRecord],
+    max_age_seconds: int = STALE_MESSAGE_MAX_AGE_SECONDS,
+    now: Optional[float] = None,
+) -> tuple[list[DynamoDBRecord], list[DynamoDBRecord]]:
+    """
+    Function to split the records in fresh and stale ones, keeping their order.
+    :param records (list[DynamoDBRecord]): New message records of the batch.
+    :param max_age_seconds (int): Maximum age of a fresh message.
+    :param now (Optional(float)): Current epoch time. Defaults to "time.time()".
+    """
+    now = time.time() if now is None else now
+    fresh, stale = [], []
+    for record in records:
+        age = message_age_seconds(record, now)
+        (stale if age is not None and age > max_age_seconds else fresh).append(record)
+    return fresh, stale
+
+
+def fold_records(records: list[DynamoDBRecord]) -> DynamoDBRecord:
+    """
+    Function to fold the stale messages of a number into a single text record
+    marked as "catching_up", which gets one reply without calling the agent.
+    The last message is kept (the reply goes to it), as in "merge_records".
+    :param records (list[DynamoDBRecord]): Stale message records of the same number.
+    """
+    raw_event = copy.deepcopy(records[-1].raw_event)
+    new_image = raw_event["dynamodb"]["NewImage"]
+    new_image["type"] = {"S": WhatsAppMessageTypes.TEXT.value}
+    new_image["text"] = {
+        "S": COALESCE_SEPARATOR.join(
+            _new_image(record).get("text", {}).get("S")
+            or f"[{_new_image(record).get('type', {}).get('S', 'unknown')}]"
+            for record in records
+        )
+    }
+    new_image["catching_up"] = {"BOOL": True}
+    new_image["coalesced_count"] = {"N": str(len(records))}
+    new_image["coalesced_whatsapp_ids"] = {
+        "L": [
+            {"S": _new_image(record).get("whatsapp_id", {}).get("S", "")}
+            for record in records
+        ]
+    }
+    new_image["coalesced_sks"] = {
+        "L": [
+            {"S": _new_image(record).get("SK", {}).get("S", "")} for record in records
+        ]
+    }
+    return DynamoDBRecord(raw_event)
+
+
+def claim_catching_up_reply(
+    from_number: str, interval_seconds: int = CATCHING_UP_INTERVAL_SECONDS
+) -> bool:
+    """
+    Function to register the "catching up" reply of a number with a conditional
+    write (item with TTL). Returns False if it already got one in the interval.
+    If the claim fails, the reply is sent anyway (a late reply is better than none).
+    :param from_number (str): Phone number of the conversation.
+    :param interval_seconds (int): Minimum seconds between "catching up" replies.
+    """
+    try:
+        return dynamodb_helper.put_item_if_not_exists(
+            {
+                "PK": f"{DDBPrefixes.PK_NUMBER.value}{from_number}",
+                "SK": DDBPrefixes.SK_CATCHING_UP.value,
+                TTL_ATTRIBUTE: int(time.time()) + interval_seconds,
+            },
+            ttl_attribute=TTL_ATTRIBUTE,
+        )
+    except Exception as error:
+        logger.warning(f"Could not claim the catching up reply: {error}")
+        return True
@@ -1,8 +1,6 @@
 # Built-in imports
-import time
 import os
 import json
-import boto3
 
 # External imports
 from aws_lambda_powertools import Logger
@@ -11,23 +9,43 @@ from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import
 )
 
 # Own imports
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.execution_helper import start_execution
+from common.helpers.sequencer_helper import (
+    ConversationSequencer,
+    build_execution_name,
+)
 from common.logger import custom_logger
+from common.models.message_envelope_model import MessageEnvelopeModel
 
 LOGGER = custom_logger()
 
-step_function_client = boto3.client("stepfunctions")
+# Executions started concurrently by the trigger (one connection per worker)
+MAX_WORKERS = int(os.environ.get("TRIGGER_MAX_WORKERS", "10"))
+
+# Process the messages of every conversation in order, one at a time
+SEQUENCE_CONVERSATIONS = (
+    os.environ.get("SEQUENCE_CONVERSATIONS", "true").lower() == "true"
+)
+
+sequencer = ConversationSequencer(
+    DynamoDBHelper(os.environ.get("DYNAMODB_TABLE"), max_pool_connections=MAX_WORKERS),
+    start_execution,
+)
 
 
-def trigger_sm(record: DynamoDBRecord, logger: Logger = None) -> str:
+def trigger_sm(record: DynamoDBRecord, logger: Logger = None) -> int:
     """
-    Handler for triggering the Step Function's execution.
+    Handler for triggering the Step Function's execution. When the conversations
+    are sequenced, the execution is queued and only starts once the previous
+    message of the same number finished processing.
 
     Args:
         record (DynamoDBRecord): Event from from DynamoDB Stream Record.
         logger (Logger, optional): Logger object. Defaults to None.
 
     Returns:
-        None
+        int: Queue depth of the conversation (including the in-flight execution).
     """
     try:
         logger = logger or LOGGER
@@ -40,24 +58,35 @@ def trigger_sm(record: DynamoDBRecord, logger: Logger = None) -> str:
         log_message["RECORD"] = record.raw_event
 
         # Extract the necessary information from the DynamoDB Stream Record for Execution Name
-        from_message = record.dynamodb.new_image.get("from_number", "NOT_FOUND")
-        correlation_id = record.dynamodb.new_image.get("correlation_id", "NOT_FOUND")
-        exec_name = f"{time.strftime('%Y%m%dT%H%M%S')}_{from_message}_{correlation_id}"
+        new_image = record.dynamodb.new_image
+        from_message = new_image.get("from_number", "NOT_FOUND")
+        correlation_id = new_image.get("correlation_id", "NOT_FOUND")
+        exec_name = build_execution_name(
+            from_message, new_image.get("SK", ""), correlation_id
+        )
 
-        logger.append_keys(correlation_id=correlation_id)
+        # The records of a batch run in parallel threads, so the correlation_id
+        # goes in the log message instead of the (shared) logger keys
+        log_message["CORRELATION_ID"] = correlation_id
+        log_message["EXECUTION_NAME"] = exec_name
         logger.debug(log_message)
 
-        # Generate state machine input event with the same DynamoDBRecord dict
-        state_machine_input = {"input": record.raw_event}
+        # Generate state machine input event with only the fields of the message
+        # that the steps need (instead of the whole DynamoDBRecord dict)
+        state_machine_input = {
+            "message": MessageEnvelopeModel.from_new_image(new_image).to_event(),
+            "execution_name": exec_name,
+        }
 
         logger.debug(state_machine_input, message_details="State Machine Input")
 
-        response = step_function_client.start_execution(
-            stateMachineArn=state_machine_arn,
-            input=json.dumps(state_machine_input),
-            name=exec_name,
-        )
-        return response.get("executionArn")
+        if SEQUENCE_CONVERSATIONS:
+            # The last step of the execution releases the conversation
+            state_machine_input["sequenced"] = True
+            return sequencer.submit(from_message, exec_name, state_machine_input)
+
+        start_execution(exec_name, json.dumps(state_machine_input))
+        return 1
     except Exception as err:
         log_message["EXCEPTION"] = str(err)
         logger.error(str(log_message))
@@ -0,0 +1,45 @@
+################################################################################
+# Lambda Function that recovers the conversations of the dead executions
+################################################################################
+
+# Built-in imports
+import os
+
+# External imports
+from aws_lambda_powertools.metrics import MetricUnit
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Own imports
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.execution_helper import start_execution
+from common.helpers.sequencer_helper import ConversationSequencer
+from common.logger import custom_logger
+from common.metrics import custom_metrics
+
+logger = custom_logger()
+metrics = custom_metrics()
+
+sequencer = ConversationSequencer(
+    DynamoDBHelper(os.environ.get("DYNAMODB_TABLE")), start_execution
+)
+
+
+@metrics.log_metrics
+@logger.inject_lambda_context(log_event=True)
+def lambda_handler(event: dict, context: LambdaContext):
+    """
+    Runs on a schedule to start the queued executions of the conversations
+    whose lease expired. An execution that never reaches "Process Success" or
+    "Process Failure" (e.g. a timeout or a crashed Lambda) does not release its
+    conversation, and otherwise only the next message of the same number would
+    take it over.
+    """
+    started_names = sequencer.recover_expired_leases()
+    if started_names:
+        metrics.add_metric(
+            name="ConversationsRecovered",
+            unit=MetricUnit.Count,
+            value=len(started_names),
+        )
+    logger.info(f"Recovered {len(started_names)} conversations")
+    return {"started_executions": started_names}
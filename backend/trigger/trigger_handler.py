@@ -2,42 +2,198 @@
 # Lambda Function that triggers receives the event and triggers the State Machine
 ################################################################################
 
+# Built-in imports
+from concurrent.futures import ThreadPoolExecutor
+
 # External imports
-from aws_lambda_powertools import Logger
+from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.typing import LambdaContext
 from aws_lambda_powertools.utilities.data_classes import event_source
 from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import (
     DynamoDBStreamEvent,
     DynamoDBRecord,
+    DynamoDBRecordEventName,
 )
 
 # Own imports
+from common.enums import StaleMessagePolicies
 from common.logger import custom_logger
-from trigger.helpers.step_functions_helper import trigger_sm  # noqa
+from common.metrics import custom_metrics
+from trigger.helpers.coalescing_helper import (
+    COALESCE_MESSAGES,
+    group_records,
+    merge_records,
+)
+from trigger.helpers.redelivery_helper import (
+    SKIP_ANSWERED_MESSAGES,
+    split_answered_records,
+)
+from trigger.helpers.staleness_helper import (
+    STALE_MESSAGE_POLICY,
+    claim_catching_up_reply,
+    fold_records,
+    split_stale_records,
+)
+from trigger.helpers.step_functions_helper import MAX_WORKERS, trigger_sm  # noqa
 
 logger = custom_logger()
+metrics = custom_metrics()
+
+# Bounded pool to start the executions of a batch concurrently (it is reused by
+# the warm invocations and matches the Step Functions client's pool size)
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="trigger")
+
 
+def is_new_message_record(record: DynamoDBRecord) -> bool:
+    """
+    Only new messages must start the State Machine, so the rest of the items in
+    the table (dedupe items, TTL deletions, etc) are skipped. The same rule is
+    configured as a filter in the event source mapping.
+    """
+    new_image = record.dynamodb.new_image or {}
+    return record.event_name == DynamoDBRecordEventName.INSERT and str(
+        new_image.get("SK", "")
+    ).startswith("MESSAGE#")
 
-def send_message_to_step_function(record: DynamoDBRecord) -> None:
-    logger.append_keys(event_id=record.event_id)
-    execution_id = trigger_sm(record)
-    logger.info(f"State Machine execution_id: {execution_id}")
 
+def send_message_to_step_function(record: DynamoDBRecord) -> int:
+    queue_depth = trigger_sm(record)
+    logger.info(
+        f"State Machine execution submitted (queue depth: {queue_depth})",
+        event_id=record.event_id,
+    )
+    return queue_depth
 
+
+def send_conversation_to_step_function(
+    submissions: list[tuple[list[DynamoDBRecord], DynamoDBRecord]],
+) -> tuple[list[int], list[DynamoDBRecord]]:
+    """
+    Submits the executions of one conversation in order, given as pairs of the
+    original records and the (merged or folded) record to submit. After a
+    failure the next ones are not submitted (to keep the order), and all their
+    records are returned as failed, next to the queue depths of the submitted ones.
+    """
+    queue_depths = []
+    for position, (group, record) in enumerate(submissions):
+        try:
+            queue_depths.append(send_message_to_step_function(record))
+        except Exception as e:
+            logger.exception(
+                f"Error while triggering the State Machine for record: {e}",
+                event_id=record.event_id,
+            )
+            failed_submissions = submissions[position:]
+            return queue_depths, [r for g, _ in failed_submissions for r in g]
+    return queue_depths, []
+
+
+@metrics.log_metrics
 @logger.inject_lambda_context(log_event=True)
 @event_source(data_class=DynamoDBStreamEvent)
 def lambda_handler(event: DynamoDBStreamEvent, context: LambdaContext):
+    """
+    Submits one State Machine execution per new message of the batch (or per
+    group of coalesced messages). The conversations run in parallel, and the
+    messages of each one in order. Stale messages (e.g. a backlog replayed after
+    an outage) are skipped or folded per number, depending on the policy. The
+    failed records are reported as "batchItemFailures": the stream checkpoints at
+    the lowest of them and re-delivers every record after it (also the ones that
+    succeeded), so the answered messages are skipped, and the sequencer skips
+    the executions that were submitted already.
+    """
     logger.info("Starting message processing from DynamoDB Stream")
-    try:
-        for record in event.records:
-            correlation_id = record.dynamodb.new_image.get("correlation_id")
-            logger.append_keys(correlation_id=correlation_id)
-            logger.debug(record.raw_event, message_details="DynamoDB Stream Record")
-            send_message_to_step_function(record)
-
-        logger.info("Finished message processing")
-    except Exception as e:
-        logger.exception(
-            f"Wrong input event, does not match DynamoDBRecord schema: {e}"
+
+    records = []
+    for record in event.records:
+        if not is_new_message_record(record):
+            logger.debug(f"Skipping record {record.event_id} (not a new message)")
+            continue
+
+        logger.debug(record.raw_event, message_details="DynamoDB Stream Record")
+        records.append(record)
+
+    answered_records = []
+    if SKIP_ANSWERED_MESSAGES:
+        records, answered_records = split_answered_records(records)
+        if answered_records:
+            logger.info(f"Skipping {len(answered_records)} answered messages")
+            metrics.add_metric(
+                name="AnsweredMessagesSkipped",
+                unit=MetricUnit.Count,
+                value=len(answered_records),
+            )
+
+    stale_records = []
+    if STALE_MESSAGE_POLICY != StaleMessagePolicies.OFF:
+        records, stale_records = split_stale_records(records)
+
+    conversations = {}  # Submissions (records, record to submit) per number
+    skipped_records = stale_records
+    if stale_records and STALE_MESSAGE_POLICY == StaleMessagePolicies.FOLD:
+        stale_conversations = {}
+        for record in stale_records:
+            from_number = record.dynamodb.new_image.get("from_number")
+            stale_conversations.setdefault(from_number, []).append(record)
+        claims = executor.map(claim_catching_up_reply, stale_conversations)
+        skipped_records = []
+        for (from_number, stale_group), claimed in zip(
+            stale_conversations.items(), claims
+        ):
+            if claimed:
+                conversations[from_number] = [(stale_group, fold_records(stale_group))]
+            else:
+                skipped_records.extend(stale_group)
+        folded = len(stale_records) - len(skipped_records)
+        if folded:
+            metrics.add_metric(
+                name="StaleMessagesFolded", unit=MetricUnit.Count, value=folded
+            )
+    if skipped_records:
+        metrics.add_metric(
+            name="StaleMessagesSkipped",
+            unit=MetricUnit.Count,
+            value=len(skipped_records),
         )
-        raise e
+    if stale_records:
+        logger.info(
+            f"Found {len(stale_records)} stale messages "
+            f"(policy: {STALE_MESSAGE_POLICY.value}, skipped: {len(skipped_records)})"
+        )
+
+    groups = group_records(records) if COALESCE_MESSAGES else [[r] for r in records]
+    for group in groups:
+        from_number = group[-1].dynamodb.new_image.get("from_number")
+        conversations.setdefault(from_number, []).append((group, merge_records(group)))
+
+    futures = [
+        executor.submit(send_conversation_to_step_function, submissions)
+        for submissions in conversations.values()
+    ]
+
+    batch_item_failures = []
+    for future in futures:
+        queue_depths, failed_records = future.result()
+        for queue_depth in queue_depths:
+            metrics.add_metric(
+                name="ConversationQueueDepth", unit=MetricUnit.Count, value=queue_depth
+            )
+        batch_item_failures.extend(
+            {"itemIdentifier": record.dynamodb.sequence_number}
+            for record in failed_records
+        )
+
+    if len(groups) < len(records):
+        metrics.add_metric(
+            name="MessagesCoalesced",
+            unit=MetricUnit.Count,
+            value=len(records) - len(groups),
+        )
+
+    executions = sum(len(submissions) for submissions in conversations.values())
+    logger.info(
+        f"Finished message processing: "
+        f"{len(records) + len(stale_records) + len(answered_records)} records, "
+        f"{executions} executions, {len(batch_item_failures)} failed"
+    )
+    return {"batchItemFailures": batch_item_failures}
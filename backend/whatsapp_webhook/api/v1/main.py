@@ -10,24 +10,32 @@ from mangum import Mangum
 from fastapi import FastAPI
 
 # Own imports
+from common.metrics import custom_metrics
 from whatsapp_webhook.api.v1.routers import webhook
 
 # Environment used to dynamically load the FastAPI docs with stages
 ENVIRONMENT = os.environ.get("ENVIRONMENT")
 API_PREFIX = "/api/v1"
 
+# The docs routes are only mounted when enabled (not needed to serve Meta)
+ENABLE_DOCS = os.environ.get("ENABLE_DOCS", "true").lower() == "true"
+
 
 app = FastAPI(
     title="WhatsApp Chatbot API",
     description="Custom built API by Santi to interact with the WhatsApp Chatbot",
     version="v1",
     root_path=f"/{ENVIRONMENT}" if ENVIRONMENT else None,
-    docs_url="/api/v1/docs",
-    openapi_url="/api/v1/docs/openapi.json",
+    docs_url=f"{API_PREFIX}/docs" if ENABLE_DOCS else None,
+    openapi_url=f"{API_PREFIX}/docs/openapi.json" if ENABLE_DOCS else None,
+    redoc_url="/redoc" if ENABLE_DOCS else None,
 )
 
 
 app.include_router(webhook.router, prefix=API_PREFIX)
 
-# This is the Lambda Function's entrypoint (handler)
-handler = Mangum(app)
+# This is the Lambda Function's entrypoint (handler), with the metrics flushed
+# at the end of each invocation. The app has no startup/shutdown events, so the
+# ASGI lifespan (otherwise run on every invocation) is disabled
+metrics = custom_metrics()
+handler = metrics.log_metrics(Mangum(app, lifespan="off"))
@@ -1,17 +1,38 @@
 # Built-in imports
 import os
-from datetime import datetime, timezone
-from typing import Annotated
+from typing import Annotated, Optional
 from uuid import uuid4
 
 # External imports
+from aws_lambda_powertools.metrics import MetricUnit
 from fastapi import APIRouter, Header, Query, Request, Response, status
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 
 # Own imports
-from common.models.text_message_model import TextMessageModel
 from common.logger import custom_logger
+from common.metrics import custom_metrics
 from common.helpers.dynamodb_helper import DynamoDBHelper
 from common.helpers.secrets_helper import SecretsHelper
+from whatsapp_webhook.api.v1.schemas import WebhookPayloadModel
+from whatsapp_webhook.helpers.async_helper import MAX_WORKERS, run_blocking
+from whatsapp_webhook.helpers.dedupe_helper import MessageDeduplicator
+from whatsapp_webhook.helpers.messages_helper import (
+    DeliveryTypes,
+    classify_delivery,
+    ingest_messages,
+)
+from whatsapp_webhook.helpers.signature_helper import is_valid_signature
+from whatsapp_webhook.helpers.statuses_helper import ingest_statuses
+
+# Webhook deliveries from Meta are a few KBs, so bigger bodies are rejected
+# before being verified or parsed
+MAX_BODY_BYTES = int(os.environ.get("WEBHOOK_MAX_BODY_BYTES", 256 * 1024))
+
+# Verify the "X-Hub-Signature-256" header of Meta with the App Secret
+VALIDATE_META_SIGNATURE = (
+    os.environ.get("VALIDATE_META_SIGNATURE", "true").lower() == "true"
+)
 
 # Initialize Secrets Manager Helper
 SECRET_NAME = os.environ["SECRET_NAME"]
@@ -20,11 +41,19 @@ secrets_helper = SecretsHelper(SECRET_NAME)
 # Initialize DynamoDB Helper
 DYNAMODB_TABLE = os.environ["DYNAMODB_TABLE"]
 ENDPOINT_URL = os.environ.get("ENDPOINT_URL")  # Used for local testing
-dynamodb_helper = DynamoDBHelper(table_name=DYNAMODB_TABLE, endpoint_url=ENDPOINT_URL)
+dynamodb_helper = DynamoDBHelper(
+    table_name=DYNAMODB_TABLE,
+    endpoint_url=ENDPOINT_URL,
+    max_pool_connections=MAX_WORKERS,
+)
+
+# Initialize the Deduplicator for Meta's redeliveries (based on WhatsApp IDs)
+message_deduplicator = MessageDeduplicator(dynamodb_helper)
 
 
 router = APIRouter()
 logger = custom_logger()
+metrics = custom_metrics()
 
 
 @router.get("/webhook", tags=["Chatbot"])
@@ -43,7 +72,9 @@ async def get_chatbot_webhook(
         logger.debug(f"hub_verify_token_query_param: {hub_verify_token_query_param}")
 
         # TODO: MIGRATE TOKEN VALIDATION TO DEDICATED AUTHORIZER!!!
-        AWS_API_KEY_TOKEN = secrets_helper.get_secret_value("AWS_API_KEY_TOKEN")
+        AWS_API_KEY_TOKEN = await run_blocking(
+            secrets_helper.get_secret_value, "AWS_API_KEY_TOKEN"
+        )
         if hub_verify_token_query_param == AWS_API_KEY_TOKEN:
             return Response(
                 content=hub_challenge_query_param,
@@ -58,60 +89,111 @@ async def get_chatbot_webhook(
         raise e
 
 
+async def read_body(request: Request, max_bytes: int) -> Optional[bytes]:
+    """
+    Function to read the raw body of the request, returning None as soon as it
+    exceeds the maximum size (without loading the rest of it in memory).
+    :param request (Request): Incoming webhook request.
+    :param max_bytes (int): Maximum size of the body in bytes.
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        return None
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            return None
+    return bytes(body)
+
+
+def reject_request(status_code: int, reason: str) -> JSONResponse:
+    logger.warning(f"Rejected webhook request: {reason}")
+    metrics.add_metric(name="WebhookRequestsRejected", unit=MetricUnit.Count, value=1)
+    return JSONResponse(status_code=status_code, content={"error": reason})
+
+
 @router.post("/webhook", tags=["Chatbot"])
 async def post_chatbot_webhook(
-    request: Request,  # Only for initial debugging purposes
-    input_body: dict,
+    request: Request,
+    x_hub_signature_256: Annotated[Optional[str], Header()] = None,
 ):
     try:
         correlation_id = str(uuid4())
         logger.append_keys(correlation_id=correlation_id)
-        logger.info(
-            input_body, message_details="Received body in post_chatbot_webhook()"
-        )
         logger.info("Started chatbot handler for post_chatbot_webhook()")
-        logger.info("Finished post_chatbot_webhook() successfully")
 
-        # TODO: Remove these logs after initial validations
-        logger.debug(f"HEADERS: {request.headers}")
-        logger.debug(f"QUERY_PARAMS: {request.query_params}")
-        logger.debug(f"PATH_PARAMS: {request.path_params}")
-        logger.debug(f"INPUT_BODY: {input_body}")
-
-        # Intentionally break code if parsing fails
-        message = input_body["entry"][0]["changes"][0]["value"]["messages"][0]
-        wpp_from_phone_number = message["from"]
-        wpp_id = message["id"]
-        wpp_timestamp = message["timestamp"]
-        wpp_type = message["type"]
-        created_at = datetime.now(timezone.utc).isoformat()
-
-        # Initialize the Message Model based on the type of message
-        message_item = None
-        if wpp_type == "text":
-            message_item = TextMessageModel(
-                PK=f"NUMBER#{wpp_from_phone_number}",
-                SK=f"MESSAGE#{created_at}",
-                from_number=wpp_from_phone_number,
-                created_at=created_at,
-                type=wpp_type,
-                whatsapp_id=wpp_id,
-                whatsapp_timestamp=wpp_timestamp,
-                text=message["text"]["body"],
-                correlation_id=correlation_id,
+        # Reject forged or oversized deliveries before any parsing or AWS call
+        # (the App Secret is served from the in-memory secrets cache)
+        body = await read_body(request, MAX_BODY_BYTES)
+        if body is None:
+            return reject_request(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "Request body too large"
             )
-            logger.info(
-                message_item.model_dump(),
-                message_details="Successfully created TextMessageModel instance",
+
+        if VALIDATE_META_SIGNATURE:
+            try:
+                app_secret = await run_blocking(
+                    secrets_helper.get_secret_value, "META_APP_SECRET"
+                )
+            except KeyError:
+                # Deployments that upgraded before adding the key to the secret
+                logger.error(
+                    f"Configuration error: the secret {SECRET_NAME} has no "
+                    f"META_APP_SECRET to verify the webhook signatures (add it, "
+                    f"or set VALIDATE_META_SIGNATURE to false)"
+                )
+                metrics.add_metric(
+                    name="WebhookConfigurationErrors", unit=MetricUnit.Count, value=1
+                )
+                return JSONResponse(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    content={"error": "Webhook signature verification not configured"},
+                )
+            if not is_valid_signature(body, x_hub_signature_256, app_secret):
+                return reject_request(
+                    status.HTTP_401_UNAUTHORIZED, "Invalid request signature"
+                )
+
+        # Parse the verified bytes straight into the models (no intermediate dict)
+        try:
+            payload = WebhookPayloadModel.model_validate_json(body)
+        except ValidationError as e:
+            return reject_request(
+                status.HTTP_400_BAD_REQUEST,
+                f"Invalid request body: {e.error_count()} errors",
             )
-        # TODO: Add other types of messages (image, voice, video, etc)
+        logger.debug(
+            payload.model_dump(by_alias=True, exclude_defaults=True),
+            message_details="Received body in post_chatbot_webhook()",
+        )
 
-        # Save the message to DynamoDB
-        if message_item:
-            result = dynamodb_helper.put_item(message_item.model_dump())
-            logger.debug(result, message_details="DynamoDB put_item() result")
+        # Classify the delivery before building any model (status callbacks
+        # from outbound messages do not contain "messages")
+        delivery_type = classify_delivery(payload)
+        logger.info(f"Webhook delivery type: {delivery_type.value}")
+
+        if delivery_type in (DeliveryTypes.STATUSES, DeliveryTypes.MIXED):
+            try:
+                await run_blocking(ingest_statuses, payload, dynamodb_helper)
+            except Exception as e:
+                # Status tracking is best-effort, so Meta must not retry for it
+                logger.warning(f"Error while processing status callbacks: {e}")
+
+        if delivery_type == DeliveryTypes.STATUSES:
+            return {"message": "ok", "details": "Received status"}
+        if delivery_type == DeliveryTypes.UNKNOWN:
+            return {"message": "ok", "details": "Nothing to process"}
+
+        # Process every message of the delivery (Meta batches them under load)
+        outcomes = await run_blocking(
+            ingest_messages, payload, dynamodb_helper, message_deduplicator
+        )
+        logger.debug(outcomes, message_details="Messages processing outcomes")
+        logger.info("Finished post_chatbot_webhook() successfully")
 
-        result = {"message": "ok", "details": "Received message"}
+        result = {"message": "ok", "details": "Received message", "results": outcomes}
         return result
 
     except Exception as e:
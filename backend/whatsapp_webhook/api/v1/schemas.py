@@ -0,0 +1,111 @@
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+
+# NOTE: the fields are optional on purpose, so that a single malformed message
+# or status is reported as invalid without rejecting the whole webhook delivery
+
+
+class WebhookTextModel(BaseModel):
+    body: Optional[str] = None
+
+
+class WebhookMediaModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[str] = None
+    mime_type: Optional[str] = None
+    sha256: Optional[str] = None
+    caption: Optional[str] = None
+
+
+class WebhookMessageModel(BaseModel):
+    """
+    Class that represents a single message received in the Meta webhook.
+    """
+
+    model_config = ConfigDict(extra="allow", populate_by_name=True)
+
+    from_number: Optional[str] = Field(default=None, alias="from")
+    id: Optional[str] = None
+    timestamp: Optional[str] = None
+    type: Optional[str] = None
+    text: Optional[WebhookTextModel] = None
+    image: Optional[WebhookMediaModel] = None
+    audio: Optional[WebhookMediaModel] = None
+    video: Optional[WebhookMediaModel] = None
+
+
+class WebhookStatusModel(BaseModel):
+    """
+    Class that represents a status callback (sent/delivered/read/failed) of an
+    outbound message received in the Meta webhook.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[str] = None
+    status: Optional[str] = None
+    timestamp: Optional[str] = None
+    recipient_id: Optional[str] = None
+    errors: list[dict] = []
+
+
+class WebhookValueModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    messages: list[WebhookMessageModel] = []
+    statuses: list[WebhookStatusModel] = []
+
+
+class WebhookChangeModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    field: Optional[str] = None
+    value: WebhookValueModel = WebhookValueModel()
+
+
+class WebhookEntryModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[str] = None
+    changes: list[WebhookChangeModel] = []
+
+
+class WebhookPayloadModel(BaseModel):
+    """
+    Class that represents the Model of the POST requests from the Meta webhook.
+    """
+
+    model_config = ConfigDict(
+        extra="allow",
+        json_schema_extra={
+            "example": {
+                "object": "whatsapp_business_account",
+                "entry": [
+                    {
+                        "id": "whatsapp_business_account_id",
+                        "changes": [
+                            {
+                                "field": "messages",
+                                "value": {
+                                    "messages": [
+                                        {
+                                            "from": "12345678987",
+                                            "id": "wamid.ID",
+                                            "timestamp": "1718768502",
+                                            "type": "text",
+                                            "text": {"body": "Hello!"},
+                                        }
+                                    ]
+                                },
+                            }
+                        ],
+                    }
+                ],
+            }
+        },
+    )
+
+    object: Optional[str] = None
+    entry: list[WebhookEntryModel] = []
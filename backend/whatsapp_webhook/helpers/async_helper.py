@@ -0,0 +1,22 @@
+# Built-in imports
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+
+# Bounded pool for the blocking boto3 calls of the async webhook routes, so that
+# they never block the event loop (it matches the DynamoDB client's pool size)
+MAX_WORKERS = int(os.environ.get("WEBHOOK_MAX_WORKERS", "10"))
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="webhook")
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """
+    Function to run a blocking (synchronous) callable in the bounded executor
+    and await its result from the event loop.
+    :param func (Callable): Blocking function to execute.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
@@ -0,0 +1,110 @@
+# Built-in imports
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# External imports
+from aws_lambda_powertools.metrics import MetricUnit
+
+# Own imports
+from common.enums import DDBPrefixes
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.logger import custom_logger
+from common.metrics import custom_metrics
+from common.models.message_base_model import MessageBaseModel
+
+
+logger = custom_logger()
+metrics = custom_metrics()
+
+# Meta keeps retrying a webhook delivery for up to 7 days
+DEFAULT_DEDUPE_TTL_SECONDS = int(os.environ.get("DEDUPE_TTL_SECONDS", "604800"))
+DEFAULT_DEDUPE_LRU_MAX_SIZE = int(os.environ.get("DEDUPE_LRU_MAX_SIZE", "2048"))
+TTL_ATTRIBUTE = "ttl"
+
+
+class MessageDeduplicator:
+    """
+    Class to make the webhook ingestion idempotent based on the WhatsApp message
+    ID. Hot retries are answered from an in-process LRU, and the rest rely on a
+    conditional write of a dedupe item (with TTL) in the DynamoDB table, in the
+    same transaction as the message.
+    """
+
+    def __init__(
+        self,
+        dynamodb_helper: DynamoDBHelper,
+        ttl_seconds: int = DEFAULT_DEDUPE_TTL_SECONDS,
+        lru_max_size: int = DEFAULT_DEDUPE_LRU_MAX_SIZE,
+    ) -> None:
+        """
+        :param dynamodb_helper (DynamoDBHelper): Helper for the chatbot DynamoDB table.
+        :param ttl_seconds (int): Seconds to keep the dedupe items in DynamoDB.
+        :param lru_max_size (int): Max number of message IDs to keep in memory.
+        """
+        self.dynamodb_helper = dynamodb_helper
+        self.ttl_seconds = ttl_seconds
+        self.lru_max_size = lru_max_size
+        self._recent_ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put_unique(self, message_items: list[MessageBaseModel]) -> list[bool]:
+        """
+        Method to save the messages of a delivery that were not received before.
+        Each message is written in the same transaction as its dedupe item, so a
+        failure never leaves a claimed message unsaved (Meta's redelivery is
+        processed again). Returns if each message was saved (False if duplicate).
+        :param message_items (list[MessageBaseModel]): Messages of the delivery.
+        """
+        saved = [False] * len(message_items)
+        pending = {}
+        for index, message_item in enumerate(message_items):
+            whatsapp_id = message_item.whatsapp_id
+            # Repeated messages in the same delivery are written once
+            if whatsapp_id not in pending and not self._is_recent(whatsapp_id):
+                pending[whatsapp_id] = index
+
+        if pending:
+            added = self.dynamodb_helper.put_items_with_claims(
+                [message_items[index] for index in pending.values()],
+                [self._dedupe_item(whatsapp_id) for whatsapp_id in pending],
+                ttl_attribute=TTL_ATTRIBUTE,
+            )
+            for (whatsapp_id, index), was_added in zip(pending.items(), added):
+                self._remember(whatsapp_id)
+                saved[index] = was_added
+                if not was_added:
+                    self._count_stored_duplicate(whatsapp_id)
+        return saved
+
+    def _dedupe_item(self, whatsapp_id: str) -> dict:
+        return {
+            "PK": f"{DDBPrefixes.PK_DEDUPE.value}{whatsapp_id}",
+            "SK": DDBPrefixes.SK_DEDUPE.value,
+            TTL_ATTRIBUTE: int(time.time()) + self.ttl_seconds,
+        }
+
+    def _is_recent(self, whatsapp_id: str) -> bool:
+        with self._lock:
+            if whatsapp_id not in self._recent_ids:
+                return False
+            self._recent_ids.move_to_end(whatsapp_id)
+        logger.info(f"Duplicate message {whatsapp_id} suppressed from LRU")
+        metrics.add_metric(
+            name="DuplicatesSuppressedInMemory", unit=MetricUnit.Count, value=1
+        )
+        return True
+
+    def _count_stored_duplicate(self, whatsapp_id: str) -> None:
+        logger.info(f"Duplicate message {whatsapp_id} suppressed from DynamoDB")
+        metrics.add_metric(
+            name="DuplicatesSuppressedInDynamoDB", unit=MetricUnit.Count, value=1
+        )
+
+    def _remember(self, whatsapp_id: str) -> None:
+        with self._lock:
+            self._recent_ids[whatsapp_id] = True
+            self._recent_ids.move_to_end(whatsapp_id)
+            while len(self._recent_ids) > self.lru_max_size:
+                self._recent_ids.popitem(last=False)
@@ -0,0 +1,209 @@
+# Built-in imports
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Optional
+from uuid import uuid4
+
+# External imports
+from pydantic import ValidationError
+
+# Own imports
+from common.enums import WhatsAppMessageTypes
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.logger import custom_logger
+from common.models.media_message_model import MediaMessageModel
+from common.models.message_base_model import MessageBaseModel
+from common.models.text_message_model import TextMessageModel
+from whatsapp_webhook.api.v1.schemas import WebhookMessageModel, WebhookPayloadModel
+from whatsapp_webhook.helpers.dedupe_helper import MessageDeduplicator
+
+
+logger = custom_logger()
+
+# Meta types of the media messages and their type in the chatbot (voice notes
+# are received by Meta as "audio" messages)
+MEDIA_MESSAGE_TYPES = {
+    "image": WhatsAppMessageTypes.IMAGE.value,
+    "audio": WhatsAppMessageTypes.VOICE.value,
+    "video": WhatsAppMessageTypes.VIDEO.value,
+}
+
+
+class MessageOutcomes(Enum):
+    """Class that represents the processing outcome of each webhook message."""
+
+    STORED: str = "stored"
+    UNSUPPORTED: str = "unsupported"
+    INVALID: str = "invalid"
+    DUPLICATE: str = "duplicate"
+
+
+class DeliveryTypes(Enum):
+    """Class that represents the kind of content of a webhook delivery."""
+
+    MESSAGES: str = "messages"
+    STATUSES: str = "statuses"
+    MIXED: str = "mixed"
+    UNKNOWN: str = "unknown"
+
+
+def classify_delivery(payload: WebhookPayloadModel) -> DeliveryTypes:
+    """
+    Function to classify a webhook delivery before building any model, so that
+    status-only callbacks (sent/delivered/read) can be acknowledged right away.
+    :param payload (WebhookPayloadModel): Body received from the Meta webhook.
+    """
+    has_messages = has_statuses = False
+    for entry in payload.entry:
+        for change in entry.changes:
+            has_messages = has_messages or bool(change.value.messages)
+            has_statuses = has_statuses or bool(change.value.statuses)
+
+    if has_messages and has_statuses:
+        return DeliveryTypes.MIXED
+    if has_messages:
+        return DeliveryTypes.MESSAGES
+    if has_statuses:
+        return DeliveryTypes.STATUSES
+    return DeliveryTypes.UNKNOWN
+
+
+def extract_messages(payload: WebhookPayloadModel) -> list[WebhookMessageModel]:
+    """
+    Function to walk all the entries, changes and messages of a webhook delivery,
+    as Meta batches several of them in a single POST request under heavy load.
+    :param payload (WebhookPayloadModel): Body received from the Meta webhook.
+    """
+    messages = []
+    for entry in payload.entry:
+        for change in entry.changes:
+            messages.extend(change.value.messages)
+    return messages
+
+
+def build_message_item(
+    message: WebhookMessageModel,
+    created_at: str,
+    correlation_id: str,
+) -> Optional[MessageBaseModel]:
+    """
+    Function to initialize the Message Model based on the type of message.
+    Returns None if the type of message is not supported yet.
+    :param message (WebhookMessageModel): Single message from the webhook delivery.
+    :param created_at (str): Creation datetime to use for the message item.
+    :param correlation_id (str): Correlation ID for the message item.
+    """
+    wpp_from_phone_number = message.from_number
+    wpp_type = message.type
+
+    if wpp_type == WhatsAppMessageTypes.TEXT.value:
+        return TextMessageModel(
+            PK=f"NUMBER#{wpp_from_phone_number}",
+            SK=f"MESSAGE#{created_at}",
+            from_number=wpp_from_phone_number,
+            created_at=created_at,
+            type=wpp_type,
+            whatsapp_id=message.id,
+            whatsapp_timestamp=message.timestamp,
+            text=message.text.body if message.text else None,
+            correlation_id=correlation_id,
+        )
+
+    if wpp_type in MEDIA_MESSAGE_TYPES:
+        media = getattr(message, wpp_type)
+        return MediaMessageModel(
+            PK=f"NUMBER#{wpp_from_phone_number}",
+            SK=f"MESSAGE#{created_at}",
+            from_number=wpp_from_phone_number,
+            created_at=created_at,
+            type=MEDIA_MESSAGE_TYPES[wpp_type],
+            whatsapp_id=message.id,
+            whatsapp_timestamp=message.timestamp,
+            media_id=media.id if media else None,
+            mime_type=media.mime_type if media else None,
+            sha256=media.sha256 if media else None,
+            caption=media.caption if media else None,
+            correlation_id=correlation_id,
+        )
+
+    return None
+
+
+def build_message_items(
+    messages: list[WebhookMessageModel],
+) -> tuple[list[MessageBaseModel], list[dict]]:
+    """
+    Function to build all the Message Models of a webhook delivery in one pass.
+    Returns the message items to store and the outcome of each input message.
+    :param messages (list[WebhookMessageModel]): Messages of the webhook delivery.
+    """
+    message_items = []
+    outcomes = []
+    last_created_at = None
+    for message in messages:
+        # Keep "created_at" strictly increasing, so that messages from the same
+        # number never collide on the "SK" within the same batch write
+        created_at = datetime.now(timezone.utc)
+        if last_created_at and created_at <= last_created_at:
+            created_at = last_created_at + timedelta(microseconds=1)
+        last_created_at = created_at
+
+        correlation_id = str(uuid4())
+        outcome = {"whatsapp_id": message.id, "correlation_id": correlation_id}
+        try:
+            message_item = build_message_item(
+                message, created_at.isoformat(), correlation_id
+            )
+        except ValidationError as error:
+            logger.warning(f"Invalid message in webhook delivery: {error}")
+            outcomes.append({**outcome, "status": MessageOutcomes.INVALID.value})
+            continue
+
+        if message_item is None:
+            outcomes.append({**outcome, "status": MessageOutcomes.UNSUPPORTED.value})
+            continue
+
+        logger.info(
+            message_item.model_dump(),
+            message_details=f"Successfully created {message_item.__class__.__name__} instance",
+        )
+        message_items.append(message_item)
+        outcomes.append({**outcome, "status": MessageOutcomes.STORED.value})
+
+    return message_items, outcomes
+
+
+def ingest_messages(
+    payload: WebhookPayloadModel,
+    dynamodb_helper: DynamoDBHelper,
+    deduplicator: Optional[MessageDeduplicator] = None,
+) -> list[dict]:
+    """
+    Function to process all the messages of a webhook delivery and save them to
+    DynamoDB with a single batch writer. Returns the outcome of each message.
+    :param payload (WebhookPayloadModel): Body received from the Meta webhook.
+    :param dynamodb_helper (DynamoDBHelper): Helper for the chatbot DynamoDB table.
+    :param deduplicator (Optional(MessageDeduplicator)): Skips messages that were
+        already received, so that Meta redeliveries never reach the pipeline (the
+        messages are then saved in transactions, together with their claims).
+    """
+    messages = extract_messages(payload)
+    logger.info(f"Found {len(messages)} messages in the webhook delivery")
+
+    message_items, outcomes = build_message_items(messages)
+    if not message_items:
+        return outcomes
+
+    if deduplicator:
+        outcomes_by_correlation_id = {
+            outcome["correlation_id"]: outcome for outcome in outcomes
+        }
+        saved = deduplicator.put_unique(message_items)
+        for message_item, was_saved in zip(message_items, saved):
+            if not was_saved:
+                outcome = outcomes_by_correlation_id[message_item.correlation_id]
+                outcome["status"] = MessageOutcomes.DUPLICATE.value
+    else:
+        dynamodb_helper.put_items(message_items)
+
+    return outcomes
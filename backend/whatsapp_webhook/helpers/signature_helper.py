@@ -0,0 +1,38 @@
+# Built-in imports
+import hashlib
+import hmac
+from typing import Optional
+
+
+SIGNATURE_PREFIX = "sha256="
+
+
+def compute_signature(body: bytes, app_secret: str) -> str:
+    """
+    Function to compute the "X-Hub-Signature-256" header value that Meta sends
+    with every webhook delivery (HMAC-SHA256 of the raw body with the App Secret).
+    :param body (bytes): Raw body of the webhook request.
+    :param app_secret (str): App Secret of the Meta App.
+    """
+    digest = hmac.new(app_secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return f"{SIGNATURE_PREFIX}{digest}"
+
+
+def is_valid_signature(
+    body: bytes,
+    signature_header: Optional[str],
+    app_secret: str,
+) -> bool:
+    """
+    Function to verify the "X-Hub-Signature-256" header over the exact raw bytes
+    of the request, with a constant-time comparison to avoid timing attacks.
+    :param body (bytes): Raw body of the webhook request.
+    :param signature_header (Optional(str)): Value of the signature header.
+    :param app_secret (str): App Secret of the Meta App.
+    """
+    if not signature_header or not signature_header.startswith(SIGNATURE_PREFIX):
+        return False
+    return hmac.compare_digest(
+        compute_signature(body, app_secret).encode("utf-8"),
+        signature_header.strip().encode("utf-8"),
+    )
@@ -0,0 +1,179 @@
+# Built-in imports
+import os
+
+# External imports
+from aws_lambda_powertools.metrics import MetricUnit
+from pydantic import ValidationError
+
+# Own imports
+from common.enums import DDBPrefixes, WhatsAppStatusTypes
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.logger import custom_logger
+from common.metrics import custom_metrics
+from common.models.message_status_model import MessageStatusModel
+from whatsapp_webhook.api.v1.schemas import WebhookPayloadModel, WebhookStatusModel
+
+
+logger = custom_logger()
+metrics = custom_metrics()
+
+# Aggregating the statuses in DynamoDB is optional, as it costs one write per
+# outbound message and delivery (the callbacks are acknowledged anyway)
+ENABLE_STATUS_TRACKING = (
+    os.environ.get("ENABLE_STATUS_TRACKING", "false").lower() == "true"
+)
+
+# The higher status wins when several callbacks for a message are aggregated
+STATUS_RANKS = {
+    WhatsAppStatusTypes.SENT.value: 1,
+    WhatsAppStatusTypes.DELIVERED.value: 2,
+    WhatsAppStatusTypes.READ.value: 3,
+    WhatsAppStatusTypes.FAILED.value: 4,
+}
+
+
+def extract_statuses(payload: WebhookPayloadModel) -> list[WebhookStatusModel]:
+    """
+    Function to walk all the entries and changes of a webhook delivery to get the
+    status callbacks (sent/delivered/read/failed) of our outbound messages.
+    :param payload (WebhookPayloadModel): Body received from the Meta webhook.
+    """
+    statuses = []
+    for entry in payload.entry:
+        for change in entry.changes:
+            statuses.extend(change.value.statuses)
+    return statuses
+
+
+def aggregate_statuses(
+    statuses: list[WebhookStatusModel],
+) -> list[MessageStatusModel]:
+    """
+    Function to aggregate the status callbacks into one compact record per
+    outbound message, keeping the timestamp of each status and the latest one.
+    :param statuses (list[WebhookStatusModel]): Status callbacks of the delivery.
+    """
+    status_items = {}
+    for status in statuses:
+        if status.status not in STATUS_RANKS or not status.id:
+            logger.warning(f"Unknown status callback skipped: {status}")
+            continue
+
+        status_item = status_items.get(status.id)
+        if status_item is None:
+            try:
+                status_item = MessageStatusModel(
+                    PK=f"{DDBPrefixes.PK_NUMBER.value}{status.recipient_id}",
+                    SK=f"{DDBPrefixes.SK_STATUS.value}{status.id}",
+                    whatsapp_id=status.id,
+                    recipient_id=status.recipient_id,
+                    status=status.status,
+                    status_timestamp=status.timestamp,
+                )
+            except ValidationError as error:
+                logger.warning(f"Invalid status callback skipped: {error}")
+                continue
+            status_items[status.id] = status_item
+
+        setattr(status_item, f"{status.status}_at", status.timestamp)
+        if status.errors:
+            status_item.error_code = str(status.errors[0].get("code"))
+        if STATUS_RANKS[status.status] > STATUS_RANKS[status_item.status]:
+            status_item.status = status.status
+            status_item.status_timestamp = status.timestamp
+
+    return list(status_items.values())
+
+
+def save_status(
+    status_item: MessageStatusModel,
+    dynamodb_helper: DynamoDBHelper,
+) -> None:
+    """
+    Function to merge an aggregated status record into the one saved by the
+    previous deliveries. The first timestamp of each status is kept, and the
+    latest status is only replaced by a higher one (the callbacks of different
+    deliveries can arrive out of order or be re-delivered).
+    :param status_item (MessageStatusModel): Aggregated status of a message.
+    :param dynamodb_helper (DynamoDBHelper): Helper for the chatbot DynamoDB table.
+    """
+    attribute_values = {
+        ":whatsapp_id": status_item.whatsapp_id,
+        ":recipient_id": status_item.recipient_id,
+    }
+    assignments = ["whatsapp_id = :whatsapp_id", "recipient_id = :recipient_id"]
+    for status in STATUS_RANKS:
+        timestamp = getattr(status_item, f"{status}_at")
+        if timestamp is not None:
+            attribute_values[f":{status}_at"] = timestamp
+            assignments.append(
+                f"{status}_at = if_not_exists({status}_at, :{status}_at)"
+            )
+    if status_item.error_code is not None:
+        attribute_values[":error_code"] = status_item.error_code
+        assignments.append("error_code = :error_code")
+
+    # Only replace the saved status if it is lower than the aggregated one
+    lower_statuses = [
+        status
+        for status, rank in STATUS_RANKS.items()
+        if rank < STATUS_RANKS[status_item.status]
+    ]
+    condition_expression = "attribute_not_exists(#status)"
+    condition_values = {}
+    if lower_statuses:
+        placeholders = [f":lower_{index}" for index in range(len(lower_statuses))]
+        condition_values = dict(zip(placeholders, lower_statuses))
+        condition_expression += f" OR #status IN ({', '.join(placeholders)})"
+
+    updated_item = dynamodb_helper.update_item(
+        status_item.PK,
+        status_item.SK,
+        "SET "
+        + ", ".join(
+            assignments + ["#status = :status", "status_timestamp = :status_timestamp"]
+        ),
+        attribute_names={"#status": "status"},
+        attribute_values={
+            **attribute_values,
+            **condition_values,
+            ":status": status_item.status,
+            ":status_timestamp": status_item.status_timestamp,
+        },
+        condition_expression=condition_expression,
+    )
+    if updated_item is None:
+        # A higher status is saved already, so only the timestamps are merged
+        dynamodb_helper.update_item(
+            status_item.PK,
+            status_item.SK,
+            f"SET {', '.join(assignments)}",
+            attribute_values=attribute_values,
+        )
+
+
+def ingest_statuses(
+    payload: WebhookPayloadModel,
+    dynamodb_helper: DynamoDBHelper,
+    track_statuses: bool = ENABLE_STATUS_TRACKING,
+) -> int:
+    """
+    Function to process the status callbacks of a webhook delivery. When the
+    status tracking is enabled, the callbacks are aggregated per message and
+    merged into the saved records (see "save_status"). Returns the number of
+    status callbacks received.
+    :param payload (WebhookPayloadModel): Body received from the Meta webhook.
+    :param dynamodb_helper (DynamoDBHelper): Helper for the chatbot DynamoDB table.
+    :param track_statuses (bool): Save the aggregated status records to DynamoDB.
+    """
+    statuses = extract_statuses(payload)
+    logger.info(f"Found {len(statuses)} status callbacks in the webhook delivery")
+    metrics.add_metric(
+        name="StatusCallbacksReceived", unit=MetricUnit.Count, value=len(statuses)
+    )
+
+    if track_statuses and statuses:
+        for status_item in aggregate_statuses(statuses):
+            save_status(status_item, dynamodb_helper)
+
+    return len(statuses)
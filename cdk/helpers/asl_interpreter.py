@@ -0,0 +1,451 @@
+################################################################################
+# Local interpreter of the State Machine definition (Amazon States Language),
+# to execute the synthesized workflow in-process without AWS, with the timing
+# and payload size of every state. Supported states: Task (LambdaInvoke and
+# plain Lambda ARNs), Choice, Pass, Succeed and Fail, with Retry and Catch.
+################################################################################
+
+# Built-in imports
+import copy
+import fnmatch
+import json
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+
+# Step Functions rejects payloads over 256 KB between states
+MAX_PAYLOAD_BYTES = 256 * 1024
+MAX_TRANSITIONS = 1000
+
+LOCAL_ACCOUNT = "000000000000"
+LOCAL_REGION = "local"
+
+_PATH_TOKEN = re.compile(r"\.([^.\[\]]+)|\[(\d+)\]|\['([^']+)'\]")
+
+
+class StatesError(Exception):
+    """Error of a state, with the same "Error" and "Cause" as Step Functions."""
+
+    def __init__(self, error: str, cause: str = "") -> None:
+        super().__init__(f"{error}: {cause}" if cause else error)
+        self.error = error
+        self.cause = cause
+
+
+class StateRecord:
+    """Timing and payload sizes of a state (one per transition)."""
+
+    def __init__(self, name: str, state_type: str, input_bytes: int) -> None:
+        self.name = name
+        self.state_type = state_type
+        self.input_bytes = input_bytes
+        self.output_bytes = 0
+        self.duration_ms = 0.0
+        self.attempts = 0
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.name,
+            "type": self.state_type,
+            "duration_ms": self.duration_ms,
+            "input_bytes": self.input_bytes,
+            "output_bytes": self.output_bytes,
+            "attempts": self.attempts,
+            "error": self.error,
+        }
+
+
+class ExecutionResult:
+    """Result of a local execution (status, output or error and the states)."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.status = "RUNNING"
+        self.output: Any = None
+        self.error: Optional[str] = None
+        self.cause: Optional[str] = None
+        self.duration_ms = 0.0
+        self.states: list[StateRecord] = []
+
+
+def _size(data: Any) -> int:
+    return len(json.dumps(data, separators=(",", ":")).encode())
+
+
+def resolve_intrinsics(value: Any) -> Any:
+    """
+    Function to resolve the CloudFormation intrinsic functions used by CDK in the
+    definition ("Fn::Join", "Ref" and "Fn::GetAtt"), with local placeholders.
+    :param value (Any): Part of the CloudFormation template.
+    """
+    if isinstance(value, list):
+        return [resolve_intrinsics(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "Fn::Join" in value:
+        delimiter, parts = value["Fn::Join"]
+        return delimiter.join(str(resolve_intrinsics(part)) for part in parts)
+    if "Ref" in value:
+        return {
+            "AWS::Partition": "aws",
+            "AWS::Region": LOCAL_REGION,
+            "AWS::AccountId": LOCAL_ACCOUNT,
+            "AWS::URLSuffix": "amazonaws.com",
+        }.get(value["Ref"], value["Ref"])
+    if "Fn::GetAtt" in value:
+        logical_id, _ = value["Fn::GetAtt"]
+        return f"arn:aws:lambda:{LOCAL_REGION}:{LOCAL_ACCOUNT}:function:{logical_id}"
+    return {key: resolve_intrinsics(item) for key, item in value.items()}
+
+
+def definition_from_template(template: dict, logical_id: Optional[str] = None) -> dict:
+    """
+    Function to get the ASL definition of a State Machine from a synthesized
+    CloudFormation template (e.g. "Template.from_stack(stack).to_json()").
+    The Lambda ARNs are replaced by "arn:aws:lambda:local:...:function:<LogicalId>".
+    :param template (dict): CloudFormation template.
+    :param logical_id (Optional(str)): State Machine to use (if there are several).
+    """
+    state_machines = {
+        resource_id: resource
+        for resource_id, resource in template.get("Resources", {}).items()
+        if resource.get("Type") == "AWS::StepFunctions::StateMachine"
+        and (logical_id is None or resource_id == logical_id)
+    }
+    if len(state_machines) != 1:
+        raise ValueError(f"Expected one State Machine, found: {list(state_machines)}")
+    properties = next(iter(state_machines.values()))["Properties"]
+    definition = properties.get("DefinitionString") or properties.get("Definition")
+    definition = resolve_intrinsics(definition)
+    return json.loads(definition) if isinstance(definition, str) else definition
+
+
+def get_path(data: Any, path: str, context: Optional[dict] = None) -> Any:
+    """
+    Function to read a reference path ("$", "$.a.b", "$.a[0]", "$['a b']", and
+    "$$.<path>" for the context object).
+    """
+    if path.startswith("$$"):
+        data, path = context or {}, path[1:]
+    if not path.startswith("$"):
+        raise StatesError("States.Runtime", f"Invalid path {path}")
+    for key, index, quoted_key in _PATH_TOKEN.findall(path[1:]):
+        try:
+            data = data[int(index)] if index else data[key or quoted_key]
+        except (KeyError, IndexError, TypeError):
+            raise StatesError(
+                "States.Runtime", f"The JSONPath {path} could not be found"
+            )
+    return data
+
+
+def set_path(data: Any, path: Optional[str], value: Any) -> Any:
+    """
+    Function to apply a "ResultPath": "$" replaces the input, None discards
+    the result, and "$.a.b" sets it in a copy of the input.
+    """
+    if path is None:
+        return data
+    if path == "$":
+        return value
+    data = copy.deepcopy(data) if isinstance(data, dict) else {}
+    keys = [key or quoted_key for key, _, quoted_key in _PATH_TOKEN.findall(path[1:])]
+    target = data
+    for key in keys[:-1]:
+        target = target.setdefault(key, {})
+    target[keys[-1]] = value
+    return data
+
+
+def apply_parameters(template: Any, data: Any, context: dict) -> Any:
+    """
+    Function to build "Parameters", "ResultSelector" or LambdaInvoke payloads:
+    the keys ending in ".$" are replaced with the value of their path.
+    """
+    if isinstance(template, list):
+        return [apply_parameters(item, data, context) for item in template]
+    if not isinstance(template, dict):
+        return template
+    result = {}
+    for key, value in template.items():
+        if key.endswith(".$"):
+            result[key[:-2]] = get_path(data, value, context)
+        else:
+            result[key] = apply_parameters(value, data, context)
+    return result
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+_COMPARISONS = {
+    "StringEquals": lambda a, b: isinstance(a, str) and a == b,
+    "StringLessThan": lambda a, b: isinstance(a, str) and a < b,
+    "StringGreaterThan": lambda a, b: isinstance(a, str) and a > b,
+    "StringLessThanEquals": lambda a, b: isinstance(a, str) and a <= b,
+    "StringGreaterThanEquals": lambda a, b: isinstance(a, str) and a >= b,
+    "StringMatches": lambda a, b: isinstance(a, str) and fnmatch.fnmatchcase(a, b),
+    "NumericEquals": lambda a, b: _is_number(a) and a == b,
+    "NumericLessThan": lambda a, b: _is_number(a) and a < b,
+    "NumericGreaterThan": lambda a, b: _is_number(a) and a > b,
+    "NumericLessThanEquals": lambda a, b: _is_number(a) and a <= b,
+    "NumericGreaterThanEquals": lambda a, b: _is_number(a) and a >= b,
+    "BooleanEquals": lambda a, b: isinstance(a, bool) and a == b,
+}
+_TYPE_CHECKS = {
+    "IsNull": lambda a: a is None,
+    "IsString": lambda a: isinstance(a, str),
+    "IsNumeric": _is_number,
+    "IsBoolean": lambda a: isinstance(a, bool),
+}
+
+
+def evaluate_choice_rule(rule: dict, data: Any, context: dict) -> bool:
+    """Function to evaluate a Choice rule (comparisons, And, Or and Not)."""
+    if "And" in rule:
+        return all(evaluate_choice_rule(r, data, context) for r in rule["And"])
+    if "Or" in rule:
+        return any(evaluate_choice_rule(r, data, context) for r in rule["Or"])
+    if "Not" in rule:
+        return not evaluate_choice_rule(rule["Not"], data, context)
+
+    try:
+        value = get_path(data, rule["Variable"], context)
+        is_present = True
+    except StatesError:
+        value, is_present = None, False
+
+    if "IsPresent" in rule:
+        return is_present == rule["IsPresent"]
+    if not is_present:
+        return False
+    for operator, check in _TYPE_CHECKS.items():
+        if operator in rule:
+            return check(value) == rule[operator]
+    for operator, compare in _COMPARISONS.items():
+        if operator in rule:
+            return compare(value, rule[operator])
+        if f"{operator}Path" in rule:
+            return compare(value, get_path(data, rule[f"{operator}Path"], context))
+    raise StatesError("States.Runtime", f"Unsupported Choice rule: {rule}")
+
+
+def _error_matches(error_equals: list[str], error: str) -> bool:
+    if error in error_equals:
+        return True
+    if "States.ALL" in error_equals:
+        return error != "States.Runtime"
+    return "States.TaskFailed" in error_equals and not error.startswith("States.")
+
+
+class ASLInterpreter:
+    """
+    Executes an ASL definition in-process. The Lambda functions of the Task
+    states are run by "invoke_lambda(function_name, payload)", which returns
+    the function output (or raises the function error).
+    """
+
+    def __init__(
+        self,
+        definition: dict,
+        invoke_lambda: Callable[[str, Any], Any],
+        sleep: Callable[[float], None] = time.sleep,
+        max_transitions: int = MAX_TRANSITIONS,
+    ) -> None:
+        """
+        :param definition (dict): ASL definition (see "definition_from_template").
+        :param invoke_lambda (Callable): Function to invoke the Lambda functions.
+        :param sleep (Callable): Function to wait between retries (e.g. no-op).
+        :param max_transitions (int): Limit of transitions (to stop loops).
+        """
+        self.definition = definition
+        self.invoke_lambda = invoke_lambda
+        self.sleep = sleep
+        self.max_transitions = max_transitions
+
+    def execute(
+        self, execution_input: Any, name: Optional[str] = None
+    ) -> ExecutionResult:
+        """
+        Method to run an execution until it succeeds or fails.
+        :param execution_input (Any): Input of the execution (JSON serializable).
+        :param name (Optional(str)): Execution name. Defaults to a UUID.
+        """
+        result = ExecutionResult(name or str(uuid.uuid4()))
+        context = {
+            "Execution": {
+                "Id": f"arn:aws:states:{LOCAL_REGION}:{LOCAL_ACCOUNT}:execution:local:{result.name}",
+                "Name": result.name,
+                "Input": execution_input,
+                "StartTime": datetime.now(timezone.utc).isoformat(),
+            },
+            "StateMachine": {"Name": "local"},
+        }
+        start = time.perf_counter()
+        data = json.loads(json.dumps(execution_input))
+        state_name = self.definition["StartAt"]
+        try:
+            for _ in range(self.max_transitions):
+                state = self.definition["States"][state_name]
+                record = StateRecord(state_name, state["Type"], _size(data))
+                result.states.append(record)
+                context["State"] = {
+                    "Name": state_name,
+                    "EnteredTime": datetime.now(timezone.utc).isoformat(),
+                    "RetryCount": 0,
+                }
+
+                state_start = time.perf_counter()
+                try:
+                    data, state_name = self._run_state(state, data, context, record)
+                finally:
+                    record.duration_ms = (time.perf_counter() - state_start) * 1000
+                record.output_bytes = _size(data)
+                if record.output_bytes > MAX_PAYLOAD_BYTES:
+                    raise StatesError(
+                        "States.DataLimitExceeded",
+                        f"The state/task '{record.name}' returned a result with a "
+                        f"size of {record.output_bytes} bytes",
+                    )
+                if state_name is None:
+                    result.status, result.output = "SUCCEEDED", data
+                    break
+            else:
+                raise StatesError("States.Runtime", "Maximum transitions exceeded")
+        except StatesError as error:
+            result.status, result.error, result.cause = (
+                "FAILED",
+                error.error,
+                error.cause,
+            )
+        result.duration_ms = (time.perf_counter() - start) * 1000
+        return result
+
+    def _run_state(
+        self, state: dict, data: Any, context: dict, record: StateRecord
+    ) -> tuple[Any, Optional[str]]:
+        """Returns the output of the state and the next state (None to end)."""
+        state_type = state["Type"]
+        if state_type == "Fail":
+            record.error = state.get("Error", "States.Fail")
+            raise StatesError(record.error, state.get("Cause", ""))
+
+        effective_input = self._input(state, data, context)
+        if state_type == "Succeed":
+            return self._output(state, effective_input), None
+        if state_type == "Choice":
+            for rule in state.get("Choices", []):
+                if evaluate_choice_rule(rule, effective_input, context):
+                    return self._output(state, effective_input), rule["Next"]
+            if "Default" not in state:
+                raise StatesError("States.NoChoiceMatched", json.dumps(effective_input))
+            return self._output(state, effective_input), state["Default"]
+        if state_type == "Pass":
+            if "Parameters" in state:
+                effective_input = apply_parameters(
+                    state["Parameters"], effective_input, context
+                )
+            task_result = state.get("Result", effective_input)
+            return self._finish(state, data, task_result, context)
+        if state_type == "Task":
+            if "Parameters" in state:
+                effective_input = apply_parameters(
+                    state["Parameters"], effective_input, context
+                )
+            try:
+                task_result = self._run_task_with_retries(
+                    state, effective_input, context, record
+                )
+            except StatesError as error:
+                record.error = error.error
+                for catcher in state.get("Catch", []):
+                    if _error_matches(catcher["ErrorEquals"], error.error):
+                        error_output = {"Error": error.error, "Cause": error.cause}
+                        output = set_path(
+                            data, catcher.get("ResultPath", "$"), error_output
+                        )
+                        return output, catcher["Next"]
+                raise
+            if "ResultSelector" in state:
+                task_result = apply_parameters(
+                    state["ResultSelector"], task_result, context
+                )
+            return self._finish(state, data, task_result, context)
+        raise StatesError("States.Runtime", f"Unsupported state type {state_type}")
+
+    def _input(self, state: dict, data: Any, context: dict) -> Any:
+        input_path = state.get("InputPath", "$")
+        return {} if input_path is None else get_path(data, input_path, context)
+
+    def _output(self, state: dict, data: Any) -> Any:
+        output_path = state.get("OutputPath", "$")
+        return {} if output_path is None else get_path(data, output_path)
+
+    def _finish(
+        self, state: dict, data: Any, task_result: Any, context: dict
+    ) -> tuple[Any, Optional[str]]:
+        output = set_path(data, state.get("ResultPath", "$"), task_result)
+        output = self._output(state, output)
+        return output, None if state.get("End") else state["Next"]
+
+    def _run_task_with_retries(
+        self, state: dict, task_input: Any, context: dict, record: StateRecord
+    ) -> Any:
+        retry_counts = [0] * len(state.get("Retry", []))
+        while True:
+            record.attempts += 1
+            try:
+                return self._run_task(state["Resource"], task_input)
+            except StatesError as error:
+                for position, retrier in enumerate(state.get("Retry", [])):
+                    if _error_matches(retrier["ErrorEquals"], error.error):
+                        break
+                else:
+                    raise
+                if retry_counts[position] >= retrier.get("MaxAttempts", 3):
+                    raise
+                interval = (
+                    retrier.get("IntervalSeconds", 1)
+                    * retrier.get("BackoffRate", 2.0) ** retry_counts[position]
+                )
+                if "MaxDelaySeconds" in retrier:
+                    interval = min(interval, retrier["MaxDelaySeconds"])
+                if retrier.get("JitterStrategy") == "FULL":
+                    interval = random.uniform(0, interval)
+                retry_counts[position] += 1
+                context["State"]["RetryCount"] = sum(retry_counts)
+                self.sleep(interval)
+
+    def _run_task(self, resource: str, task_input: Any) -> Any:
+        if resource.endswith(":states:::lambda:invoke"):
+            function_name = task_input["FunctionName"]
+            payload = task_input.get("Payload", {})
+            return {
+                "ExecutedVersion": "$LATEST",
+                "Payload": self._invoke(function_name, payload),
+                "StatusCode": 200,
+            }
+        if resource.startswith("arn:aws:lambda:"):
+            return self._invoke(resource, task_input)
+        raise StatesError("States.Runtime", f"Unsupported Task resource {resource}")
+
+    def _invoke(self, function_name: str, payload: Any) -> Any:
+        # Same JSON round trip (and error format) as the Lambda service
+        try:
+            output = self.invoke_lambda(function_name, json.loads(json.dumps(payload)))
+        except StatesError:
+            raise
+        except Exception as error:
+            raise StatesError(
+                type(error).__name__,
+                json.dumps(
+                    {"errorMessage": str(error), "errorType": type(error).__name__}
+                ),
+            )
+        return json.loads(json.dumps(output))
@@ -6,6 +6,8 @@ from aws_cdk import (
     Duration,
     aws_bedrock,
     aws_dynamodb,
+    aws_events,
+    aws_events_targets,
     aws_iam,
     aws_lambda,
     aws_lambda_event_sources,
@@ -61,6 +63,7 @@ class ChatbotAPIStack(Stack):
         # Main methods for the deployment
         self.import_secrets()
         self.create_dynamodb_table()
+        self.create_media_bucket()
         self.create_lambda_layers()
         self.create_lambda_functions()
         self.create_dynamodb_streams()
@@ -100,10 +103,46 @@ class ChatbotAPIStack(Stack):
             ),
             stream=aws_dynamodb.StreamViewType.NEW_IMAGE,
             billing_mode=aws_dynamodb.BillingMode.PAY_PER_REQUEST,
+            time_to_live_attribute="ttl",
             removal_policy=RemovalPolicy.DESTROY,
         )
         Tags.of(self.dynamodb_table).add("Name", self.app_config["table_name"])
 
+        # Sparse index of the sequencer items with a lease, to recover the
+        # conversations of the executions that never released them
+        self.dynamodb_table.add_global_secondary_index(
+            index_name="sequencer-leases",
+            partition_key=aws_dynamodb.Attribute(
+                name="lease_index", type=aws_dynamodb.AttributeType.STRING
+            ),
+            sort_key=aws_dynamodb.Attribute(
+                name="lease_expires_at", type=aws_dynamodb.AttributeType.NUMBER
+            ),
+            projection_type=aws_dynamodb.ProjectionType.KEYS_ONLY,
+        )
+
+    def create_media_bucket(self) -> None:
+        """
+        Create S3 bucket for storing the media of the messages (image, voice, video).
+        """
+        self.s3_bucket_media = aws_s3.Bucket(
+            self,
+            "S3-Media",
+            bucket_name=f"{self.main_resources_name}-media-{self.account}",
+            auto_delete_objects=True,
+            encryption=aws_s3.BucketEncryption.S3_MANAGED,
+            block_public_access=aws_s3.BlockPublicAccess.BLOCK_ALL,
+            removal_policy=RemovalPolicy.DESTROY,
+            lifecycle_rules=[
+                aws_s3.LifecycleRule(
+                    abort_incomplete_multipart_upload_after=Duration.days(1),
+                    expiration=Duration.days(
+                        self.app_config.get("media_retention_days", 30)
+                    ),
+                ),
+            ],
+        )
+
     def create_lambda_layers(self) -> None:
         """
         Create the Lambda layers that are necessary for the additional runtime
@@ -156,6 +195,13 @@ class ChatbotAPIStack(Stack):
                 "LOG_LEVEL": self.app_config["log_level"],
                 "DYNAMODB_TABLE": self.dynamodb_table.table_name,
                 "SECRET_NAME": self.app_config["secret_name"],
+                "ENABLE_STATUS_TRACKING": str(
+                    self.app_config.get("enable_status_tracking", False)
+                ).lower(),
+                "VALIDATE_META_SIGNATURE": str(
+                    self.app_config.get("validate_meta_signature", True)
+                ).lower(),
+                "ENABLE_DOCS": str(self.app_config.get("enable_docs", True)).lower(),
             },
             layers=[
                 self.lambda_layer_powertools,
@@ -179,12 +225,36 @@ class ChatbotAPIStack(Stack):
             environment={
                 "ENVIRONMENT": self.app_config["deployment_environment"],
                 "LOG_LEVEL": self.app_config["log_level"],
+                "TRIGGER_MAX_WORKERS": str(
+                    self.app_config.get("trigger_max_workers", 10)
+                ),
+                "COALESCE_MESSAGES": str(
+                    self.app_config.get("coalesce_messages", True)
+                ).lower(),
+                "COALESCE_MAX_MESSAGES": str(
+                    self.app_config.get("coalesce_max_messages", 10)
+                ),
+                "DYNAMODB_TABLE": self.dynamodb_table.table_name,
+                "SEQUENCE_CONVERSATIONS": str(
+                    self.app_config.get("sequence_conversations", True)
+                ).lower(),
+                "STALE_MESSAGE_POLICY": self.app_config.get(
+                    "stale_message_policy", "fold"
+                ),
+                "STALE_MESSAGE_MAX_AGE_SECONDS": str(
+                    self.app_config.get("stale_message_max_age_seconds", 900)
+                ),
+                "CATCHING_UP_INTERVAL_SECONDS": str(
+                    self.app_config.get("catching_up_interval_seconds", 3600)
+                ),
             },
             layers=[
                 self.lambda_layer_powertools,
                 self.lambda_layer_common,
             ],
         )
+        # The per-conversation queues (sequencer items) live in the same table
+        self.dynamodb_table.grant_read_write_data(self.lambda_trigger_state_machine)
 
         # Lambda Function that will run the State Machine steps for processing the messages
         # TODO: In the future, can be migrated to MULTIPLE Lambda Functions for each step...
@@ -197,11 +267,50 @@ class ChatbotAPIStack(Stack):
             code=aws_lambda.Code.from_asset(PATH_TO_LAMBDA_FUNCTION_FOLDER),
             timeout=Duration.seconds(60),
             memory_size=512,
+            retry_attempts=0,
             environment={
                 "ENVIRONMENT": self.app_config["deployment_environment"],
                 "LOG_LEVEL": self.app_config["log_level"],
                 "SECRET_NAME": self.app_config["secret_name"],
                 "META_ENDPOINT": self.app_config["meta_endpoint"],
+                "DYNAMODB_TABLE": self.dynamodb_table.table_name,
+                "MEDIA_BUCKET": self.s3_bucket_media.bucket_name,
+                # Built from the name, as the State Machine depends on this function
+                "STATE_MACHINE_ARN": f"arn:aws:states:{self.region}:{self.account}:stateMachine:{self.main_resources_name}-process-message",
+                "EXECUTION_MODE": self.app_config.get(
+                    "execution_mode", "state_machine"
+                ),
+                "PIPELINE_FUNCTION_NAME": f"{self.main_resources_name}-state-machine-lambda",
+                "STREAM_RESPONSES": str(
+                    self.app_config.get("stream_responses", False)
+                ).lower(),
+                "STREAM_MIN_CHUNK_CHARS": str(
+                    self.app_config.get("stream_min_chunk_chars", 120)
+                ),
+                "SESSION_IDLE_SECONDS": str(
+                    self.app_config.get("session_idle_seconds", 1800)
+                ),
+                "SESSION_MAX_TURNS": str(self.app_config.get("session_max_turns", 10)),
+                "SESSION_CARRY_OVER_TURNS": str(
+                    self.app_config.get("session_carry_over_turns", 3)
+                ),
+                "ANSWER_CACHE_ENABLED": str(
+                    self.app_config.get("answer_cache_enabled", False)
+                ).lower(),
+                "ANSWER_CACHE_SEMANTIC": str(
+                    self.app_config.get("answer_cache_semantic", False)
+                ).lower(),
+                "ANSWER_CACHE_TTL_SECONDS": str(
+                    self.app_config.get("answer_cache_ttl_seconds", 3600)
+                ),
+                "LOCAL_INTENTS_ENABLED": str(
+                    self.app_config.get("local_intents_enabled", False)
+                ).lower(),
+                "LOCAL_TIMEZONE": self.app_config.get(
+                    "local_timezone", "America/Bogota"
+                ),
+                # Agents data table, for the action groups of the local intents
+                "TABLE_NAME": self.app_config["agents_data_table_name"],
             },
             layers=[
                 self.lambda_layer_powertools,
@@ -212,11 +321,93 @@ class ChatbotAPIStack(Stack):
         self.dynamodb_table.grant_read_write_data(
             self.lambda_state_machine_process_message
         )
+        self.s3_bucket_media.grant_read_write(self.lambda_state_machine_process_message)
+        # The last step of an execution starts the next queued message of the number
+        self.lambda_state_machine_process_message.add_to_role_policy(
+            aws_iam.PolicyStatement(
+                actions=["states:StartExecution"],
+                resources=[
+                    f"arn:aws:states:{self.region}:{self.account}:stateMachine:{self.main_resources_name}-process-message",
+                ],
+            )
+        )
+        self.lambda_state_machine_process_message.add_to_role_policy(
+            aws_iam.PolicyStatement(
+                actions=["lambda:InvokeFunction"],
+                resources=[
+                    f"arn:aws:lambda:{self.region}:{self.account}:function:{self.main_resources_name}-state-machine-lambda",
+                ],
+            )
+        )
+
+        # Direct execution mode: the trigger invokes this function asynchronously
+        # to run all the steps in-process (no retries, as the State Machine)
+        self.lambda_state_machine_process_message.grant_invoke(
+            self.lambda_trigger_state_machine
+        )
+        self.lambda_trigger_state_machine.add_environment(
+            "EXECUTION_MODE",
+            self.app_config.get("execution_mode", "state_machine"),
+        )
+        self.lambda_trigger_state_machine.add_environment(
+            "PIPELINE_FUNCTION_NAME",
+            self.lambda_state_machine_process_message.function_name,
+        )
         self.lambda_state_machine_process_message.role.add_managed_policy(
             aws_iam.ManagedPolicy.from_aws_managed_policy_name(
                 "AmazonSSMReadOnlyAccess",
             ),
         )
+
+        # Lambda Function that starts the queued messages of the conversations
+        # whose execution died without releasing them (expired leases)
+        self.lambda_sequencer_recovery = aws_lambda.Function(
+            self,
+            "Lambda-Sequencer-Recovery",
+            runtime=aws_lambda.Runtime.PYTHON_3_11,
+            handler="trigger/recovery_handler.lambda_handler",
+            function_name=f"{self.main_resources_name}-sequencer-recovery",
+            code=aws_lambda.Code.from_asset(PATH_TO_LAMBDA_FUNCTION_FOLDER),
+            timeout=Duration.seconds(60),
+            memory_size=256,
+            environment={
+                "ENVIRONMENT": self.app_config["deployment_environment"],
+                "LOG_LEVEL": self.app_config["log_level"],
+                "DYNAMODB_TABLE": self.dynamodb_table.table_name,
+                "STATE_MACHINE_ARN": f"arn:aws:states:{self.region}:{self.account}:stateMachine:{self.main_resources_name}-process-message",
+                "EXECUTION_MODE": self.app_config.get(
+                    "execution_mode", "state_machine"
+                ),
+                "PIPELINE_FUNCTION_NAME": self.lambda_state_machine_process_message.function_name,
+            },
+            layers=[
+                self.lambda_layer_powertools,
+                self.lambda_layer_common,
+            ],
+        )
+        self.dynamodb_table.grant_read_write_data(self.lambda_sequencer_recovery)
+        self.lambda_sequencer_recovery.add_to_role_policy(
+            aws_iam.PolicyStatement(
+                actions=["states:StartExecution"],
+                resources=[
+                    f"arn:aws:states:{self.region}:{self.account}:stateMachine:{self.main_resources_name}-process-message",
+                ],
+            )
+        )
+        self.lambda_state_machine_process_message.grant_invoke(
+            self.lambda_sequencer_recovery
+        )
+        aws_events.Rule(
+            self,
+            "Rule-Sequencer-Recovery",
+            rule_name=f"{self.main_resources_name}-sequencer-recovery",
+            schedule=aws_events.Schedule.rate(
+                Duration.minutes(
+                    self.app_config.get("sequencer_recovery_interval_minutes", 1)
+                )
+            ),
+            targets=[aws_events_targets.LambdaFunction(self.lambda_sequencer_recovery)],
+        )
         self.lambda_state_machine_process_message.role.add_managed_policy(
             aws_iam.ManagedPolicy.from_aws_managed_policy_name(
                 "AmazonBedrockFullAccess",
@@ -272,7 +463,35 @@ class ChatbotAPIStack(Stack):
             aws_lambda_event_sources.DynamoEventSource(
                 self.dynamodb_table,
                 starting_position=aws_lambda.StartingPosition.TRIM_HORIZON,
-                batch_size=1,
+                batch_size=self.app_config.get("stream_batch_size", 10),
+                # Messages of the same number within this window arrive in the
+                # same batch, so the trigger merges them into one agent turn
+                max_batching_window=Duration.seconds(
+                    self.app_config.get("coalescing_window_seconds", 2)
+                ),
+                # The stream checkpoints at the lowest failed record and
+                # re-delivers every record after it (the trigger skips the
+                # answered messages), and a bad record no longer blocks the
+                # shard forever
+                report_batch_item_failures=True,
+                retry_attempts=self.app_config.get("stream_retry_attempts", 5),
+                # Only new messages start the processing (not dedupe/TTL items)
+                filters=[
+                    aws_lambda.FilterCriteria.filter(
+                        {
+                            "eventName": aws_lambda.FilterRule.is_equal("INSERT"),
+                            "dynamodb": {
+                                "NewImage": {
+                                    "SK": {
+                                        "S": aws_lambda.FilterRule.begins_with(
+                                            "MESSAGE#"
+                                        )
+                                    },
+                                },
+                            },
+                        }
+                    )
+                ],
             )
         )
 
@@ -418,6 +637,23 @@ class ChatbotAPIStack(Stack):
             output_path="$.Payload",
         )
 
+        self.task_process_media = aws_sfn_tasks.LambdaInvoke(
+            self,
+            "Task-ProcessMedia",
+            state_name="Process Media",
+            lambda_function=self.lambda_state_machine_process_message,
+            payload=aws_sfn.TaskInput.from_object(
+                {
+                    "event.$": "$",
+                    "params": {
+                        "class_name": "ProcessMedia",
+                        "method_name": "process_media",
+                    },
+                }
+            ),
+            output_path="$.Payload",
+        )
+
         self.task_process_voice = aws_sfn_tasks.LambdaInvoke(
             self,
             "Task-ProcessVoice",
@@ -492,6 +728,33 @@ class ChatbotAPIStack(Stack):
             output_path="$.Payload",
         )
 
+        # The steps that call Meta or Bedrock run again (later) when the dependency
+        # keeps failing with transient errors after the retries in the Lambda.
+        # An open circuit ("CircuitOpenError") is not retried, to fail fast
+        for task in (
+            self.task_process_text,
+            self.task_process_media,
+            self.task_send_message,
+        ):
+            task.add_retry(
+                errors=["TransientDependencyError"],
+                interval=Duration.seconds(3),
+                max_attempts=self.app_config.get("dependency_retry_attempts", 2),
+                backoff_rate=2,
+                jitter_strategy=aws_sfn.JitterType.FULL,
+            )
+
+        # The next queued message of the conversation is started by "Process
+        # Success", so the release runs again if it could not be started (the
+        # failure path saves the failure first, so it is not retried)
+        self.task_process_success.add_retry(
+            errors=["DispatchError"],
+            interval=Duration.seconds(2),
+            max_attempts=self.app_config.get("dispatch_retry_attempts", 3),
+            backoff_rate=2,
+            jitter_strategy=aws_sfn.JitterType.FULL,
+        )
+
         self.task_success = aws_sfn.Succeed(
             self,
             id="Succeed",
@@ -529,11 +792,18 @@ class ChatbotAPIStack(Stack):
         self.task_pass_text.next(
             self.task_process_text.next(self.task_send_message),
         )
-        self.task_pass_voice.next(
-            self.task_process_voice.next(self.task_pass_text),
+        # Media messages are fetched to S3 first, then processed by type
+        self.task_pass_voice.next(self.task_process_media)
+        self.task_pass_image.next(self.task_process_media)
+        self.task_pass_video.next(self.task_process_media)
+        self.task_process_media.next(
+            aws_sfn.Choice(self, "Media Type?")
+            .when(
+                self.choice_voice,
+                self.task_process_voice.next(self.task_pass_text),
+            )
+            .otherwise(self.task_not_implemented)
         )
-        self.task_pass_image.next(self.task_not_implemented)
-        self.task_pass_video.next(self.task_not_implemented)
 
         self.task_not_implemented.next(self.task_send_message)
 
@@ -541,8 +811,30 @@ class ChatbotAPIStack(Stack):
 
         self.task_process_success.next(self.task_success)
 
-        # TODO: Add failure handling for the State Machine with "process_failure"
-        # self.task_process_failure.next(self.task_failure)
+        # Failed steps go to "Process Failure" with the error ("$.error") and the
+        # name of the step ("$.failed_step"), which saves the message for replays
+        for task, state_name in [
+            (self.task_validate_message, "Validate Message"),
+            (self.task_process_media, "Process Media"),
+            (self.task_process_voice, "Process Voice"),
+            (self.task_process_text, "Process Text"),
+            (self.task_send_message, "Send Message"),
+        ]:
+            task_failed_step = aws_sfn.Pass(
+                self,
+                f"Task-{state_name.replace(' ', '')}-Failed",
+                state_name=f"{state_name} Failed",
+                result=aws_sfn.Result.from_string(state_name),
+                result_path="$.failed_step",
+            )
+            task.add_catch(
+                task_failed_step,
+                errors=[aws_sfn.Errors.ALL],
+                result_path="$.error",
+            )
+            task_failed_step.next(self.task_process_failure)
+
+        self.task_process_failure.next(self.task_failure)
 
     def create_state_machine(self) -> None:
         """
@@ -615,6 +907,10 @@ class ChatbotAPIStack(Stack):
         Tags.of(self.agents_data_dynamodb_table).add(
             "Name", self.app_config["agents_data_table_name"]
         )
+        # The simple requests are answered by the State Machine (local intents)
+        self.agents_data_dynamodb_table.grant_read_data(
+            self.lambda_state_machine_process_message
+        )
 
         # Add permissions to the Lambda function resource policy. You use a resource-based policy to allow an AWS service to invoke your function.
         self.lambda_action_groups.add_permission(
@@ -903,6 +1199,10 @@ class ChatbotAPIStack(Stack):
             # foundation_model="anthropic.claude-3-5-sonnet-20240620-v1:0",
             instruction="You are a specialized agent in giving back information about projects, calendar events, contacts or TODOs. If information is asked about projects, contacts or TODOs, do NOT ask for the date. In case that user asks for events, they must provide the <date> and you will make sure it has the format 'YYYY-MM-DD' for the parameter <date> when looking for events and you will use it to get the list of events for that day and return them in a structured format. Always answer in the same language as the user asked. If the user asks for a project, you will return the project information. If the user asks for TODOs, you will return the TODOs from the <FetchTODOs> action group. If the user asks for Contacts, you will return the Contacts from the <FetchContacts> action group. If the user asks for events, you will return the events for that day. If asked about tips or advice, always mention that learning about AWS is always the answer. Never give back additional information than the one requested (only the corresponding projects, events or advice). Always answer back politely to the user by saying his name: 'Santi'.",
             auto_prepare=True,
+            # The sessions of the agent expire with the ones of the chatbot
+            idle_session_ttl_in_seconds=self.app_config.get(
+                "session_idle_seconds", 1800
+            ),
             action_groups=[
                 aws_bedrock.CfnAgent.AgentActionGroupProperty(
                     action_group_name="FetchCalendarEvents",
@@ -0,0 +1,82 @@
+################################################################################
+# Replay of the messages that failed in the State Machine (saved by its
+# "Process Failure" step), e.g. after an outage of the Meta API or Bedrock.
+# The messages already answered and the failures already replayed are skipped,
+# and the replays keep the order of every conversation (sequencer):
+#   python scripts/replay_failures.py --table <table> \
+#       --state-machine-arn <arn> --since 2024-06-19 --dry-run
+#   python scripts/replay_failures.py --table <table> \
+#       --state-machine-arn <arn> --error TransientDependencyError --rate 10
+################################################################################
+
+# Built-in imports
+import argparse
+import os
+import sys
+from collections import Counter
+from datetime import date, datetime, timezone
+
+BACKEND_ROOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"
+)
+
+
+def main() -> None:
+    today = datetime.now(timezone.utc).date()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--table", required=True, help="DynamoDB table")
+    parser.add_argument("--state-machine-arn", help="for the state_machine mode")
+    parser.add_argument(
+        "--execution-mode", choices=["state_machine", "direct"], default="state_machine"
+    )
+    parser.add_argument("--pipeline-function-name", help="for the direct mode")
+    parser.add_argument("--since", type=date.fromisoformat, default=today)
+    parser.add_argument("--until", type=date.fromisoformat, default=today)
+    parser.add_argument("--step", help="only the failures of this step")
+    parser.add_argument("--error", help="only the failures with this error class")
+    parser.add_argument("--rate", type=float, default=5.0, help="replays/s")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--force", action="store_true", help="replay them again")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    # The backend modules read their configuration when they are imported
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["EXECUTION_MODE"] = args.execution_mode
+    if args.pipeline_function_name:
+        os.environ["PIPELINE_FUNCTION_NAME"] = args.pipeline_function_name
+    if args.state_machine_arn:
+        os.environ["STATE_MACHINE_ARN"] = args.state_machine_arn
+    sys.path.insert(0, BACKEND_ROOT)
+
+    from common.helpers.dynamodb_helper import DynamoDBHelper
+    from common.helpers.failure_helper import FailureReplayer, FailureStore
+    from common.helpers.execution_helper import start_execution
+    from common.helpers.sequencer_helper import ConversationSequencer
+
+    dynamodb_helper = DynamoDBHelper(args.table)
+    failure_store = FailureStore(dynamodb_helper)
+    failures = [
+        failure
+        for failure in failure_store.list_failures(args.since, args.until)
+        if (not args.step or failure.step == args.step)
+        and (not args.error or failure.error == args.error)
+    ]
+    summary = Counter((failure.step, failure.error) for failure in failures)
+    print(f"Failures from {args.since} to {args.until}: {len(failures)}")
+    for (step, error), count in summary.most_common():
+        print(f"  {step}: {error} x{count}")
+
+    replayer = FailureReplayer(
+        failure_store,
+        ConversationSequencer(dynamodb_helper, start_execution),
+        rate_per_second=args.rate,
+        max_workers=args.workers,
+        force=args.force,
+    )
+    outcomes = replayer.replay(failures, dry_run=args.dry_run)
+    print(f"Outcomes: {dict(outcomes)}")
+
+
+if __name__ == "__main__":
+    main()
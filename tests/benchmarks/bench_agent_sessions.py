@@ -0,0 +1,170 @@
+################################################################################
+# Benchmark: prompt size and latency of the Bedrock agent turns as the
+# conversations get long, with a single agent session shared by all the users
+# ("TempSessionBedrock", previous behavior) against a session per conversation
+# with idle expiry and bounded history ("SessionManager"). The real
+# "ProcessText" step runs in-process, with a Bedrock stand-in that keeps the
+# history of every session (like the agent) and takes longer for longer prompts:
+#   python tests/benchmarks/bench_agent_sessions.py --users 5 --turns 40
+################################################################################
+
+# Built-in imports
+import argparse
+import time
+from collections import defaultdict
+
+# Own imports
+from benchmark_utils import (
+    MetricsCollector,
+    percentile,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+from local_stand_ins import LocalDynamoDBClient, LocalSSMClient
+
+setup_backend_path()
+setup_fake_aws_environment(
+    ENVIRONMENT="bench",
+    SECRET_NAME="bench-secret",
+    DYNAMODB_TABLE="bench-table",
+)
+
+# Own imports
+from common.helpers import session_helper  # noqa: E402
+from state_machine.processing import bedrock_agent, process_text  # noqa: E402
+
+SSM_PARAMETERS = {
+    "/bench/aws-wpp/bedrock-agent-alias-id-full-string": "arn|BENCHALIAS",
+    "/bench/aws-wpp/bedrock-agent-id": "BENCHAGENT",
+}
+
+ANSWER_TEXT = "Here are your events for that day: " + "meeting at 10:00, " * 10
+
+
+class SessionAwareBedrockAgentRuntimeClient:
+    """
+    Bedrock Agent Runtime stand-in that keeps the history of every session, so
+    the prompt of a turn includes all the previous turns of its session (and the
+    carried over "conversationHistory"), with a latency per prompt character.
+    """
+
+    def __init__(self, base_latency_seconds: float, seconds_per_1k_chars: float):
+        self.base_latency_seconds = base_latency_seconds
+        self.seconds_per_1k_chars = seconds_per_1k_chars
+        self.history_chars = defaultdict(int)
+        self.prompt_chars = []
+
+    def invoke_agent(self, sessionId: str, inputText: str, **kwargs) -> dict:
+        if sessionId not in self.history_chars:
+            messages = (
+                kwargs.get("sessionState", {})
+                .get("conversationHistory", {})
+                .get("messages", [])
+            )
+            self.history_chars[sessionId] = sum(
+                len(message["content"][0]["text"]) for message in messages
+            )
+        prompt_chars = self.history_chars[sessionId] + len(inputText)
+        self.prompt_chars.append(prompt_chars)
+        time.sleep(
+            self.base_latency_seconds + self.seconds_per_1k_chars * prompt_chars / 1000
+        )
+        self.history_chars[sessionId] = prompt_chars + len(ANSWER_TEXT)
+        return {"completion": [{"chunk": {"bytes": ANSWER_TEXT.encode()}}]}
+
+
+def build_event(user: int, turn: int) -> dict:
+    return {
+        "message": {
+            "version": 1,
+            "from_number": f"57300{user:04d}",
+            "type": "text",
+            "correlation_id": f"bench-{user}-{turn}",
+            "text": f"What are my events for 2024-06-{turn % 28 + 1:02d}?",
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=40, help="per user")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="AWS APIs")
+    parser.add_argument("--bedrock-ms", type=float, default=20.0, help="base")
+    parser.add_argument("--ms-per-1k-chars", type=float, default=2.0)
+    args = parser.parse_args()
+
+    latency_seconds = args.latency_ms / 1000
+    bedrock_agent.agent_parameters.ssm_client = LocalSSMClient(
+        SSM_PARAMETERS, latency_seconds
+    )
+    process_text.session_manager.dynamodb_helper.dynamodb_client = LocalDynamoDBClient(
+        latency_seconds
+    )
+    collected_metrics = MetricsCollector(session_helper.metrics)
+    per_conversation_ask_agent = process_text.ProcessText.ask_agent
+
+    def ask_agent_in_shared_session(self, on_chunk=None) -> str:
+        return bedrock_agent.call_bedrock_agent(self.text, on_chunk=on_chunk)
+
+    rows = []
+    buckets = [(1, 10), (11, 20), (21, 40), (41, args.turns)]
+    for per_user in [False, True]:
+        process_text.ProcessText.ask_agent = (
+            per_conversation_ask_agent if per_user else ask_agent_in_shared_session
+        )
+        runtime_client = SessionAwareBedrockAgentRuntimeClient(
+            args.bedrock_ms / 1000, args.ms_per_1k_chars / 1000
+        )
+        bedrock_agent.bedrock_agent_runtime_client = runtime_client
+
+        durations_by_turn = defaultdict(list)
+        prompts_by_turn = defaultdict(list)
+        for turn in range(1, args.turns + 1):
+            for user in range(args.users):
+                start = time.perf_counter()
+                process_text.ProcessText(build_event(user, turn)).process_text()
+                durations_by_turn[turn].append((time.perf_counter() - start) * 1000)
+                prompts_by_turn[turn].append(runtime_client.prompt_chars[-1])
+        session_helper.metrics.flush_metrics()
+
+        for first, last in buckets:
+            if first > args.turns:
+                continue
+            turns = range(first, min(last, args.turns) + 1)
+            durations = [value for turn in turns for value in durations_by_turn[turn]]
+            prompts = [value for turn in turns for value in prompts_by_turn[turn]]
+            rows.append(
+                [
+                    "per conversation" if per_user else "shared",
+                    f"{first}-{min(last, args.turns)}",
+                    f"{sum(prompts) / len(prompts):.0f}",
+                    max(prompts),
+                    f"{percentile(durations, 50):.1f}",
+                    f"{percentile(durations, 95):.1f}",
+                ]
+            )
+
+    print(
+        f"Users: {args.users} | turns per user: {args.turns} | Bedrock: "
+        f"{args.bedrock_ms} ms + {args.ms_per_1k_chars} ms per 1k prompt chars | "
+        f"max turns per session: {session_helper.SESSION_MAX_TURNS} | carried "
+        f"over: {session_helper.SESSION_CARRY_OVER_TURNS} | metrics: "
+        f"{dict(collected_metrics.totals)}"
+    )
+    print_table(
+        [
+            "sessions",
+            "turns",
+            "avg prompt chars",
+            "max prompt chars",
+            "p50 ms",
+            "p95 ms",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
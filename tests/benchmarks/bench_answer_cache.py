@@ -0,0 +1,152 @@
+################################################################################
+# Benchmark: latency of the "ProcessText" step and Bedrock agent calls for a
+# workload of repeated questions about the projects (plus personal questions,
+# that are never cached) starting new conversations, without and with the
+# answer cache. The containers are simulated with a new "AnswerCache" every
+# "--messages-per-container" messages, so the hits after the first ones come
+# from the DynamoDB warm tier:
+#   python tests/benchmarks/bench_answer_cache.py --messages 400 --questions 30
+################################################################################
+
+# Built-in imports
+import argparse
+import random
+import time
+
+# Own imports
+from benchmark_utils import (
+    MetricsCollector,
+    percentile,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+from local_stand_ins import (
+    LocalBedrockAgentRuntimeClient,
+    LocalDynamoDBClient,
+    LocalSSMClient,
+)
+
+setup_backend_path()
+setup_fake_aws_environment(
+    ENVIRONMENT="bench",
+    SECRET_NAME="bench-secret",
+    DYNAMODB_TABLE="bench-table",
+)
+
+# Own imports
+from common.helpers import answer_cache_helper  # noqa: E402
+from state_machine.processing import bedrock_agent, process_text  # noqa: E402
+
+SSM_PARAMETERS = {
+    "/bench/aws-wpp/bedrock-agent-alias-id-full-string": "arn|BENCHALIAS",
+    "/bench/aws-wpp/bedrock-agent-id": "BENCHAGENT",
+}
+
+
+def build_workload(args: argparse.Namespace) -> list[str]:
+    """Questions with a Zipf-like popularity, and some personal questions."""
+    randomizer = random.Random(7)
+    questions = [f"What is the project number {number}?" for number in range(30)]
+    questions = questions[: args.questions]
+    weights = [1 / (rank + 1) for rank in range(len(questions))]
+    workload = []
+    for number in range(args.messages):
+        if randomizer.random() < args.personal_ratio:
+            workload.append(f"What are my events for 2024-06-{number % 28 + 1:02d}?")
+        else:
+            question = randomizer.choices(questions, weights)[0]
+            # Same question with other casing and punctuation
+            workload.append(question.upper() if number % 3 else question.rstrip("?"))
+    return workload
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--questions", type=int, default=30, help="distinct")
+    parser.add_argument("--personal-ratio", type=float, default=0.2)
+    parser.add_argument("--messages-per-container", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="AWS APIs")
+    parser.add_argument("--bedrock-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    latency_seconds = args.latency_ms / 1000
+    bedrock_agent.agent_parameters.ssm_client = LocalSSMClient(
+        SSM_PARAMETERS, latency_seconds
+    )
+    process_text.dynamodb_helper.dynamodb_client = LocalDynamoDBClient(latency_seconds)
+    collected_metrics = MetricsCollector(answer_cache_helper.metrics)
+    workload = build_workload(args)
+
+    rows = []
+    for enabled in [False, True]:
+        process_text.ANSWER_CACHE_ENABLED = enabled
+        runtime_client = LocalBedrockAgentRuntimeClient(args.bedrock_ms / 1000)
+        bedrock_agent.bedrock_agent_runtime_client = runtime_client
+        collected_metrics.totals.clear()
+
+        durations = []
+        for number, text in enumerate(workload):
+            if number % args.messages_per_container == 0:
+                process_text.answer_cache = answer_cache_helper.AnswerCache(
+                    process_text.dynamodb_helper
+                )
+            event = {
+                "message": {
+                    "version": 1,
+                    # First message of each conversation (follow-ups with
+                    # previous turns always go to the agent)
+                    "from_number": f"57{int(enabled)}{number:07d}",
+                    "type": "text",
+                    "correlation_id": f"bench-{number}",
+                    "text": text,
+                },
+            }
+            start = time.perf_counter()
+            process_text.ProcessText(event).process_text()
+            durations.append((time.perf_counter() - start) * 1000)
+            # Flushed per message, as the "log_metrics" of the handler
+            answer_cache_helper.metrics.flush_metrics()
+
+        totals = collected_metrics.totals
+        lookups = totals["AnswerCacheHits"] + totals["AnswerCacheMisses"]
+        rows.append(
+            [
+                "on" if enabled else "off",
+                runtime_client.calls,
+                f"{totals['AnswerCacheHits'] / lookups:.0%}" if lookups else "-",
+                int(totals["AnswerCacheMemoryHits"]),
+                int(totals["AnswerCacheWarmHits"]),
+                int(totals["AnswerCacheUncacheable"]),
+                f"{totals['AnswerCacheLatencySaved'] / 1000:.1f}",
+                f"{percentile(durations, 50):.1f}",
+                f"{percentile(durations, 95):.1f}",
+                f"{sum(durations) / 1000:.2f}",
+            ]
+        )
+
+    print(
+        f"Messages: {args.messages} | distinct questions: {args.questions} | "
+        f"personal: {args.personal_ratio:.0%} | messages per container: "
+        f"{args.messages_per_container} | Bedrock: {args.bedrock_ms} ms"
+    )
+    print_table(
+        [
+            "cache",
+            "agent calls",
+            "hit rate",
+            "memory hits",
+            "warm hits",
+            "uncacheable",
+            "saved s",
+            "p50 ms",
+            "p95 ms",
+            "total s",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+################################################################################
+# Benchmark: messages sent through the real "MetaAPI.post_message" while the
+# Meta API degrades, with a single attempt per message (previous behavior)
+# against the retries, retry budget and circuit breaker of "meta_dependency".
+# Scenarios (simulated locally, latencies in milliseconds):
+#   - healthy: every request succeeds.
+#   - flaky:   a ratio of the requests answers HTTP 503 (transient errors).
+#   - outage:  every request hangs until the connect timeout.
+#   python tests/benchmarks/bench_dependency_resilience.py --messages 100
+################################################################################
+
+# Built-in imports
+import argparse
+import random
+import time
+
+# Own imports
+from benchmark_utils import (
+    MetricsCollector,
+    percentile,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+from local_stand_ins import (
+    LocalHTTPResponse,
+    LocalMetaGraphAPI,
+    LocalSecretsManagerClient,
+)
+
+setup_backend_path()
+setup_fake_aws_environment(
+    LOG_LEVEL="CRITICAL",  # Keep the simulated failures out of the output
+    SECRET_NAME="bench-secret",
+    META_ENDPOINT="https://graph.facebook.local/",
+)
+
+# External imports
+from requests.exceptions import ConnectTimeout  # noqa: E402
+
+# Own imports
+from common.helpers.resilience_helper import (  # noqa: E402
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientDependency,
+    metrics,
+)
+from state_machine.integrations.meta import api_requests  # noqa: E402
+
+CONFIGURED_DEPENDENCY = api_requests.meta_dependency
+
+
+class DegradedMetaGraphAPI(LocalMetaGraphAPI):
+    """Meta Graph API stand-in that fails a ratio of the requests."""
+
+    def __init__(self, scenario: str, error_rate: float, timeout_seconds: float):
+        super().__init__(latency_seconds=0.005)
+        self.scenario = scenario
+        self.error_rate = error_rate
+        self.timeout_seconds = timeout_seconds
+        self.requests = 0
+
+    def post(self, url: str, headers: dict = None, json: dict = None, **kwargs):
+        self.requests += 1
+        if self.scenario == "outage":
+            time.sleep(self.timeout_seconds)
+            raise ConnectTimeout("Simulated connect timeout")
+        if self.scenario == "flaky" and random.random() < self.error_rate:
+            time.sleep(self.latency_seconds)
+            return LocalHTTPResponse(503, {"error": {"message": "Unavailable"}})
+        return super().post(url, headers=headers, json=json, **kwargs)
+
+
+def build_dependency(resilient: bool) -> ResilientDependency:
+    """The configured "meta_dependency", or a single attempt without a circuit."""
+    if resilient:
+        dependency = CONFIGURED_DEPENDENCY
+        return ResilientDependency(
+            dependency.name,
+            is_transient=dependency.is_transient,
+            max_attempts=dependency.max_attempts,
+            base_delay_seconds=dependency.base_delay_seconds,
+            max_delay_seconds=dependency.max_delay_seconds,
+            deadline_seconds=dependency.deadline_seconds,
+            circuit_breaker=CircuitBreaker(
+                dependency.circuit_breaker.failure_threshold,
+                dependency.circuit_breaker.reset_timeout_seconds,
+            ),
+        )
+    return ResilientDependency(
+        "MetaAPI",
+        is_transient=lambda error: False,
+        max_attempts=1,
+        circuit_breaker=CircuitBreaker(failure_threshold=10**9),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.3, help="flaky")
+    parser.add_argument("--timeout-ms", type=float, default=300.0, help="outage")
+    args = parser.parse_args()
+
+    secrets = {"bench-secret": {"META_TOKEN": "x"}}
+    api_requests.secrets_helper.client_sm = LocalSecretsManagerClient(secrets, 0)
+    collected_metrics = MetricsCollector(metrics)
+
+    rows = []
+    for scenario in ["healthy", "flaky", "outage"]:
+        for resilient in [False, True]:
+            meta_graph_api = DegradedMetaGraphAPI(
+                scenario, args.error_rate, args.timeout_ms / 1000
+            )
+            api_requests.requests = meta_graph_api
+            api_requests.meta_dependency = build_dependency(resilient)
+            meta_api = api_requests.MetaAPI()
+
+            durations = []
+            outcomes = {"sent": 0, "failed": 0, "failed fast": 0}
+            for number in range(args.messages):
+                start = time.perf_counter()
+                try:
+                    response = meta_api.post_message(f"Message {number}", "573000")
+                    outcomes["failed" if "error" in response else "sent"] += 1
+                except CircuitOpenError:
+                    outcomes["failed fast"] += 1
+                except Exception:
+                    outcomes["failed"] += 1
+                durations.append((time.perf_counter() - start) * 1000)
+
+            metrics.flush_metrics()
+            rows.append(
+                [
+                    scenario,
+                    "retries + circuit" if resilient else "single attempt",
+                    outcomes["sent"],
+                    outcomes["failed"],
+                    outcomes["failed fast"],
+                    meta_graph_api.requests,
+                    f"{percentile(durations, 50):.1f}",
+                    f"{percentile(durations, 95):.1f}",
+                    f"{sum(durations) / 1000:.2f}",
+                ]
+            )
+
+    print(
+        f"Messages per scenario: {args.messages} | flaky error rate: "
+        f"{args.error_rate} | outage timeout: {args.timeout_ms} ms | "
+        f"metrics: {dict(collected_metrics.totals)}"
+    )
+    print_table(
+        [
+            "scenario",
+            "mode",
+            "sent",
+            "failed",
+            "failed fast",
+            "HTTP requests",
+            "p50 ms",
+            "p95 ms",
+            "total s",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
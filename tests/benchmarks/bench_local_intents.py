@@ -0,0 +1,170 @@
+################################################################################
+# Benchmark: latency of the "ProcessText" step for a mix of simple requests
+# (TODOs, contacts, events of a date) and questions about the projects, with
+# every request going to the Bedrock agent (previous behavior) against the
+# local intents answering the simple ones with the action group functions.
+# The agent stand-in takes the time of an orchestration with one action group:
+#   python tests/benchmarks/bench_local_intents.py --messages 200
+################################################################################
+
+# Built-in imports
+import argparse
+import random
+import time
+
+# Own imports
+from benchmark_utils import (
+    MetricsCollector,
+    percentile,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+from local_stand_ins import (
+    LocalBedrockAgentRuntimeClient,
+    LocalDynamoDBClient,
+    LocalSSMClient,
+)
+
+setup_backend_path()
+setup_fake_aws_environment(
+    ENVIRONMENT="bench",
+    SECRET_NAME="bench-secret",
+    DYNAMODB_TABLE="bench-table",
+    TABLE_NAME="bench-agents-data",
+)
+
+# Own imports
+from bedrock_agent import dynamodb_helper as agents_data  # noqa: E402
+from state_machine.processing import (  # noqa: E402
+    bedrock_agent,
+    local_intents,
+    process_text,
+)
+
+SSM_PARAMETERS = {
+    "/bench/aws-wpp/bedrock-agent-alias-id-full-string": "arn|BENCHALIAS",
+    "/bench/aws-wpp/bedrock-agent-id": "BENCHAGENT",
+}
+
+SIMPLE_REQUESTS = [
+    "What are my TODOs?",
+    "¿Cuáles son mis tareas pendientes?",
+    "contacts",
+    "Dame mis contactos",
+    "agenda for 2024-12-02",
+    "What are my events tomorrow?",
+    "Eventos del 2 de diciembre",
+]
+OTHER_REQUESTS = [
+    "Tell me about the serverless projects",
+    "Which project uses Step Functions?",
+    "Any tips to learn about AWS?",
+]
+
+
+class LocalAgentsDataTable:
+    """Agents data table stand-in (DynamoDB "Table" resource) for the queries."""
+
+    def __init__(self, latency_seconds: float) -> None:
+        self.latency_seconds = latency_seconds
+
+    def query(self, **kwargs) -> dict:
+        time.sleep(self.latency_seconds)
+        return {
+            "Items": [
+                {
+                    "events": ["10:00 AWS meetup", "15:00 Dentist"],
+                    "todo_details": "Prepare the re:Invent talk",
+                    "contact_details": "Santi: +57 300 000 0000",
+                }
+            ]
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--simple-ratio", type=float, default=0.6)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="AWS APIs")
+    parser.add_argument(
+        "--bedrock-ms", type=float, default=300.0, help="with an action group"
+    )
+    args = parser.parse_args()
+
+    latency_seconds = args.latency_ms / 1000
+    bedrock_agent.agent_parameters.ssm_client = LocalSSMClient(
+        SSM_PARAMETERS, latency_seconds
+    )
+    process_text.dynamodb_helper.dynamodb_client = LocalDynamoDBClient(latency_seconds)
+    agents_data.table = LocalAgentsDataTable(latency_seconds)
+    collected_metrics = MetricsCollector(local_intents.metrics)
+
+    randomizer = random.Random(7)
+    workload = [
+        (
+            (True, randomizer.choice(SIMPLE_REQUESTS))
+            if randomizer.random() < args.simple_ratio
+            else (False, randomizer.choice(OTHER_REQUESTS))
+        )
+        for _ in range(args.messages)
+    ]
+
+    rows = []
+    for enabled in [False, True]:
+        process_text.LOCAL_INTENTS_ENABLED = enabled
+        runtime_client = LocalBedrockAgentRuntimeClient(args.bedrock_ms / 1000)
+        bedrock_agent.bedrock_agent_runtime_client = runtime_client
+        collected_metrics.totals.clear()
+
+        durations = {True: [], False: []}
+        for number, (simple, text) in enumerate(workload):
+            event = {
+                "message": {
+                    "version": 1,
+                    "from_number": f"57300{number % 10:04d}",
+                    "type": "text",
+                    "correlation_id": f"bench-{number}",
+                    "text": text,
+                },
+            }
+            start = time.perf_counter()
+            process_text.ProcessText(event).process_text()
+            durations[simple].append((time.perf_counter() - start) * 1000)
+            # Flushed per message, as the "log_metrics" of the handler
+            local_intents.metrics.flush_metrics()
+
+        totals = collected_metrics.totals
+        lookups = totals["LocalIntentHits"] + totals["LocalIntentMisses"]
+        rows.append(
+            [
+                "on" if enabled else "off",
+                runtime_client.calls,
+                f"{totals['LocalIntentHits'] / lookups:.0%}" if lookups else "-",
+                f"{percentile(durations[True], 50):.1f}",
+                f"{percentile(durations[True], 95):.1f}",
+                f"{percentile(durations[False], 50):.1f}",
+                f"{sum(durations[True] + durations[False]) / 1000:.2f}",
+            ]
+        )
+
+    print(
+        f"Messages: {args.messages} | simple requests: {args.simple_ratio:.0%} | "
+        f"Bedrock: {args.bedrock_ms} ms | AWS APIs: {args.latency_ms} ms"
+    )
+    print_table(
+        [
+            "local intents",
+            "agent calls",
+            "hit ratio",
+            "simple p50 ms",
+            "simple p95 ms",
+            "other p50 ms",
+            "total s",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
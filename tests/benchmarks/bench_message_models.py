@@ -0,0 +1,102 @@
+################################################################################
+# Benchmark: per-message cost of the message models and their conversion from
+# and to the DynamoDB low-level format. The previous approaches (model_dump()
+# with the boto3 TypeSerializer and the hand-written "from_dynamodb_item") are
+# compared against the conversions derived from the fields of the models.
+#   python tests/benchmarks/bench_message_models.py --iterations 50000
+################################################################################
+
+# Built-in imports
+import argparse
+import timeit
+
+# Own imports
+from benchmark_utils import print_table, setup_backend_path
+
+setup_backend_path()
+
+# External imports
+from boto3.dynamodb.types import TypeSerializer  # noqa: E402
+
+# Own imports
+from common.models.text_message_model import TextMessageModel  # noqa: E402
+
+serializer = TypeSerializer()
+
+MESSAGE_FIELDS = {
+    "PK": "NUMBER#12345678987",
+    "SK": "MESSAGE#2024-06-19T03:41:42.269532+00:00",
+    "created_at": "2024-06-19T03:41:42.269532+00:00",
+    "from_number": "12345678987",
+    "type": "text",
+    "whatsapp_id": "wamid.HBgMNTczMDAwMDAwMDAxFQIAEhggQjVCRkE0RkI3QjU4",
+    "whatsapp_timestamp": "1718768502",
+    "text": "Hello! What is the status of my last order?",
+    "correlation_id": "2b1e8f0c-8d7b-4d47-9d8f-1c9b5d7f0e11",
+}
+
+
+def previous_to_dynamodb_item(message: TextMessageModel) -> dict:
+    """Previous approach: model_dump() and the boto3 TypeSerializer."""
+    return {
+        key: serializer.serialize(value) for key, value in message.model_dump().items()
+    }
+
+
+def previous_from_dynamodb_item(dynamodb_item: dict) -> TextMessageModel:
+    """Previous approach: hand-written unpacking of every attribute."""
+    return TextMessageModel(
+        PK=dynamodb_item["PK"]["S"],
+        SK=dynamodb_item["SK"]["S"],
+        from_number=dynamodb_item["from_number"]["S"],
+        whatsapp_id=dynamodb_item["whatsapp_id"]["S"],
+        created_at=dynamodb_item["created_at"]["S"],
+        whatsapp_timestamp=dynamodb_item["whatsapp_timestamp"]["S"],
+        type=dynamodb_item["type"]["S"],
+        text=dynamodb_item["text"]["S"],
+        correlation_id=dynamodb_item.get("correlation_id", {}).get("S"),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    message = TextMessageModel(**MESSAGE_FIELDS)
+    dynamodb_item = message.to_dynamodb_item()
+    assert previous_to_dynamodb_item(message) == dynamodb_item
+    assert TextMessageModel.from_dynamodb_item(dynamodb_item) == message
+
+    cases = [
+        (
+            "construct",
+            "validated (__init__)",
+            lambda: TextMessageModel(**MESSAGE_FIELDS),
+        ),
+        (
+            "construct",
+            "trusted (model_construct)",
+            lambda: TextMessageModel.model_construct(**MESSAGE_FIELDS),
+        ),
+        ("serialize", "previous", lambda: previous_to_dynamodb_item(message)),
+        ("serialize", "to_dynamodb_item", message.to_dynamodb_item),
+        ("deserialize", "previous", lambda: previous_from_dynamodb_item(dynamodb_item)),
+        (
+            "deserialize",
+            "from_dynamodb_item",
+            lambda: TextMessageModel.from_dynamodb_item(dynamodb_item),
+        ),
+    ]
+
+    rows = []
+    for operation, approach, function in cases:
+        best = min(timeit.repeat(function, number=args.iterations, repeat=args.repeat))
+        rows.append([operation, approach, f"{best / args.iterations * 1e6:.2f}"])
+
+    print_table(["operation", "approach", "us/message"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,599 @@
+################################################################################
+# Load test: latency of every stage of the message pipeline, end to end:
+#   webhook -> DynamoDB stream -> trigger Lambda -> State Machine steps -> Meta
+# The real handlers run in-process, and DynamoDB, the stream, Step Functions,
+# SSM, Bedrock Agent Runtime and the Meta Graph API are local stand-ins with a
+# simulated latency. Synthetic (or recorded) webhook deliveries are replayed at
+# a fixed rate, and p50/p95/p99 are reported per stage and end to end.
+#   python tests/benchmarks/bench_pipeline_load.py --messages 500 --rate 50
+#   python tests/benchmarks/bench_pipeline_load.py --payloads deliveries.jsonl
+#   python tests/benchmarks/bench_pipeline_load.py --backlog-age-s 3600
+#   python tests/benchmarks/bench_pipeline_load.py --execution-mode direct
+# The conversations are sequenced (one execution in flight per number) with a
+# moto table behind the sequencer, unless "--no-sequencer" is given.
+################################################################################
+
+# Built-in imports
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# External imports
+import boto3
+from moto import mock_aws
+
+# Own imports
+from benchmark_utils import (
+    MetricsCollector,
+    create_messages_table,
+    percentile,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+from local_stand_ins import (
+    LocalBedrockAgentRuntimeClient,
+    LocalDynamoDBClient,
+    LocalDynamoDBStream,
+    LocalLambdaClient,
+    LocalMetaGraphAPI,
+    LocalSecretsManagerClient,
+    LocalSSMClient,
+    LocalStepFunctionsClient,
+    SerializedClient,
+)
+
+setup_backend_path()
+setup_fake_aws_environment(
+    ENVIRONMENT="bench",
+    SECRET_NAME="bench-secret",
+    DYNAMODB_TABLE="bench-table",
+    STATE_MACHINE_ARN="arn:aws:states:us-east-1:000000000000:stateMachine:bench",
+    META_ENDPOINT="https://graph.facebook.local/",
+)
+
+# External imports
+import httpx  # noqa: E402
+
+# Own imports
+from common.enums import ExecutionModes  # noqa: E402
+from common.helpers import execution_helper  # noqa: E402
+from state_machine import base_step_function, state_machine_handler  # noqa: E402
+from state_machine.integrations.meta import api_requests  # noqa: E402
+from state_machine.processing import (  # noqa: E402
+    bedrock_agent,
+    process_text,
+    send_message,
+)
+from state_machine.utils import failure  # noqa: E402
+from trigger import trigger_handler  # noqa: E402
+from trigger.helpers import (  # noqa: E402
+    redelivery_helper,
+    staleness_helper,
+    step_functions_helper,
+)
+from whatsapp_webhook.api.v1.main import app  # noqa: E402
+from whatsapp_webhook.api.v1.routers import webhook  # noqa: E402
+from whatsapp_webhook.helpers.signature_helper import (  # noqa: E402
+    compute_signature,
+)
+
+APP_SECRET = "bench-app-secret"
+SSM_PARAMETERS = {
+    "/bench/aws-wpp/bedrock-agent-alias-id-full-string": "arn|BENCHALIAS",
+    "/bench/aws-wpp/bedrock-agent-id": "BENCHAGENT",
+}
+
+# Same path as the CDK definition for text messages (media messages only go
+# through "Validate Message" and "Send Message", as there is no S3 stand-in)
+TEXT_STEPS = [
+    ("Process Text", "ProcessText", "process_text"),
+    ("Send Message", "SendMessage", "send_message"),
+    ("Process Success", "Success", "process_success"),
+]
+NOT_IMPLEMENTED_STEPS = [
+    ("Send Message", "SendMessage", "send_message"),
+    ("Process Success", "Success", "process_success"),
+]
+
+EXECUTION_MODE = ExecutionModes.STATE_MACHINE
+
+STAGES = [
+    "webhook",
+    "stream",
+    "trigger",
+    "sfn queue",
+    "Validate Message",
+    "Process Text",
+    "Send Message",
+    "Process Success",
+    "Pipeline",
+    "end to end",
+]
+
+
+class LocalLambdaContext:
+    """Minimal Lambda context for the Powertools decorators of the handlers."""
+
+    def __init__(self, function_name: str) -> None:
+        self.function_name = function_name
+        self.function_version = "$LATEST"
+        self.memory_limit_in_mb = 512
+        self.invoked_function_arn = (
+            f"arn:aws:lambda:us-east-1:000000000000:function:{function_name}"
+        )
+        self.aws_request_id = "local"
+
+    def get_remaining_time_in_millis(self) -> int:
+        return 60000
+
+
+class PipelineRecorder:
+    """Thread-safe latencies per stage and timestamps per WhatsApp message."""
+
+    def __init__(self) -> None:
+        self.latencies = defaultdict(list)
+        self.sent_at = {}
+        self.answered_at = {}
+        self.coalesced = {}  # Replied WhatsApp ID -> IDs of the merged messages
+        self.executions_started = 0
+        self.executions_finished = 0
+        self.executions_failed = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, milliseconds: float) -> None:
+        with self._lock:
+            self.latencies[stage].append(milliseconds)
+
+    def message_sent(self, whatsapp_id: str, at: float) -> None:
+        with self._lock:
+            self.sent_at[whatsapp_id] = at
+
+    def messages_coalesced(self, whatsapp_ids: list[str]) -> None:
+        with self._lock:
+            self.coalesced[whatsapp_ids[-1]] = whatsapp_ids
+
+    def message_answered(self, whatsapp_id: str, at: float) -> None:
+        with self._lock:
+            for answered_id in self.coalesced.get(whatsapp_id, [whatsapp_id]):
+                self.answered_at[answered_id] = at
+                if answered_id in self.sent_at:
+                    self.latencies["end to end"].append(
+                        (at - self.sent_at[answered_id]) * 1000
+                    )
+
+    def execution_event(self, started: int = 0, finished: int = 0, failed: int = 0):
+        with self._lock:
+            self.executions_started += started
+            self.executions_finished += finished
+            self.executions_failed += failed
+
+
+class LocalStateMachine:
+    """
+    Runs the executions of the State Machine in a bounded pool of workers, and
+    invokes every LambdaInvoke step through the real "state_machine_handler"
+    with the same payload and JSON round trip as Step Functions. In the "direct"
+    execution mode, the pipeline runs in a single invocation instead.
+    """
+
+    def __init__(
+        self,
+        recorder: PipelineRecorder,
+        concurrency: int,
+        invoke_latency_seconds: float,
+    ) -> None:
+        self.recorder = recorder
+        self.invoke_latency_seconds = invoke_latency_seconds
+        self.context = LocalLambdaContext("bench-state-machine-process-message")
+        self.lambda_invocations = 0
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="sfn"
+        )
+
+    def start_execution(self, name: str, execution_input: str) -> None:
+        self.recorder.execution_event(started=1)
+        message = json.loads(execution_input)["message"]
+        if "coalesced_whatsapp_ids" in message:
+            self.recorder.messages_coalesced(message["coalesced_whatsapp_ids"])
+        self.executor.submit(self.run, execution_input, time.perf_counter())
+
+    def invoke_function(self, payload: dict) -> None:
+        self.start_execution(
+            payload["event"]["execution_name"], json.dumps(payload["event"])
+        )
+
+    def run(self, execution_input: str, queued_at: float) -> None:
+        if EXECUTION_MODE == ExecutionModes.DIRECT:
+            return self.run_direct(execution_input, queued_at)
+
+        self.recorder.add("sfn queue", (time.perf_counter() - queued_at) * 1000)
+        try:
+            state = self.invoke(
+                "Validate Message",
+                "ValidateMessage",
+                "validate_input",
+                json.loads(execution_input),
+            )
+            steps = (
+                TEXT_STEPS
+                if state.get("message_type") == "text"
+                else NOT_IMPLEMENTED_STEPS
+            )
+            for state_name, class_name, method_name in steps:
+                state = self.invoke(state_name, class_name, method_name, state)
+            self.recorder.execution_event(finished=1)
+        except Exception:
+            self.recorder.execution_event(finished=1, failed=1)
+
+    def run_direct(self, execution_input: str, queued_at: float) -> None:
+        self.recorder.add("sfn queue", (time.perf_counter() - queued_at) * 1000)
+        try:
+            state = self.invoke(
+                "Pipeline", "PipelineRunner", "run", json.loads(execution_input)
+            )
+            for state_name, duration_ms in state["step_durations_ms"].items():
+                if state_name != "Pipeline":
+                    self.recorder.add(state_name, duration_ms)
+            self.recorder.execution_event(finished=1)
+        except Exception:
+            self.recorder.execution_event(finished=1, failed=1)
+
+    def invoke(self, state_name: str, class_name: str, method_name: str, state):
+        start = time.perf_counter()
+        with self._lock:
+            self.lambda_invocations += 1
+        if self.invoke_latency_seconds:
+            time.sleep(self.invoke_latency_seconds)
+        payload = json.loads(
+            json.dumps(
+                {
+                    "event": state,
+                    "params": {"class_name": class_name, "method_name": method_name},
+                }
+            )
+        )
+        result = state_machine_handler.lambda_handler(payload, self.context)
+        result = json.loads(json.dumps(result))
+        self.recorder.add(state_name, (time.perf_counter() - start) * 1000)
+        return result
+
+
+def build_trigger_consumer(recorder: PipelineRecorder):
+    """Delivers the stream batches to the real trigger handler."""
+    context = LocalLambdaContext("bench-trigger-state-machine")
+
+    def on_batch(records: list[dict], enqueued_at: list[float]) -> dict:
+        start = time.perf_counter()
+        for record_enqueued_at in enqueued_at:
+            recorder.add("stream", (start - record_enqueued_at) * 1000)
+        response = trigger_handler.lambda_handler({"Records": records}, context)
+        elapsed = (time.perf_counter() - start) * 1000
+        for _ in records:
+            recorder.add("trigger", elapsed)
+        return response
+
+    return on_batch
+
+
+def generate_delivery(message_number: int, users: int, burst: int) -> dict:
+    from_number = f"5730000{(message_number // burst) % users:05d}"
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "id": "bench-entry",
+                "changes": [
+                    {
+                        "field": "messages",
+                        "value": {
+                            "messages": [
+                                {
+                                    "from": from_number,
+                                    "id": f"wamid.load.{message_number}",
+                                    "timestamp": str(int(time.time())),
+                                    "type": "text",
+                                    "text": {"body": "Hello! Where is my order?"},
+                                }
+                            ]
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def load_recorded_deliveries(path: str) -> list[dict]:
+    """Load webhook deliveries from a JSON list or a JSON Lines file."""
+    with open(path, encoding="utf-8") as file:
+        content = file.read().strip()
+    if content.startswith("["):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def replay_delivery(delivery: dict, replay_number: int) -> dict:
+    """Copy of a recorded delivery with unique WhatsApp IDs (avoid the dedupe)."""
+    delivery = json.loads(json.dumps(delivery))
+    for entry in delivery.get("entry", []):
+        for change in entry.get("changes", []):
+            for message in change.get("value", {}).get("messages", []):
+                message["id"] = f"{message.get('id')}.replay.{replay_number}"
+                message["timestamp"] = str(int(time.time()))
+    return delivery
+
+
+def delivery_message_ids(delivery: dict) -> list[str]:
+    return [
+        message.get("id")
+        for entry in delivery.get("entry", [])
+        for change in entry.get("changes", [])
+        for message in change.get("value", {}).get("messages", [])
+    ]
+
+
+async def replay(deliveries, rate: float, recorder: PipelineRecorder) -> list:
+    """Send the deliveries at a fixed rate (open loop, not waiting for answers)."""
+    transport = httpx.ASGITransport(app=app)
+    errors = []
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def send(delivery: dict) -> None:
+            body = json.dumps(delivery).encode()
+            start = time.perf_counter()
+            for whatsapp_id in delivery_message_ids(delivery):
+                recorder.message_sent(whatsapp_id, start)
+            response = await client.post(
+                "/api/v1/webhook",
+                content=body,
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Hub-Signature-256": compute_signature(body, APP_SECRET),
+                },
+            )
+            recorder.add("webhook", (time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+        tasks = []
+        start = time.perf_counter()
+        for delivery_number, delivery in enumerate(deliveries):
+            delay = start + delivery_number / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(delivery)))
+        await asyncio.gather(*tasks)
+    return errors
+
+
+def wait_for_drain(
+    recorder: PipelineRecorder, stream: LocalDynamoDBStream, timeout: float
+) -> bool:
+    """Wait until every stored message went through its State Machine execution."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if stream.idle and recorder.executions_finished == recorder.executions_started:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=30.0, help="deliveries/s")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--burst", type=int, default=1, help="messages in a row")
+    parser.add_argument("--payloads", help="recorded deliveries (JSON or JSONL)")
+    parser.add_argument("--stream-shards", type=int, default=1)
+    parser.add_argument("--stream-batch-size", type=int, default=10)
+    parser.add_argument("--batching-window-ms", type=float, default=2000.0)
+    parser.add_argument("--sfn-concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="AWS APIs")
+    parser.add_argument("--invoke-ms", type=float, default=20.0, help="LambdaInvoke")
+    parser.add_argument("--bedrock-ms", type=float, default=800.0)
+    parser.add_argument("--meta-ms", type=float, default=150.0)
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--no-sequencer", action="store_true")
+    parser.add_argument(
+        "--execution-mode",
+        choices=[mode.value for mode in ExecutionModes],
+        default=ExecutionModes.STATE_MACHINE.value,
+    )
+    parser.add_argument(
+        "--backlog-age-s", type=int, default=0, help="age of the replayed messages"
+    )
+    parser.add_argument("--json-output", help="write the results to this file")
+    args = parser.parse_args()
+
+    global EXECUTION_MODE
+    EXECUTION_MODE = ExecutionModes(args.execution_mode)
+    execution_helper.EXECUTION_MODE = EXECUTION_MODE
+
+    recorder = PipelineRecorder()
+    collected_metrics = MetricsCollector(
+        trigger_handler.metrics, state_machine_handler.metrics
+    )
+    latency_seconds = args.latency_ms / 1000
+
+    # Webhook -> DynamoDB -> stream -> trigger -> Step Functions (local pool)
+    state_machine = LocalStateMachine(
+        recorder, args.sfn_concurrency, args.invoke_ms / 1000
+    )
+    stream = LocalDynamoDBStream(
+        build_trigger_consumer(recorder),
+        shards=args.stream_shards,
+        batch_size=args.stream_batch_size,
+        batching_window_seconds=args.batching_window_ms / 1000,
+    )
+    dynamodb_client = LocalDynamoDBClient(latency_seconds)
+    dynamodb_client.on_insert = stream.on_insert
+    webhook.dynamodb_helper.dynamodb_client = dynamodb_client
+    staleness_helper.dynamodb_helper.table_name = "bench-table"
+    staleness_helper.dynamodb_helper.dynamodb_client = dynamodb_client
+    redelivery_helper.dynamodb_helper.table_name = "bench-table"
+    redelivery_helper.dynamodb_helper.dynamodb_client = dynamodb_client
+    send_message.dynamodb_helper.table_name = "bench-table"
+    send_message.dynamodb_helper.dynamodb_client = dynamodb_client
+    process_text.session_manager.dynamodb_helper.table_name = "bench-table"
+    process_text.session_manager.dynamodb_helper.dynamodb_client = dynamodb_client
+    failure.failure_store.dynamodb_helper.table_name = "bench-table"
+    failure.failure_store.dynamodb_helper.dynamodb_client = dynamodb_client
+    secrets = {"bench-secret": {"META_APP_SECRET": APP_SECRET, "META_TOKEN": "x"}}
+    webhook.secrets_helper.client_sm = LocalSecretsManagerClient(
+        secrets, latency_seconds
+    )
+    stepfunctions_client = LocalStepFunctionsClient(
+        state_machine.start_execution, latency_seconds
+    )
+    lambda_client = LocalLambdaClient(state_machine.invoke_function, latency_seconds)
+    local_clients = {"stepfunctions": stepfunctions_client, "lambda": lambda_client}
+    execution_helper.get_client = lambda service_name, **kwargs: local_clients[
+        service_name
+    ]
+
+    # Per-conversation sequencer (trigger submits, "Process Success" releases)
+    step_functions_helper.SEQUENCE_CONVERSATIONS = not args.no_sequencer
+    sequencer_client = None
+    if not args.no_sequencer:
+        mock_aws().start()
+        create_messages_table("bench-table")
+        sequencer_client = SerializedClient(boto3.client("dynamodb"), latency_seconds)
+        for sequencer in (
+            step_functions_helper.sequencer,
+            base_step_function.get_sequencer(),
+        ):
+            sequencer.dynamodb_helper.table_name = "bench-table"
+            sequencer.dynamodb_helper.dynamodb_client = sequencer_client
+
+    # State Machine steps -> SSM, Bedrock Agent Runtime and Meta Graph API
+    bedrock_agent.agent_parameters.ssm_client = LocalSSMClient(
+        SSM_PARAMETERS, latency_seconds
+    )
+    bedrock_client = LocalBedrockAgentRuntimeClient(args.bedrock_ms / 1000)
+    bedrock_agent.bedrock_agent_runtime_client = bedrock_client
+    api_requests.secrets_helper.client_sm = LocalSecretsManagerClient(
+        secrets, latency_seconds
+    )
+    meta_api = LocalMetaGraphAPI(
+        on_message=lambda json_data: recorder.message_answered(
+            (json_data.get("context") or {}).get("message_id"), time.perf_counter()
+        ),
+        latency_seconds=args.meta_ms / 1000,
+    )
+    api_requests.requests = meta_api
+
+    if args.payloads:
+        recorded = load_recorded_deliveries(args.payloads)
+        deliveries = [
+            replay_delivery(recorded[number % len(recorded)], number)
+            for number in range(args.messages)
+        ]
+    else:
+        deliveries = [
+            generate_delivery(i, args.users, args.burst) for i in range(args.messages)
+        ]
+
+    if args.backlog_age_s:
+        # Backlog replayed from TRIM_HORIZON (e.g. after an outage), so the
+        # staleness policy of the trigger applies to the old messages
+        for delivery in deliveries:
+            for entry in delivery.get("entry", []):
+                for change in entry.get("changes", []):
+                    for message in change.get("value", {}).get("messages", []):
+                        message["timestamp"] = str(
+                            int(time.time()) - args.backlog_age_s
+                        )
+
+    stream.start()
+    start = time.perf_counter()
+    errors = asyncio.run(replay(deliveries, args.rate, recorder))
+    drained = wait_for_drain(recorder, stream, args.drain_timeout)
+    elapsed = time.perf_counter() - start
+    stream.stop()
+    state_machine.executor.shutdown(wait=drained)
+
+    rows = []
+    results = {"stages": {}}
+    for stage in STAGES:
+        values = recorder.latencies.get(stage, [])
+        if not values:
+            continue
+        stage_results = {
+            "count": len(values),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+            "max_ms": max(values),
+        }
+        results["stages"][stage] = stage_results
+        rows.append(
+            [stage, len(values)]
+            + [f"{stage_results[key]:.1f}" for key in ("p50_ms", "p95_ms", "p99_ms")]
+            + [f"{stage_results['max_ms']:.1f}"]
+        )
+
+    answered = len(recorder.answered_at)
+    results.update(
+        {
+            "deliveries": len(deliveries),
+            "offered_rate": args.rate,
+            "answered": answered,
+            "throughput": answered / elapsed,
+            "execution_mode": EXECUTION_MODE.value,
+            "executions": recorder.executions_started,
+            "lambda_invocations": state_machine.lambda_invocations,
+            "bedrock_calls": bedrock_client.calls,
+            "meta_sends": meta_api.calls,
+            "metrics": dict(collected_metrics.totals),
+            "max_conversation_queue_depth": collected_metrics.maximums[
+                "ConversationQueueDepth"
+            ],
+            "duplicate_execution_names": stepfunctions_client.duplicate_names,
+            "sequencer_calls": sequencer_client.calls if sequencer_client else 0,
+            "webhook_errors": len(errors),
+            "stream_failed_batches": stream.failed_batches,
+            "stream_failed_records": stream.failed_records,
+            "executions_failed": recorder.executions_failed,
+            "drained": drained,
+        }
+    )
+
+    print(
+        f"Deliveries: {len(deliveries)} at {args.rate}/s | answered: {answered} | "
+        f"throughput: {results['throughput']:.1f} answers/s | "
+        f"webhook errors: {len(errors)} | failed executions: "
+        f"{recorder.executions_failed} | failed stream records: "
+        f"{stream.failed_records} (batches: {stream.failed_batches})"
+        + ("" if drained else " | NOT DRAINED")
+    )
+    print(
+        f"Execution mode: {EXECUTION_MODE.value} | Lambda invocations: "
+        f"{state_machine.lambda_invocations} | "
+        f"Executions: {recorder.executions_started} | Bedrock calls: "
+        f"{bedrock_client.calls} | Meta sends: {meta_api.calls} | "
+        f"metrics: {dict(collected_metrics.totals)}"
+    )
+    print(
+        f"Max conversation queue depth: "
+        f"{results['max_conversation_queue_depth']} | duplicate execution names: "
+        f"{stepfunctions_client.duplicate_names} | sequencer calls: "
+        f"{results['sequencer_calls']}"
+    )
+    print_table(["stage", "count", "p50 ms", "p95 ms", "p99 ms", "max ms"], rows)
+
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
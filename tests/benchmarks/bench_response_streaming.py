@@ -0,0 +1,157 @@
+################################################################################
+# Benchmark: time until the user gets the first and the last part of the reply,
+# with the agent response sent in one message after the whole generation
+# (previous behavior) against the response streamed in chunks ("ProcessText"
+# with "STREAM_RESPONSES"). The real "ProcessText" and "SendMessage" steps run
+# in-process, with local stand-ins for SSM, Bedrock (generating the response
+# chunk by chunk), Secrets Manager, DynamoDB and the Meta Graph API:
+#   python tests/benchmarks/bench_response_streaming.py --messages 20
+#   python tests/benchmarks/bench_response_streaming.py --chunk-ms 40 --min-chars 80
+################################################################################
+
+# Built-in imports
+import argparse
+import time
+
+# Own imports
+from benchmark_utils import (
+    MetricsCollector,
+    percentile,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+from local_stand_ins import (
+    LocalBedrockAgentRuntimeClient,
+    LocalDynamoDBClient,
+    LocalMetaGraphAPI,
+    LocalSecretsManagerClient,
+    LocalSSMClient,
+)
+
+setup_backend_path()
+setup_fake_aws_environment(
+    ENVIRONMENT="bench",
+    SECRET_NAME="bench-secret",
+    DYNAMODB_TABLE="bench-table",
+    META_ENDPOINT="https://graph.facebook.local/",
+)
+
+# Own imports
+from state_machine.integrations.meta import api_requests  # noqa: E402
+from state_machine.processing import (  # noqa: E402
+    bedrock_agent,
+    process_text,
+    response_streamer,
+    send_message,
+)
+
+SSM_PARAMETERS = {
+    "/bench/aws-wpp/bedrock-agent-alias-id-full-string": "arn|BENCHALIAS",
+    "/bench/aws-wpp/bedrock-agent-id": "BENCHAGENT",
+}
+
+RESPONSE_TEXT = " ".join(
+    f"This is the sentence number {number} of the answer, with some details."
+    for number in range(1, 13)
+)
+
+
+def build_event(number: int) -> dict:
+    return {
+        "message": {
+            "version": 1,
+            "PK": "NUMBER#573000",
+            "SK": f"MESSAGE#2024-06-19T00:00:{number:02d}",
+            "from_number": "573000",
+            "type": "text",
+            "whatsapp_id": f"wamid.local.in.{number}",
+            "correlation_id": f"bench-{number}",
+            "text": "Tell me about my account",
+        },
+        "execution_name": f"bench-{number}",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="AWS APIs")
+    parser.add_argument("--first-token-ms", type=float, default=800.0)
+    parser.add_argument("--chunks", type=int, default=40, help="Bedrock chunks")
+    parser.add_argument("--chunk-ms", type=float, default=60.0, help="per chunk")
+    parser.add_argument("--meta-ms", type=float, default=80.0)
+    parser.add_argument("--min-chars", type=int, default=120)
+    args = parser.parse_args()
+
+    latency_seconds = args.latency_ms / 1000
+    secrets = {"bench-secret": {"META_TOKEN": "x"}}
+    bedrock_agent.agent_parameters.ssm_client = LocalSSMClient(
+        SSM_PARAMETERS, latency_seconds
+    )
+    bedrock_agent.bedrock_agent_runtime_client = LocalBedrockAgentRuntimeClient(
+        args.first_token_ms / 1000,
+        response_text=RESPONSE_TEXT,
+        chunks=args.chunks,
+        chunk_interval_seconds=args.chunk_ms / 1000,
+    )
+    api_requests.secrets_helper.client_sm = LocalSecretsManagerClient(
+        secrets, latency_seconds
+    )
+    dynamodb_client = LocalDynamoDBClient(latency_seconds)
+    send_message.dynamodb_helper.dynamodb_client = dynamodb_client
+    process_text.session_manager.dynamodb_helper.dynamodb_client = dynamodb_client
+    response_streamer.STREAM_MIN_CHUNK_CHARS = args.min_chars
+    collected_metrics = MetricsCollector(response_streamer.metrics)
+
+    rows = []
+    for streamed in [False, True]:
+        process_text.STREAM_RESPONSES = streamed
+        first_reply_ms, last_reply_ms, replies = [], [], 0
+        for number in range(args.messages):
+            sent_at = []
+            api_requests.requests = LocalMetaGraphAPI(
+                on_message=lambda _: sent_at.append(time.perf_counter()),
+                latency_seconds=args.meta_ms / 1000,
+            )
+            start = time.perf_counter()
+            event = process_text.ProcessText(build_event(number)).process_text()
+            send_message.SendMessage(event).send_message()
+
+            first_reply_ms.append((sent_at[0] - start) * 1000)
+            last_reply_ms.append((sent_at[-1] - start) * 1000)
+            replies += len(sent_at)
+        response_streamer.metrics.flush_metrics()
+
+        rows.append(
+            [
+                "streamed chunks" if streamed else "single message",
+                f"{replies / args.messages:.1f}",
+                f"{percentile(first_reply_ms, 50):.1f}",
+                f"{percentile(first_reply_ms, 95):.1f}",
+                f"{percentile(last_reply_ms, 50):.1f}",
+                f"{percentile(last_reply_ms, 95):.1f}",
+            ]
+        )
+
+    print(
+        f"Messages: {args.messages} | response: {len(RESPONSE_TEXT)} chars in "
+        f"{args.chunks} chunks | first token: {args.first_token_ms} ms | chunk: "
+        f"{args.chunk_ms} ms | Meta: {args.meta_ms} ms | min chunk: "
+        f"{args.min_chars} chars | metrics: {dict(collected_metrics.totals)}"
+    )
+    print_table(
+        [
+            "mode",
+            "messages/reply",
+            "first p50 ms",
+            "first p95 ms",
+            "last p50 ms",
+            "last p95 ms",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
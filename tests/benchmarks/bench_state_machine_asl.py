@@ -0,0 +1,269 @@
+################################################################################
+# Profiling of the State Machine workflow offline: the ASL definition is
+# synthesized from the CDK app (or loaded from a file) and executed by the local
+# interpreter ("cdk/helpers/asl_interpreter.py"), which invokes the real
+# "state_machine_handler" in-process. SSM, Bedrock Agent Runtime, Secrets
+# Manager and the Meta Graph API are local stand-ins with a simulated latency.
+# Reports the timing and payload size (bytes in/out) of every state:
+#   python tests/benchmarks/bench_state_machine_asl.py --executions 50
+#   python tests/benchmarks/bench_state_machine_asl.py --dump-definition sm.json
+#   python tests/benchmarks/bench_state_machine_asl.py --definition sm.json
+#   python tests/benchmarks/bench_state_machine_asl.py --input-format record
+################################################################################
+
+# Built-in imports
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+# Own imports
+from benchmark_utils import (
+    REPOSITORY_ROOT,
+    MetricsCollector,
+    percentile,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+from local_stand_ins import (
+    LocalBedrockAgentRuntimeClient,
+    LocalDynamoDBClient,
+    LocalMetaGraphAPI,
+    LocalSecretsManagerClient,
+    LocalSSMClient,
+)
+
+setup_backend_path()
+sys.path.insert(0, REPOSITORY_ROOT)
+setup_fake_aws_environment(
+    ENVIRONMENT="bench",
+    SECRET_NAME="bench-secret",
+    DYNAMODB_TABLE="bench-table",
+    META_ENDPOINT="https://graph.facebook.local/",
+)
+
+# Own imports
+from cdk.helpers.asl_interpreter import (  # noqa: E402
+    ASLInterpreter,
+    definition_from_template,
+)
+from common.models.message_envelope_model import MessageEnvelopeModel  # noqa: E402
+from state_machine import state_machine_handler  # noqa: E402
+from state_machine.integrations.meta import api_requests  # noqa: E402
+from state_machine.processing import (  # noqa: E402
+    bedrock_agent,
+    process_text,
+    send_message,
+)
+from state_machine.utils import failure  # noqa: E402
+
+SSM_PARAMETERS = {
+    "/bench/aws-wpp/bedrock-agent-alias-id-full-string": "arn|BENCHALIAS",
+    "/bench/aws-wpp/bedrock-agent-id": "BENCHAGENT",
+}
+
+
+class LocalLambdaContext:
+    function_name = "bench-state-machine-process-message"
+    function_version = "$LATEST"
+    memory_limit_in_mb = 512
+    invoked_function_arn = (
+        "arn:aws:lambda:us-east-1:000000000000:function:bench-state-machine"
+    )
+    aws_request_id = "local"
+
+    def get_remaining_time_in_millis(self) -> int:
+        return 60000
+
+
+def synthesize_definition() -> dict:
+    """Synthesize the chatbot stack with the "dev" config of cdk.json."""
+    import aws_cdk as cdk
+    import aws_cdk.assertions as assertions
+
+    from cdk.stacks.cdk_chatbot_api_stack import ChatbotAPIStack
+
+    with open(os.path.join(REPOSITORY_ROOT, "cdk.json"), encoding="utf-8") as file:
+        context = json.load(file)["context"]
+    stack = ChatbotAPIStack(
+        cdk.App(),
+        "bench-chatbot-api",
+        context["main_resources_name"],
+        context["app_config"]["dev"],
+    )
+    return definition_from_template(assertions.Template.from_stack(stack).to_json())
+
+
+def generate_execution_input(
+    execution_number: int, text: str, input_format: str = "envelope"
+) -> dict:
+    """
+    Execution input with the same format as the trigger ("trigger_sm"), or with
+    the whole DynamoDB record (previous format) for "input_format" "record".
+    """
+    sort_key = f"MESSAGE#2024-06-19T03:41:42.{execution_number:06d}+00:00"
+    new_image = {
+        "PK": {"S": "NUMBER#573000000001"},
+        "SK": {"S": sort_key},
+        "from_number": {"S": "573000000001"},
+        "type": {"S": "text"},
+        "text": {"S": text},
+        "whatsapp_id": {"S": f"wamid.asl.{execution_number}"},
+        "correlation_id": {"S": f"asl-correlation-{execution_number}"},
+        "created_at": {"S": "2024-06-19T03:41:42+00:00"},
+    }
+    if input_format == "envelope":
+        return {
+            "message": MessageEnvelopeModel.from_new_image(
+                {name: value["S"] for name, value in new_image.items()}
+            ).to_event(),
+            "execution_name": f"573000000001_{execution_number}",
+        }
+    return {
+        "input": {
+            "eventID": f"asl-{execution_number}",
+            "eventName": "INSERT",
+            "eventSource": "aws:dynamodb",
+            "dynamodb": {
+                "Keys": {"PK": new_image["PK"], "SK": new_image["SK"]},
+                "NewImage": new_image,
+                "SequenceNumber": str(execution_number),
+                "StreamViewType": "NEW_AND_OLD_IMAGES",
+            },
+        },
+        "execution_name": f"573000000001_{execution_number}",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--executions", type=int, default=20)
+    parser.add_argument("--definition", help="ASL definition (JSON) to execute")
+    parser.add_argument("--dump-definition", help="write the synthesized ASL here")
+    parser.add_argument("--text", default="Hello! Where is my order?")
+    parser.add_argument(
+        "--input-format", choices=["envelope", "record"], default="envelope"
+    )
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="AWS APIs")
+    parser.add_argument("--invoke-ms", type=float, default=20.0, help="LambdaInvoke")
+    parser.add_argument("--bedrock-ms", type=float, default=200.0)
+    parser.add_argument("--meta-ms", type=float, default=50.0)
+    parser.add_argument("--json-output", help="write the results to this file")
+    args = parser.parse_args()
+
+    if args.definition:
+        with open(args.definition, encoding="utf-8") as file:
+            definition = json.load(file)
+    else:
+        definition = synthesize_definition()
+    if args.dump_definition:
+        with open(args.dump_definition, "w", encoding="utf-8") as file:
+            json.dump(definition, file, indent=2)
+
+    latency_seconds = args.latency_ms / 1000
+    secrets = {"bench-secret": {"META_TOKEN": "x"}}
+    bedrock_agent.agent_parameters.ssm_client = LocalSSMClient(
+        SSM_PARAMETERS, latency_seconds
+    )
+    bedrock_agent.bedrock_agent_runtime_client = LocalBedrockAgentRuntimeClient(
+        args.bedrock_ms / 1000
+    )
+    api_requests.secrets_helper.client_sm = LocalSecretsManagerClient(
+        secrets, latency_seconds
+    )
+    api_requests.requests = LocalMetaGraphAPI(latency_seconds=args.meta_ms / 1000)
+    dynamodb_client = LocalDynamoDBClient(latency_seconds)
+    send_message.dynamodb_helper.dynamodb_client = dynamodb_client
+    process_text.session_manager.dynamodb_helper.dynamodb_client = dynamodb_client
+    failure.failure_store.dynamodb_helper.dynamodb_client = dynamodb_client
+
+    collected_metrics = MetricsCollector(state_machine_handler.metrics)
+    context = LocalLambdaContext()
+
+    def invoke_lambda(function_name: str, payload: dict) -> dict:
+        if args.invoke_ms:
+            time.sleep(args.invoke_ms / 1000)
+        return state_machine_handler.lambda_handler(payload, context)
+
+    interpreter = ASLInterpreter(definition, invoke_lambda)
+    executions = [
+        interpreter.execute(
+            generate_execution_input(number, args.text, args.input_format)
+        )
+        for number in range(args.executions)
+    ]
+
+    states = defaultdict(list)
+    for execution in executions:
+        for record in execution.states:
+            states[record.name].append(record)
+
+    rows = []
+    results = {"states": {}}
+    for state_name, records in states.items():
+        durations = [record.duration_ms for record in records]
+        state_results = {
+            "type": records[0].state_type,
+            "count": len(records),
+            "p50_ms": percentile(durations, 50),
+            "p95_ms": percentile(durations, 95),
+            "avg_input_bytes": sum(r.input_bytes for r in records) / len(records),
+            "avg_output_bytes": sum(r.output_bytes for r in records) / len(records),
+            "max_output_bytes": max(r.output_bytes for r in records),
+        }
+        results["states"][state_name] = state_results
+        rows.append(
+            [
+                state_name,
+                state_results["type"],
+                state_results["count"],
+                f"{state_results['p50_ms']:.1f}",
+                f"{state_results['p95_ms']:.1f}",
+                f"{state_results['avg_input_bytes']:.0f}",
+                f"{state_results['avg_output_bytes']:.0f}",
+                state_results["max_output_bytes"],
+            ]
+        )
+
+    durations = [execution.duration_ms for execution in executions]
+    failed = [execution for execution in executions if execution.status == "FAILED"]
+    results.update(
+        {
+            "executions": len(executions),
+            "failed": len(failed),
+            "errors": sorted({execution.error for execution in failed}),
+            "p50_ms": percentile(durations, 50),
+            "p95_ms": percentile(durations, 95),
+            "metrics": dict(collected_metrics.totals),
+        }
+    )
+
+    print(
+        f"Executions: {len(executions)} | failed: {len(failed)} "
+        f"{results['errors'] or ''}| p50: {results['p50_ms']:.1f} ms | "
+        f"p95: {results['p95_ms']:.1f} ms | metrics: {results['metrics']}"
+    )
+    print_table(
+        [
+            "state",
+            "type",
+            "count",
+            "p50 ms",
+            "p95 ms",
+            "avg in bytes",
+            "avg out bytes",
+            "max out bytes",
+        ],
+        rows,
+    )
+
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
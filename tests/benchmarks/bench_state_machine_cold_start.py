@@ -0,0 +1,134 @@
+################################################################################
+# Benchmark: cold start of the State Machine Lambda handler per step type,
+# measured in fresh interpreters:
+#   - import_ms: time to import "state_machine.state_machine_handler".
+#   - resolve_ms: first dispatch of the step (imports of its module and clients).
+#   - cold_total_ms: import_ms + resolve_ms.
+#   - modules: number of modules loaded after the first dispatch.
+# The step registry ("lazy", only the dispatched step is imported) is compared
+# against importing every step module up front ("eager", previous behavior):
+#   python tests/benchmarks/bench_state_machine_cold_start.py --runs 10
+################################################################################
+
+# Built-in imports
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Own imports
+from benchmark_utils import (
+    REPOSITORY_ROOT,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+
+MODES = ["eager", "lazy"]
+STEPS = [
+    ("ValidateMessage", "validate_input"),
+    ("ProcessText", "process_text"),
+    ("ProcessMedia", "process_media"),
+    ("SendMessage", "send_message"),
+    ("Success", "process_success"),
+]
+
+
+def run_child(mode: str, class_name: str, method_name: str) -> None:
+    """Single cold start in this interpreter (executed as a subprocess)."""
+    setup_backend_path()
+    setup_fake_aws_environment(
+        SECRET_NAME="bench-secret",
+        DYNAMODB_TABLE="bench-table",
+        MEDIA_BUCKET="bench-bucket",
+    )
+
+    start = time.perf_counter()
+    from state_machine import state_machine_handler, step_registry  # noqa: F401
+
+    import_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if mode == "eager":
+        for module_path in step_registry.STEP_MODULES.values():
+            importlib.import_module(module_path)
+    step_registry.get_handler(class_name, method_name)
+    resolve_ms = (time.perf_counter() - start) * 1000
+
+    print(
+        json.dumps(
+            {
+                "import_ms": import_ms,
+                "resolve_ms": resolve_ms,
+                "cold_total_ms": import_ms + resolve_ms,
+                "modules": len(sys.modules),
+            }
+        )
+    )
+
+
+def _run_subprocess(mode: str, class_name: str, method_name: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", mode, class_name, method_name],
+        cwd=REPOSITORY_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "POWERTOOLS_METRICS_DISABLED": "true"},
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    rows = []
+    for class_name, method_name in STEPS:
+        medians = {}
+        for mode in MODES:
+            samples = [
+                _run_subprocess(mode, class_name, method_name) for _ in range(args.runs)
+            ]
+            medians[mode] = {
+                metric: statistics.median(sample[metric] for sample in samples)
+                for metric in samples[0]
+            }
+        eager, lazy = medians["eager"], medians["lazy"]
+        rows.append(
+            [
+                class_name,
+                f"{eager['cold_total_ms']:.1f}",
+                f"{lazy['cold_total_ms']:.1f}",
+                f"{lazy['cold_total_ms'] / eager['cold_total_ms'] - 1:+.0%}",
+                int(eager["modules"]),
+                int(lazy["modules"]),
+            ]
+        )
+
+    print(f"Fresh interpreters: {args.runs} per step and mode (medians)")
+    print_table(
+        [
+            "step",
+            "eager cold ms",
+            "lazy cold ms",
+            "delta",
+            "eager modules",
+            "lazy modules",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+################################################################################
+# Benchmark: records per second consumed from the DynamoDB stream by the
+# trigger Lambda, for several batch sizes and worker pools. Every invocation
+# pays a fixed overhead (stream polling and Lambda invoke) and every record a
+# StartExecution call, both simulated with a local latency. Serial processing
+# (one worker, previous behavior) is compared against the bounded pool.
+#   python tests/benchmarks/bench_trigger_batches.py --records 500
+################################################################################
+
+# Built-in imports
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Own imports
+from benchmark_utils import (
+    MetricsCollector,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+from local_stand_ins import LocalDynamoDBClient, LocalStepFunctionsClient
+
+setup_backend_path()
+setup_fake_aws_environment(
+    LOG_LEVEL="CRITICAL",  # Keep the simulated failures out of the output
+    STATE_MACHINE_ARN="arn:aws:states:us-east-1:000000000000:stateMachine:bench",
+)
+
+# Own imports
+from common.helpers import execution_helper  # noqa: E402
+from trigger import trigger_handler  # noqa: E402
+from trigger.helpers import redelivery_helper, step_functions_helper  # noqa: E402
+
+
+class LocalLambdaContext:
+    function_name = "bench-trigger-state-machine"
+    function_version = "$LATEST"
+    memory_limit_in_mb = 512
+    invoked_function_arn = (
+        "arn:aws:lambda:us-east-1:000000000000:function:bench-trigger-state-machine"
+    )
+    aws_request_id = "local"
+
+
+def generate_record(record_number: int) -> dict:
+    sort_key = f"MESSAGE#2024-06-19T03:41:42.{record_number:06d}+00:00"
+    new_image = {
+        "PK": {"S": f"NUMBER#5730000{record_number % 100:05d}"},
+        "SK": {"S": sort_key},
+        "from_number": {"S": f"5730000{record_number % 100:05d}"},
+        "type": {"S": "text"},
+        "text": {"S": "Hello from the benchmark"},
+        "correlation_id": {"S": f"bench-correlation-{record_number}"},
+    }
+    return {
+        "eventID": f"bench-{record_number}",
+        "eventName": "INSERT",
+        "eventSource": "aws:dynamodb",
+        "dynamodb": {
+            "Keys": {"PK": new_image["PK"], "SK": new_image["SK"]},
+            "NewImage": new_image,
+            "SequenceNumber": str(record_number),
+            "StreamViewType": "NEW_AND_OLD_IMAGES",
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=300)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="per record")
+    parser.add_argument("--invoke-ms", type=float, default=25.0, help="per batch")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    def start_execution(name: str, execution_input: str) -> None:
+        if random.random() < args.failure_rate:
+            raise RuntimeError("Simulated StartExecution failure")
+
+    # Every record is measured on its own (no coalescing of the messages)
+    trigger_handler.COALESCE_MESSAGES = False
+    step_functions_helper.SEQUENCE_CONVERSATIONS = False
+    MetricsCollector(trigger_handler.metrics)
+    stepfunctions_client = LocalStepFunctionsClient(
+        start_execution, args.latency_ms / 1000
+    )
+    execution_helper.get_client = lambda service_name, **kwargs: stepfunctions_client
+    # One BatchGetItem per batch to skip the answered (re-delivered) messages
+    redelivery_helper.dynamodb_helper.dynamodb_client = LocalDynamoDBClient(
+        args.latency_ms / 1000
+    )
+    records = [generate_record(i) for i in range(args.records)]
+    context = LocalLambdaContext()
+
+    rows = []
+    for workers in args.workers:
+        trigger_handler.executor = ThreadPoolExecutor(max_workers=workers)
+        for batch_size in args.batch_sizes:
+            failed = 0
+            start = time.perf_counter()
+            for first in range(0, len(records), batch_size):
+                time.sleep(args.invoke_ms / 1000)
+                response = trigger_handler.lambda_handler(
+                    {"Records": records[first : first + batch_size]}, context
+                )
+                failed += len(response["batchItemFailures"])
+            elapsed = time.perf_counter() - start
+            rows.append(
+                [
+                    workers,
+                    batch_size,
+                    -(-len(records) // batch_size),
+                    failed,
+                    f"{len(records) / elapsed:.1f}",
+                ]
+            )
+        trigger_handler.executor.shutdown()
+
+    print(
+        f"Simulated latency: {args.latency_ms} ms per StartExecution, "
+        f"{args.invoke_ms} ms per invocation"
+    )
+    print_table(
+        ["workers", "batch size", "invocations", "failed records", "records/s"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+################################################################################
+# Benchmark: concurrent requests per second served by the webhook ASGI app.
+# The DynamoDB and Secrets Manager clients are replaced by local stand-ins with
+# a simulated network latency, and the blocking calls inside the event loop
+# (previous behavior) are compared against the bounded executor.
+#   python tests/benchmarks/bench_webhook_asgi_concurrency.py --latency-ms 15
+################################################################################
+
+# Built-in imports
+import argparse
+import asyncio
+import json
+import time
+
+# Own imports
+from benchmark_utils import (
+    percentile,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+from local_stand_ins import LocalDynamoDBClient, LocalSecretsManagerClient
+
+setup_backend_path()
+setup_fake_aws_environment(
+    SECRET_NAME="bench-secret",
+    DYNAMODB_TABLE="bench-table",
+)
+
+# External imports
+import httpx  # noqa: E402
+
+# Own imports
+from whatsapp_webhook.api.v1.main import app  # noqa: E402
+from whatsapp_webhook.api.v1.routers import webhook  # noqa: E402
+from whatsapp_webhook.helpers.signature_helper import (  # noqa: E402
+    compute_signature,
+)
+
+VERIFY_TOKEN = "bench-verify-token"
+APP_SECRET = "bench-app-secret"
+
+
+def generate_delivery(request_number: int) -> dict:
+    return {
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "messages": [
+                                {
+                                    "from": f"5730000{request_number % 1000:05d}",
+                                    "id": f"wamid.asgi.{time.time_ns()}.{request_number}",
+                                    "timestamp": str(int(time.time())),
+                                    "type": "text",
+                                    "text": {"body": "Hello from the benchmark"},
+                                }
+                            ]
+                        }
+                    }
+                ]
+            }
+        ]
+    }
+
+
+async def run_blocking_inline(func, *args, **kwargs):
+    """Previous behavior: the boto3 calls block the event loop."""
+    return func(*args, **kwargs)
+
+
+async def run_load(requests: int, concurrency: int, method: str) -> tuple:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def send(request_number: int) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                if method == "POST":
+                    body = json.dumps(generate_delivery(request_number)).encode()
+                    response = await client.post(
+                        "/api/v1/webhook",
+                        content=body,
+                        headers={
+                            "Content-Type": "application/json",
+                            "X-Hub-Signature-256": compute_signature(body, APP_SECRET),
+                        },
+                    )
+                else:
+                    response = await client.get(
+                        "/api/v1/webhook",
+                        params={
+                            "hub.challenge": "1234",
+                            "hub.verify_token": VERIFY_TOKEN,
+                        },
+                    )
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    return requests / elapsed, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    latency_seconds = args.latency_ms / 1000
+    webhook.dynamodb_helper.dynamodb_client = LocalDynamoDBClient(latency_seconds)
+    webhook.secrets_helper.client_sm = LocalSecretsManagerClient(
+        {
+            "bench-secret": {
+                "AWS_API_KEY_TOKEN": VERIFY_TOKEN,
+                "META_APP_SECRET": APP_SECRET,
+            }
+        },
+        latency_seconds,
+    )
+    executor_run_blocking = webhook.run_blocking
+
+    rows = []
+    for method in ("POST", "GET"):
+        for mode, runner in (
+            ("blocking event loop", run_blocking_inline),
+            ("bounded executor", executor_run_blocking),
+        ):
+            webhook.run_blocking = runner
+            for concurrency in args.concurrency:
+                # Force one secret fetch per run to include the cold cache
+                webhook.secrets_helper.invalidate()
+                requests_per_second, latencies = asyncio.run(
+                    run_load(args.requests, concurrency, method)
+                )
+                rows.append(
+                    [
+                        method,
+                        mode,
+                        concurrency,
+                        f"{requests_per_second:.1f}",
+                        f"{percentile(latencies, 50):.1f}",
+                        f"{percentile(latencies, 95):.1f}",
+                    ]
+                )
+
+    print(f"Simulated AWS latency per call: {args.latency_ms} ms")
+    print_table(
+        ["method", "mode", "concurrency", "req/s", "p50 ms", "p95 ms"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
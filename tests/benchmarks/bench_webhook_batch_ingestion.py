@@ -0,0 +1,113 @@
+################################################################################
+# Benchmark: DynamoDB round trips per webhook delivery.
+# Compares one "put_item" per message (previous approach) against the batch
+# ingestion path of the webhook, for deliveries with several messages.
+#   python tests/benchmarks/bench_webhook_batch_ingestion.py
+################################################################################
+
+# Built-in imports
+import argparse
+import time
+
+# Own imports
+from benchmark_utils import (
+    APICallCounter,
+    create_messages_table,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+
+setup_backend_path()
+setup_fake_aws_environment()
+
+# External imports
+from moto import mock_aws  # noqa: E402
+
+# Own imports
+from common.helpers.dynamodb_helper import DynamoDBHelper  # noqa: E402
+from whatsapp_webhook.api.v1.schemas import WebhookPayloadModel  # noqa: E402
+from whatsapp_webhook.helpers.messages_helper import (  # noqa: E402
+    build_message_items,
+    extract_messages,
+    ingest_messages,
+)
+
+TABLE_NAME = "bench-webhook-batch-ingestion"
+
+
+def generate_delivery(number_of_messages: int, offset: int = 0) -> WebhookPayloadModel:
+    """Generate a webhook delivery spread over several entries and changes."""
+    messages = [
+        {
+            "from": f"5730000{(offset + i) % 100:05d}",
+            "id": f"wamid.bench.{offset + i}",
+            "timestamp": str(int(time.time())),
+            "type": "text",
+            "text": {"body": f"Benchmark message {offset + i}"},
+        }
+        for i in range(number_of_messages)
+    ]
+    half = number_of_messages // 2
+    return WebhookPayloadModel.model_validate(
+        {
+            "object": "whatsapp_business_account",
+            "entry": [
+                {"id": "1", "changes": [{"value": {"messages": messages[:half]}}]},
+                {"id": "2", "changes": [{"value": {"messages": messages[half:]}}]},
+            ],
+        }
+    )
+
+
+def ingest_one_put_per_message(
+    payload: WebhookPayloadModel, helper: DynamoDBHelper
+) -> None:
+    """Previous approach: one PutItem round trip per message."""
+    message_items, _ = build_message_items(extract_messages(payload))
+    for message_item in message_items:
+        helper.put_item(message_item.model_dump())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 25, 60])
+    parser.add_argument("--deliveries", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = []
+    with mock_aws():
+        create_messages_table(TABLE_NAME)
+        helper = DynamoDBHelper(table_name=TABLE_NAME)
+        counter = APICallCounter()
+        counter.register(helper.dynamodb_client)
+
+        offset = 0
+        for size in args.sizes:
+            for name, ingest in (
+                ("put_item per message", ingest_one_put_per_message),
+                ("batch writer", ingest_messages),
+            ):
+                counter.reset()
+                start = time.perf_counter()
+                for _ in range(args.deliveries):
+                    ingest(generate_delivery(size, offset), helper)
+                    offset += size
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                rows.append(
+                    [
+                        size,
+                        name,
+                        f"{counter.total / args.deliveries:.1f}",
+                        f"{elapsed_ms / args.deliveries:.2f}",
+                    ]
+                )
+
+    print_table(
+        ["messages/delivery", "approach", "round trips/delivery", "ms/delivery"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
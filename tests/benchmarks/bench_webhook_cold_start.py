@@ -0,0 +1,270 @@
+################################################################################
+# Benchmark: cold start of the webhook Lambda handler
+# ("whatsapp_webhook.api.v1.main:handler"), measured in fresh interpreters:
+#   - import_ms: time to import the handler module (Lambda "init" phase).
+#   - first_request_ms: first signed POST delivery (lazy clients, secret fetch).
+#   - warm_request_ms: second POST delivery in the same execution environment.
+# Only the network is replaced (botocore's send), so that the client creation,
+# request signing and response parsing are part of the timings.
+# The medians are compared against a baseline to track regressions:
+#   python tests/benchmarks/bench_webhook_cold_start.py --runs 15
+#   python tests/benchmarks/bench_webhook_cold_start.py --update-baseline
+#   python tests/benchmarks/bench_webhook_cold_start.py --importtime 15
+# Note: baselines are machine-specific, so update them on the machine used.
+################################################################################
+
+# Built-in imports
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Own imports
+from benchmark_utils import (
+    REPOSITORY_ROOT,
+    percentile,
+    print_table,
+    setup_backend_path,
+    setup_fake_aws_environment,
+)
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(__file__), "baselines", "webhook_cold_start.json"
+)
+TRACKED_METRICS = ["import_ms", "first_request_ms", "cold_total_ms"]
+REPORTED_METRICS = TRACKED_METRICS + ["warm_request_ms"]
+
+SECRET_NAME = "bench-secret"
+APP_SECRET = "bench-app-secret"
+
+
+class _RawResponse:
+    """Minimal raw HTTP response body for botocore's AWSResponse."""
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def _fake_send(endpoint, request):
+    """Replacement of "botocore.endpoint.Endpoint._send" with canned responses."""
+    from botocore.awsrequest import AWSResponse
+
+    operation = request.headers.get("X-Amz-Target", b"")
+    if isinstance(operation, bytes):
+        operation = operation.decode()
+    operation = operation.split(".")[-1]
+
+    body = {}
+    if operation == "GetSecretValue":
+        body = {
+            "Name": SECRET_NAME,
+            "SecretString": json.dumps({"META_APP_SECRET": APP_SECRET}),
+        }
+    elif operation == "BatchWriteItem":
+        body = {"UnprocessedItems": {}}
+
+    return AWSResponse(
+        request.url,
+        200,
+        {"Content-Type": "application/x-amz-json-1.0"},
+        _RawResponse(json.dumps(body).encode()),
+    )
+
+
+def _api_gateway_event(body: bytes, signature: str) -> dict:
+    return {
+        "resource": "/{proxy+}",
+        "path": "/api/v1/webhook",
+        "httpMethod": "POST",
+        "headers": {
+            "Content-Type": "application/json",
+            "X-Hub-Signature-256": signature,
+        },
+        "multiValueHeaders": {},
+        "queryStringParameters": None,
+        "multiValueQueryStringParameters": None,
+        "requestContext": {
+            "resourcePath": "/{proxy+}",
+            "httpMethod": "POST",
+            "path": "/api/v1/webhook",
+            "stage": "bench",
+        },
+        "body": body.decode(),
+        "isBase64Encoded": False,
+    }
+
+
+def _delivery(wamid: str) -> bytes:
+    message = {
+        "from": "573000000001",
+        "id": wamid,
+        "timestamp": str(int(time.time())),
+        "type": "text",
+        "text": {"body": "Hello from the cold start benchmark"},
+    }
+    body = {"entry": [{"changes": [{"value": {"messages": [message]}}]}]}
+    return json.dumps(body).encode()
+
+
+class _LambdaContext:
+    function_name = "bench-webhook"
+    memory_limit_in_mb = 512
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:bench"
+    aws_request_id = "bench-request"
+
+
+def run_child() -> None:
+    """Single cold start in this interpreter (executed as a subprocess)."""
+    setup_backend_path()
+    setup_fake_aws_environment(
+        SECRET_NAME=SECRET_NAME,
+        DYNAMODB_TABLE="bench-table",
+    )
+
+    start = time.perf_counter()
+    from whatsapp_webhook.api.v1.main import handler
+
+    import_ms = (time.perf_counter() - start) * 1000
+
+    import botocore.endpoint
+    from whatsapp_webhook.helpers.signature_helper import compute_signature
+
+    botocore.endpoint.Endpoint._send = _fake_send
+
+    timings = {"import_ms": import_ms}
+    for name, wamid in (
+        ("first_request_ms", "wamid.1"),
+        ("warm_request_ms", "wamid.2"),
+    ):
+        body = _delivery(wamid)
+        event = _api_gateway_event(body, compute_signature(body, APP_SECRET))
+        start = time.perf_counter()
+        response = handler(event, _LambdaContext())
+        timings[name] = (time.perf_counter() - start) * 1000
+        assert response["statusCode"] == 200, response
+
+    timings["cold_total_ms"] = timings["import_ms"] + timings["first_request_ms"]
+    print(json.dumps(timings))
+
+
+def _run_subprocess(extra_args: list[str] = None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *(extra_args or []), __file__, "--child"],
+        cwd=REPOSITORY_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+        # Metrics are written to stdout by powertools, so they are disabled
+        env={**os.environ, "POWERTOOLS_METRICS_DISABLED": "true"},
+    )
+
+
+def print_import_times(top: int) -> None:
+    """Show the packages with the highest import time (from -X importtime)."""
+    stderr = _run_subprocess(["-X", "importtime"]).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, module = line.removeprefix("import time:").split("|")
+        package = module.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1000
+    print_table(
+        ["package", "import ms"],
+        [
+            [package, f"{ms:.1f}"]
+            for package, ms in sorted(packages.items(), key=lambda i: -i[1])[:top]
+        ],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative increase of the medians over the baseline",
+    )
+    parser.add_argument(
+        "--importtime",
+        type=int,
+        default=0,
+        help="Show the N packages with the slowest imports (no benchmark)",
+    )
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+    if args.importtime:
+        print_import_times(args.importtime)
+        return
+
+    samples = {metric: [] for metric in REPORTED_METRICS}
+    for _ in range(args.runs):
+        timings = json.loads(_run_subprocess().stdout.strip().splitlines()[-1])
+        for metric in REPORTED_METRICS:
+            samples[metric].append(timings[metric])
+    medians = {metric: statistics.median(samples[metric]) for metric in samples}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["medians"]
+
+    rows = []
+    regressions = []
+    for metric in REPORTED_METRICS:
+        delta = "-"
+        if metric in baseline:
+            change = medians[metric] / baseline[metric] - 1
+            delta = f"{change:+.0%}"
+            if metric in TRACKED_METRICS and change > args.tolerance:
+                regressions.append(metric)
+        rows.append(
+            [
+                metric,
+                f"{medians[metric]:.1f}",
+                f"{percentile(samples[metric], 95):.1f}",
+                f"{baseline[metric]:.1f}" if metric in baseline else "-",
+                delta,
+            ]
+        )
+
+    print(f"Fresh interpreters: {args.runs}")
+    print_table(["metric", "median", "p95", "baseline median", "delta"], rows)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "runs": args.runs,
+                    "medians": {k: round(v, 1) for k, v in medians.items()},
+                },
+                baseline_file,
+                indent=2,
+            )
+            baseline_file.write("\n")
+        print(f"Baseline updated: {args.baseline}")
+    elif regressions:
+        print(f"Regression over {args.tolerance:.0%} in: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
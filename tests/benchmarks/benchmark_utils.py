@@ -0,0 +1,119 @@
+################################################################################
+# Shared utilities for the local benchmarks (no AWS account required).
+# Run the benchmarks from the root of the repository, for example:
+#   python tests/benchmarks/bench_webhook_batch_ingestion.py
+################################################################################
+
+# Built-in imports
+import functools
+import os
+import sys
+import statistics
+import threading
+from collections import Counter
+
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+BACKEND_ROOT = os.path.join(REPOSITORY_ROOT, "backend")
+
+
+def setup_backend_path() -> None:
+    """Allow the benchmarks to import the backend modules as the Lambdas do."""
+    if BACKEND_ROOT not in sys.path:
+        sys.path.insert(0, BACKEND_ROOT)
+
+
+def setup_fake_aws_environment(**environment_variables: str) -> None:
+    """Configure fake AWS credentials and the given env vars for local runs."""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    os.environ.setdefault("LOG_LEVEL", "ERROR")  # Keep the logs out of timings
+    os.environ.update(environment_variables)
+
+
+def create_messages_table(table_name: str) -> None:
+    """Create the chatbot table with the same keys as the CDK stack (moto only)."""
+    import boto3
+
+    boto3.client("dynamodb").create_table(
+        TableName=table_name,
+        KeySchema=[
+            {"AttributeName": "PK", "KeyType": "HASH"},
+            {"AttributeName": "SK", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "PK", "AttributeType": "S"},
+            {"AttributeName": "SK", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+class APICallCounter:
+    """Counts the AWS API calls (network round trips) done by boto3 clients."""
+
+    def __init__(self) -> None:
+        self.calls = Counter()
+
+    def register(self, client) -> None:
+        client.meta.events.register("before-call", self._count)
+
+    def _count(self, model, **kwargs) -> None:
+        self.calls[model.name] += 1
+
+    def reset(self) -> None:
+        self.calls.clear()
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+class MetricsCollector:
+    """
+    Sums the EMF metrics flushed by the handlers (Powertools "log_metrics")
+    instead of printing them, so they can be reported by the benchmarks. The
+    Metrics objects of a process share their metric set, so all of them must
+    go through the same collector.
+    """
+
+    def __init__(self, *metrics) -> None:
+        self.totals = Counter()
+        self.maximums = Counter()
+        self._lock = threading.Lock()
+        for metrics_object in metrics:
+            provider = metrics_object.provider
+            provider.flush_metrics = functools.partial(self._flush, provider)
+
+    def _flush(self, provider, raise_on_empty_metrics: bool = False) -> None:
+        with self._lock:
+            for name, metric in list(provider.metric_set.items()):
+                self.totals[name] += sum(metric["Value"])
+                self.maximums[name] = max(self.maximums[name], *metric["Value"])
+            provider.clear_metrics()
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Return the given percentile (0-100) with linear interpolation."""
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[
+        max(0, min(98, int(round(percent)) - 1))
+    ]
+
+
+def print_table(headers: list[str], rows: list[list]) -> None:
+    """Print a simple fixed-width table with the benchmark results."""
+    widths = [
+        max(len(str(header)), *(len(str(row[i])) for row in rows))
+        for i, header in enumerate(headers)
+    ]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(value).ljust(w) for value, w in zip(row, widths)))
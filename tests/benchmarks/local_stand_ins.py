@@ -0,0 +1,465 @@
+################################################################################
+# Local stand-ins for the AWS services used by the chatbot, so that the real
+# handlers can be benchmarked in-process with a configurable network latency.
+################################################################################
+
+# Built-in imports
+import itertools
+import json
+import queue
+import threading
+import time
+import zlib
+
+# External imports
+from botocore.exceptions import ClientError
+
+
+class LocalDynamoDBClient:
+    """
+    In-memory stand-in for the DynamoDB low-level client (only the operations
+    and expressions used by the DynamoDBHelper), with a latency per API call.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0) -> None:
+        self.latency_seconds = latency_seconds
+        self.tables = {}
+        self.calls = 0
+        self.on_insert = None  # Optional callback(table_name, item) for streams
+        self._lock = threading.Lock()
+
+    def _round_trip(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def _key(self, item: dict) -> tuple:
+        return item["PK"]["S"], item["SK"]["S"]
+
+    def _put(self, table_name: str, item: dict) -> None:
+        with self._lock:
+            table = self.tables.setdefault(table_name, {})
+            is_insert = self._key(item) not in table
+            table[self._key(item)] = item
+        if is_insert and self.on_insert:
+            self.on_insert(table_name, item)
+
+    def _exists(self, table_name: str, item: dict, **kwargs) -> bool:
+        """Result of the "attribute_not_exists(PK) OR #ttl < :now" condition."""
+        existing = self.tables.get(table_name, {}).get(self._key(item))
+        now = kwargs.get("ExpressionAttributeValues", {}).get(":now", {})
+        expired = (
+            existing is not None
+            and "N" in now
+            and int(existing.get("ttl", {}).get("N", "0")) < int(now["N"])
+        )
+        return existing is not None and not expired
+
+    def put_item(self, TableName: str, Item: dict, **kwargs) -> dict:
+        self._round_trip()
+        if "ConditionExpression" in kwargs and self._exists(TableName, Item, **kwargs):
+            raise ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException"}},
+                "PutItem",
+            )
+        self._put(TableName, Item)
+        return {}
+
+    def transact_write_items(self, TransactItems: list) -> dict:
+        self._round_trip()
+        puts = [transact_item["Put"] for transact_item in TransactItems]
+        reasons = [
+            {
+                "Code": (
+                    "ConditionalCheckFailed"
+                    if "ConditionExpression" in put
+                    and self._exists(put["TableName"], put["Item"], **put)
+                    else "None"
+                )
+            }
+            for put in puts
+        ]
+        if any(reason["Code"] != "None" for reason in reasons):
+            error = ClientError(
+                {"Error": {"Code": "TransactionCanceledException"}},
+                "TransactWriteItems",
+            )
+            error.response["CancellationReasons"] = reasons
+            raise error
+        for put in puts:
+            self._put(put["TableName"], put["Item"])
+        return {}
+
+    def batch_write_item(self, RequestItems: dict) -> dict:
+        self._round_trip()
+        for table_name, write_requests in RequestItems.items():
+            for write_request in write_requests:
+                self._put(table_name, write_request["PutRequest"]["Item"])
+        return {"UnprocessedItems": {}}
+
+    def get_item(self, TableName: str, Key: dict, **kwargs) -> dict:
+        self._round_trip()
+        item = self.tables.get(TableName, {}).get(self._key(Key))
+        return {"Item": item} if item else {}
+
+    def batch_get_item(self, RequestItems: dict) -> dict:
+        self._round_trip()
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self.tables.get(table_name, {})
+            responses[table_name] = [
+                table[self._key(key)]
+                for key in request["Keys"]
+                if self._key(key) in table
+            ]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def delete_item(self, TableName: str, Key: dict, **kwargs) -> dict:
+        self._round_trip()
+        with self._lock:
+            self.tables.get(TableName, {}).pop(self._key(Key), None)
+        return {}
+
+    def update_item(self, TableName: str, Key: dict, **kwargs) -> dict:
+        self._round_trip()
+        return {}
+
+    def query(self, TableName: str, ExpressionAttributeValues: dict, **kwargs) -> dict:
+        self._round_trip()
+        partition_key = ExpressionAttributeValues[":pk"]["S"]
+        sort_key_portion = ExpressionAttributeValues[":sk"]["S"]
+        items = [
+            item
+            for (pk, sk), item in sorted(self.tables.get(TableName, {}).items())
+            if pk == partition_key and sk.startswith(sort_key_portion)
+        ]
+        return {"Items": items}
+
+
+class LocalSecretsManagerClient:
+    """In-memory stand-in for the Secrets Manager client."""
+
+    def __init__(self, secrets: dict, latency_seconds: float = 0.0) -> None:
+        self.secrets = secrets
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+
+    def get_secret_value(self, SecretId: str) -> dict:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return {"SecretString": json.dumps(self.secrets[SecretId])}
+
+
+class LocalDynamoDBStream:
+    """
+    In-memory stand-in for a DynamoDB stream and its Lambda event source mapping.
+    The INSERT records of the messages (same filter as the CDK stack) are spread
+    over the shards by partition key, and every shard delivers its records in
+    batches to "on_batch(records, enqueued_at)" with one batch in flight at most.
+    The "batchItemFailures" returned by "on_batch" are counted (not retried).
+    Plug it in with: LocalDynamoDBClient.on_insert = stream.on_insert
+    """
+
+    def __init__(
+        self,
+        on_batch,
+        shards: int = 1,
+        batch_size: int = 1,
+        batching_window_seconds: float = 0.0,
+    ) -> None:
+        self.on_batch = on_batch
+        self.batch_size = batch_size
+        self.batching_window_seconds = batching_window_seconds
+        self.records = 0
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed_batches = 0
+        self.failed_records = 0
+        self._lock = threading.Lock()
+        self._queues = [queue.Queue() for _ in range(shards)]
+        self._threads = []
+        self._sequence = itertools.count(1)
+
+    @property
+    def idle(self) -> bool:
+        """Every enqueued record was delivered (and its batch returned)."""
+        return self.delivered == self.enqueued
+
+    @staticmethod
+    def is_new_message(item: dict) -> bool:
+        return item.get("SK", {}).get("S", "").startswith("MESSAGE#")
+
+    def on_insert(self, table_name: str, item: dict) -> None:
+        if not self.is_new_message(item):
+            return
+        with self._lock:
+            self.enqueued += 1
+        sequence_number = next(self._sequence)
+        record = {
+            "eventID": f"local-{sequence_number}",
+            "eventName": "INSERT",
+            "eventVersion": "1.1",
+            "eventSource": "aws:dynamodb",
+            "awsRegion": "us-east-1",
+            "dynamodb": {
+                "ApproximateCreationDateTime": int(time.time()),
+                "Keys": {"PK": item["PK"], "SK": item["SK"]},
+                "NewImage": item,
+                "SequenceNumber": str(sequence_number),
+                "SizeBytes": len(json.dumps(item)),
+                "StreamViewType": "NEW_AND_OLD_IMAGES",
+            },
+            "eventSourceARN": f"arn:aws:dynamodb:us-east-1:000000000000:table/{table_name}/stream/local",
+        }
+        shard = zlib.crc32(item["PK"]["S"].encode()) % len(self._queues)
+        self._queues[shard].put((record, time.perf_counter()))
+
+    def start(self) -> None:
+        for shard_queue in self._queues:
+            thread = threading.Thread(
+                target=self._poll_shard, args=(shard_queue,), daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        for shard_queue in self._queues:
+            shard_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _poll_shard(self, shard_queue: queue.Queue) -> None:
+        while True:
+            entry = shard_queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            deadline = time.perf_counter() + self.batching_window_seconds
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    entry = (
+                        shard_queue.get(timeout=timeout)
+                        if timeout > 0
+                        else shard_queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if entry is None:
+                    shard_queue.put(None)  # Stop after delivering this batch
+                    break
+                batch.append(entry)
+
+            self.records += len(batch)
+            try:
+                response = self.on_batch(
+                    [record for record, _ in batch],
+                    [enqueued_at for _, enqueued_at in batch],
+                )
+                self.failed_records += len(
+                    (response or {}).get("batchItemFailures", [])
+                )
+            except Exception:
+                # The real event source mapping retries the batch; here it is
+                # only counted, so that the benchmark keeps going
+                self.failed_batches += 1
+            with self._lock:
+                self.delivered += len(batch)
+
+
+class SerializedClient:
+    """
+    Proxy for a boto3 client mocked with moto, for the benchmarks that need the
+    real expression semantics (e.g. conditional updates): the calls run one at a
+    time (the moto backends are not thread-safe), after a simulated latency.
+    """
+
+    def __init__(self, client, latency_seconds: float = 0.0) -> None:
+        self.client = client
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        operation = getattr(self.client, name)
+
+        def call(**kwargs):
+            if self.latency_seconds:
+                time.sleep(self.latency_seconds)
+            with self._lock:
+                self.calls += 1
+                return operation(**kwargs)
+
+        return call
+
+
+class LocalStepFunctionsClient:
+    """
+    In-memory stand-in for the Step Functions client: every StartExecution is
+    handed to "on_start_execution(name, input)" (e.g. a local executions pool).
+    """
+
+    def __init__(self, on_start_execution, latency_seconds: float = 0.0) -> None:
+        self.on_start_execution = on_start_execution
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+        self.duplicate_names = 0
+        self._names = set()
+        self._lock = threading.Lock()
+
+    def start_execution(self, stateMachineArn: str, input: str, name: str) -> dict:
+        with self._lock:
+            self.calls += 1
+            if name in self._names:
+                self.duplicate_names += 1
+            self._names.add(name)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        self.on_start_execution(name, input)
+        return {"executionArn": f"{stateMachineArn}:{name}", "startDate": time.time()}
+
+
+class LocalLambdaClient:
+    """
+    In-memory stand-in for the Lambda client: every asynchronous Invoke is
+    handed to "on_invoke(payload)" (e.g. a local pool that runs the function).
+    """
+
+    def __init__(self, on_invoke, latency_seconds: float = 0.0) -> None:
+        self.on_invoke = on_invoke
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, FunctionName: str, InvocationType: str, Payload: str) -> dict:
+        with self._lock:
+            self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        self.on_invoke(json.loads(Payload))
+        return {"StatusCode": 202}
+
+
+class LocalSSMClient:
+    """In-memory stand-in for the SSM Parameter Store client."""
+
+    def __init__(self, parameters: dict, latency_seconds: float = 0.0) -> None:
+        self.parameters = parameters
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+
+    def get_parameter(self, Name: str, WithDecryption: bool = False) -> dict:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return {"Parameter": {"Name": Name, "Value": self.parameters[Name]}}
+
+    def get_parameters(self, Names: list, WithDecryption: bool = False) -> dict:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return {
+            "Parameters": [
+                {"Name": name, "Value": self.parameters[name]}
+                for name in Names
+                if name in self.parameters
+            ],
+            "InvalidParameters": [
+                name for name in Names if name not in self.parameters
+            ],
+        }
+
+
+class LocalBedrockAgentRuntimeClient:
+    """
+    In-memory stand-in for the Bedrock Agent Runtime client, that answers with
+    a fixed text split in chunks after the simulated inference latency. With a
+    "chunk_interval_seconds", the chunks are generated one by one (streaming).
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        response_text: str = "Hello! This is a local answer.",
+        chunks: int = 1,
+        chunk_interval_seconds: float = 0.0,
+    ) -> None:
+        self.latency_seconds = latency_seconds
+        self.response_text = response_text
+        self.chunks = chunks
+        self.chunk_interval_seconds = chunk_interval_seconds
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke_agent(self, **kwargs) -> dict:
+        with self._lock:
+            self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        size = -(-len(self.response_text) // self.chunks)
+        parts = [
+            self.response_text[start : start + size]
+            for start in range(0, len(self.response_text), size)
+        ]
+        return {
+            "completion": self._generate(parts),
+            "sessionId": kwargs.get("sessionId"),
+        }
+
+    def _generate(self, parts: list):
+        for number, part in enumerate(parts):
+            if number and self.chunk_interval_seconds:
+                time.sleep(self.chunk_interval_seconds)
+            yield {"chunk": {"bytes": part.encode()}}
+
+
+class LocalHTTPResponse:
+    """Minimal stand-in for a "requests.Response" with a JSON body."""
+
+    def __init__(self, status_code: int, payload: dict, headers: dict = None) -> None:
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+        self.text = json.dumps(payload)
+
+    def json(self) -> dict:
+        return self.payload
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def close(self) -> None:
+        pass
+
+
+class LocalMetaGraphAPI:
+    """
+    In-memory stand-in for the "requests" calls to the Meta Graph API. Every
+    sent message is handed to "on_message(json_data)" after the latency.
+    Plug it in with: api_requests.requests = LocalMetaGraphAPI(...)
+    """
+
+    def __init__(self, on_message=None, latency_seconds: float = 0.0) -> None:
+        self.on_message = on_message
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+        self._sequence = itertools.count(1)
+
+    def post(self, url: str, headers: dict = None, json: dict = None, **kwargs):
+        message_number = next(self._sequence)
+        self.calls = message_number
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if self.on_message:
+            self.on_message(json)
+        return LocalHTTPResponse(
+            200,
+            {
+                "messaging_product": "whatsapp",
+                "contacts": [{"input": json.get("to"), "wa_id": json.get("to")}],
+                "messages": [{"id": f"wamid.local.out.{message_number}"}],
+            },
+        )
@@ -0,0 +1,134 @@
+# Built-in imports
+import os
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from common.helpers.answer_cache_helper import (
+    AnswerCache,
+    is_cacheable,
+    metrics,
+)
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.text_helper import normalize_text
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1718768000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    yield FakeClock()
+    metrics.clear_metrics()
+
+
+@pytest.fixture
+def dynamodb_helper():
+    """Helper with a mocked DynamoDB table (warm tier)"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb_helper = DynamoDBHelper(table_name="test-table")
+        dynamodb_helper.dynamodb_client = boto3.client("dynamodb")
+        yield dynamodb_helper
+
+
+@pytest.mark.parametrize(
+    "text,question,cacheable",
+    [
+        ("¿Qué es AWS Lambda?", "que es aws lambda", True),
+        ("Tell me about   the project X!!", "tell me about the project x", True),
+        (
+            "What are my events for 2024-06-19?",
+            "what are my events for 2024 06 19",
+            False,
+        ),
+        ("Show me my TODOs", "show me my todos", False),
+        ("¿Qué tengo mañana?", "que tengo manana", False),
+        ("Santi's contacts", "santi s contacts", False),
+    ],
+)
+def test_questions_are_normalized_and_personal_data_is_uncacheable(
+    text, question, cacheable
+):
+    assert normalize_text(text) == question
+    assert is_cacheable(question) is cacheable
+
+
+def test_memory_hits_expire_and_are_evicted(clock):
+    answer_cache = AnswerCache(ttl_seconds=60, max_entries=2, clock=clock)
+    answer_cache.put("What is AWS?", "A cloud", agent_latency_ms=3000)
+    answer_cache.put("What is S3?", "Storage")
+
+    assert answer_cache.get("what is aws") == "A cloud"
+    assert answer_cache.get("My calendar events?") is None
+
+    # The least recently used answer is evicted
+    answer_cache.put("What is EC2?", "Servers")
+    assert answer_cache.get("What is S3?") is None
+    assert answer_cache.get("What is AWS?") == "A cloud"
+
+    clock.now += 60
+    assert answer_cache.get("What is AWS?") is None
+
+
+def test_uncacheable_answers_are_not_saved(clock):
+    answer_cache = AnswerCache(clock=clock)
+    answer_cache.put("What are my TODOs?", "Buy milk")
+    answer_cache.put("What is AWS?", "")
+
+    assert answer_cache.get("What are my TODOs?") is None
+    assert answer_cache.get("What is AWS?") is None
+
+
+def test_warm_tier_is_shared_by_the_containers(dynamodb_helper, clock):
+    AnswerCache(dynamodb_helper, ttl_seconds=60, clock=clock).put(
+        "What is AWS?", "A cloud"
+    )
+    other_container = AnswerCache(dynamodb_helper, ttl_seconds=60, clock=clock)
+    assert other_container.get("What is AWS?") == "A cloud"
+
+    clock.now += 60
+    assert AnswerCache(dynamodb_helper, clock=clock).get("What is AWS?") is None
+
+
+def test_similar_questions_reuse_the_answer(clock):
+    pytest.importorskip("numpy")
+    vectors = {
+        "what is aws": [1.0, 0.0, 0.0],
+        "what is amazon web services": [0.98, 0.2, 0.0],
+        "what is azure": [0.5, 0.0, 0.87],
+    }
+    embedded = []
+
+    def embedder(question: str) -> list[float]:
+        embedded.append(question)
+        return vectors[question]
+
+    answer_cache = AnswerCache(embedder=embedder, similarity_threshold=0.9, clock=clock)
+    assert answer_cache.get("What is AWS?") is None
+    answer_cache.put("What is AWS?", "A cloud")
+
+    assert answer_cache.get("What is Amazon Web Services?") == "A cloud"
+    assert answer_cache.get("What is Azure?") is None
+    # The vector of the missed question is reused to index its answer
+    assert embedded.count("what is aws") == 1
@@ -0,0 +1,58 @@
+# Built-in imports
+import importlib
+import os
+
+# External imports
+import pytest
+from moto import mock_aws
+
+# Own imports
+from backend.common.helpers import aws_clients
+from backend.common.helpers.dynamodb_helper import DynamoDBHelper
+from backend.common.helpers.secrets_helper import SecretsHelper
+
+
+@pytest.fixture(autouse=True)
+def shared_clients():
+    """Mocked AWS environment, without shared clients from other tests"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    aws_clients.clear_clients()
+    with mock_aws():
+        yield
+    aws_clients.clear_clients()
+
+
+def test_get_client_is_shared_per_configuration():
+    client = aws_clients.get_client("dynamodb")
+    assert aws_clients.get_client("dynamodb") is client
+    assert aws_clients.get_client("dynamodb", max_pool_connections=5) is not client
+    assert client.meta.service_model.service_name == "dynamodb"
+
+
+def test_helpers_create_clients_on_first_use(mocker):
+    spy = mocker.spy(aws_clients.boto3, "client")
+
+    dynamodb_helper = DynamoDBHelper(table_name="test-table")
+    secrets_helper = SecretsHelper("test-secret")
+    assert spy.call_count == 0
+
+    assert dynamodb_helper.dynamodb_client is dynamodb_helper.dynamodb_client
+    assert secrets_helper.client_sm is SecretsHelper("other-secret").client_sm
+    assert spy.call_count == 2
+
+
+def test_bedrock_agent_runtime_client_is_created_on_first_use(monkeypatch, mocker):
+    spy = mocker.spy(aws_clients.boto3, "client")
+    os.environ.setdefault("SECRET_NAME", "test-secret")
+    bedrock_agent = importlib.import_module("state_machine.processing.bedrock_agent")
+    monkeypatch.setattr(bedrock_agent, "bedrock_agent_runtime_client", None)
+    # The steps import the helpers from "common" (not from "backend.common")
+    importlib.import_module("common.helpers.aws_clients").clear_clients()
+    assert spy.call_count == 0
+
+    client = bedrock_agent.get_runtime_client()
+
+    assert bedrock_agent.get_runtime_client() is client
+    assert spy.call_count == 1
+    assert client.meta.config.read_timeout == bedrock_agent.BEDROCK_READ_TIMEOUT_SECONDS
+    assert client.meta.config.retries["mode"] == "standard"
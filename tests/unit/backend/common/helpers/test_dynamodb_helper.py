@@ -0,0 +1,112 @@
+# Built-in imports
+import os
+from decimal import Decimal
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from backend.common.helpers.dynamodb_helper import DynamoDBHelper
+
+
+@pytest.fixture
+def dynamodb_helper():
+    """Mocked DynamoDB table with the single-table-design keys"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield DynamoDBHelper(table_name="test-table")
+
+
+def test_put_item_and_get_item(dynamodb_helper):
+    dynamodb_helper.put_item({"PK": "NUMBER#1", "SK": "MESSAGE#1", "count": 3})
+    assert dynamodb_helper.get_item_by_pk_and_sk("NUMBER#1", "MESSAGE#1") == {
+        "PK": {"S": "NUMBER#1"},
+        "SK": {"S": "MESSAGE#1"},
+        "count": {"N": "3"},
+    }
+
+
+def test_put_items_in_chunks_and_query(dynamodb_helper, mocker):
+    spy = mocker.spy(dynamodb_helper.dynamodb_client, "batch_write_item")
+    dynamodb_helper.put_items(
+        [{"PK": "NUMBER#1", "SK": f"MESSAGE#{i:03d}", "count": i} for i in range(60)]
+    )
+    assert spy.call_count == 3
+
+    items = dynamodb_helper.query_by_pk_and_sk_begins_with("NUMBER#1", "MESSAGE#")
+    assert len(items) == 60
+    assert items[5] == {"PK": "NUMBER#1", "SK": "MESSAGE#005", "count": Decimal(5)}
+
+
+def test_put_items_retries_unprocessed_items(dynamodb_helper, mocker):
+    item = {"PK": "NUMBER#1", "SK": "MESSAGE#1"}
+    unprocessed = {
+        "UnprocessedItems": {
+            "test-table": [
+                {"PutRequest": {"Item": dynamodb_helper.serialize_item(item)}}
+            ]
+        }
+    }
+    mocked = mocker.patch.object(
+        dynamodb_helper.dynamodb_client,
+        "batch_write_item",
+        side_effect=[unprocessed, {"UnprocessedItems": {}}],
+    )
+    mocker.patch("backend.common.helpers.dynamodb_helper.time.sleep")
+
+    dynamodb_helper.put_items([item])
+    assert mocked.call_count == 2
+
+
+def test_put_item_if_not_exists_and_delete_item(dynamodb_helper):
+    item = {"PK": "DEDUPE#1", "SK": "DEDUPE"}
+    assert dynamodb_helper.put_item_if_not_exists(item) is True
+    assert dynamodb_helper.put_item_if_not_exists(item) is False
+
+    dynamodb_helper.delete_item("DEDUPE#1", "DEDUPE")
+    assert dynamodb_helper.put_item_if_not_exists(item) is True
+
+
+def test_update_item_attributes(dynamodb_helper):
+    dynamodb_helper.put_item({"PK": "NUMBER#1", "SK": "MESSAGE#1", "type": "image"})
+    dynamodb_helper.update_item_attributes(
+        "NUMBER#1", "MESSAGE#1", {"media_key": "media/1/wamid.1.jpg", "media_size": 10}
+    )
+    assert dynamodb_helper.get_item_by_pk_and_sk("NUMBER#1", "MESSAGE#1") == {
+        "PK": {"S": "NUMBER#1"},
+        "SK": {"S": "MESSAGE#1"},
+        "type": {"S": "image"},
+        "media_key": {"S": "media/1/wamid.1.jpg"},
+        "media_size": {"N": "10"},
+    }
+
+
+def test_get_items_in_chunks_with_projection(dynamodb_helper, mocker):
+    dynamodb_helper.put_items(
+        [
+            {"PK": "NUMBER#1", "SK": f"MESSAGE#{i:03d}", "count": i, "text": "hi"}
+            for i in range(120)
+        ]
+    )
+    spy = mocker.spy(dynamodb_helper.dynamodb_client, "batch_get_item")
+
+    keys = [("NUMBER#1", f"MESSAGE#{i:03d}") for i in range(10, 130)]
+    items = dynamodb_helper.get_items(keys + keys[:5], "PK, SK, answered_at")
+
+    assert spy.call_count == 2
+    assert len(items) == 110
+    assert all(set(item) == {"PK", "SK"} for item in items)
@@ -0,0 +1,120 @@
+# Built-in imports
+import json
+import os
+from datetime import datetime, timezone
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.failure_helper import FailureReplayer, FailureStore
+from common.helpers.sequencer_helper import ConversationSequencer
+
+
+@pytest.fixture
+def failure_store():
+    """Failure store with a mocked DynamoDB table"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb_helper = DynamoDBHelper(table_name="test-table")
+        dynamodb_helper.dynamodb_client = boto3.client("dynamodb")
+        yield FailureStore(dynamodb_helper)
+
+
+class StartedExecutions:
+    def __init__(self) -> None:
+        self.inputs = []
+
+    def __call__(self, name: str, execution_input: str) -> None:
+        self.inputs.append(json.loads(execution_input))
+
+
+def _message(from_number: str, number: int) -> dict:
+    return {
+        "version": 1,
+        "PK": f"NUMBER#{from_number}",
+        "SK": f"MESSAGE#2024-06-19T03:41:4{number}+00:00",
+        "from_number": from_number,
+        "type": "text",
+        "text": f"Message {number}",
+        "whatsapp_id": f"wamid.{number}",
+        "coalesced_count": 2,
+    }
+
+
+def _replayer(failure_store: FailureStore, started: StartedExecutions):
+    sequencer = ConversationSequencer(failure_store.dynamodb_helper)
+    sequencer.start_execution = started
+    return FailureReplayer(failure_store, sequencer, rate_per_second=1000)
+
+
+def test_save_and_list_failures(failure_store):
+    failure_store.save(
+        _message("573001", 1), "exec-1", "Send Message", "TransientDependencyError", "x"
+    )
+    today = datetime.now(timezone.utc).date()
+
+    failures = failure_store.list_failures(today, today)
+
+    assert len(failures) == 1
+    assert failures[0].PK == f"FAILURE#{today.isoformat()}"
+    assert failures[0].step == "Send Message"
+    assert failures[0].whatsapp_id == "wamid.1"
+    assert failures[0].message["coalesced_count"] == 2
+
+
+def test_replay_skips_answered_and_replayed_messages(failure_store):
+    started = StartedExecutions()
+    for number, from_number in [(1, "573001"), (2, "573001"), (3, "573002")]:
+        failure_store.save(
+            _message(from_number, number), f"exec-{number}", "Process Text", "E", ""
+        )
+    # The reply of the third message was sent before the failure
+    failure_store.dynamodb_helper.put_item(
+        {
+            "PK": "NUMBER#573002",
+            "SK": "MESSAGE#2024-06-19T03:41:43+00:00",
+            "answered_at": "2024-06-19T03:41:50+00:00",
+        }
+    )
+    # Only a part of the reply of the fourth one was streamed before the failure
+    failure_store.save(_message("573003", 4), "exec-4", "Process Text", "E", "")
+    failure_store.dynamodb_helper.put_item(
+        {
+            "PK": "NUMBER#573003",
+            "SK": "MESSAGE#2024-06-19T03:41:44+00:00",
+            "partial_reply_at": "2024-06-19T03:41:50+00:00",
+        }
+    )
+    today = datetime.now(timezone.utc).date()
+    failures = failure_store.list_failures(today, today)
+
+    dry_run = _replayer(failure_store, started).replay(failures, dry_run=True)
+    outcomes = _replayer(failure_store, started).replay(failures)
+    again = _replayer(failure_store, started).replay(
+        failure_store.list_failures(today, today)
+    )
+
+    assert dry_run == {"would_replay": 2, "answered": 2}
+    assert outcomes == {"replayed": 2, "answered": 2}
+    assert again == {"already_replayed": 2, "answered": 2}
+    # The second message of the conversation waits for the first one
+    assert len(started.inputs) == 1
+    assert started.inputs[0]["replay_of"] == "exec-1"
+    assert started.inputs[0]["sequenced"] is True
+    assert started.inputs[0]["message"]["text"] == "Message 1"
@@ -0,0 +1,75 @@
+# Built-in imports
+import os
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from backend.common.helpers.parameters_helper import ParametersHelper
+
+
+@pytest.fixture
+def aws_credentials():
+    """Mocked AWS configuration for moto"""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+
+@pytest.fixture
+def mock_parameters(aws_credentials):
+    """Provide mocked client and parameters for the parameters tests"""
+    with mock_aws():
+        ssm_client = boto3.client("ssm", os.environ.get("AWS_DEFAULT_REGION"))
+        ssm_client.put_parameter(Name="/test/agent-id", Value="AGENT", Type="String")
+        ssm_client.put_parameter(
+            Name="/test/agent-alias", Value="arn|ALIAS", Type="SecureString"
+        )
+        yield ssm_client
+
+
+@pytest.fixture
+def parameters_helper(mock_parameters) -> ParametersHelper:
+    return ParametersHelper(["/test/agent-id", "/test/agent-alias"])
+
+
+def test_get_parameters_in_a_single_request(parameters_helper, mocker):
+    spy = mocker.spy(parameters_helper.ssm_client, "get_parameters")
+    assert parameters_helper.get_parameters() == {
+        "/test/agent-id": "AGENT",
+        "/test/agent-alias": "arn|ALIAS",
+    }
+    assert parameters_helper.get_parameter("/test/agent-id") == "AGENT"
+    assert spy.call_count == 1
+
+
+def test_get_parameters_force_refresh(parameters_helper, mock_parameters, mocker):
+    spy = mocker.spy(parameters_helper.ssm_client, "get_parameters")
+    assert parameters_helper.get_parameter("/test/agent-alias") == "arn|ALIAS"
+
+    mock_parameters.put_parameter(
+        Name="/test/agent-alias", Value="arn|NEW", Type="SecureString", Overwrite=True
+    )
+    assert parameters_helper.get_parameter("/test/agent-alias") == "arn|ALIAS"
+    assert parameters_helper.get_parameter("/test/agent-alias", force_refresh=True) == (
+        "arn|NEW"
+    )
+    assert spy.call_count == 2
+
+
+def test_get_parameters_expired_ttl(mock_parameters, mocker):
+    parameters_helper = ParametersHelper(["/test/agent-id"], ttl_seconds=0)
+    spy = mocker.spy(parameters_helper.ssm_client, "get_parameters")
+    parameters_helper.get_parameters()
+    parameters_helper.get_parameters()
+    assert spy.call_count == 2
+
+
+def test_get_parameters_not_found(mock_parameters):
+    parameters_helper = ParametersHelper(["/test/agent-id", "/test/missing"])
+    with pytest.raises(ValueError, match="/test/missing"):
+        parameters_helper.get_parameters()
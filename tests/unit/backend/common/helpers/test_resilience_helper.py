@@ -0,0 +1,124 @@
+# External imports
+import pytest
+
+# Own imports
+from common.enums import CircuitStates
+from common.helpers.resilience_helper import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientDependency,
+    RetryableError,
+    RetryBudget,
+    TransientDependencyError,
+    metrics,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FlakyFunction:
+    """Fails with the given errors (in order) and then returns "ok"."""
+
+    def __init__(self, *errors) -> None:
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def dependency():
+    """Dependency that retries RetryableError, without waiting"""
+    clock = FakeClock()
+    delays = []
+    dependency = ResilientDependency(
+        "Test",
+        is_transient=lambda error: isinstance(error, RetryableError),
+        max_attempts=3,
+        circuit_breaker=CircuitBreaker(failure_threshold=3, clock=clock),
+        sleep=delays.append,
+    )
+    yield dependency, clock, delays
+    metrics.clear_metrics()
+
+
+def test_transient_errors_are_retried_with_backoff(dependency):
+    dependency, _, delays = dependency
+    function = FlakyFunction(RetryableError("503"), RetryableError("429", 1.5))
+
+    assert dependency.call(function) == "ok"
+    assert function.calls == 3
+    # Full jitter for the first retry, and the "Retry-After" for the second one
+    assert 0 <= delays[0] <= dependency.base_delay_seconds
+    assert delays[1] == 1.5
+    assert dependency.circuit_breaker.state == CircuitStates.CLOSED
+
+
+def test_other_errors_are_not_retried(dependency):
+    dependency, _, delays = dependency
+    function = FlakyFunction(ValueError("Bad request"))
+
+    with pytest.raises(ValueError):
+        dependency.call(function)
+    assert function.calls == 1
+    assert delays == []
+
+
+def test_exhausted_retries_raise_transient_dependency_error(dependency):
+    dependency, _, _ = dependency
+    function = FlakyFunction(*[RetryableError("503")] * 3)
+
+    with pytest.raises(TransientDependencyError, match="after 3 attempts"):
+        dependency.call(function)
+    assert function.calls == 3
+
+
+def test_open_circuit_fails_fast_until_the_trial_call(dependency):
+    dependency, clock, _ = dependency
+    with pytest.raises(TransientDependencyError):
+        dependency.call(FlakyFunction(*[RetryableError("503")] * 3))
+    assert dependency.circuit_breaker.state == CircuitStates.OPEN
+
+    # The dependency is not called while the circuit is open
+    function = FlakyFunction()
+    with pytest.raises(CircuitOpenError):
+        dependency.call(function)
+    assert function.calls == 0
+
+    # After the reset timeout, a successful trial call closes the circuit
+    clock.now += dependency.circuit_breaker.reset_timeout_seconds
+    assert dependency.call(function) == "ok"
+    assert dependency.circuit_breaker.state == CircuitStates.CLOSED
+
+
+def test_failed_trial_call_opens_the_circuit_again():
+    clock = FakeClock()
+    circuit_breaker = CircuitBreaker(failure_threshold=1, clock=clock)
+    assert circuit_breaker.record_failure() is True
+
+    clock.now += circuit_breaker.reset_timeout_seconds
+    assert circuit_breaker.allow_request() is True
+    # Only one trial call at a time
+    assert circuit_breaker.allow_request() is False
+    assert circuit_breaker.record_failure() is True
+    assert circuit_breaker.state == CircuitStates.OPEN
+
+
+def test_retry_budget_limits_the_retries(dependency):
+    dependency, _, _ = dependency
+    dependency.retry_budget = RetryBudget(ratio=0.5, max_tokens=1)
+    function = FlakyFunction(RetryableError("503"), RetryableError("503"))
+
+    with pytest.raises(TransientDependencyError, match="retry budget"):
+        dependency.call(function)
+    assert function.calls == 2
@@ -0,0 +1,77 @@
+# Built-in imports
+import os
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from backend.common.helpers.aws_clients import clear_clients
+from backend.common.helpers.s3_helper import MIN_PART_SIZE_BYTES, S3Helper
+
+
+@pytest.fixture
+def s3_helper():
+    """Mocked S3 bucket for the media"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    clear_clients()
+    with mock_aws():
+        boto3.client("s3").create_bucket(Bucket="test-bucket")
+        yield S3Helper(bucket_name="test-bucket")
+    clear_clients()
+
+
+def _chunks(size: int, chunk_size: int = 64 * 1024):
+    for start in range(0, size, chunk_size):
+        yield b"x" * min(chunk_size, size - start)
+
+
+def test_upload_stream_small_content_with_put_object(s3_helper, mocker):
+    spy = mocker.spy(s3_helper.s3_client, "create_multipart_upload")
+    size = s3_helper.upload_stream(_chunks(1000), "media/1.jpg", "image/jpeg")
+
+    assert size == 1000
+    assert spy.call_count == 0
+    response = s3_helper.s3_client.get_object(Bucket="test-bucket", Key="media/1.jpg")
+    assert response["ContentType"] == "image/jpeg"
+    assert len(response["Body"].read()) == 1000
+
+
+def test_upload_stream_multipart_in_fixed_size_parts(s3_helper, mocker):
+    spy = mocker.spy(s3_helper.s3_client, "upload_part")
+    total = 2 * MIN_PART_SIZE_BYTES + 1024
+    size = s3_helper.upload_stream(
+        _chunks(total), "media/2.mp4", part_size=MIN_PART_SIZE_BYTES
+    )
+
+    assert size == total
+    assert [len(call.kwargs["Body"]) for call in spy.call_args_list] == [
+        MIN_PART_SIZE_BYTES,
+        MIN_PART_SIZE_BYTES,
+        1024,
+    ]
+    response = s3_helper.s3_client.head_object(Bucket="test-bucket", Key="media/2.mp4")
+    assert response["ContentLength"] == total
+
+
+def test_upload_stream_aborts_on_failure(s3_helper, mocker):
+    spy = mocker.spy(s3_helper.s3_client, "abort_multipart_upload")
+
+    def failing_chunks():
+        yield from _chunks(MIN_PART_SIZE_BYTES + 1)
+        raise ValueError("download failed")
+
+    with pytest.raises(ValueError):
+        s3_helper.upload_stream(
+            failing_chunks(), "media/3.mp4", part_size=MIN_PART_SIZE_BYTES
+        )
+
+    assert spy.call_count == 1
+    uploads = s3_helper.s3_client.list_multipart_uploads(Bucket="test-bucket")
+    assert not uploads.get("Uploads")
+
+
+def test_upload_stream_rejects_small_parts(s3_helper):
+    with pytest.raises(ValueError):
+        s3_helper.upload_stream(_chunks(10), "media/4.jpg", part_size=1024)
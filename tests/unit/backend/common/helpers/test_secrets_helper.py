@@ -73,3 +73,59 @@ def test_get_secret_value_without_key(secrets_helper):
 def test_get_secret_value_with_key_invalid(secrets_helper):
     with pytest.raises(KeyError):
         secrets_helper.get_secret_value("test-invalid-key")
+
+
+def test_get_secret_value_is_cached(secrets_helper, mocker):
+    spy = mocker.spy(secrets_helper.client_sm, "get_secret_value")
+    assert secrets_helper.get_secret_value("username") == "test-user"
+    assert secrets_helper.get_secret_value("password") == "test-password"
+    assert secrets_helper.get_secret_value() == secrets_helper.json_secret
+    assert spy.call_count == 1
+
+
+def test_get_secret_value_force_refresh(secrets_helper, mock_secret, mocker):
+    spy = mocker.spy(secrets_helper.client_sm, "get_secret_value")
+    assert secrets_helper.get_secret_value("token") == "test-token"
+
+    mock_secret.put_secret_value(
+        SecretId="test-secret",
+        SecretString=json.dumps({"token": "rotated-token"}),
+    )
+    assert secrets_helper.get_secret_value("token") == "test-token"
+    assert secrets_helper.get_secret_value("token", force_refresh=True) == (
+        "rotated-token"
+    )
+    assert spy.call_count == 2
+
+
+def test_get_secret_value_after_invalidate(secrets_helper, mocker):
+    spy = mocker.spy(secrets_helper.client_sm, "get_secret_value")
+    secrets_helper.get_secret_value()
+    secrets_helper.invalidate()
+    secrets_helper.get_secret_value()
+    assert spy.call_count == 2
+
+
+def test_get_secret_value_expired_ttl(mock_secret, mocker):
+    secrets_helper = SecretsHelper("test-secret", ttl_seconds=0)
+    spy = mocker.spy(secrets_helper.client_sm, "get_secret_value")
+    secrets_helper.get_secret_value()
+    secrets_helper.get_secret_value()
+    assert spy.call_count == 2
+
+
+def test_get_secret_value_refresh_ahead_keeps_cached_value_on_error(
+    mock_secret, mocker
+):
+    secrets_helper = SecretsHelper(
+        "test-secret", ttl_seconds=300, refresh_ahead_seconds=300
+    )
+    assert secrets_helper.get_secret_value("username") == "test-user"
+
+    # Within the refresh-ahead window, a failed refresh must not break callers
+    mocker.patch.object(
+        secrets_helper.client_sm,
+        "get_secret_value",
+        side_effect=ClientError({"Error": {"Code": "Throttling"}}, "GetSecretValue"),
+    )
+    assert secrets_helper.get_secret_value("username") == "test-user"
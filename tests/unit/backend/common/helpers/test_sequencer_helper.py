@@ -0,0 +1,218 @@
+# Built-in imports
+import os
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.sequencer_helper import (
+    SEQUENCER_LEASE_INDEX,
+    ConversationSequencer,
+    DispatchError,
+    build_execution_name,
+)
+
+
+@pytest.fixture
+def sequencer():
+    """Sequencer with a mocked DynamoDB table"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "lease_index", "AttributeType": "S"},
+                {"AttributeName": "lease_expires_at", "AttributeType": "N"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": SEQUENCER_LEASE_INDEX,
+                    "KeySchema": [
+                        {"AttributeName": "lease_index", "KeyType": "HASH"},
+                        {"AttributeName": "lease_expires_at", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "KEYS_ONLY"},
+                }
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb_helper = DynamoDBHelper(table_name="test-table")
+        dynamodb_helper.dynamodb_client = boto3.client("dynamodb")
+        yield ConversationSequencer(dynamodb_helper, dispatch_attempts=2)
+
+
+class StartedExecutions:
+    def __init__(self) -> None:
+        self.names = []
+
+    def __call__(self, name: str, execution_input: str) -> None:
+        self.names.append(name)
+
+
+def test_build_execution_name_is_unique_per_message():
+    first = build_execution_name(
+        "12345678987", "MESSAGE#2024-06-19T03:41:42.269532+00:00", "corr-1"
+    )
+    second = build_execution_name(
+        "12345678987", "MESSAGE#2024-06-19T03:41:42.269533+00:00", "corr-1"
+    )
+    assert first == "12345678987_202406190341422695320000_corr-1"
+    assert first != second
+    assert len(build_execution_name("1" * 15, "MESSAGE#1", "x" * 100)) == 80
+
+
+def test_one_execution_in_flight_per_conversation(sequencer):
+    started = StartedExecutions()
+
+    assert sequencer.submit("1", "a", {"n": 1}, started) == 1
+    assert sequencer.submit("1", "b", {"n": 2}, started) == 2
+    assert sequencer.submit("1", "c", {"n": 3}, started) == 3
+    assert sequencer.submit("2", "x", {"n": 4}, started) == 1
+    assert started.names == ["a", "x"]
+
+    # The next messages start in order, once the previous one finishes
+    assert sequencer.release("1", "a", started) == "b"
+    assert sequencer.release("1", "b", started) == "c"
+    assert sequencer.release("1", "c", started) is None
+    assert started.names == ["a", "x", "b", "c"]
+
+    # The conversation is idle again
+    assert sequencer.submit("1", "d", {"n": 5}, started) == 1
+    assert started.names[-1] == "d"
+
+
+def test_submit_is_idempotent(sequencer):
+    started = StartedExecutions()
+    sequencer.submit("1", "a", {}, started)
+    sequencer.submit("1", "b", {}, started)
+    assert sequencer.submit("1", "b", {}, started) == 2
+    assert sequencer.release("1", "a", started) == "b"
+    assert sequencer.release("1", "b", started) is None
+
+
+def test_failed_start_goes_back_to_the_queue(sequencer):
+    def failing_start(name: str, execution_input: str) -> None:
+        raise RuntimeError("Throttled")
+
+    with pytest.raises(DispatchError):
+        sequencer.submit("1", "a", {}, failing_start)
+
+    # The retry of the same record starts it
+    started = StartedExecutions()
+    assert sequencer.submit("1", "a", {}, started) == 1
+    assert started.names == ["a"]
+
+
+def test_failed_start_after_a_release_is_retried(sequencer):
+    started = StartedExecutions()
+    sequencer.submit("1", "a", {}, started)
+    sequencer.submit("1", "b", {}, started)
+    sequencer.submit("1", "c", {}, started)
+
+    def flaky_start(name: str, execution_input: str) -> None:
+        flaky_start.calls += 1
+        if flaky_start.calls == 1:
+            raise RuntimeError("Throttled")
+        started(name, execution_input)
+
+    # A transient failure is retried within the release
+    flaky_start.calls = 0
+    assert sequencer.release("1", "a", flaky_start) == "b"
+
+    # A persistent failure gives it back, and the retry of the release starts it
+    def failing_start(name: str, execution_input: str) -> None:
+        raise RuntimeError("Throttled")
+
+    with pytest.raises(DispatchError):
+        sequencer.release("1", "b", failing_start)
+    assert sequencer.release("1", "b", started) == "c"
+    assert started.names == ["a", "b", "c"]
+
+
+def test_expired_lease_is_taken_over(sequencer):
+    started = StartedExecutions()
+    sequencer.lease_seconds = -1
+    sequencer.submit("1", "a", {}, started)
+    sequencer.submit("1", "b", {}, started)
+
+    assert started.names == ["a", "b"]
+    assert sequencer.release("1", "a", started) is None
+
+
+def test_dead_execution_with_queued_messages_is_recovered(sequencer):
+    started = StartedExecutions()
+    sequencer.submit("1", "a", {}, started)
+    sequencer.submit("1", "b", {}, started)
+    sequencer.submit("1", "c", {}, started)
+    sequencer.submit("2", "x", {}, started)
+
+    # The executions still hold their conversations
+    assert sequencer.recover_expired_leases(started) == []
+
+    # "a" and "x" die without a release, and their leases expire
+    sequencer.lease_seconds = -1
+    for from_number, name in [("1", "a"), ("2", "x")]:
+        sequencer.dynamodb_helper.update_item(
+            f"NUMBER#{from_number}",
+            "SEQUENCER",
+            "SET lease_expires_at = :lease",
+            attribute_values={":lease": 0},
+        )
+    assert sequencer.recover_expired_leases(started) == ["b"]
+    assert started.names == ["a", "x", "b"]
+
+    # "b" dies too, so "c" starts, and "x" (with nothing queued) left the index
+    assert sequencer.recover_expired_leases(started) == ["c"]
+    sequencer.lease_seconds = 300
+    assert sequencer.release("1", "c", started) is None
+    assert sequencer.recover_expired_leases(started) == []
+    assert sequencer.submit("2", "y", {}, started) == 1
+    assert started.names == ["a", "x", "b", "c", "y"]
+
+
+def test_failed_start_is_recovered(sequencer):
+    def failing_start(name: str, execution_input: str) -> None:
+        raise RuntimeError("Throttled")
+
+    with pytest.raises(DispatchError):
+        sequencer.submit("1", "a", {}, failing_start)
+
+    # No retry of the stream record or the release arrives
+    started = StartedExecutions()
+    assert sequencer.recover_expired_leases(started) == ["a"]
+    assert sequencer.release("1", "a", started) is None
+    assert sequencer.recover_expired_leases(started) == []
+
+
+def test_redelivered_names_are_skipped_after_they_finish(sequencer):
+    started = StartedExecutions()
+    sequencer.submit("1", "a", {}, started)
+    assert sequencer.release("1", "a", started) is None
+
+    # The stream re-delivers the record after a failure later in its batch
+    assert sequencer.submit("1", "a", {}, started) == 0
+    assert started.names == ["a"]
+
+
+def test_completed_names_are_trimmed_in_batches(sequencer):
+    started = StartedExecutions()
+    sequencer.completed_names = 2
+    for name in "abcd":
+        sequencer.submit("1", name, {}, started)
+        sequencer.release("1", name, started)
+
+    item = sequencer.dynamodb_helper.deserialize_item(
+        sequencer.dynamodb_helper.get_item_by_pk_and_sk("NUMBER#1", "SEQUENCER")
+    )
+    assert item["completed_names"] == ["c", "d"]
+    assert sequencer.submit("1", "b", {}, started) == 1
+    assert started.names == ["a", "b", "c", "d", "b"]
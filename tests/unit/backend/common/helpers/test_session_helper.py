@@ -0,0 +1,130 @@
+# Built-in imports
+import os
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from common.helpers.dynamodb_helper import DynamoDBHelper
+from common.helpers.session_helper import SessionManager, build_session_id, metrics
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1718768000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def session_manager():
+    """Session manager with a mocked DynamoDB table and a fake clock"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb_helper = DynamoDBHelper(table_name="test-table")
+        dynamodb_helper.dynamodb_client = boto3.client("dynamodb")
+        clock = FakeClock()
+        yield SessionManager(
+            dynamodb_helper,
+            idle_seconds=600,
+            max_turns=3,
+            carry_over_turns=2,
+            clock=clock,
+        ), clock
+    metrics.clear_metrics()
+
+
+def test_sessions_are_per_conversation(session_manager):
+    session_manager, _ = session_manager
+    session = session_manager.get_session("573000")
+    session_manager.record_turn(session, "Hi", "Hello!")
+
+    assert session_manager.get_session("573000").session_id == session.session_id
+    assert session_manager.get_session("573001").session_id != session.session_id
+    # The phone number is not exposed in the agent session
+    assert "573000" not in session.session_id
+    assert session.session_id == build_session_id("573000", 1718768000)
+
+
+def test_idle_sessions_expire_without_history(session_manager):
+    session_manager, clock = session_manager
+    session = session_manager.get_session("573000")
+    session_manager.record_turn(session, "Hi", "Hello!")
+
+    clock.now += 600
+    new_session = session_manager.get_session("573000")
+    assert new_session.session_id != session.session_id
+    assert session_manager.conversation_history(new_session) == []
+
+
+def test_long_sessions_carry_over_the_last_turns(session_manager):
+    session_manager, clock = session_manager
+    session = session_manager.get_session("573000")
+    for number in range(3):
+        assert session_manager.get_session("573000").session_id == session.session_id
+        session_manager.record_turn(
+            session_manager.get_session("573000"), f"Q{number}", f"A{number}" * 600
+        )
+        clock.now += 1
+
+    new_session = session_manager.get_session("573000")
+    assert new_session.session_id != session.session_id
+    history = session_manager.conversation_history(new_session)
+    assert [message["role"] for message in history] == [
+        "user",
+        "assistant",
+        "user",
+        "assistant",
+    ]
+    assert history[0]["content"] == [{"text": "Q1"}]
+    assert len(history[3]["content"][0]["text"]) == 500
+
+    # The history is only sent with the first turn of the new session
+    session_manager.record_turn(new_session, "Q3", "A3")
+    new_session = session_manager.get_session("573000")
+    assert session_manager.conversation_history(new_session) == []
+
+
+def test_turns_answered_without_the_agent_go_to_the_history(session_manager):
+    session_manager, clock = session_manager
+    session = session_manager.get_session("573000")
+    assert not session_manager.has_context(session)
+
+    session_manager.record_turn(session, "Q0", "Cached A0", agent_turn=False)
+    session = session_manager.get_session("573000")
+    assert session_manager.has_context(session)
+    assert session.turns == 0
+    assert session_manager.conversation_history(session)[0]["content"] == [
+        {"text": "Q0"}
+    ]
+
+    # Turns answered without the agent in the middle of a session are pending
+    session_manager.record_turn(session, "Q1", "A1")
+    session = session_manager.get_session("573000")
+    assert session_manager.conversation_history(session) == []
+    session_manager.record_turn(session, "Q2", "Local A2", agent_turn=False)
+    session = session_manager.get_session("573000")
+    assert session_manager.conversation_history(session)[0]["content"] == [
+        {"text": "Q2"}
+    ]
+
+    # Until the next agent turn sends them
+    session_manager.record_turn(session, "Q3", "A3")
+    session = session_manager.get_session("573000")
+    assert session.pending_turns == []
+    assert session_manager.conversation_history(session) == []
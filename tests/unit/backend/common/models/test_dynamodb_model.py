@@ -0,0 +1,57 @@
+import pytest
+from decimal import Decimal
+from typing import Optional
+from pydantic import ValidationError
+from backend.common.models.dynamodb_model import DynamoDBModel
+from backend.common.models.text_message_model import TextMessageModel
+
+
+class SampleModel(DynamoDBModel):
+    PK: str
+    count: int
+    price: Optional[Decimal] = None
+    enabled: bool = False
+    tags: list[str] = []
+    note: Optional[str] = None
+
+
+@pytest.fixture
+def text_message_dynamodb_item() -> dict:
+    return {
+        "PK": {"S": "NUMBER#12345678987"},
+        "SK": {"S": "MESSAGE#2024-06-19 03:41:42.269532+00:00"},
+        "created_at": {"S": "2024-06-19 03:41:42.269532+00:00"},
+        "from_number": {"S": "12345678987"},
+        "type": {"S": "text"},
+        "text": {"S": "Hello by Santi!"},
+        "whatsapp_id": {"S": "wamid.1"},
+        "whatsapp_timestamp": {"S": "1718768502"},
+    }
+
+
+def test_text_message_model_round_trip(text_message_dynamodb_item):
+    text_message = TextMessageModel.from_dynamodb_item(text_message_dynamodb_item)
+    assert text_message.correlation_id is None
+
+    # None values are omitted from the item
+    assert text_message.to_dynamodb_item() == text_message_dynamodb_item
+
+
+def test_from_dynamodb_item_validates(text_message_dynamodb_item):
+    text_message_dynamodb_item["PK"] = {"S": "INVALID#1"}
+    with pytest.raises(ValidationError):
+        TextMessageModel.from_dynamodb_item(text_message_dynamodb_item)
+
+
+def test_scalar_and_generic_attributes():
+    sample = SampleModel(PK="ITEM#1", count=3, price=Decimal("9.5"), tags=["a"])
+    dynamodb_item = sample.to_dynamodb_item()
+
+    assert dynamodb_item == {
+        "PK": {"S": "ITEM#1"},
+        "count": {"N": "3"},
+        "price": {"N": "9.5"},
+        "enabled": {"BOOL": False},
+        "tags": {"L": [{"S": "a"}]},
+    }
+    assert SampleModel.from_dynamodb_item(dynamodb_item) == sample
@@ -0,0 +1,67 @@
+import pytest
+from decimal import Decimal
+from backend.common.models.message_envelope_model import (
+    ENVELOPE_VERSION,
+    MessageEnvelopeModel,
+)
+
+
+@pytest.fixture
+def new_image() -> dict:
+    return {
+        "PK": "NUMBER#12345678987",
+        "SK": "MESSAGE#2024-06-19 03:41:42.269532+00:00",
+        "created_at": "2024-06-19 03:41:42.269532+00:00",
+        "from_number": "12345678987",
+        "type": "text",
+        "text": "Hello by Santi!",
+        "whatsapp_id": "wamid.1",
+        "whatsapp_timestamp": "1718768502",
+        "coalesced_count": Decimal("2"),
+    }
+
+
+def test_from_new_image_only_keeps_the_pipeline_fields(new_image):
+    message = MessageEnvelopeModel.from_new_image(new_image).to_event()
+
+    assert message == {
+        "version": ENVELOPE_VERSION,
+        "PK": "NUMBER#12345678987",
+        "SK": "MESSAGE#2024-06-19 03:41:42.269532+00:00",
+        "from_number": "12345678987",
+        "type": "text",
+        "text": "Hello by Santi!",
+        "whatsapp_id": "wamid.1",
+        "coalesced_count": 2,
+    }
+    assert MessageEnvelopeModel.from_event({"message": message}).text == (
+        "Hello by Santi!"
+    )
+
+
+def test_from_event_loads_the_legacy_dynamodb_record():
+    event = {
+        "input": {
+            "dynamodb": {
+                "NewImage": {
+                    "from_number": {"S": "12345678987"},
+                    "type": {"S": "text"},
+                    "catching_up": {"BOOL": True},
+                    "coalesced_count": {"N": "3"},
+                }
+            }
+        }
+    }
+
+    message = MessageEnvelopeModel.from_event(event)
+
+    assert message.from_number == "12345678987"
+    assert message.catching_up is True
+    assert message.coalesced_count == 3
+
+
+def test_from_event_rejects_unknown_versions():
+    with pytest.raises(ValueError, match="version <99>"):
+        MessageEnvelopeModel.from_event({"message": {"version": 99}})
+    with pytest.raises(ValueError):
+        MessageEnvelopeModel.from_event({})
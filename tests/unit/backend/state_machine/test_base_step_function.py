@@ -0,0 +1,57 @@
+# Built-in imports
+import os
+
+# Own imports
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+from state_machine import base_step_function  # noqa: E402
+
+
+def test_release_without_from_number_is_logged(mocker):
+    release = mocker.patch.object(base_step_function.get_sequencer(), "release")
+    step = base_step_function.BaseStepFunction(
+        {
+            "message": {"version": 1, "type": "text"},
+            "execution_name": "exec-1",
+            "sequenced": True,
+        }
+    )
+    error = mocker.spy(step.logger, "error")
+
+    step.release_conversation()
+
+    release.assert_not_called()
+    assert "exec-1" in error.call_args.args[0]
+
+
+def test_release_of_sequenced_executions(mocker):
+    release = mocker.patch.object(
+        base_step_function.get_sequencer(), "release", return_value=None
+    )
+    step = base_step_function.BaseStepFunction(
+        {
+            "message": {"version": 1, "type": "text", "from_number": "573000"},
+            "execution_name": "exec-1",
+            "sequenced": True,
+        }
+    )
+
+    step.release_conversation()
+
+    release.assert_called_once_with("573000", "exec-1")
+
+
+def test_sequencer_is_created_on_the_first_sequenced_release(monkeypatch, mocker):
+    monkeypatch.setattr(base_step_function, "_sequencer", None)
+    step = base_step_function.BaseStepFunction(
+        {"message": {"version": 1, "type": "text", "from_number": "573000"}}
+    )
+
+    step.release_conversation()
+    assert base_step_function._sequencer is None
+
+    step.event.update({"execution_name": "exec-1", "sequenced": True})
+    mocker.patch.object(base_step_function.ConversationSequencer, "release")
+    step.release_conversation()
+    sequencer = base_step_function._sequencer
+    assert sequencer.start_execution.__module__ == "common.helpers.execution_helper"
+    sequencer.release.assert_called_once_with("573000", "exec-1")
@@ -0,0 +1,89 @@
+# Built-in imports
+import importlib
+import os
+
+# External imports
+import pytest
+from botocore.exceptions import ClientError
+
+
+class FakeSSMClient:
+    def __init__(self, parameters: dict) -> None:
+        self.parameters = parameters
+        self.calls = 0
+
+    def get_parameters(self, Names: list, WithDecryption: bool = False) -> dict:
+        self.calls += 1
+        return {
+            "Parameters": [
+                {"Name": name, "Value": self.parameters[name]} for name in Names
+            ]
+        }
+
+
+class FakeBedrockAgentRuntimeClient:
+    """Answers only for the given alias (the rest do not exist anymore)."""
+
+    def __init__(self, valid_alias_id: str) -> None:
+        self.valid_alias_id = valid_alias_id
+        self.invoked_aliases = []
+
+    def invoke_agent(self, agentAliasId: str, **kwargs) -> dict:
+        self.invoked_aliases.append(agentAliasId)
+        if agentAliasId != self.valid_alias_id:
+            raise ClientError(
+                {"Error": {"Code": "ResourceNotFoundException"}}, "InvokeAgent"
+            )
+        return {"completion": [{"chunk": {"bytes": b"Hello!"}}]}
+
+
+@pytest.fixture
+def bedrock_agent(monkeypatch):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    bedrock_agent = importlib.import_module("state_machine.processing.bedrock_agent")
+    ssm_client = FakeSSMClient(
+        {
+            bedrock_agent.AGENT_ID_PARAMETER: "AGENT",
+            bedrock_agent.AGENT_ALIAS_PARAMETER: "arn|ALIAS1",
+        }
+    )
+    monkeypatch.setattr(
+        bedrock_agent,
+        "agent_parameters",
+        bedrock_agent.ParametersHelper(list(ssm_client.parameters)),
+    )
+    bedrock_agent.agent_parameters.ssm_client = ssm_client
+    yield bedrock_agent, ssm_client
+
+
+def test_agent_configuration_is_fetched_once(bedrock_agent, monkeypatch):
+    bedrock_agent, ssm_client = bedrock_agent
+    runtime_client = FakeBedrockAgentRuntimeClient("ALIAS1")
+    monkeypatch.setattr(bedrock_agent, "bedrock_agent_runtime_client", runtime_client)
+
+    assert bedrock_agent.call_bedrock_agent("Hi") == "Hello!"
+    assert bedrock_agent.call_bedrock_agent("Hi again") == "Hello!"
+    assert ssm_client.calls == 1
+
+
+def test_invalid_alias_reloads_the_configuration(bedrock_agent, monkeypatch):
+    bedrock_agent, ssm_client = bedrock_agent
+    runtime_client = FakeBedrockAgentRuntimeClient("ALIAS2")
+    monkeypatch.setattr(bedrock_agent, "bedrock_agent_runtime_client", runtime_client)
+    bedrock_agent.get_agent_configuration()
+
+    # A deploy replaced the alias after the configuration was cached
+    ssm_client.parameters[bedrock_agent.AGENT_ALIAS_PARAMETER] = "arn|ALIAS2"
+    assert bedrock_agent.call_bedrock_agent("Hi") == "Hello!"
+    assert runtime_client.invoked_aliases == ["ALIAS1", "ALIAS2"]
+    assert ssm_client.calls == 2
+
+
+def test_invalid_alias_without_a_new_configuration_raises(bedrock_agent, monkeypatch):
+    bedrock_agent, ssm_client = bedrock_agent
+    runtime_client = FakeBedrockAgentRuntimeClient("ALIAS2")
+    monkeypatch.setattr(bedrock_agent, "bedrock_agent_runtime_client", runtime_client)
+
+    with pytest.raises(ClientError):
+        bedrock_agent.call_bedrock_agent("Hi")
+    assert runtime_client.invoked_aliases == ["ALIAS1"]
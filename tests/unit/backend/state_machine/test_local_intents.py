@@ -0,0 +1,105 @@
+# Built-in imports
+import importlib
+import os
+from datetime import date
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+TODAY = date(2024, 6, 19)
+
+
+@pytest.fixture
+def local_intents():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("SECRET_NAME", "test-secret")
+    local_intents = importlib.import_module("state_machine.processing.local_intents")
+    yield local_intents
+    local_intents.metrics.clear_metrics()
+
+
+@pytest.fixture
+def agents_data_table(monkeypatch):
+    """Mocked agents data table, as read by the action group functions"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    dynamodb_helper = importlib.import_module("bedrock_agent.dynamodb_helper")
+    with mock_aws():
+        table = boto3.resource("dynamodb").create_table(
+            TableName="test-agents-data",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        monkeypatch.setattr(dynamodb_helper, "TABLE_NAME", "test-agents-data")
+        monkeypatch.setattr(dynamodb_helper, "table", None)
+        yield table
+
+
+@pytest.mark.parametrize(
+    "text,intent",
+    [
+        ("What are my TODOs?", ("FetchTODOs", "en", None)),
+        ("¿Cuáles son mis tareas pendientes?", ("FetchTODOs", "es", None)),
+        ("todos mis contactos por favor", ("FetchContacts", "es", None)),
+        ("contacts", ("FetchContacts", "en", None)),
+        ("agenda for 2024-12-02", ("FetchCalendarEvents", "en", "2024-12-02")),
+        ("What are my events tomorrow?", ("FetchCalendarEvents", "en", "2024-06-20")),
+        ("Eventos de pasado mañana", ("FetchCalendarEvents", "es", "2024-06-21")),
+        ("eventos del 2 de diciembre", ("FetchCalendarEvents", "es", "2024-12-02")),
+        ("meetings on March 3 2025", ("FetchCalendarEvents", "en", "2025-03-03")),
+    ],
+)
+def test_simple_requests_are_recognized(local_intents, text, intent):
+    assert local_intents.classify(text, today=TODAY) == intent
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "What are my events?",  # The agent asks for the date
+        "events for 2024-02-30",
+        "events today and tomorrow",
+        "my todos and contacts",
+        "todos for tomorrow",
+        "Which contacts work at AWS?",
+        "Tell me about the projects",
+        "",
+    ],
+)
+def test_other_requests_are_left_to_the_agent(local_intents, text):
+    assert local_intents.classify(text, today=TODAY) is None
+
+
+def test_replies_use_the_action_group_data(local_intents, agents_data_table):
+    agents_data_table.put_item(
+        Item={
+            "PK": "USER#san99tiago@gmail.com",
+            "SK": "DATE#2024-12-02",
+            "events": ["10:00 AWS meetup", "15:00 Dentist"],
+        }
+    )
+
+    assert local_intents.answer_locally("agenda for 2024-12-02") == (
+        "Santi, these are your events for 2024-12-02:\n"
+        "- 10:00 AWS meetup\n"
+        "- 15:00 Dentist"
+    )
+    assert local_intents.answer_locally("mis tareas") == (
+        "Santi, no tienes tareas pendientes."
+    )
+    assert local_intents.answer_locally("Tell me about the projects") is None
+
+
+def test_failures_fall_back_to_the_agent(local_intents):
+    def fetch_function(intent):
+        raise RuntimeError("Table not available")
+
+    assert local_intents.answer_locally("contacts", fetch_function) is None
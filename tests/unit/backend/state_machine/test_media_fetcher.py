@@ -0,0 +1,208 @@
+# Built-in imports
+import hashlib
+import importlib
+import os
+
+# External imports
+import boto3
+import pytest
+import requests
+from moto import mock_aws
+
+# Own imports
+from common.helpers.aws_clients import clear_clients
+from common.helpers.resilience_helper import (
+    ResilientDependency,
+    TransientDependencyError,
+)
+from common.helpers.s3_helper import MIN_PART_SIZE_BYTES, S3Helper
+from state_machine.integrations.meta.api_utils import get_api_endpoint
+
+os.environ.setdefault("SECRET_NAME", "test-secret")
+
+MEDIA_URL = "https://lookaside.fbsbx.com/whatsapp_business/attachments/?mid=1"
+
+
+class FakeResponse:
+    """Response of "requests.get" with a JSON body or a streamed content"""
+
+    def __init__(self, status_code: int = 200, json_data=None, content=b""):
+        self.status_code = status_code
+        self.headers = {}
+        self.json_data = json_data
+        self.content = content
+        self.closed = False
+
+    def json(self):
+        return self.json_data
+
+    def iter_content(self, chunk_size: int):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def media_fetcher(monkeypatch):
+    """Media fetcher with a mocked S3 bucket and fake Meta API responses"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    api_requests = importlib.import_module(
+        "state_machine.integrations.meta.api_requests"
+    )
+    media_fetcher = importlib.import_module(
+        "state_machine.integrations.meta.media_fetcher"
+    )
+    api_utils = importlib.import_module("state_machine.integrations.meta.api_utils")
+    monkeypatch.setattr(api_utils, "META_ENDPOINT", "https://graph.facebook.com/")
+    monkeypatch.setattr(
+        api_requests.secrets_helper,
+        "get_secret_value",
+        lambda force_refresh=False: {"META_TOKEN": "token"},
+    )
+    # Transient errors are retried once without waiting, in a circuit of the test
+    monkeypatch.setattr(
+        api_requests,
+        "meta_dependency",
+        ResilientDependency(
+            "MetaAPI",
+            is_transient=api_requests._is_transient_error,
+            max_attempts=2,
+            sleep=lambda seconds: None,
+        ),
+    )
+
+    responses = {}
+
+    def get(url, **kwargs):
+        return responses[url]
+
+    monkeypatch.setattr(api_requests.requests, "get", get)
+    clear_clients()
+    with mock_aws():
+        boto3.client("s3").create_bucket(Bucket="test-bucket")
+        fetcher = media_fetcher.MediaFetcher(
+            S3Helper(bucket_name="test-bucket"), part_size=MIN_PART_SIZE_BYTES
+        )
+        yield fetcher, responses
+    clear_clients()
+
+
+def _media_responses(responses: dict, content: bytes, **metadata) -> FakeResponse:
+    media_response = FakeResponse(content=content)
+    responses[get_api_endpoint("media-1")] = FakeResponse(
+        json_data={
+            "url": MEDIA_URL,
+            "mime_type": "image/jpeg",
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "file_size": len(content),
+            **metadata,
+        }
+    )
+    responses[MEDIA_URL] = media_response
+    return media_response
+
+
+def _read_object(fetcher, key: str) -> bytes:
+    response = fetcher.s3_helper.s3_client.get_object(Bucket="test-bucket", Key=key)
+    return response["Body"].read()
+
+
+def test_build_media_key_uses_the_extension_of_the_mime_type():
+    media_fetcher = importlib.import_module(
+        "state_machine.integrations.meta.media_fetcher"
+    )
+    assert (
+        media_fetcher.build_media_key("573000", "wamid.1", "audio/ogg; codecs=opus")
+        == "media/573000/wamid.1.oga"
+    )
+
+
+def test_fetch_copies_the_media_to_s3(media_fetcher):
+    fetcher, responses = media_fetcher
+    content = b"jpeg-bytes" * 100
+    media_response = _media_responses(responses, content)
+
+    reference = fetcher.fetch("media-1", "media/573000/wamid.1.jpg")
+
+    assert reference == {
+        "bucket": "test-bucket",
+        "key": "media/573000/wamid.1.jpg",
+        "size": len(content),
+        "mime_type": "image/jpeg",
+        "sha256": hashlib.sha256(content).hexdigest(),
+    }
+    assert _read_object(fetcher, "media/573000/wamid.1.jpg") == content
+    assert media_response.closed
+
+
+@pytest.mark.parametrize(
+    "status_code, error", [(404, requests.HTTPError), (500, TransientDependencyError)]
+)
+def test_fetch_fails_on_meta_errors(media_fetcher, status_code, error):
+    fetcher, responses = media_fetcher
+    responses[get_api_endpoint("media-1")] = FakeResponse(status_code)
+
+    with pytest.raises(error):
+        fetcher.fetch("media-1", "media/573000/wamid.1.jpg")
+
+    objects = fetcher.s3_helper.s3_client.list_objects_v2(Bucket="test-bucket")
+    assert not objects.get("Contents")
+
+
+def test_stream_media_fails_on_download_errors(media_fetcher):
+    fetcher, responses = media_fetcher
+    _media_responses(responses, b"jpeg-bytes")
+    responses[MEDIA_URL] = FakeResponse(403)
+
+    with pytest.raises(requests.HTTPError):
+        fetcher.meta_api.stream_media(MEDIA_URL)
+    with pytest.raises(requests.HTTPError):
+        fetcher.fetch("media-1", "media/573000/wamid.1.jpg")
+
+
+def test_fetch_splits_the_upload_at_the_part_boundary(media_fetcher, mocker):
+    fetcher, responses = media_fetcher
+    content = os.urandom(MIN_PART_SIZE_BYTES + 1024)
+    _media_responses(responses, content, mime_type="video/mp4")
+    spy = mocker.spy(fetcher.s3_helper.s3_client, "upload_part")
+
+    reference = fetcher.fetch("media-1", "media/573000/wamid.1.mp4")
+
+    assert [len(call.kwargs["Body"]) for call in spy.call_args_list] == [
+        MIN_PART_SIZE_BYTES,
+        1024,
+    ]
+    assert reference["size"] == len(content)
+    assert _read_object(fetcher, "media/573000/wamid.1.mp4") == content
+
+
+def test_fetch_aborts_the_upload_on_errors(media_fetcher, mocker):
+    fetcher, responses = media_fetcher
+    fetcher.max_size = MIN_PART_SIZE_BYTES + 1
+    # Meta reports a smaller size than the download, which is stopped midway
+    media_response = _media_responses(
+        responses, b"x" * (MIN_PART_SIZE_BYTES + 1024), file_size=1024
+    )
+    spy = mocker.spy(fetcher.s3_helper.s3_client, "abort_multipart_upload")
+
+    with pytest.raises(ValueError):
+        fetcher.fetch("media-1", "media/573000/wamid.1.mp4")
+
+    assert spy.call_count == 1
+    assert media_response.closed
+    uploads = fetcher.s3_helper.s3_client.list_multipart_uploads(Bucket="test-bucket")
+    assert not uploads.get("Uploads")
+
+
+def test_fetch_rejects_media_over_the_maximum_size(media_fetcher):
+    fetcher, responses = media_fetcher
+    _media_responses(responses, b"x", file_size=fetcher.max_size + 1)
+
+    with pytest.raises(ValueError):
+        fetcher.fetch("media-1", "media/573000/wamid.1.jpg")
@@ -0,0 +1,86 @@
+# Built-in imports
+import importlib
+import os
+
+# External imports
+import pytest
+
+
+def _event(message_type: str) -> dict:
+    return {
+        "message": {
+            "version": 1,
+            "from_number": "1",
+            "type": message_type,
+            "correlation_id": "correlation-1",
+        }
+    }
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Pipeline runner with the steps replaced by recorders (except validation)"""
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("SECRET_NAME", "test-secret")
+    pipeline_runner = importlib.import_module("state_machine.pipeline_runner")
+
+    step_registry = importlib.import_module("state_machine.step_registry")
+    steps = []
+    for class_name, method_name in pipeline_runner.PIPELINE_STEPS.values():
+        if class_name == "ValidateMessage":
+            continue
+
+        def run_step(self, class_name=class_name):
+            steps.append(class_name)
+            return self.event
+
+        step_class = step_registry.get_step_class(class_name, method_name)
+        monkeypatch.setattr(step_class, method_name, run_step)
+    yield pipeline_runner, steps
+    # Flushed by the Lambda handler (not called in these tests)
+    pipeline_runner.metrics.clear_metrics()
+
+
+@pytest.mark.parametrize(
+    "message_type,expected_steps",
+    [
+        ("text", ["ProcessText", "SendMessage", "Success"]),
+        (
+            "voice",
+            ["ProcessMedia", "ProcessVoice", "ProcessText", "SendMessage", "Success"],
+        ),
+        ("image", ["ProcessMedia", "SendMessage", "Success"]),
+    ],
+)
+def test_pipeline_follows_the_state_machine_routing(
+    pipeline, message_type, expected_steps
+):
+    pipeline_runner, steps = pipeline
+
+    result = pipeline_runner.PipelineRunner(_event(message_type)).run()
+
+    assert steps == expected_steps
+    assert result["message_type"] == message_type
+    assert {"Validate Message", "Send Message", "Pipeline"} <= set(
+        result["step_durations_ms"]
+    )
+
+
+def test_pipeline_runs_the_failure_step_on_errors(pipeline, monkeypatch):
+    pipeline_runner, steps = pipeline
+
+    def send_message(self):
+        raise RuntimeError("Meta API is down")
+
+    step_registry = importlib.import_module("state_machine.step_registry")
+    step_class = step_registry.get_step_class("SendMessage", "send_message")
+    monkeypatch.setattr(step_class, "send_message", send_message)
+
+    event = _event("text")
+    with pytest.raises(RuntimeError):
+        pipeline_runner.PipelineRunner(event).run()
+
+    assert steps == ["ProcessText", "Failure"]
+    # Same fields as the "Catch" of the State Machine tasks
+    assert event["failed_step"] == "Send Message"
+    assert event["error"] == {"Error": "RuntimeError", "Cause": "Meta API is down"}
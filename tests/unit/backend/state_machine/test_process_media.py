@@ -0,0 +1,111 @@
+# Built-in imports
+import importlib
+import os
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from common.helpers.aws_clients import clear_clients
+
+os.environ.setdefault("SECRET_NAME", "test-secret")
+
+
+class FakeMediaFetcher:
+    """Returns the S3 reference of the media without calling Meta or S3"""
+
+    fetched = []
+
+    def __init__(self, s3_helper, logger=None) -> None:
+        self.s3_helper = s3_helper
+
+    def fetch(self, media_id: str, key: str) -> dict:
+        self.fetched.append((media_id, key))
+        return {
+            "bucket": self.s3_helper.bucket_name,
+            "key": key,
+            "size": 2048,
+            "mime_type": "audio/ogg",
+            "sha256": "abc",
+        }
+
+
+@pytest.fixture
+def process_media(monkeypatch):
+    """Media processing step with a mocked table and a fake media fetcher"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    process_media = importlib.import_module("state_machine.processing.process_media")
+    monkeypatch.setattr(process_media, "MEDIA_BUCKET", "test-bucket")
+    monkeypatch.setattr(process_media, "DYNAMODB_TABLE", "test-table")
+    monkeypatch.setattr(process_media, "MediaFetcher", FakeMediaFetcher)
+    FakeMediaFetcher.fetched = []
+    clear_clients()
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield process_media
+    clear_clients()
+
+
+def _event(**message) -> dict:
+    return {
+        "message": {
+            "version": 1,
+            "PK": "NUMBER#573000",
+            "SK": "MESSAGE#2024-06-19T03:41:42.269532+00:00",
+            "from_number": "573000",
+            "type": "voice",
+            "whatsapp_id": "wamid.1",
+            "media_id": "media-1",
+            "mime_type": "audio/ogg; codecs=opus",
+            **message,
+        },
+        "message_type": "voice",
+    }
+
+
+def test_process_media_saves_the_reference_in_the_message(process_media):
+    boto3.client("dynamodb").put_item(
+        TableName="test-table",
+        Item={
+            "PK": {"S": "NUMBER#573000"},
+            "SK": {"S": "MESSAGE#2024-06-19T03:41:42.269532+00:00"},
+        },
+    )
+
+    event = process_media.ProcessMedia(_event()).process_media()
+
+    assert FakeMediaFetcher.fetched == [("media-1", "media/573000/wamid.1.oga")]
+    assert event["media"]["key"] == "media/573000/wamid.1.oga"
+    item = boto3.client("dynamodb").get_item(
+        TableName="test-table",
+        Key={
+            "PK": {"S": "NUMBER#573000"},
+            "SK": {"S": "MESSAGE#2024-06-19T03:41:42.269532+00:00"},
+        },
+    )["Item"]
+    assert item["media_bucket"] == {"S": "test-bucket"}
+    assert item["media_key"] == {"S": "media/573000/wamid.1.oga"}
+    assert item["media_size"] == {"N": "2048"}
+
+
+def test_process_media_fails_clearly_on_invalid_envelopes(process_media):
+    with pytest.raises(ValueError, match="no message envelope"):
+        process_media.ProcessMedia({"message_type": "voice"}).process_media()
+
+    with pytest.raises(ValueError, match="media_id"):
+        process_media.ProcessMedia(_event(media_id=None)).process_media()
+
+    assert FakeMediaFetcher.fetched == []
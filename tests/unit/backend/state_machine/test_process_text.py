@@ -0,0 +1,190 @@
+# Built-in imports
+import importlib
+import os
+import threading
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from common.helpers.answer_cache_helper import AnswerCache
+
+
+@pytest.fixture
+def process_text(monkeypatch):
+    """Text processing step with a mocked table, the answer cache and a fake agent"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    os.environ.setdefault("SECRET_NAME", "test-secret")
+    process_text = importlib.import_module("state_machine.processing.process_text")
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb_helper = process_text.dynamodb_helper
+        monkeypatch.setattr(dynamodb_helper, "table_name", "test-table")
+        monkeypatch.setattr(
+            dynamodb_helper, "dynamodb_client", boto3.client("dynamodb")
+        )
+        monkeypatch.setattr(process_text, "ANSWER_CACHE_ENABLED", True)
+        monkeypatch.setattr(process_text, "LOCAL_INTENTS_ENABLED", False)
+        monkeypatch.setattr(process_text, "STREAM_RESPONSES", False)
+        monkeypatch.setattr(process_text, "answer_cache", AnswerCache(dynamodb_helper))
+
+        agent_calls = []
+
+        def call_bedrock_agent(text, **kwargs):
+            agent_calls.append(text)
+            return f"Answer {len(agent_calls)}"
+
+        monkeypatch.setattr(process_text, "call_bedrock_agent", call_bedrock_agent)
+        yield process_text, agent_calls
+
+
+def run(process_text, from_number: str, text: str) -> str:
+    event = {
+        "message": {
+            "version": 1,
+            "from_number": from_number,
+            "type": "text",
+            "correlation_id": "test-correlation-id",
+            "text": text,
+        },
+    }
+    return process_text.ProcessText(event).process_text()["response_message"]
+
+
+def test_cached_answers_are_only_used_without_context(process_text):
+    process_text, agent_calls = process_text
+    question = "Which project uses Step Functions?"
+
+    assert run(process_text, "573000", question) == "Answer 1"
+    # A follow-up in the same conversation goes to the agent
+    assert run(process_text, "573000", question) == "Answer 2"
+    # A new conversation gets the cached answer (saved in its session)
+    assert run(process_text, "573001", question) == "Answer 1"
+    assert agent_calls == [question, question]
+
+    session = process_text.session_manager.get_session("573001")
+    assert session.recent_turns == [{"user": question, "assistant": "Answer 1"}]
+    assert session.turns == 0
+
+
+def test_local_answers_are_saved_in_the_session(process_text, monkeypatch):
+    process_text, agent_calls = process_text
+    monkeypatch.setattr(process_text, "LOCAL_INTENTS_ENABLED", True)
+    monkeypatch.setattr(
+        process_text,
+        "answer_locally",
+        lambda text: "Santi, these are your TODOs:" if text == "my todos" else None,
+    )
+
+    assert run(process_text, "573000", "my todos") == "Santi, these are your TODOs:"
+    # The follow-up depends on the local answer, so the cache is not used
+    question = "Which project uses Step Functions?"
+    process_text.answer_cache.put(question, "Cached answer", 1000)
+    assert run(process_text, "573000", question) == "Answer 1"
+    assert agent_calls == [question]
+
+    session = process_text.session_manager.get_session("573000")
+    assert session.recent_turns[0] == {
+        "user": "my todos",
+        "assistant": "Santi, these are your TODOs:",
+    }
+
+
+def test_local_answers_are_sent_with_the_next_agent_turn(process_text, monkeypatch):
+    process_text, _ = process_text
+    bedrock_agent = importlib.import_module("state_machine.processing.bedrock_agent")
+    requests = []
+
+    class FakeBedrockAgentRuntimeClient:
+        def invoke_agent(self, **kwargs) -> dict:
+            requests.append(kwargs)
+            return {"completion": [{"chunk": {"bytes": b"Done!"}}]}
+
+    monkeypatch.setattr(
+        bedrock_agent, "bedrock_agent_runtime_client", FakeBedrockAgentRuntimeClient()
+    )
+    monkeypatch.setattr(
+        bedrock_agent, "get_agent_configuration", lambda **kwargs: ("AGENT", "ALIAS")
+    )
+    monkeypatch.setattr(
+        process_text, "call_bedrock_agent", bedrock_agent.call_bedrock_agent
+    )
+    monkeypatch.setattr(process_text, "LOCAL_INTENTS_ENABLED", True)
+    monkeypatch.setattr(
+        process_text,
+        "answer_locally",
+        lambda text: "Santi, these are your TODOs:" if text == "my todos" else None,
+    )
+
+    assert run(process_text, "573000", "hello") == "Done!"
+    assert "sessionState" not in requests[0]
+    # The local answer is in the middle of the agent session
+    run(process_text, "573000", "my todos")
+    assert run(process_text, "573000", "mark the first one done") == "Done!"
+    assert requests[1]["sessionState"]["conversationHistory"]["messages"] == [
+        {"role": "user", "content": [{"text": "my todos"}]},
+        {"role": "assistant", "content": [{"text": "Santi, these are your TODOs:"}]},
+    ]
+    assert requests[1]["sessionId"] == requests[0]["sessionId"]
+
+    # It is only sent once
+    assert run(process_text, "573000", "thanks") == "Done!"
+    assert "sessionState" not in requests[2]
+
+
+def test_partial_streamed_replies_are_marked_in_the_message(process_text, monkeypatch):
+    process_text, _ = process_text
+    sort_key = "MESSAGE#2024-06-19T03:41:42.269532+00:00"
+    chunk_posted = threading.Event()
+
+    class FakeMetaAPI:
+        def __init__(self, logger=None) -> None:
+            pass
+
+        def post_message(self, text_message, to_phone_number, original_message_id):
+            chunk_posted.set()
+            return {"messages": [{"id": "wamid.OUT"}]}
+
+    def call_bedrock_agent(text, on_chunk=None, **kwargs):
+        on_chunk("The first part of the answer is a complete sentence. " * 3)
+        # The agent stream fails once the first chunk reached the user
+        chunk_posted.wait(timeout=5)
+        raise TimeoutError("Read timeout on the agent stream")
+
+    monkeypatch.setattr(process_text, "STREAM_RESPONSES", True)
+    monkeypatch.setattr(process_text, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(process_text, "MetaAPI", FakeMetaAPI)
+    monkeypatch.setattr(process_text, "call_bedrock_agent", call_bedrock_agent)
+    process_text.dynamodb_helper.put_item({"PK": "NUMBER#573000", "SK": sort_key})
+    event = {
+        "message": {
+            "version": 1,
+            "PK": "NUMBER#573000",
+            "SK": sort_key,
+            "from_number": "573000",
+            "type": "text",
+            "text": "Tell me about the projects",
+            "whatsapp_id": "wamid.IN",
+        },
+    }
+
+    with pytest.raises(process_text.PartialResponseError):
+        process_text.ProcessText(event).process_text()
+
+    # A replay of the failure skips the message (see "FailureStore.is_answered")
+    item = process_text.dynamodb_helper.get_item_by_pk_and_sk("NUMBER#573000", sort_key)
+    assert "partial_reply_at" in item
+    assert item["answer_whatsapp_id"] == {"S": "wamid.OUT"}
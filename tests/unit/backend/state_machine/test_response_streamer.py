@@ -0,0 +1,93 @@
+# Built-in imports
+import importlib
+import os
+
+# External imports
+import pytest
+
+
+class FakeMetaAPI:
+    """Records the posted messages, and fails the given message numbers."""
+
+    def __init__(self, failing_messages: tuple = ()) -> None:
+        self.posted = []
+        self.failing_messages = failing_messages
+
+    def post_message(self, text_message, to_phone_number, original_message_id=None):
+        self.posted.append((text_message, original_message_id))
+        if len(self.posted) in self.failing_messages:
+            return {"error": {"message": "Unavailable"}}
+        return {"messages": [{"id": f"wamid.{len(self.posted)}"}]}
+
+
+@pytest.fixture
+def response_streamer():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("SECRET_NAME", "test-secret")
+    response_streamer = importlib.import_module(
+        "state_machine.processing.response_streamer"
+    )
+    yield response_streamer
+    response_streamer.metrics.clear_metrics()
+
+
+def test_chunks_are_complete_sentences_sent_in_order(response_streamer):
+    meta_api = FakeMetaAPI()
+    text = "First sentence here. Second one is longer! Third? And the rest"
+
+    with response_streamer.ResponseStreamer(
+        meta_api, "573000", "wamid.IN", min_chunk_chars=15
+    ) as streamer:
+        # The agent generates the text in small pieces
+        for start in range(0, len(text), 4):
+            streamer.add_text(text[start : start + 4])
+
+    assert meta_api.posted == [
+        ("First sentence here.", "wamid.IN"),
+        ("Second one is longer!", None),
+        ("Third? And the rest", None),
+    ]
+    assert streamer.sent_whatsapp_ids == ["wamid.1", "wamid.2", "wamid.3"]
+    assert 0 <= streamer.first_chunk_ms <= streamer.last_chunk_ms
+
+
+def test_paragraphs_and_long_sentences_are_split(response_streamer):
+    meta_api = FakeMetaAPI()
+
+    with response_streamer.ResponseStreamer(
+        meta_api, "573000", min_chunk_chars=5, max_chunk_chars=20
+    ) as streamer:
+        streamer.add_text("A paragraph 3.5\n\nsome words without any end")
+
+    assert [text for text, _ in meta_api.posted] == [
+        "A paragraph 3.5",
+        "some words without",
+        "any end",
+    ]
+
+
+def test_chunks_after_a_failed_one_are_not_sent(response_streamer):
+    meta_api = FakeMetaAPI(failing_messages=(1,))
+
+    with pytest.raises(Exception, match="Meta API"):
+        with response_streamer.ResponseStreamer(
+            meta_api, "573000", min_chunk_chars=5
+        ) as streamer:
+            streamer.add_text("One sentence. ")
+            streamer.add_text("Another sentence. ")
+
+    assert [text for text, _ in meta_api.posted] == ["One sentence."]
+    assert streamer.sent_whatsapp_ids == []
+
+
+def test_first_sent_chunk_is_reported_once(response_streamer):
+    meta_api = FakeMetaAPI()
+    first_chunks = []
+
+    with response_streamer.ResponseStreamer(
+        meta_api, "573000", min_chunk_chars=5, on_first_chunk=first_chunks.append
+    ) as streamer:
+        streamer.add_text("One sentence. ")
+        streamer.add_text("Another sentence. ")
+
+    assert first_chunks == ["wamid.1"]
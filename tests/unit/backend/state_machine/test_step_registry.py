@@ -0,0 +1,33 @@
+# Built-in imports
+import sys
+
+# External imports
+import pytest
+
+# Own imports
+from state_machine import step_registry
+
+
+def test_get_handler_runs_the_step_and_is_cached():
+    event = {"message": {"version": 1, "type": "text"}}
+
+    handler = step_registry.get_handler("ValidateMessage", "validate_input")
+    result = handler(event)
+
+    assert result["message_type"] == "text"
+    assert step_registry.get_handler("ValidateMessage", "validate_input") is handler
+
+
+def test_get_handler_only_imports_the_dispatched_step(monkeypatch):
+    monkeypatch.delitem(
+        sys.modules, "state_machine.processing.send_message", raising=False
+    )
+
+    step_registry.get_handler("Success", "process_success")
+
+    assert "state_machine.processing.send_message" not in sys.modules
+
+
+def test_get_handler_rejects_unknown_steps():
+    with pytest.raises(ValueError):
+        step_registry.get_handler("ValidateMessage", "process_text")
@@ -0,0 +1,64 @@
+# External imports
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import (
+    DynamoDBRecord,
+)
+
+# Own imports
+from trigger.helpers.coalescing_helper import group_records, merge_records
+
+
+def _record(from_number: str, wamid: str, message_type: str = "text") -> DynamoDBRecord:
+    new_image = {
+        "SK": {"S": f"MESSAGE#{wamid}"},
+        "from_number": {"S": from_number},
+        "whatsapp_id": {"S": wamid},
+        "type": {"S": message_type},
+    }
+    if message_type == "text":
+        new_image["text"] = {"S": f"text of {wamid}"}
+    return DynamoDBRecord({"dynamodb": {"NewImage": new_image}})
+
+
+def _ids(groups: list) -> list:
+    return [
+        [record.raw_event["dynamodb"]["NewImage"]["whatsapp_id"]["S"] for record in g]
+        for g in groups
+    ]
+
+
+def test_group_records_per_number_keeps_order():
+    records = [_record("1", "a"), _record("2", "b"), _record("1", "c")]
+    assert _ids(group_records(records)) == [["a", "c"], ["b"]]
+
+
+def test_group_records_never_merges_media_across():
+    records = [
+        _record("1", "a"),
+        _record("1", "b", message_type="image"),
+        _record("1", "c"),
+    ]
+    assert _ids(group_records(records)) == [["a"], ["b"], ["c"]]
+
+
+def test_group_records_with_max_messages():
+    records = [_record("1", wamid) for wamid in "abcde"]
+    assert _ids(group_records(records, max_messages=2)) == [
+        ["a", "b"],
+        ["c", "d"],
+        ["e"],
+    ]
+
+
+def test_merge_records_keeps_the_last_message():
+    merged = merge_records([_record("1", "a"), _record("1", "b")])
+    new_image = merged.raw_event["dynamodb"]["NewImage"]
+
+    assert new_image["whatsapp_id"] == {"S": "b"}
+    assert new_image["text"] == {"S": "text of a\ntext of b"}
+    assert new_image["coalesced_whatsapp_ids"] == {"L": [{"S": "a"}, {"S": "b"}]}
+    assert new_image["coalesced_sks"] == {"L": [{"S": "MESSAGE#a"}, {"S": "MESSAGE#b"}]}
+
+
+def test_merge_records_single_record_is_unchanged():
+    record = _record("1", "a")
+    assert merge_records([record]) is record
@@ -0,0 +1,98 @@
+# Built-in imports
+import os
+
+# External imports
+import boto3
+from moto import mock_aws
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import (
+    DynamoDBRecord,
+)
+
+# Own imports
+from trigger.helpers import staleness_helper
+from trigger.helpers.staleness_helper import (
+    claim_catching_up_reply,
+    fold_records,
+    message_age_seconds,
+    split_stale_records,
+)
+
+NOW = 1718768502.0  # 2024-06-19T03:41:42+00:00
+
+
+def _record(wamid: str, age: float = None, message_type: str = "text", **image):
+    new_image = {
+        "from_number": {"S": "1"},
+        "whatsapp_id": {"S": wamid},
+        "type": {"S": message_type},
+        **image,
+    }
+    if age is not None:
+        new_image["whatsapp_timestamp"] = {"S": str(int(NOW - age))}
+    if message_type == "text":
+        new_image["text"] = {"S": f"text of {wamid}"}
+    return DynamoDBRecord({"dynamodb": {"NewImage": new_image}})
+
+
+def test_message_age_from_whatsapp_timestamp_or_created_at():
+    assert message_age_seconds(_record("a", age=60), now=NOW) == 60
+    created_at = {"created_at": {"S": "2024-06-19T03:40:42+00:00"}}
+    assert message_age_seconds(_record("b", **created_at), now=NOW) == 60
+    assert message_age_seconds(_record("c"), now=NOW) is None
+
+
+def test_split_stale_records_keeps_order():
+    records = [
+        _record("a", age=3600),
+        _record("b", age=10),
+        _record("c", age=1000),
+        _record("d"),
+    ]
+
+    fresh, stale = split_stale_records(records, max_age_seconds=900, now=NOW)
+
+    assert [r.raw_event["dynamodb"]["NewImage"]["whatsapp_id"]["S"] for r in fresh] == [
+        "b",
+        "d",
+    ]
+    assert [r.raw_event["dynamodb"]["NewImage"]["whatsapp_id"]["S"] for r in stale] == [
+        "a",
+        "c",
+    ]
+
+
+def test_fold_records_as_a_single_catching_up_text():
+    folded = fold_records([_record("a"), _record("b", message_type="image")])
+    new_image = folded.raw_event["dynamodb"]["NewImage"]
+
+    assert new_image["whatsapp_id"] == {"S": "b"}
+    assert new_image["type"] == {"S": "text"}
+    assert new_image["text"] == {"S": "text of a\n[image]"}
+    assert new_image["catching_up"] == {"BOOL": True}
+    assert new_image["coalesced_count"] == {"N": "2"}
+
+
+def test_claim_catching_up_reply_once_per_interval(monkeypatch):
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb_helper = staleness_helper.dynamodb_helper
+        monkeypatch.setattr(dynamodb_helper, "table_name", "test-table")
+        monkeypatch.setattr(
+            dynamodb_helper, "dynamodb_client", boto3.client("dynamodb")
+        )
+
+        assert claim_catching_up_reply("1") is True
+        assert claim_catching_up_reply("1") is False
+        assert claim_catching_up_reply("2") is True
@@ -0,0 +1,346 @@
+# Built-in imports
+import importlib
+import json
+import time
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from common.enums import StaleMessagePolicies
+
+
+class FakeLambdaContext:
+    function_name = "test-trigger"
+    function_version = "$LATEST"
+    memory_limit_in_mb = 512
+    invoked_function_arn = "arn:aws:lambda:us-east-1:000000000000:function:test"
+    aws_request_id = "test-request-id"
+
+
+def _record(
+    sequence_number: str,
+    sort_key: str,
+    event_name: str = "INSERT",
+    from_number: str = "1",
+    text: str = None,
+    age_seconds: int = None,
+) -> dict:
+    new_image = {
+        "PK": {"S": f"NUMBER#{from_number}"},
+        "SK": {"S": sort_key},
+        "from_number": {"S": from_number},
+        "whatsapp_id": {"S": f"wamid.{sequence_number}"},
+        "correlation_id": {"S": f"correlation-{sequence_number}"},
+    }
+    if age_seconds is not None:
+        new_image["whatsapp_timestamp"] = {"S": str(int(time.time()) - age_seconds)}
+    if text is not None:
+        new_image.update({"type": {"S": "text"}, "text": {"S": text}})
+    return {
+        "eventID": f"event-{sequence_number}",
+        "eventName": event_name,
+        "eventSource": "aws:dynamodb",
+        "dynamodb": {
+            "Keys": {"PK": new_image["PK"], "SK": {"S": sort_key}},
+            "NewImage": new_image,
+            "SequenceNumber": sequence_number,
+            "StreamViewType": "NEW_AND_OLD_IMAGES",
+        },
+    }
+
+
+@pytest.fixture
+def trigger(monkeypatch, mocker):
+    """Trigger handler with a mocked Step Functions client"""
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("STATE_MACHINE_ARN", "arn:aws:states:::stateMachine:test")
+    trigger_handler = importlib.import_module("trigger.trigger_handler")
+    step_functions_helper = importlib.import_module(
+        "trigger.helpers.step_functions_helper"
+    )
+    monkeypatch.setattr(step_functions_helper, "SEQUENCE_CONVERSATIONS", False)
+    execution_helper = importlib.import_module("common.helpers.execution_helper")
+    client = mocker.MagicMock()
+    mocker.patch.object(execution_helper, "get_client", return_value=client)
+    client.start_execution.return_value = {"executionArn": "arn:execution"}
+    # No message was answered yet
+    redelivery_helper = importlib.import_module("trigger.helpers.redelivery_helper")
+    dynamodb_client = mocker.MagicMock()
+    dynamodb_client.batch_get_item.return_value = {"Responses": {}}
+    monkeypatch.setattr(
+        redelivery_helper.dynamodb_helper, "dynamodb_client", dynamodb_client
+    )
+    yield trigger_handler, client
+
+
+@pytest.fixture
+def sequenced_trigger(trigger, monkeypatch):
+    """Trigger handler that sequences the conversations in a mocked table"""
+    trigger_handler, client = trigger
+    step_functions_helper = importlib.import_module(
+        "trigger.helpers.step_functions_helper"
+    )
+    monkeypatch.setattr(step_functions_helper, "SEQUENCE_CONVERSATIONS", True)
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        redelivery_helper = importlib.import_module("trigger.helpers.redelivery_helper")
+        for dynamodb_helper in (
+            step_functions_helper.sequencer.dynamodb_helper,
+            redelivery_helper.dynamodb_helper,
+        ):
+            monkeypatch.setattr(dynamodb_helper, "table_name", "test-table")
+            monkeypatch.setattr(
+                dynamodb_helper, "dynamodb_client", boto3.client("dynamodb")
+            )
+        yield trigger_handler, client
+
+
+def test_batch_starts_one_execution_per_new_message(trigger):
+    trigger_handler, client = trigger
+    event = {
+        "Records": [
+            _record("100", "MESSAGE#1"),
+            _record("200", "DEDUPE"),
+            _record("300", "MESSAGE#2"),
+            _record("400", "MESSAGE#3", event_name="REMOVE"),
+        ]
+    }
+
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+
+    assert response == {"batchItemFailures": []}
+    assert client.start_execution.call_count == 2
+
+
+def test_batch_reports_the_failed_records_and_the_next_of_the_conversation(
+    trigger,
+):
+    trigger_handler, client = trigger
+
+    def start_execution(**kwargs):
+        if "correlation-200" in kwargs["name"]:
+            raise RuntimeError("Throttled")
+        return {"executionArn": "arn:execution"}
+
+    client.start_execution.side_effect = start_execution
+    event = {
+        "Records": [
+            _record("100", "MESSAGE#1"),
+            _record("200", "MESSAGE#2"),
+            _record("300", "MESSAGE#3", from_number="2"),
+            _record("400", "MESSAGE#4"),
+        ]
+    }
+
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+
+    # The message after the failed one is not started, to keep the order
+    assert response == {
+        "batchItemFailures": [{"itemIdentifier": "200"}, {"itemIdentifier": "400"}]
+    }
+    assert client.start_execution.call_count == 3
+
+
+def test_batch_coalesces_text_messages_per_number(trigger):
+    trigger_handler, client = trigger
+    event = {
+        "Records": [
+            _record("100", "MESSAGE#1", text="hi"),
+            _record("200", "MESSAGE#2", from_number="2", text="hello"),
+            _record("300", "MESSAGE#3", text="can you"),
+            _record("400", "MESSAGE#4", text="check my todos"),
+        ]
+    }
+
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+
+    assert response == {"batchItemFailures": []}
+    assert client.start_execution.call_count == 2
+    messages = [
+        json.loads(call.kwargs["input"])["message"]
+        for call in client.start_execution.call_args_list
+    ]
+    inputs = {message["from_number"]: message for message in messages}
+    assert inputs["1"]["text"] == "hi\ncan you\ncheck my todos"
+    assert inputs["1"]["whatsapp_id"] == "wamid.400"
+    assert inputs["1"]["coalesced_count"] == 3
+    assert "coalesced_count" not in inputs["2"]
+
+
+def test_batch_reports_all_the_records_of_a_failed_group(trigger):
+    trigger_handler, client = trigger
+    client.start_execution.side_effect = RuntimeError("Throttled")
+    event = {
+        "Records": [
+            _record("100", "MESSAGE#1", text="hi"),
+            _record("200", "MESSAGE#2", text="there"),
+        ]
+    }
+
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+
+    assert response == {
+        "batchItemFailures": [{"itemIdentifier": "100"}, {"itemIdentifier": "200"}]
+    }
+
+
+def test_batch_sequences_the_executions_per_conversation(sequenced_trigger):
+    trigger_handler, client = sequenced_trigger
+    event = {
+        "Records": [
+            _record("100", "MESSAGE#1"),
+            _record("200", "MESSAGE#2", from_number="2"),
+            _record("300", "MESSAGE#3"),
+        ]
+    }
+
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+
+    # Only the first message of every conversation starts, the rest is queued
+    assert response == {"batchItemFailures": []}
+    names = [call.kwargs["name"] for call in client.start_execution.call_args_list]
+    assert sorted(names) == ["1_1_correlation-100", "2_2_correlation-200"]
+    execution_input = json.loads(client.start_execution.call_args.kwargs["input"])
+    assert execution_input["sequenced"] is True
+
+
+def test_batch_folds_stale_messages_per_number(trigger, monkeypatch):
+    trigger_handler, client = trigger
+    monkeypatch.setattr(trigger_handler, "claim_catching_up_reply", lambda n: True)
+    monkeypatch.setattr(
+        trigger_handler, "STALE_MESSAGE_POLICY", StaleMessagePolicies.FOLD
+    )
+    event = {
+        "Records": [
+            _record("100", "MESSAGE#1", text="hi", age_seconds=7200),
+            _record("200", "MESSAGE#2", text="are you there?", age_seconds=3600),
+            _record("300", "MESSAGE#3", text="hello", age_seconds=5),
+        ]
+    }
+
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+
+    assert response == {"batchItemFailures": []}
+    messages = [
+        json.loads(call.kwargs["input"])["message"]
+        for call in client.start_execution.call_args_list
+    ]
+    # The stale messages are folded into one reply, before the fresh message
+    assert messages[0]["catching_up"] is True
+    assert messages[0]["coalesced_count"] == 2
+    assert messages[1]["text"] == "hello"
+
+
+def test_batch_skips_stale_messages(trigger, monkeypatch):
+    trigger_handler, client = trigger
+    monkeypatch.setattr(
+        trigger_handler, "STALE_MESSAGE_POLICY", StaleMessagePolicies.SKIP
+    )
+    event = {
+        "Records": [
+            _record("100", "MESSAGE#1", text="hi", age_seconds=7200),
+            _record("200", "MESSAGE#2", text="hello", age_seconds=5),
+        ]
+    }
+
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+
+    assert response == {"batchItemFailures": []}
+    assert client.start_execution.call_count == 1
+    assert "correlation-200" in client.start_execution.call_args.kwargs["name"]
+
+
+def test_batch_skips_stale_messages_already_caught_up(trigger, monkeypatch):
+    trigger_handler, client = trigger
+    monkeypatch.setattr(
+        trigger_handler, "STALE_MESSAGE_POLICY", StaleMessagePolicies.FOLD
+    )
+    monkeypatch.setattr(trigger_handler, "claim_catching_up_reply", lambda n: False)
+    event = {"Records": [_record("100", "MESSAGE#1", text="hi", age_seconds=7200)]}
+
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+
+    assert response == {"batchItemFailures": []}
+    assert client.start_execution.call_count == 0
+
+
+def test_redelivered_records_are_not_processed_again(sequenced_trigger):
+    trigger_handler, client = sequenced_trigger
+    boto3.client("dynamodb").put_item(
+        TableName="test-table",
+        Item={
+            "PK": {"S": "NUMBER#1"},
+            "SK": {"S": "MESSAGE#1"},
+            "answered_at": {"S": "2024-06-19T03:41:43+00:00"},
+        },
+    )
+    event = {"Records": [_record("100", "MESSAGE#1"), _record("200", "MESSAGE#2")]}
+
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+    assert response == {"batchItemFailures": []}
+    assert client.start_execution.call_count == 1
+
+    # Re-delivered after a failure later in the batch: the answered message and
+    # the submitted execution are skipped
+    event["Records"].append(_record("300", "MESSAGE#3"))
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+    assert response == {"batchItemFailures": []}
+    assert client.start_execution.call_count == 1
+
+
+def test_redelivered_records_of_an_answered_group_are_skipped(
+    sequenced_trigger, monkeypatch
+):
+    trigger_handler, client = sequenced_trigger
+    monkeypatch.setenv("SECRET_NAME", "test-secret")
+    send_message = importlib.import_module("state_machine.processing.send_message")
+    monkeypatch.setattr(send_message.dynamodb_helper, "table_name", "test-table")
+    monkeypatch.setattr(
+        send_message.dynamodb_helper, "dynamodb_client", boto3.client("dynamodb")
+    )
+    step_functions_helper = importlib.import_module(
+        "trigger.helpers.step_functions_helper"
+    )
+    event = {
+        "Records": [
+            _record("100", "MESSAGE#1", text="hi"),
+            _record("200", "MESSAGE#2", text="can you"),
+            _record("300", "MESSAGE#3", text="check my todos"),
+        ]
+    }
+    for record in event["Records"]:
+        boto3.client("dynamodb").put_item(
+            TableName="test-table", Item=record["dynamodb"]["NewImage"]
+        )
+
+    trigger_handler.lambda_handler(event, FakeLambdaContext())
+    assert client.start_execution.call_count == 1
+    state_machine_input = json.loads(client.start_execution.call_args.kwargs["input"])
+    assert state_machine_input["message"]["coalesced_count"] == 3
+
+    # The group is answered and its execution finishes
+    step = send_message.SendMessage(state_machine_input)
+    step.mark_answered("wamid.reply")
+    step_functions_helper.sequencer.release("1", state_machine_input["execution_name"])
+
+    # Re-delivered after a failure later in the batch: no new group is submitted
+    event["Records"].append(_record("400", "MESSAGE#4", from_number="2", text="hey"))
+    response = trigger_handler.lambda_handler(event, FakeLambdaContext())
+    assert response == {"batchItemFailures": []}
+    assert client.start_execution.call_count == 2
+    message = json.loads(client.start_execution.call_args.kwargs["input"])["message"]
+    assert message["from_number"] == "2"
@@ -0,0 +1,124 @@
+# Built-in imports
+import importlib
+import json
+import os
+
+# External imports
+import boto3
+import pytest
+from fastapi.testclient import TestClient
+from moto import mock_aws
+
+# Own imports
+from backend.whatsapp_webhook.helpers.signature_helper import compute_signature
+
+
+APP_SECRET = "test-app-secret"
+
+
+@pytest.fixture
+def webhook_client(monkeypatch):
+    """Webhook API with a mocked DynamoDB table and Secrets Manager secret"""
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("SECRET_NAME", "test-secret")
+    monkeypatch.setenv("DYNAMODB_TABLE", "test-table")
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        boto3.client("secretsmanager").create_secret(
+            Name="test-secret",
+            SecretString=json.dumps({"META_APP_SECRET": APP_SECRET}),
+        )
+        main = importlib.import_module("whatsapp_webhook.api.v1.main")
+        webhook = importlib.import_module("whatsapp_webhook.api.v1.routers.webhook")
+        webhook.secrets_helper.invalidate()
+        yield TestClient(main.app), webhook
+
+
+def _delivery_body(wamid: str = "wamid.1") -> bytes:
+    message = {
+        "from": "12345678987",
+        "id": wamid,
+        "timestamp": "1718768502",
+        "type": "text",
+        "text": {"body": "Hello"},
+    }
+    body = {"entry": [{"changes": [{"value": {"messages": [message]}}]}]}
+    return json.dumps(body).encode("utf-8")
+
+
+def _post(client: TestClient, body: bytes, signature: str = None):
+    headers = {"Content-Type": "application/json"}
+    if signature:
+        headers["X-Hub-Signature-256"] = signature
+    return client.post("/api/v1/webhook", content=body, headers=headers)
+
+
+def test_post_webhook_with_valid_signature(webhook_client):
+    client, webhook = webhook_client
+    body = _delivery_body()
+
+    response = _post(client, body, compute_signature(body, APP_SECRET))
+    assert response.status_code == 200
+    assert response.json()["results"][0]["status"] == "stored"
+
+    items = webhook.dynamodb_helper.query_by_pk_and_sk_begins_with(
+        "NUMBER#12345678987", "MESSAGE#"
+    )
+    assert [item["text"] for item in items] == ["Hello"]
+
+
+def test_post_webhook_rejects_forged_requests(webhook_client, mocker):
+    client, webhook = webhook_client
+    spy = mocker.spy(webhook, "ingest_messages")
+    body = _delivery_body()
+
+    assert _post(client, body).status_code == 401
+    assert _post(client, body, compute_signature(body, "forged")).status_code == 401
+    assert spy.call_count == 0
+
+
+def test_post_webhook_without_app_secret_is_a_configuration_error(
+    webhook_client, mocker
+):
+    client, webhook = webhook_client
+    spy = mocker.spy(webhook, "ingest_messages")
+    boto3.client("secretsmanager").put_secret_value(
+        SecretId="test-secret",
+        SecretString=json.dumps({"AWS_API_KEY_TOKEN": "token"}),
+    )
+    webhook.secrets_helper.invalidate()
+    body = _delivery_body()
+
+    response = _post(client, body, compute_signature(body, APP_SECRET))
+    assert response.status_code == 503
+    assert "not configured" in response.json()["error"]
+    assert spy.call_count == 0
+
+
+def test_post_webhook_rejects_oversized_requests(webhook_client, mocker):
+    client, webhook = webhook_client
+    mocker.patch.object(webhook, "MAX_BODY_BYTES", 64)
+    spy = mocker.spy(webhook.secrets_helper, "get_secret_value")
+    body = _delivery_body()
+
+    assert _post(client, body, compute_signature(body, APP_SECRET)).status_code == 413
+    assert spy.call_count == 0
+
+
+def test_post_webhook_rejects_invalid_json(webhook_client):
+    client, _ = webhook_client
+    body = b'{"entry": "not-a-list"'
+
+    response = _post(client, body, compute_signature(body, APP_SECRET))
+    assert response.status_code == 400
@@ -0,0 +1,209 @@
+# Built-in imports
+import os
+from datetime import datetime, timezone
+
+# External imports
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+# Own imports
+from backend.common.helpers.dynamodb_helper import DynamoDBHelper
+from backend.common.models.text_message_model import TextMessageModel
+from backend.whatsapp_webhook.api.v1.schemas import WebhookPayloadModel
+from backend.whatsapp_webhook.helpers.dedupe_helper import MessageDeduplicator
+from backend.whatsapp_webhook.helpers.messages_helper import (
+    MessageOutcomes,
+    ingest_messages,
+)
+
+
+@pytest.fixture
+def dynamodb_helper():
+    """Mocked DynamoDB table for the messages"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield DynamoDBHelper(table_name="test-table")
+
+
+@pytest.fixture
+def webhook_body() -> WebhookPayloadModel:
+    return WebhookPayloadModel.model_validate(
+        {
+            "entry": [
+                {
+                    "changes": [
+                        {
+                            "value": {
+                                "messages": [
+                                    {
+                                        "from": "12345678987",
+                                        "id": "wamid.1",
+                                        "timestamp": "1718768502",
+                                        "type": "text",
+                                        "text": {"body": "Hello"},
+                                    }
+                                ]
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+    )
+
+
+def _message_item(whatsapp_id: str) -> TextMessageModel:
+    created_at = datetime.now(timezone.utc).isoformat()
+    return TextMessageModel(
+        PK="NUMBER#12345678987",
+        SK=f"MESSAGE#{created_at}",
+        from_number="12345678987",
+        created_at=created_at,
+        type="text",
+        whatsapp_id=whatsapp_id,
+        whatsapp_timestamp="1718768502",
+        text="Hello",
+    )
+
+
+def test_put_unique_first_time_and_duplicate_from_lru(dynamodb_helper, mocker):
+    deduplicator = MessageDeduplicator(dynamodb_helper)
+    spy = mocker.spy(dynamodb_helper, "put_items_with_claims")
+
+    assert deduplicator.put_unique([_message_item("wamid.1")]) == [True]
+    assert deduplicator.put_unique([_message_item("wamid.1")]) == [False]
+    assert spy.call_count == 1  # Hot retry answered from memory
+
+    dedupe_item = dynamodb_helper.get_item_by_pk_and_sk("DEDUPE#wamid.1", "DEDUPE")
+    assert "ttl" in dedupe_item
+
+
+def test_put_unique_duplicate_from_dynamodb(dynamodb_helper):
+    # Different containers do not share the LRU, only the DynamoDB table
+    for saved in ([True], [False]):
+        deduplicator = MessageDeduplicator(dynamodb_helper)
+        assert deduplicator.put_unique([_message_item("wamid.1")]) == saved
+
+
+def test_put_unique_expired_dedupe_item(dynamodb_helper):
+    deduplicator = MessageDeduplicator(dynamodb_helper, ttl_seconds=-10)
+    assert deduplicator.put_unique([_message_item("wamid.1")]) == [True]
+    deduplicator = MessageDeduplicator(dynamodb_helper)
+    assert deduplicator.put_unique([_message_item("wamid.1")]) == [True]
+
+
+def test_lru_is_bounded(dynamodb_helper):
+    deduplicator = MessageDeduplicator(dynamodb_helper, lru_max_size=2)
+    deduplicator.put_unique(
+        [
+            _message_item(whatsapp_id)
+            for whatsapp_id in ("wamid.1", "wamid.2", "wamid.3")
+        ]
+    )
+    assert list(deduplicator._recent_ids) == ["wamid.2", "wamid.3"]
+
+
+def test_ingest_messages_suppresses_redeliveries(dynamodb_helper, webhook_body):
+    deduplicator = MessageDeduplicator(dynamodb_helper)
+
+    outcomes = ingest_messages(webhook_body, dynamodb_helper, deduplicator)
+    assert outcomes[0]["status"] == MessageOutcomes.STORED.value
+
+    outcomes = ingest_messages(webhook_body, dynamodb_helper, deduplicator)
+    assert outcomes[0]["status"] == MessageOutcomes.DUPLICATE.value
+
+    messages = dynamodb_helper.query_by_pk_and_sk_begins_with(
+        "NUMBER#12345678987", "MESSAGE#"
+    )
+    assert len(messages) == 1
+
+
+def test_ingest_messages_saves_claims_with_the_messages(dynamodb_helper, mocker):
+    def message(whatsapp_id: str) -> dict:
+        return {
+            "from": "12345678987",
+            "id": whatsapp_id,
+            "timestamp": "1718768502",
+            "type": "text",
+            "text": {"body": "Hello"},
+        }
+
+    # Received by another container
+    MessageDeduplicator(dynamodb_helper).put_unique([_message_item("wamid.2")])
+    payload = WebhookPayloadModel.model_validate(
+        {
+            "entry": [
+                {
+                    "changes": [
+                        {
+                            "value": {
+                                "messages": [
+                                    message("wamid.1"),
+                                    message("wamid.2"),
+                                    message("wamid.3"),
+                                    message("wamid.1"),
+                                ]
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+    )
+    spy = mocker.spy(dynamodb_helper.dynamodb_client, "transact_write_items")
+
+    outcomes = ingest_messages(
+        payload, dynamodb_helper, MessageDeduplicator(dynamodb_helper)
+    )
+    assert [outcome["status"] for outcome in outcomes] == [
+        MessageOutcomes.STORED.value,
+        MessageOutcomes.DUPLICATE.value,
+        MessageOutcomes.STORED.value,
+        MessageOutcomes.DUPLICATE.value,
+    ]
+    # Written again without the duplicate from DynamoDB
+    assert spy.call_count == 2
+
+    messages = dynamodb_helper.query_by_pk_and_sk_begins_with(
+        "NUMBER#12345678987", "MESSAGE#"
+    )
+    assert [message["whatsapp_id"] for message in messages] == [
+        "wamid.2",
+        "wamid.1",
+        "wamid.3",
+    ]
+
+
+def test_ingest_messages_failure_allows_redelivery(
+    dynamodb_helper, webhook_body, mocker
+):
+    deduplicator = MessageDeduplicator(dynamodb_helper)
+    mocker.patch.object(
+        dynamodb_helper.dynamodb_client,
+        "transact_write_items",
+        side_effect=ClientError(
+            {"Error": {"Code": "InternalServerError"}}, "TransactWriteItems"
+        ),
+    )
+
+    with pytest.raises(ClientError):
+        ingest_messages(webhook_body, dynamodb_helper, deduplicator)
+
+    # Neither the claim nor the message were saved
+    mocker.stopall()
+    outcomes = ingest_messages(webhook_body, dynamodb_helper, deduplicator)
+    assert outcomes[0]["status"] == MessageOutcomes.STORED.value
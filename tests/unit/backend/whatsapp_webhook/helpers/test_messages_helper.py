@@ -0,0 +1,204 @@
+# Built-in imports
+import os
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from backend.common.helpers.dynamodb_helper import DynamoDBHelper
+from backend.whatsapp_webhook.api.v1.schemas import WebhookPayloadModel
+from common.models.media_message_model import MediaMessageModel
+from backend.whatsapp_webhook.helpers.messages_helper import (
+    MessageOutcomes,
+    build_message_item,
+    build_message_items,
+    extract_messages,
+    ingest_messages,
+)
+
+
+def _text_message(number: str, wamid: str, text: str) -> dict:
+    return {
+        "from": number,
+        "id": wamid,
+        "timestamp": "1718768502",
+        "type": "text",
+        "text": {"body": text},
+    }
+
+
+@pytest.fixture
+def webhook_body() -> WebhookPayloadModel:
+    """Webhook delivery with several entries, changes and messages"""
+    return WebhookPayloadModel.model_validate(
+        {
+            "object": "whatsapp_business_account",
+            "entry": [
+                {
+                    "id": "entry-1",
+                    "changes": [
+                        {
+                            "field": "messages",
+                            "value": {
+                                "messages": [
+                                    _text_message("12345678987", "wamid.1", "Hello"),
+                                    _text_message("12345678987", "wamid.2", "World"),
+                                ]
+                            },
+                        },
+                        {
+                            "field": "messages",
+                            "value": {
+                                "messages": [
+                                    {
+                                        "from": "12345678988",
+                                        "id": "wamid.3",
+                                        "timestamp": "1718768503",
+                                        "type": "sticker",
+                                    },
+                                ]
+                            },
+                        },
+                    ],
+                },
+                {
+                    "id": "entry-2",
+                    "changes": [
+                        {
+                            "field": "messages",
+                            "value": {
+                                "messages": [
+                                    _text_message("12345678989", "wamid.4", "Hi!"),
+                                    _text_message("invalid", "wamid.5", "Bad number"),
+                                ]
+                            },
+                        },
+                    ],
+                },
+            ],
+        }
+    )
+
+
+@pytest.fixture
+def dynamodb_helper():
+    """Mocked DynamoDB table for the messages"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield DynamoDBHelper(table_name="test-table")
+
+
+def test_extract_messages_walks_all_entries_and_changes(webhook_body):
+    messages = extract_messages(webhook_body)
+    assert [message.id for message in messages] == [
+        "wamid.1",
+        "wamid.2",
+        "wamid.3",
+        "wamid.4",
+        "wamid.5",
+    ]
+
+
+def test_extract_messages_without_messages():
+    payload = WebhookPayloadModel.model_validate(
+        {"entry": [{"changes": [{"value": {}}]}]}
+    )
+    assert extract_messages(payload) == []
+
+
+def test_build_message_items_outcomes(webhook_body):
+    message_items, outcomes = build_message_items(extract_messages(webhook_body))
+
+    assert [item.whatsapp_id for item in message_items] == [
+        "wamid.1",
+        "wamid.2",
+        "wamid.4",
+    ]
+    assert [outcome["status"] for outcome in outcomes] == [
+        MessageOutcomes.STORED.value,
+        MessageOutcomes.STORED.value,
+        MessageOutcomes.UNSUPPORTED.value,
+        MessageOutcomes.STORED.value,
+        MessageOutcomes.INVALID.value,
+    ]
+
+    # Messages from the same number must never collide on the sort key
+    sort_keys = [item.SK for item in message_items]
+    assert len(set(sort_keys)) == len(sort_keys)
+    assert sort_keys == sorted(sort_keys)
+
+
+def test_ingest_messages_stores_all_valid_messages(webhook_body, dynamodb_helper):
+    outcomes = ingest_messages(webhook_body, dynamodb_helper)
+    assert len(outcomes) == 5
+
+    items = dynamodb_helper.query_by_pk_and_sk_begins_with(
+        "NUMBER#12345678987", "MESSAGE#"
+    )
+    assert [item["text"] for item in items] == ["Hello", "World"]
+    assert (
+        len(
+            dynamodb_helper.query_by_pk_and_sk_begins_with(
+                "NUMBER#12345678989", "MESSAGE#"
+            )
+        )
+        == 1
+    )
+
+
+@pytest.mark.parametrize(
+    "wpp_type,expected_type",
+    [("image", "image"), ("audio", "voice"), ("video", "video")],
+)
+def test_build_message_item_media(wpp_type, expected_type):
+    message = WebhookPayloadModel.model_validate(
+        {
+            "entry": [
+                {
+                    "changes": [
+                        {
+                            "value": {
+                                "messages": [
+                                    {
+                                        "from": "12345678987",
+                                        "id": "wamid.6",
+                                        "timestamp": "1718768504",
+                                        "type": wpp_type,
+                                        wpp_type: {
+                                            "id": "media-1",
+                                            "mime_type": "image/jpeg",
+                                            "sha256": "abc",
+                                        },
+                                    }
+                                ]
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+    )
+    item = build_message_item(
+        extract_messages(message)[0], "2024-06-19T03:41:42+00:00", "corr-1"
+    )
+
+    assert isinstance(item, MediaMessageModel)
+    assert item.type == expected_type
+    assert item.media_id == "media-1"
+    assert item.mime_type == "image/jpeg"
+    # Only the reference is stored, the media itself is fetched later to S3
+    assert item.media_key is None
@@ -0,0 +1,30 @@
+# Own imports
+from backend.whatsapp_webhook.helpers.signature_helper import (
+    compute_signature,
+    is_valid_signature,
+)
+
+
+BODY = b'{"entry":[{"changes":[{"value":{"messages":[]}}]}]}'
+
+
+def test_compute_signature_known_value():
+    assert compute_signature(b"", "secret") == (
+        "sha256=f9e66e179b6747ae54108f82f8ade8b3c25d76fd30afde6c395822c530196169"
+    )
+
+
+def test_is_valid_signature():
+    signature = compute_signature(BODY, "app-secret")
+    assert is_valid_signature(BODY, signature, "app-secret") is True
+
+
+def test_is_valid_signature_rejects_forged_requests():
+    signature = compute_signature(BODY, "app-secret")
+    assert is_valid_signature(BODY + b" ", signature, "app-secret") is False
+    assert is_valid_signature(BODY, signature, "other-secret") is False
+    assert (
+        is_valid_signature(BODY, signature.removeprefix("sha256="), "app-secret")
+        is False
+    )
+    assert is_valid_signature(BODY, None, "app-secret") is False
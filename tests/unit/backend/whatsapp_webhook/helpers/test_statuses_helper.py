@@ -0,0 +1,178 @@
+# Built-in imports
+import os
+
+# External imports
+import boto3
+import pytest
+from moto import mock_aws
+
+# Own imports
+from backend.common.helpers.dynamodb_helper import DynamoDBHelper
+from backend.whatsapp_webhook.api.v1.schemas import (
+    WebhookPayloadModel,
+    WebhookStatusModel,
+)
+from backend.whatsapp_webhook.helpers.messages_helper import (
+    DeliveryTypes,
+    classify_delivery,
+)
+from backend.whatsapp_webhook.helpers.statuses_helper import (
+    aggregate_statuses,
+    ingest_statuses,
+)
+
+
+def _status(wamid: str, status: str, timestamp: str) -> dict:
+    return {
+        "id": wamid,
+        "status": status,
+        "timestamp": timestamp,
+        "recipient_id": "12345678987",
+    }
+
+
+@pytest.fixture
+def statuses_body() -> dict:
+    """Webhook delivery with status callbacks only (no messages)"""
+    return {
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "statuses": [
+                                _status("wamid.1", "sent", "1718768502"),
+                                _status("wamid.1", "read", "1718768510"),
+                                _status("wamid.1", "delivered", "1718768505"),
+                                _status("wamid.2", "sent", "1718768520"),
+                            ]
+                        }
+                    }
+                ]
+            }
+        ]
+    }
+
+
+@pytest.fixture
+def dynamodb_helper():
+    """Mocked DynamoDB table for the messages"""
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    with mock_aws():
+        boto3.client("dynamodb").create_table(
+            TableName="test-table",
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield DynamoDBHelper(table_name="test-table")
+
+
+def test_classify_delivery(statuses_body):
+    message = {"from": "12345678987", "id": "wamid.3", "type": "text"}
+    messages_body = {"entry": [{"changes": [{"value": {"messages": [message]}}]}]}
+    mixed_body = {
+        "entry": statuses_body["entry"] + messages_body["entry"],
+    }
+
+    for body, delivery_type in (
+        (statuses_body, DeliveryTypes.STATUSES),
+        (messages_body, DeliveryTypes.MESSAGES),
+        (mixed_body, DeliveryTypes.MIXED),
+        ({"entry": []}, DeliveryTypes.UNKNOWN),
+    ):
+        payload = WebhookPayloadModel.model_validate(body)
+        assert classify_delivery(payload) == delivery_type
+
+
+def test_aggregate_statuses_one_record_per_message(statuses_body):
+    statuses = statuses_body["entry"][0]["changes"][0]["value"]["statuses"]
+    status_items = aggregate_statuses(
+        [WebhookStatusModel.model_validate(status) for status in statuses]
+    )
+
+    assert len(status_items) == 2
+    assert status_items[0].model_dump(exclude_none=True) == {
+        "PK": "NUMBER#12345678987",
+        "SK": "STATUS#wamid.1",
+        "whatsapp_id": "wamid.1",
+        "recipient_id": "12345678987",
+        "status": "read",
+        "status_timestamp": "1718768510",
+        "sent_at": "1718768502",
+        "delivered_at": "1718768505",
+        "read_at": "1718768510",
+    }
+    assert status_items[1].status == "sent"
+
+
+def test_aggregate_statuses_failed_with_error_code():
+    status = _status("wamid.1", "failed", "1718768502")
+    status["errors"] = [{"code": 131047, "title": "Re-engagement message"}]
+
+    status_items = aggregate_statuses(
+        [
+            WebhookStatusModel.model_validate(status),
+            WebhookStatusModel(id="wamid.2", status="?"),
+        ]
+    )
+    assert len(status_items) == 1
+    assert status_items[0].error_code == "131047"
+
+
+def test_ingest_statuses_with_tracking(statuses_body, dynamodb_helper, mocker):
+    spy = mocker.spy(dynamodb_helper, "update_item")
+    payload = WebhookPayloadModel.model_validate(statuses_body)
+    assert ingest_statuses(payload, dynamodb_helper, track_statuses=True) == 4
+    assert spy.call_count == 2
+
+    status_items = dynamodb_helper.query_by_pk_and_sk_begins_with(
+        "NUMBER#12345678987", "STATUS#"
+    )
+    assert [item["status"] for item in status_items] == ["read", "sent"]
+
+
+def test_ingest_statuses_without_tracking(statuses_body, dynamodb_helper, mocker):
+    spy = mocker.spy(dynamodb_helper, "update_item")
+    payload = WebhookPayloadModel.model_validate(statuses_body)
+    assert ingest_statuses(payload, dynamodb_helper, track_statuses=False) == 4
+    assert spy.call_count == 0
+
+
+def test_ingest_statuses_out_of_order_deliveries(dynamodb_helper):
+    recipient_id = "573001234567890"  # E.164 numbers have up to 15 digits
+    deliveries = [
+        [_status("wamid.1", "sent", "1718768502")],
+        [_status("wamid.1", "read", "1718768510")],
+        [_status("wamid.1", "delivered", "1718768505")],
+        [_status("wamid.1", "sent", "1718768599")],  # Re-delivered
+    ]
+    for statuses in deliveries:
+        for status in statuses:
+            status["recipient_id"] = recipient_id
+        body = {"entry": [{"changes": [{"value": {"statuses": statuses}}]}]}
+        payload = WebhookPayloadModel.model_validate(body)
+        ingest_statuses(payload, dynamodb_helper, track_statuses=True)
+
+    status_items = dynamodb_helper.query_by_pk_and_sk_begins_with(
+        f"NUMBER#{recipient_id}", "STATUS#"
+    )
+    assert status_items == [
+        {
+            "PK": f"NUMBER#{recipient_id}",
+            "SK": "STATUS#wamid.1",
+            "whatsapp_id": "wamid.1",
+            "recipient_id": recipient_id,
+            "status": "read",
+            "status_timestamp": "1718768510",
+            "sent_at": "1718768502",
+            "delivered_at": "1718768505",
+            "read_at": "1718768510",
+        }
+    ]
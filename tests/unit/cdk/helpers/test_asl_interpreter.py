@@ -0,0 +1,165 @@
+# Built-in imports
+import json
+
+# Own imports
+from cdk.helpers.asl_interpreter import (
+    ASLInterpreter,
+    definition_from_template,
+)
+
+
+def _lambda_task(next_state: str, **extra) -> dict:
+    return {
+        "Type": "Task",
+        "Resource": "arn:aws:states:::lambda:invoke",
+        "Parameters": {
+            "FunctionName": "arn:aws:lambda:local:000000000000:function:Step",
+            "Payload": {"event.$": "$", "params": {"method_name": "run"}},
+        },
+        "OutputPath": "$.Payload",
+        "Next": next_state,
+        **extra,
+    }
+
+
+def test_definition_from_template_resolves_the_lambda_arns():
+    definition = {"StartAt": "Step", "States": {"Step": _lambda_task("Done")}}
+    definition_string = json.dumps(definition).replace(
+        "arn:aws:lambda:local:000000000000:function:Step", "<ARN>"
+    )
+    before, after = definition_string.split("<ARN>")
+    template = {
+        "Resources": {
+            "StateMachine": {
+                "Type": "AWS::StepFunctions::StateMachine",
+                "Properties": {
+                    "DefinitionString": {
+                        "Fn::Join": [
+                            "",
+                            [before, {"Fn::GetAtt": ["Step", "Arn"]}, after],
+                        ]
+                    }
+                },
+            }
+        }
+    }
+
+    assert definition_from_template(template) == definition
+
+
+def test_execute_task_choice_and_pass_states():
+    definition = {
+        "StartAt": "Step",
+        "States": {
+            "Step": _lambda_task("Type?"),
+            "Type?": {
+                "Type": "Choice",
+                "Choices": [
+                    {"Variable": "$.type", "StringEquals": "text", "Next": "Text"}
+                ],
+                "Default": "Other",
+            },
+            "Text": {
+                "Type": "Pass",
+                "Result": {"ok": True},
+                "ResultPath": "$.pass",
+                "Next": "Done",
+            },
+            "Other": {"Type": "Fail", "Error": "NotImplemented"},
+            "Done": {"Type": "Succeed"},
+        },
+    }
+    payloads = []
+
+    def invoke_lambda(function_name: str, payload: dict) -> dict:
+        payloads.append(payload)
+        return {**payload["event"], "step": "done"}
+
+    result = ASLInterpreter(definition, invoke_lambda).execute({"type": "text"})
+
+    assert result.status == "SUCCEEDED"
+    assert result.output == {"type": "text", "step": "done", "pass": {"ok": True}}
+    assert payloads == [{"event": {"type": "text"}, "params": {"method_name": "run"}}]
+    assert [record.name for record in result.states] == [
+        "Step",
+        "Type?",
+        "Text",
+        "Done",
+    ]
+    assert result.states[0].input_bytes == len('{"type":"text"}')
+
+
+def test_execute_retries_with_backoff_and_catches_errors():
+    definition = {
+        "StartAt": "Step",
+        "States": {
+            "Step": _lambda_task(
+                "Done",
+                Retry=[
+                    {
+                        "ErrorEquals": ["RuntimeError"],
+                        "IntervalSeconds": 1,
+                        "MaxAttempts": 2,
+                        "BackoffRate": 2,
+                    }
+                ],
+                Catch=[
+                    {
+                        "ErrorEquals": ["States.ALL"],
+                        "ResultPath": "$.error",
+                        "Next": "Failed",
+                    }
+                ],
+            ),
+            "Failed": {"Type": "Pass", "End": True},
+            "Done": {"Type": "Succeed"},
+        },
+    }
+    sleeps = []
+
+    def invoke_lambda(function_name: str, payload: dict) -> dict:
+        raise RuntimeError("Throttled")
+
+    result = ASLInterpreter(definition, invoke_lambda, sleep=sleeps.append).execute(
+        {"id": 1}
+    )
+
+    assert result.status == "SUCCEEDED"
+    assert sleeps == [1, 2]
+    assert result.states[0].attempts == 3
+    assert result.states[0].error == "RuntimeError"
+    assert result.output["id"] == 1
+    assert result.output["error"]["Error"] == "RuntimeError"
+
+
+def test_execute_fails_without_catch():
+    definition = {"StartAt": "Step", "States": {"Step": _lambda_task("Done")}}
+
+    def invoke_lambda(function_name: str, payload: dict) -> dict:
+        raise ValueError("Message type <sticker> is not allowed")
+
+    result = ASLInterpreter(definition, invoke_lambda).execute({})
+
+    assert result.status == "FAILED"
+    assert result.error == "ValueError"
+    assert "sticker" in json.loads(result.cause)["errorMessage"]
+
+
+def test_execute_fails_when_no_choice_matches():
+    definition = {
+        "StartAt": "Choice",
+        "States": {
+            "Choice": {
+                "Type": "Choice",
+                "Choices": [
+                    {"Variable": "$.missing", "IsPresent": True, "Next": "Done"}
+                ],
+            },
+            "Done": {"Type": "Succeed"},
+        },
+    }
+
+    result = ASLInterpreter(definition, lambda *_: None).execute({})
+
+    assert result.status == "FAILED"
+    assert result.error == "States.NoChoiceMatched"
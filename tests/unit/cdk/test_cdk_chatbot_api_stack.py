@@ -6,6 +6,7 @@ import aws_cdk as core
 import aws_cdk.assertions as assertions
 
 # Own imports
+from cdk.helpers.asl_interpreter import ASLInterpreter, definition_from_template
 from cdk.stacks.cdk_chatbot_api_stack import ChatbotAPIStack
 
 app: core.App = core.App()
@@ -45,8 +46,126 @@ def test_lambda_function_created():
     assert len(match) >= 8
 
 
+def test_sequencer_recovery_runs_on_a_schedule():
+    template.has_resource_properties(
+        "AWS::DynamoDB::Table",
+        {
+            "GlobalSecondaryIndexes": [
+                assertions.Match.object_like({"IndexName": "sequencer-leases"})
+            ]
+        },
+    )
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {"Handler": "trigger/recovery_handler.lambda_handler"},
+    )
+    template.has_resource_properties(
+        "AWS::Events::Rule", {"ScheduleExpression": "rate(1 minute)"}
+    )
+
+
 def test_api_gateway_created():
     match = template.find_resources(
         type="AWS::ApiGateway::RestApi",
     )
     assert len(match) == 1
+
+
+def test_media_bucket_created():
+    template.has_resource_properties(
+        "AWS::S3::Bucket",
+        {
+            "LifecycleConfiguration": {
+                "Rules": assertions.Match.array_with(
+                    [
+                        assertions.Match.object_like(
+                            {
+                                "AbortIncompleteMultipartUpload": {
+                                    "DaysAfterInitiation": 1
+                                }
+                            }
+                        )
+                    ]
+                )
+            }
+        },
+    )
+
+
+def test_state_machine_definition_routes_the_messages_by_type():
+    definition = definition_from_template(template.to_json())
+
+    def invoke_lambda(function_name: str, payload: dict) -> dict:
+        event = payload["event"]
+        event.setdefault("steps", []).append(payload["params"]["class_name"])
+        if payload["params"]["class_name"] == "ValidateMessage":
+            event["message_type"] = event["type"]
+        return event
+
+    interpreter = ASLInterpreter(definition, invoke_lambda)
+    text = interpreter.execute({"type": "text"})
+    voice = interpreter.execute({"type": "voice"})
+
+    assert text.status == voice.status == "SUCCEEDED"
+    assert text.output["steps"] == [
+        "ValidateMessage",
+        "ProcessText",
+        "SendMessage",
+        "Success",
+    ]
+    assert voice.output["steps"] == [
+        "ValidateMessage",
+        "ProcessMedia",
+        "ProcessVoice",
+        "ProcessText",
+        "SendMessage",
+        "Success",
+    ]
+
+
+def test_state_machine_retries_the_transient_dependency_errors():
+    states = definition_from_template(template.to_json())["States"]
+
+    for state_name in ["Process Text", "Process Media", "Send Message"]:
+        retriers = {
+            tuple(retrier["ErrorEquals"]): retrier
+            for retrier in states[state_name]["Retry"]
+        }
+        retrier = retriers[("TransientDependencyError",)]
+        assert retrier["JitterStrategy"] == "FULL"
+        assert ("CircuitOpenError",) not in retriers
+
+
+def test_state_machine_retries_the_release_of_the_conversation():
+    states = definition_from_template(template.to_json())["States"]
+
+    retriers = states["Process Success"]["Retry"]
+    assert ["DispatchError"] in [retrier["ErrorEquals"] for retrier in retriers]
+
+
+def test_state_machine_definition_sends_the_failed_steps_to_process_failure():
+    definition = definition_from_template(template.to_json())
+    failures = []
+
+    def invoke_lambda(function_name: str, payload: dict) -> dict:
+        event = payload["event"]
+        class_name = payload["params"]["class_name"]
+        if class_name == "ValidateMessage":
+            event["message_type"] = event["type"]
+        if class_name == "SendMessage":
+            raise RuntimeError("Meta API is down")
+        if class_name == "Failure":
+            failures.append(event)
+        return event
+
+    interpreter = ASLInterpreter(definition, invoke_lambda, sleep=lambda s: None)
+    result = interpreter.execute({"type": "text"})
+
+    assert result.status == "FAILED"
+    assert failures[0]["failed_step"] == "Send Message"
+    assert failures[0]["error"]["Error"] == "RuntimeError"
+    assert [state.name for state in result.states][-3:] == [
+        "Send Message Failed",
+        "Process Failure",
+        "Exception Handling Finished",
+    ]